@@ -7,6 +7,8 @@ import traceback
 from typing import Dict, Any, List, Optional, Callable
 from threading import RLock
 
+from beginnings.extensions.request_facts import SCOPE_KEY as REQUEST_FACTS_KEY
+
 from .metrics import MetricsCollector
 from .requests import RequestTracker
 from .profiler import PerformanceProfiler
@@ -586,6 +588,12 @@ class DebugMiddleware:
         Returns:
             Client IP address
         """
+        # Prefer the proxy-validated IP resolved by the security extensions
+        scope = getattr(request, 'scope', None)
+        facts = scope.get(REQUEST_FACTS_KEY) if isinstance(scope, dict) else None
+        if facts is not None and facts.client_ip is not None:
+            return facts.client_ip
+        
         # Try common attributes/headers for IP address
         if hasattr(request, 'remote_addr'):
             return request.remote_addr
@@ -20,8 +20,11 @@ from beginnings.config.environment import EnvironmentDetector
 from beginnings.config.route_resolver import RouteConfigResolver
 from beginnings.extensions.base import BaseExtension
 from beginnings.extensions.loader import ExtensionManager
+from beginnings.extensions.shared_memory import set_shared_memory_app_name
 from beginnings.routing.api import APIRouter
 from beginnings.routing.html import HTMLRouter
+from beginnings.routing.timing import ServerTimingMiddleware
+from beginnings.tracing import TracingMiddleware, create_tracer_from_config, set_tracer
 
 
 class ExceptionHandlerMiddleware(BaseHTTPMiddleware):
@@ -86,6 +89,13 @@ class App(FastAPI):
         # Initialize route configuration resolver
         self._route_resolver = RouteConfigResolver(self._config)
 
+        # Set the tracer before extensions and routers instrument themselves
+        self._tracer = create_tracer_from_config(self._config)
+        set_tracer(self._tracer)
+
+        # Name shared memory backing files after the app before extensions open them
+        set_shared_memory_app_name(self._config.get("app", {}).get("name", "beginnings-app"))
+
         # Create lifespan context manager
         @asynccontextmanager
         async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
@@ -94,6 +104,8 @@ class App(FastAPI):
             yield
             # Shutdown
             await self._extension_manager.shutdown()
+            if self._tracer is not None:
+                self._tracer.shutdown()
 
         # Initialize FastAPI with lifespan
         fastapi_kwargs["lifespan"] = lifespan
@@ -111,6 +123,19 @@ class App(FastAPI):
         # Add middleware to catch all unhandled exceptions
         self.add_middleware(ExceptionHandlerMiddleware, app_instance=self)
 
+        # Report middleware timings to clients outside production
+        timing_config = self._config.get("middleware_timing", {})
+        if (
+            timing_config.get("enabled", False)
+            and timing_config.get("server_timing", True)
+            and self.get_environment() != "production"
+        ):
+            self.add_middleware(ServerTimingMiddleware)
+
+        # Trace requests from the outermost middleware, so every layer is in the trace
+        if self._tracer is not None:
+            self.add_middleware(TracingMiddleware, tracer=self._tracer)
+
     def get_config(self) -> dict[str, Any]:
         """
         Get the loaded configuration.
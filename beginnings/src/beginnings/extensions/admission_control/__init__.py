@@ -0,0 +1,10 @@
+"""
+Admission control extension for Beginnings framework.
+
+This module provides load shedding with adaptive concurrency limits,
+a bounded priority wait queue and pre-serialized 503 rejections.
+"""
+
+from beginnings.extensions.admission_control.extension import AdmissionControlExtension
+
+__all__ = ["AdmissionControlExtension"]
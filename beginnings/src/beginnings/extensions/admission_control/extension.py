@@ -0,0 +1,257 @@
+"""
+Admission control extension for Beginnings framework.
+
+This module provides the admission control extension, which sheds load
+under overload by capping requests in flight with adaptive concurrency
+limits and rejecting what cannot be served in time with a cheap 503.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import time
+from typing import Any, Callable
+
+from fastapi import HTTPException, Request
+
+from beginnings.extensions.admission_control.limiter import ConcurrencyLimiter
+from beginnings.extensions.admission_control.limits import create_limit
+from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.request_facts import RequestFacts
+from beginnings.extensions.responses import PreparedResponse, encode_headers
+from beginnings.monitoring import get_metrics_collector, get_structured_logger
+
+DEFAULT_PRIORITIES = ["critical", "high", "normal", "low"]
+
+
+class AdmissionControlExtension(BaseExtension):
+    """
+    Admission control extension.
+
+    Every request takes a slot of the global concurrency limit, and of its
+    route's own limit if one is configured. Limits adapt to observed
+    latency (``gradient`` or ``aimd``). Requests over the limit wait in a
+    bounded queue, most important priority class first, for at most
+    ``queue.timeout_ms``; the rest get a pre-serialized 503 with
+    Retry-After. Routes pick their priority class with
+    ``admission_control.priority``, and requests carrying a bearer token or
+    session cookie are raised to ``authenticated_priority``.
+
+    Admission runs before authentication, so the token or cookie is not
+    verified: any client can claim the raised priority by sending one. It
+    only changes queue order, never access, but under overload anonymous
+    clients doing so compete with signed-in users. Set
+    ``authenticated_priority`` to None to disable the promotion.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize admission control extension.
+
+        Args:
+            config: Admission control configuration dictionary
+        """
+        super().__init__(config)
+
+        self.enabled = config.get("enabled", True)
+
+        # Priority classes, most important first
+        self.priorities = list(config.get("priorities", DEFAULT_PRIORITIES))
+        self.default_priority = config.get("default_priority", "normal")
+        self.authenticated_priority = config.get("authenticated_priority", "high")
+        self.session_cookie = config.get("session_cookie", "sessionid")
+
+        # Wait queue shared by the global and per-route limiters
+        queue_config = config.get("queue", {})
+        self.queue_size = queue_config.get("size", 100)
+        self.queue_timeout = queue_config.get("timeout_ms", 500) / 1000
+
+        # Global limit, plus optional defaults for per-route limits
+        self.limit_config = config.get("limit", {})
+        self.route_limit_config = config.get("route_limit")
+        self._global = ConcurrencyLimiter(
+            create_limit(self.limit_config), self.queue_size, len(self.priorities)
+        )
+
+        # Pre-serialized 503 responses
+        self.retry_after = config.get("retry_after", 1)
+        error_json = config.get("error_json", {"error": "Service overloaded", "retry_after": self.retry_after})
+        error_message = config.get("error_message", "The server is busy. Please try again shortly.")
+        self._json_body = json.dumps(error_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._html_body = (
+            "<!DOCTYPE html><html><head><title>503 Service Unavailable</title></head>"
+            f"<body><h1>Service Unavailable</h1><p>{html.escape(error_message)}</p></body></html>"
+        ).encode("utf-8")
+        retry_after_header = {"retry-after": str(self.retry_after)}
+        self._json_headers = encode_headers({"content-type": "application/json", **retry_after_header})
+        self._html_headers = encode_headers({"content-type": "text/html; charset=utf-8", **retry_after_header})
+
+        # Monitoring and observability
+        self.logger = get_structured_logger()
+        self.metrics = get_metrics_collector()
+
+        # Log extension startup
+        self.logger.log_extension_startup("admission_control", config)
+
+    def get_middleware_factory(self) -> Callable[[dict[str, Any]], Callable[..., Any]]:
+        """
+        Get middleware factory for admission control.
+
+        Returns:
+            Middleware factory function
+        """
+        def create_middleware(route_config: dict[str, Any]) -> Callable[..., Any]:
+            admission_config = route_config.get("admission_control", {})
+            priority = self._priority_index(admission_config.get("priority", self.default_priority))
+            authenticated_priority = priority
+            if self.authenticated_priority is not None:
+                authenticated_priority = min(priority, self._priority_index(self.authenticated_priority))
+            queue_timeout = admission_config.get("queue_timeout_ms", self.queue_timeout * 1000) / 1000
+            route_limiter = self._create_route_limiter(admission_config)
+            global_limiter = self._global
+
+            async def admission_middleware(request: Request, call_next: Callable[..., Any]) -> Any:
+                request_priority = priority
+                if authenticated_priority < priority and self._is_authenticated(request):
+                    request_priority = authenticated_priority
+
+                # Waiting for the route and global limits shares one deadline
+                deadline = time.monotonic() + queue_timeout
+                if route_limiter is not None and not await route_limiter.acquire(request_priority, queue_timeout):
+                    return self._reject(request, "route")
+                try:
+                    admitted = await global_limiter.acquire(request_priority, deadline - time.monotonic())
+                except BaseException:
+                    # Cancelled while waiting; give back the route slot
+                    if route_limiter is not None:
+                        route_limiter.release()
+                    raise
+                if not admitted:
+                    if route_limiter is not None:
+                        route_limiter.release()
+                    return self._reject(request, "global")
+
+                status_code = 500
+                start_time = time.perf_counter()
+                try:
+                    response = await call_next(request)
+                    status_code = response.status_code
+                    return response
+                except HTTPException as e:
+                    status_code = e.status_code
+                    raise
+                finally:
+                    latency = time.perf_counter() - start_time
+                    dropped = status_code >= 500
+                    global_limiter.release(latency, dropped)
+                    if route_limiter is not None:
+                        route_limiter.release(latency, dropped)
+
+            return admission_middleware
+
+        return create_middleware
+
+    def should_apply_to_route(
+        self,
+        path: str,
+        methods: list[str],
+        route_config: dict[str, Any]
+    ) -> bool:
+        """
+        Determine if admission control should apply to a route.
+
+        Args:
+            path: Route path
+            methods: HTTP methods
+            route_config: Route configuration
+
+        Returns:
+            True unless the extension or the route opts out
+        """
+        if not self.enabled:
+            return False
+
+        return route_config.get("admission_control", {}).get("enabled", True)
+
+    def get_status(self) -> dict[str, Any]:
+        """
+        Get the current state of the global limit.
+
+        Returns:
+            Current limit, requests in flight and requests waiting
+        """
+        return {
+            "limit": self._global.limit.current,
+            "in_flight": self._global.in_flight,
+            "waiting": self._global.waiting
+        }
+
+    def _create_route_limiter(self, admission_config: dict[str, Any]) -> ConcurrencyLimiter | None:
+        """Create a route's own limiter, or None if it only uses the global limit."""
+        route_limit = admission_config.get("limit", {})
+        if route_limit is False or (self.route_limit_config is None and not route_limit):
+            return None
+
+        limit_config = {**(self.route_limit_config or self.limit_config), **route_limit}
+        return ConcurrencyLimiter(create_limit(limit_config), self.queue_size, len(self.priorities))
+
+    def _priority_index(self, name: str) -> int:
+        """Get the index of a priority class (0 is most important)."""
+        try:
+            return self.priorities.index(name)
+        except ValueError:
+            raise ValueError(f"Unknown admission control priority: {name}")
+
+    def _is_authenticated(self, request: Request) -> bool:
+        """Whether a request carries a bearer token or session cookie (unverified)."""
+        facts = RequestFacts.of(request)
+        return facts.bearer_token is not None or self.session_cookie in facts.cookies
+
+    def _reject(self, request: Request, limit: str) -> PreparedResponse:
+        """Build the pre-serialized 503 for a request that could not be admitted."""
+        self.metrics.increment_counter("admission_rejected_total", 1, {"limit": limit})
+        if RequestFacts.of(request).is_api:
+            return PreparedResponse(503, self._json_body, self._json_headers)
+        return PreparedResponse(503, self._html_body, self._html_headers)
+
+    def validate_config(self) -> list[str]:
+        """
+        Validate admission control extension configuration.
+
+        Returns:
+            List of error messages (empty if valid)
+        """
+        errors = []
+
+        if not self.priorities:
+            errors.append("Admission control priorities must not be empty")
+
+        for option, name in (
+            ("default_priority", self.default_priority),
+            ("authenticated_priority", self.authenticated_priority)
+        ):
+            if name is not None and name not in self.priorities:
+                errors.append(f"Admission control {option} '{name}' is not a configured priority")
+
+        if self.queue_size < 0:
+            errors.append("Admission control queue size must not be negative")
+
+        if self.queue_timeout < 0:
+            errors.append("Admission control queue timeout_ms must not be negative")
+
+        if self.retry_after < 0:
+            errors.append("Admission control retry_after must not be negative")
+
+        for section, limit_config in (("limit", self.limit_config), ("route_limit", self.route_limit_config)):
+            if not limit_config:
+                continue
+            try:
+                limit = create_limit(limit_config)
+            except ValueError as e:
+                errors.append(f"Admission control {section}: {e}")
+                continue
+            if limit.min_limit < 1 or limit.min_limit > limit.max_limit:
+                errors.append(f"Admission control {section} needs 1 <= min <= max")
+
+        return errors
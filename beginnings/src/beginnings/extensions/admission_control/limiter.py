@@ -0,0 +1,126 @@
+"""
+Concurrency limiter with a bounded priority wait queue.
+
+This module admits requests up to an adaptive concurrency limit. Requests
+over the limit wait in a bounded queue, ordered by priority class, until a
+slot frees up or their deadline passes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+
+from beginnings.extensions.admission_control.limits import ConcurrencyLimit
+
+
+class ConcurrencyLimiter:
+    """
+    Admits requests up to a concurrency limit.
+
+    Requests over the limit wait in one FIFO queue per priority class, 0
+    being the most important. When a slot frees up it goes to the oldest
+    waiter of the most important class. Waiters give up at their deadline.
+    When the queue is full, a newcomer displaces the oldest waiter of a less
+    important class, or is turned away.
+    """
+
+    def __init__(self, limit: ConcurrencyLimit, queue_size: int, priority_count: int) -> None:
+        """
+        Initialize concurrency limiter.
+
+        Args:
+            limit: Adaptive limit on requests in flight
+            queue_size: Maximum number of waiting requests
+            priority_count: Number of priority classes
+        """
+        self.limit = limit
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self._queues: list[deque[asyncio.Future[bool]]] = [deque() for _ in range(priority_count)]
+        self._waiting = 0
+
+    @property
+    def waiting(self) -> int:
+        """Number of requests waiting for a slot."""
+        return self._waiting
+
+    async def acquire(self, priority: int, timeout: float) -> bool:
+        """
+        Take a slot, waiting up to a timeout for one to free up.
+
+        Args:
+            priority: Priority class of the request (0 is most important)
+            timeout: Seconds the request may wait
+
+        Returns:
+            True if admitted; the caller must then call ``release``
+        """
+        if not self._waiting and self.in_flight < self.limit.current:
+            self.in_flight += 1
+            return True
+
+        if timeout <= 0 or (self._waiting >= self.queue_size and not self._displace(priority)):
+            return False
+
+        loop = asyncio.get_running_loop()
+        waiter: asyncio.Future[bool] = loop.create_future()
+        self._queues[priority].append(waiter)
+        self._waiting += 1
+        timer = loop.call_later(timeout, self._expire, waiter, priority)
+        try:
+            return await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._remove(waiter, priority)
+            elif waiter.result():
+                # Granted a slot just before the request was cancelled
+                self.release()
+            raise
+        finally:
+            timer.cancel()
+
+    def release(self, latency: float | None = None, dropped: bool = False) -> None:
+        """
+        Give back a slot and admit waiting requests.
+
+        Args:
+            latency: Seconds the request took once admitted, to update the limit
+            dropped: Whether the request failed with a server error
+        """
+        if latency is not None:
+            self.limit.on_sample(latency, self.in_flight, dropped)
+        self.in_flight -= 1
+
+        while self._waiting and self.in_flight < self.limit.current:
+            waiter = next(queue for queue in self._queues if queue).popleft()
+            self._waiting -= 1
+            if waiter.cancelled():
+                continue
+            self.in_flight += 1
+            waiter.set_result(True)
+
+    def _displace(self, priority: int) -> bool:
+        """Turn away the oldest waiter of a class less important than priority."""
+        for queue in reversed(self._queues[priority + 1:]):
+            while queue:
+                waiter = queue.popleft()
+                self._waiting -= 1
+                if not waiter.cancelled():
+                    waiter.set_result(False)
+                    return True
+        return False
+
+    def _expire(self, waiter: asyncio.Future[bool], priority: int) -> None:
+        """Turn away a waiter whose deadline passed."""
+        if not waiter.done():
+            self._remove(waiter, priority)
+            waiter.set_result(False)
+
+    def _remove(self, waiter: asyncio.Future[bool], priority: int) -> None:
+        """Take a waiter out of its queue if it is still there."""
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            return
+        self._waiting -= 1
@@ -0,0 +1,152 @@
+"""
+Adaptive concurrency limits for admission control.
+
+This module provides limit algorithms that adjust how many requests may be
+in flight from the latency of completed requests: additive-increase /
+multiplicative-decrease (AIMD) against a latency threshold, and a gradient
+limit that compares short-term latency to a long-term baseline.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any
+
+
+class ConcurrencyLimit(ABC):
+    """Abstract base class for adaptive concurrency limits."""
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize concurrency limit.
+
+        Args:
+            config: Limit configuration
+        """
+        self.min_limit = config.get("min", 1)
+        self.max_limit = config.get("max", 1000)
+        self.limit = float(min(max(config.get("initial", 20), self.min_limit), self.max_limit))
+
+    @property
+    def current(self) -> int:
+        """Number of requests currently allowed in flight."""
+        return int(self.limit)
+
+    @abstractmethod
+    def on_sample(self, latency: float, in_flight: int, dropped: bool) -> None:
+        """
+        Update the limit from a completed request.
+
+        Args:
+            latency: Seconds the request took once admitted
+            in_flight: Requests in flight when it completed, itself included
+            dropped: Whether the request failed with a server error
+        """
+        pass
+
+    def _set_limit(self, limit: float) -> None:
+        """Store a new limit clamped to the configured bounds."""
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+
+
+class AIMDLimit(ConcurrencyLimit):
+    """
+    Additive-increase / multiplicative-decrease limit.
+
+    The limit shrinks by ``backoff_ratio`` whenever a request fails or takes
+    longer than ``latency_threshold_ms``, and otherwise grows by one request
+    per limit's worth of samples while it is actually being used.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize AIMD limit.
+
+        Args:
+            config: Limit configuration
+        """
+        super().__init__(config)
+        self.backoff_ratio = config.get("backoff_ratio", 0.9)
+        self.latency_threshold = config.get("latency_threshold_ms", 250) / 1000
+
+    def on_sample(self, latency: float, in_flight: int, dropped: bool) -> None:
+        """Back off on slow or failed requests, otherwise probe upwards."""
+        if dropped or latency > self.latency_threshold:
+            self._set_limit(self.limit * self.backoff_ratio)
+        elif in_flight * 2 >= self.limit:
+            # Only grow while at least half the limit is in use
+            self._set_limit(self.limit + 1 / self.limit)
+
+
+class GradientLimit(ConcurrencyLimit):
+    """
+    Gradient limit driven by the ratio of baseline to current latency.
+
+    A long-term latency average (``long_window`` samples) serves as the
+    no-load baseline and a short one (``short_window`` samples) tracks
+    current conditions. Their ratio, scaled by ``tolerance`` and capped
+    between 0.5 and 1, multiplies the limit; ``headroom`` extra requests
+    are added so the limit keeps probing for spare capacity.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize gradient limit.
+
+        Args:
+            config: Limit configuration
+        """
+        super().__init__(config)
+        self.tolerance = config.get("tolerance", 1.5)
+        self.smoothing = config.get("smoothing", 0.2)
+        self.headroom = config.get("headroom", 4)
+        self._long_alpha = 2 / (config.get("long_window", 600) + 1)
+        self._short_alpha = 2 / (config.get("short_window", 10) + 1)
+        self._long_latency: float | None = None
+        self._short_latency: float | None = None
+
+    def on_sample(self, latency: float, in_flight: int, dropped: bool) -> None:
+        """Scale the limit by how far current latency has drifted from the baseline."""
+        if self._long_latency is None:
+            self._long_latency = self._short_latency = latency
+            return
+
+        self._short_latency += (latency - self._short_latency) * self._short_alpha
+        self._long_latency += (latency - self._long_latency) * self._long_alpha
+        if self._short_latency <= 0:
+            return
+
+        # Pull the baseline down quickly once a latency spike is over
+        if self._long_latency / self._short_latency > 2:
+            self._long_latency *= 0.95
+
+        gradient = max(0.5, min(1.0, self.tolerance * self._long_latency / self._short_latency))
+        if gradient >= 1.0 and in_flight * 2 < self.limit:
+            # Don't grow a limit the traffic isn't using
+            return
+
+        new_limit = self.limit * gradient + self.headroom
+        self._set_limit(self.limit * (1 - self.smoothing) + new_limit * self.smoothing)
+
+
+def create_limit(config: dict[str, Any]) -> ConcurrencyLimit:
+    """
+    Create concurrency limit based on configuration.
+
+    Args:
+        config: Limit configuration
+
+    Returns:
+        Concurrency limit instance
+
+    Raises:
+        ValueError: If the limit algorithm is unknown
+    """
+    algorithm = config.get("algorithm", "gradient")
+
+    if algorithm == "gradient":
+        return GradientLimit(config)
+    elif algorithm == "aimd":
+        return AIMDLimit(config)
+    else:
+        raise ValueError(f"Unknown admission control algorithm: {algorithm}")
@@ -0,0 +1,298 @@
+"""
+Stateless cookie sessions for authentication extension.
+
+This module stores the whole session in an encrypted, authenticated and
+compressed cookie, so authenticating a request needs no storage lookup.
+An optional revocation store keeps logout working across workers.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import time
+import zlib
+from typing import Any
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from beginnings.extensions.auth.providers.session_provider import SessionStorage
+from beginnings.extensions.expiry import get_expiry_service
+from beginnings.extensions.redis_connections import acquire_redis_connection, release_redis_connection
+
+COOKIE_FORMAT_VERSION = 1
+# Browsers cap a cookie (name, value and attributes) at 4096 bytes
+MAX_COOKIE_VALUE_SIZE = 3800
+NONCE_SIZE = 12
+FINGERPRINT_SIZE = 4
+
+
+class SessionRevocationStore:
+    """
+    Per-user revocation epochs and revoked session IDs.
+
+    A cookie session records its user's epoch when issued; bumping the
+    epoch revokes every session issued before it. Single sessions are
+    revoked by ID until they would have expired anyway. Lookups are cached
+    locally for ``cache_seconds``, so a revocation made by another worker
+    takes effect within that time (immediately on the revoking worker).
+
+    The "memory" store only holds revocations made by the current process;
+    applications running several workers need the "redis" store.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize revocation store.
+
+        Args:
+            config: Revocation configuration dictionary
+        """
+        self.store_type = config.get("type", "memory")
+        self.redis_url = config.get("redis_url", "redis://localhost:6379")
+        self.key_prefix = config.get("key_prefix", "session_revocation:")
+        self.max_connections = config.get("max_connections", 20)
+        self.cache_seconds = config.get("cache_seconds", 5)
+
+        self._epochs: dict[str, int] = {}
+        self._revoked: dict[str, float] = {}
+        self._expiry = get_expiry_service().tracker(self._revoked.get, self._revoked.pop)
+        # (user_id, session_id) -> (epoch, revoked, cached_at)
+        self._cache: dict[tuple[str, str], tuple[int, bool, float]] = {}
+        self._redis = None
+
+    async def _get_redis(self):
+        """Get Redis client on the shared connection pool (lazy initialization)."""
+        if self._redis is None:
+            self._redis, _ = acquire_redis_connection(self.redis_url, self.max_connections)
+        return self._redis
+
+    async def close(self) -> None:
+        """Release the shared Redis connection pool."""
+        if self._redis is not None:
+            self._redis = None
+            await release_redis_connection(self.redis_url)
+
+    async def get_epoch(self, user_id: str) -> int:
+        """Get a user's current revocation epoch."""
+        if self.store_type == "redis":
+            redis = await self._get_redis()
+            return int(await redis.get(f"{self.key_prefix}epoch:{user_id}") or 0)
+        return self._epochs.get(user_id, 0)
+
+    async def is_revoked(self, user_id: str, session_id: str, epoch: int) -> bool:
+        """
+        Check if a session was revoked, individually or by an epoch bump.
+
+        Args:
+            user_id: User the session belongs to
+            session_id: Session ID
+            epoch: Epoch recorded in the session when it was issued
+
+        Returns:
+            True if the session is revoked
+        """
+        cache_key = (user_id, session_id)
+        cached = self._cache.get(cache_key)
+        if cached is not None and time.monotonic() - cached[2] < self.cache_seconds:
+            return cached[1] or epoch < cached[0]
+
+        if self.store_type == "redis":
+            redis = await self._get_redis()
+            pipeline = redis.pipeline(transaction=False)
+            pipeline.get(f"{self.key_prefix}epoch:{user_id}")
+            pipeline.exists(f"{self.key_prefix}revoked:{session_id}")
+            current_epoch, revoked = await pipeline.execute()
+            current_epoch = int(current_epoch or 0)
+            revoked = bool(revoked)
+        else:
+            current_epoch = self._epochs.get(user_id, 0)
+            revoked = self._revoked.get(session_id, 0) > time.time()
+
+        self._cache[cache_key] = (current_epoch, revoked, time.monotonic())
+        if len(self._cache) > 10000:
+            self._cache.clear()
+        return revoked or epoch < current_epoch
+
+    async def revoke_session(self, session_id: str, expires_at: float) -> None:
+        """Revoke one session until its expiration time."""
+        ttl = max(1, int(expires_at - time.time()) + 1)
+        if self.store_type == "redis":
+            redis = await self._get_redis()
+            await redis.set(f"{self.key_prefix}revoked:{session_id}", 1, ex=ttl)
+        else:
+            self._revoked[session_id] = time.time() + ttl
+            self._expiry.schedule(session_id, self._revoked[session_id])
+
+        for cache_key in [key for key in self._cache if key[1] == session_id]:
+            del self._cache[cache_key]
+
+    async def revoke_user(self, user_id: str) -> int:
+        """
+        Revoke all sessions of a user by bumping their epoch.
+
+        Returns:
+            The new epoch
+        """
+        if self.store_type == "redis":
+            redis = await self._get_redis()
+            epoch = int(await redis.incr(f"{self.key_prefix}epoch:{user_id}"))
+        else:
+            epoch = self._epochs[user_id] = self._epochs.get(user_id, 0) + 1
+
+        for cache_key in [key for key in self._cache if key[0] == user_id]:
+            del self._cache[cache_key]
+        return epoch
+
+
+class CookieSessionStorage(SessionStorage):
+    """
+    Session storage that keeps the session in the cookie itself.
+
+    The cookie value is ``base64url(version | key fingerprint | nonce |
+    AES-256-GCM(zlib(JSON)))``. New cookies are sealed with the first of
+    ``secret_keys``; any listed key opens them, so keys can be rotated by
+    prepending a new one and dropping the old one after ``session_timeout``.
+    The "session ID" handed to callers is the cookie value; the stable ID
+    inside the payload is what revocation and CSRF binding use.
+    """
+
+    stateless = True
+
+    def __init__(self, config: dict[str, Any], secret_key: str | None = None, max_age: int = 3600) -> None:
+        """
+        Initialize cookie session storage.
+
+        Args:
+            config: Storage configuration dictionary
+            secret_key: Provider secret key, used when no secret_keys are configured
+            max_age: Longest lifetime of a session cookie in seconds
+
+        Raises:
+            ValueError: If no secret key is available
+        """
+        secret_keys = config.get("secret_keys") or ([secret_key] if secret_key else [])
+        if not secret_keys:
+            raise ValueError("Cookie session storage requires secret_keys or a provider secret_key")
+
+        # fingerprint -> cipher; dicts keep order, so the first key seals
+        self._ciphers: dict[bytes, AESGCM] = {}
+        for key in secret_keys:
+            derived = hashlib.sha256(b"beginnings-cookie-session:" + key.encode()).digest()
+            self._ciphers[hashlib.sha256(derived).digest()[:FINGERPRINT_SIZE]] = AESGCM(derived)
+        self._sealing_fingerprint = next(iter(self._ciphers))
+
+        self.max_age = max_age
+        self.compression_threshold = config.get("compression_threshold", 128)
+        revocation_config = config.get("revocation", {})
+        self.revocation = SessionRevocationStore(revocation_config) if revocation_config.get("enabled") else None
+
+    async def save(self, session_id: str, data: dict[str, Any], expire_seconds: int) -> str:
+        """
+        Seal session data into a cookie value.
+
+        Raises:
+            ValueError: If the sealed session is too large for a cookie
+        """
+        user_id = data.get("user_id")
+        payload = {
+            "sid": session_id,
+            "exp": time.time() + expire_seconds,
+            "ep": await self.revocation.get_epoch(user_id) if self.revocation and user_id else 0,
+            "d": data
+        }
+        value = self.seal(payload)
+        if len(value) > MAX_COOKIE_VALUE_SIZE:
+            raise ValueError(f"Session too large for cookie storage ({len(value)} bytes)")
+        return value
+
+    async def set(self, session_id: str, data: dict[str, Any], expire_seconds: int) -> None:
+        """Cookie sessions are written by the client; use save() for the cookie value."""
+
+    async def get(self, session_id: str) -> dict[str, Any] | None:
+        """Open a cookie value and return its session data if valid."""
+        payload = self.unseal(session_id)
+        if payload is None or payload["exp"] < time.time():
+            return None
+
+        data = payload["d"]
+        if self.revocation and await self.revocation.is_revoked(
+            data.get("user_id", ""), payload["sid"], payload["ep"]
+        ):
+            return None
+        return data
+
+    async def touch(self, session_id: str, expire_seconds: int) -> dict[str, Any] | None:
+        """Open a cookie value; expiration slides only when a refreshed cookie is issued."""
+        return await self.get(session_id)
+
+    async def delete(self, session_id: str) -> None:
+        """Revoke a session given its cookie value or its inner session ID."""
+        if self.revocation is None:
+            return
+
+        payload = self.unseal(session_id)
+        if payload is not None:
+            await self.revocation.revoke_session(payload["sid"], payload["exp"])
+        else:
+            # Inner session ID: revoke for the longest a cookie could live
+            await self.revocation.revoke_session(session_id, time.time() + self.max_age)
+
+    async def delete_user_sessions(self, user_id: str) -> int:
+        """Revoke all sessions of a user; the count is unknown without server state."""
+        if self.revocation is not None:
+            await self.revocation.revoke_user(user_id)
+        return 0
+
+    async def cleanup_expired(self) -> int:
+        """Clean up expired sessions (nothing is stored server-side)."""
+        return 0
+
+    async def close(self) -> None:
+        """Release the revocation store."""
+        if self.revocation is not None:
+            await self.revocation.close()
+
+    def seal(self, payload: dict[str, Any]) -> str:
+        """Encrypt and authenticate a payload into a cookie value."""
+        plaintext = json.dumps(payload, separators=(",", ":")).encode()
+        if len(plaintext) >= self.compression_threshold:
+            plaintext = b"z" + zlib.compress(plaintext)
+        else:
+            plaintext = b"j" + plaintext
+
+        header = bytes([COOKIE_FORMAT_VERSION]) + self._sealing_fingerprint
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._ciphers[self._sealing_fingerprint].encrypt(nonce, plaintext, header)
+        return base64.urlsafe_b64encode(header + nonce + ciphertext).rstrip(b"=").decode()
+
+    def unseal(self, value: str) -> dict[str, Any] | None:
+        """Decrypt a cookie value, returning None if it is not authentic."""
+        try:
+            raw = base64.urlsafe_b64decode(value + "=" * (-len(value) % 4))
+        except (ValueError, TypeError):
+            return None
+
+        header_size = 1 + FINGERPRINT_SIZE
+        if len(raw) <= header_size + NONCE_SIZE or raw[0] != COOKIE_FORMAT_VERSION:
+            return None
+
+        cipher = self._ciphers.get(raw[1:header_size])
+        if cipher is None:
+            return None
+
+        nonce = raw[header_size:header_size + NONCE_SIZE]
+        try:
+            plaintext = cipher.decrypt(nonce, raw[header_size + NONCE_SIZE:], raw[:header_size])
+        except InvalidTag:
+            return None
+
+        if plaintext[:1] == b"z":
+            plaintext = zlib.decompress(plaintext[1:])
+        else:
+            plaintext = plaintext[1:]
+        return json.loads(plaintext)
+
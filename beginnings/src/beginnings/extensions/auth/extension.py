@@ -7,7 +7,7 @@ JWT, session-based authentication, OAuth, and RBAC into the framework.
 
 from __future__ import annotations
 
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 from fastapi import HTTPException, Request, Response
 from fastapi.responses import JSONResponse, RedirectResponse
@@ -21,7 +21,15 @@ from beginnings.extensions.auth.providers.jwt_provider import JWTProvider
 from beginnings.extensions.auth.providers.session_provider import SessionProvider
 from beginnings.extensions.auth.providers.oauth_provider import OAuthProvider
 from beginnings.extensions.auth.rbac import RBACManager
+# Must follow the providers: hashing imports providers.base, and the providers
+# package __init__ imports providers that need hashing, a cycle if hashing loads first
+from beginnings.extensions.auth.hashing import PasswordHashingBusyError
 from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.expiry import get_expiry_service
+from beginnings.extensions.request_facts import RequestFacts
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
 
 
 class AuthExtension(BaseExtension):
@@ -85,6 +93,46 @@ class AuthExtension(BaseExtension):
             if hasattr(provider, 'set_user_lookup_function'):
                 provider.set_user_lookup_function(func)
     
+    def invalidate_user(self, user_id: str | None = None, username: str | None = None) -> int:
+        """
+        Drop cached user lookups in all providers.
+        
+        Call after updating a user's profile, roles or password so the
+        change is visible without waiting for the cache TTL.
+        
+        Args:
+            user_id: ID of the user
+            username: Username of the user
+            
+        Returns:
+            Number of cache entries dropped
+        """
+        dropped = 0
+        for provider in self.providers.values():
+            if hasattr(provider, 'invalidate_user'):
+                dropped += provider.invalidate_user(user_id=user_id, username=username)
+        return dropped
+    
+    def get_startup_handler(self) -> Callable[[], Awaitable[None]] | None:
+        """Get startup handler that starts background expiry and provider resources."""
+        async def startup():
+            await get_expiry_service().start()
+            for provider in self.providers.values():
+                if hasattr(provider, 'start'):
+                    await provider.start()
+        
+        return startup
+    
+    def get_shutdown_handler(self) -> Callable[[], Awaitable[None]] | None:
+        """Get shutdown handler for releasing provider resources."""
+        async def shutdown():
+            for provider in self.providers.values():
+                if hasattr(provider, 'close'):
+                    await provider.close()
+            await get_expiry_service().stop()
+        
+        return shutdown
+    
     def get_middleware_factory(self) -> Callable[[dict[str, Any]], Callable[..., Any]]:
         """
         Get middleware factory for authentication.
@@ -135,6 +183,9 @@ class AuthExtension(BaseExtension):
                     # Add any auth-related headers to response
                     return await self._add_auth_headers(response, user, auth_config)
                     
+                except PasswordHashingBusyError as e:
+                    # Overloaded, not a failed login: ask the client to retry
+                    return self._handle_hashing_busy(e)
                 except AuthenticationError as e:
                     return await self._handle_authentication_error(request, auth_config, str(e))
                 except Exception as e:
@@ -183,7 +234,7 @@ class AuthExtension(BaseExtension):
     ) -> Response:
         """Handle case where authentication is required but not provided."""
         # Check if this is an API request (JSON response expected)
-        if self._is_api_request(request):
+        if RequestFacts.of(request).is_api:
             error_response = auth_config.get(
                 "error_unauthorized",
                 {"error": "Authentication required"}
@@ -210,7 +261,7 @@ class AuthExtension(BaseExtension):
         reason: str
     ) -> Response:
         """Handle case where user is authenticated but access is denied."""
-        if self._is_api_request(request):
+        if RequestFacts.of(request).is_api:
             error_response = auth_config.get(
                 "error_forbidden",
                 {"error": "Access denied", "reason": reason}
@@ -235,7 +286,7 @@ class AuthExtension(BaseExtension):
         error_message: str
     ) -> Response:
         """Handle authentication errors."""
-        if self._is_api_request(request):
+        if RequestFacts.of(request).is_api:
             return JSONResponse(
                 status_code=401,
                 content={"error": "Authentication failed", "message": error_message}
@@ -247,6 +298,14 @@ class AuthExtension(BaseExtension):
         
         return RedirectResponse(url=redirect_url, status_code=302)
     
+    def _handle_hashing_busy(self, error: PasswordHashingBusyError) -> Response:
+        """Build the 503 for a request turned away by a full password hashing queue."""
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Authentication service busy", "retry_after": error.retry_after},
+            headers={"Retry-After": str(error.retry_after)}
+        )
+    
     async def _add_auth_headers(
         self,
         response: Response,
@@ -262,24 +321,6 @@ class AuthExtension(BaseExtension):
         
         return response
     
-    def _is_api_request(self, request: Request) -> bool:
-        """Determine if request expects JSON response."""
-        # Check Accept header
-        accept_header = request.headers.get("accept", "").lower()
-        if "application/json" in accept_header:
-            return True
-        
-        # Check if path starts with /api
-        if request.url.path.startswith("/api"):
-            return True
-        
-        # Check Content-Type for non-GET requests
-        content_type = request.headers.get("content-type", "").lower()
-        if "application/json" in content_type:
-            return True
-        
-        return False
-    
     def _path_matches_pattern(self, path: str, pattern: str) -> bool:
         """Check if path matches a pattern (simple wildcard matching)."""
         if pattern == path:
@@ -324,12 +365,21 @@ class AuthExtension(BaseExtension):
             
         Raises:
             AuthenticationError: If login fails
+            HTTPException: 503 with Retry-After if the password hashing
+                queue is full
         """
         provider = self.providers.get(provider_name or self.default_provider)
         if not provider:
             raise AuthenticationError("Authentication provider not available")
         
-        return await provider.login(request, username, password)
+        try:
+            return await provider.login(request, username, password)
+        except PasswordHashingBusyError as e:
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication service busy",
+                headers={"Retry-After": str(e.retry_after)}
+            ) from e
     
     async def logout_user(
         self,
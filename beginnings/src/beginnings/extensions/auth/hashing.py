@@ -0,0 +1,223 @@
+"""
+Password hashing for authentication extension.
+
+This module runs bcrypt hashing and verification on a bounded executor so
+login bursts do not stall the event loop, with queue-depth limits that
+reject work early instead of letting latency grow without bound.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable
+
+from passlib.context import CryptContext
+
+from beginnings.extensions.auth.providers.base import AuthenticationError
+from beginnings.monitoring import get_metrics_collector
+
+logger = logging.getLogger(__name__)
+
+# Approximate seconds for one bcrypt hash at the default cost on a modern core
+REFERENCE_ROUNDS = 12
+REFERENCE_HASH_SECONDS = 0.25
+
+
+class PasswordHashingBusyError(AuthenticationError):
+    """Raised when the password hashing queue is full."""
+
+    def __init__(self, message: str, retry_after: int = 1) -> None:
+        """
+        Initialize busy error.
+
+        Args:
+            message: Error message
+            retry_after: Suggested seconds before retrying
+        """
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+@lru_cache(maxsize=8)
+def _get_context(rounds: int) -> CryptContext:
+    """Get a bcrypt context for a cost factor (cached per process)."""
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+def _hash(rounds: int, password: str) -> str:
+    """Hash a password; module level so process pools can pickle it."""
+    return _get_context(rounds).hash(password)
+
+
+def _verify(rounds: int, password: str, hashed_password: str) -> bool:
+    """Verify a password; module level so process pools can pickle it."""
+    try:
+        return _get_context(rounds).verify(password, hashed_password)
+    except ValueError as e:
+        # Malformed or unknown hash: a data problem, not a wrong password
+        logger.warning("Stored password hash could not be checked: %s", e)
+        return False
+
+
+class PasswordHasher:
+    """
+    Bcrypt hashing on a bounded thread or process pool.
+
+    The pool and queue are sized from the bcrypt cost factor: workers
+    default to the CPU count, and the queue holds as many hashes as the
+    workers can finish within ``max_queue_wait`` seconds. Once that many
+    calls are pending, new calls fail fast with ``PasswordHashingBusyError``
+    rather than queueing behind work that would outlive the client.
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None) -> None:
+        """
+        Initialize password hasher.
+
+        Args:
+            config: Password hashing configuration dictionary
+        """
+        config = config or {}
+        self.executor_type = config.get("executor", "thread")
+        self.rounds = config.get("bcrypt_rounds", REFERENCE_ROUNDS)
+        self.max_queue_wait = config.get("max_queue_wait", 2.0)
+        self.estimated_hash_seconds = REFERENCE_HASH_SECONDS * 2 ** (self.rounds - REFERENCE_ROUNDS)
+        self.max_workers = config.get("max_workers") or max(1, os.cpu_count() or 1)
+        self.max_queue = config.get("max_queue")
+        if self.max_queue is None:
+            self.max_queue = self.max_workers * max(1, math.floor(self.max_queue_wait / self.estimated_hash_seconds))
+
+        self.pwd_context = _get_context(self.rounds)
+        self.metrics = get_metrics_collector()
+        self._executor: Executor | None = None
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        """Get the number of queued and running hash operations."""
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        """
+        Hash a password off the event loop.
+
+        Raises:
+            PasswordHashingBusyError: If the queue is full
+        """
+        return await self._submit("hash", _hash, self.rounds, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        Verify a password against its hash off the event loop.
+
+        Raises:
+            PasswordHashingBusyError: If the queue is full
+        """
+        return await self._submit("verify", _verify, self.rounds, plain_password, hashed_password)
+
+    def hash_sync(self, password: str) -> str:
+        """Hash a password on the calling thread."""
+        return self.pwd_context.hash(password)
+
+    def verify_sync(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password on the calling thread."""
+        return self.pwd_context.verify(plain_password, hashed_password)
+
+    def close(self) -> None:
+        """Shut down the executor."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def validate_config(self) -> list[str]:
+        """
+        Validate password hashing configuration.
+
+        Returns:
+            List of error messages (empty if valid)
+        """
+        errors = []
+
+        if self.executor_type not in ("thread", "process"):
+            errors.append("password_hashing executor must be 'thread' or 'process'")
+
+        if not 4 <= self.rounds <= 31:
+            errors.append("password_hashing bcrypt_rounds must be between 4 and 31")
+
+        if self.max_workers <= 0:
+            errors.append("password_hashing max_workers must be positive")
+
+        if self.max_queue < 0:
+            errors.append("password_hashing max_queue cannot be negative")
+
+        return errors
+
+    async def _submit(self, operation: str, func: Callable[..., Any], *args: Any) -> Any:
+        """Run a hashing function on the executor with backpressure and metrics."""
+        tags = {"operation": operation}
+        if self._pending >= self.max_workers + self.max_queue:
+            self.metrics.increment_counter("password_hash_rejected_total", 1, tags)
+            raise PasswordHashingBusyError(
+                "Too many concurrent login attempts, try again later",
+                retry_after=max(1, math.ceil(self.max_queue_wait))
+            )
+
+        self._pending += 1
+        self.metrics.set_gauge("password_hash_pending", self._pending)
+        submitted_at = time.perf_counter()
+        try:
+            if self.executor_type == "process":
+                return await self._run_in_process(submitted_at, tags, func, *args)
+            return await asyncio.get_running_loop().run_in_executor(
+                self._get_executor(), self._run_timed, submitted_at, tags, func, *args
+            )
+        finally:
+            self._pending -= 1
+            self.metrics.set_gauge("password_hash_pending", self._pending)
+
+    def _run_timed(
+        self,
+        submitted_at: float,
+        tags: dict[str, str],
+        func: Callable[..., Any],
+        *args: Any
+    ) -> Any:
+        """Run a hashing function on a worker thread, recording queue wait and hash time."""
+        started_at = time.perf_counter()
+        self.metrics.record_histogram("password_hash_queue_wait", (started_at - submitted_at) * 1000, tags)
+        try:
+            return func(*args)
+        finally:
+            self.metrics.record_histogram("password_hash_duration", (time.perf_counter() - started_at) * 1000, tags)
+
+    async def _run_in_process(
+        self,
+        submitted_at: float,
+        tags: dict[str, str],
+        func: Callable[..., Any],
+        *args: Any
+    ) -> Any:
+        """Run a hashing function on a worker process, recording total time."""
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        finally:
+            # Queue wait and hash time are not separable across processes
+            self.metrics.record_histogram("password_hash_duration", (time.perf_counter() - submitted_at) * 1000, tags)
+
+    def _get_executor(self) -> Executor:
+        """Create the executor on first use."""
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix="password-hash"
+                )
+        return self._executor
@@ -0,0 +1,243 @@
+"""
+JWT keyring for authentication extension.
+
+This module provides a keyring of pre-parsed JWT keys indexed by key ID
+(``kid``), loaded from configuration and from local JWKS files with hot
+refresh, so keys can be rotated without invalidating existing tokens.
+"""
+
+from __future__ import annotations
+
+import json
+import pathlib
+import time
+from typing import Any
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+# Algorithms whose verification is expensive enough to offload
+ASYMMETRIC_ALGORITHM_PREFIXES = ("RS", "PS", "ES")
+
+
+class KeyringKey:
+    """A pre-parsed key held by the keyring."""
+
+    def __init__(self, kid: str | None, algorithm: str, verify_key: Key, signing_key: Key | None) -> None:
+        """
+        Initialize keyring key.
+
+        Args:
+            kid: Key ID, or None for the configured default key
+            algorithm: JWT algorithm the key is used with
+            verify_key: Parsed key used for signature verification
+            signing_key: Parsed key used for signing, if private material is available
+        """
+        self.kid = kid
+        self.algorithm = algorithm
+        self.verify_key = verify_key
+        self.signing_key = signing_key
+
+    @property
+    def is_asymmetric(self) -> bool:
+        """Check if the key uses an asymmetric (RSA/EC) algorithm."""
+        return self.algorithm.startswith(ASYMMETRIC_ALGORITHM_PREFIXES)
+
+
+def parse_key(key_data: str | dict[str, Any], algorithm: str, kid: str | None = None) -> KeyringKey:
+    """
+    Parse key material (secret, PEM or JWK) into a keyring key.
+
+    Args:
+        key_data: HMAC secret, PEM string or JWK dictionary
+        algorithm: JWT algorithm
+        kid: Key ID
+
+    Returns:
+        Parsed keyring key
+
+    Raises:
+        ValueError: If the key material cannot be parsed
+    """
+    try:
+        key = jwk.construct(key_data, algorithm)
+    except Exception as e:
+        raise ValueError(f"Invalid JWT key{f' {kid!r}' if kid else ''}: {e}") from e
+
+    if not algorithm.startswith(ASYMMETRIC_ALGORITHM_PREFIXES):
+        # HMAC keys sign and verify with the same secret
+        return KeyringKey(kid, algorithm, key, key)
+
+    if key.is_public():
+        return KeyringKey(kid, algorithm, key, None)
+    return KeyringKey(kid, algorithm, key.public_key(), key)
+
+
+class JWTKeyring:
+    """
+    Keyring of JWT keys indexed by ``kid``.
+
+    Holds the provider's configured ``secret_key`` as the default key plus
+    any keys from a JWKS file, or from every ``*.json`` file in a directory.
+    Key material is parsed once at load time. The JWKS source is checked for
+    changes at most every ``refresh_interval`` seconds and reloaded when a
+    file's modification time changes; if a reload fails the previous keys
+    stay active. ``generation`` counts reloads, so caches of verified tokens
+    can tell when the keys changed.
+    """
+
+    def __init__(
+        self,
+        config: dict[str, Any],
+        secret_key: str | None = None,
+        algorithm: str = "HS256"
+    ) -> None:
+        """
+        Initialize JWT keyring.
+
+        Args:
+            config: Keyring configuration dictionary
+            secret_key: Default key material from the provider configuration
+            algorithm: Default JWT algorithm
+        """
+        self.algorithm = algorithm
+        self.jwks_path = config.get("jwks_path")
+        self.refresh_interval = config.get("refresh_interval", 30)
+        self.signing_kid = config.get("signing_kid")
+
+        self._default_key: KeyringKey | None = None
+        if secret_key:
+            self._default_key = parse_key(secret_key, algorithm, config.get("kid"))
+
+        self._jwks_keys: dict[str, KeyringKey] = {}
+        self._mtimes: dict[str, float] = {}
+        self._last_check = 0.0
+        self.generation = 0
+        if self.jwks_path:
+            self.refresh(force=True)
+
+    @property
+    def kids(self) -> list[str]:
+        """Get the IDs of all loaded keys."""
+        kids = list(self._jwks_keys)
+        if self._default_key is not None and self._default_key.kid:
+            kids.append(self._default_key.kid)
+        return kids
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload JWKS files if any changed.
+
+        Args:
+            force: Reload even if no file changed
+
+        Returns:
+            True if keys were reloaded
+
+        Raises:
+            ValueError: If a forced load fails
+        """
+        self._last_check = time.monotonic()
+        if not self.jwks_path:
+            return False
+
+        try:
+            mtimes = {str(path): path.stat().st_mtime for path in self._jwks_files()}
+            if not force and mtimes == self._mtimes:
+                return False
+
+            keys: dict[str, KeyringKey] = {}
+            for path in mtimes:
+                for jwk_data in self._read_jwks(pathlib.Path(path)):
+                    key = self._parse_jwk(jwk_data, path)
+                    keys[key.kid] = key
+        except (OSError, ValueError) as e:
+            if force:
+                raise ValueError(f"Failed to load JWKS from '{self.jwks_path}': {e}") from e
+            # Keep serving the previous keys
+            return False
+
+        self._jwks_keys = keys
+        self._mtimes = mtimes
+        self.generation += 1
+        return True
+
+    def get_verification_key(self, token: str) -> KeyringKey:
+        """
+        Get the key to verify a token with, based on its ``kid`` header.
+
+        Args:
+            token: Encoded JWT
+
+        Returns:
+            Keyring key for the token
+
+        Raises:
+            JWTError: If the header is malformed or no key matches
+        """
+        self.refresh_if_due()
+        kid = jwt.get_unverified_header(token).get("kid")
+        if kid is None:
+            if self._default_key is not None:
+                return self._default_key
+            if len(self._jwks_keys) == 1:
+                return next(iter(self._jwks_keys.values()))
+            raise JWTError("Token has no key ID")
+
+        key = self._jwks_keys.get(kid)
+        if key is None and self._default_key is not None and self._default_key.kid == kid:
+            key = self._default_key
+        if key is None:
+            raise JWTError(f"Unknown key ID: {kid}")
+        return key
+
+    def get_signing_key(self) -> KeyringKey:
+        """
+        Get the key used to sign new tokens.
+
+        Returns:
+            The ``signing_kid`` key if configured, otherwise the default key
+
+        Raises:
+            ValueError: If no key with private material is available
+        """
+        self.refresh_if_due()
+        if self.signing_kid:
+            key = self._jwks_keys.get(self.signing_kid)
+            if key is None and self._default_key is not None and self._default_key.kid == self.signing_kid:
+                key = self._default_key
+        else:
+            key = self._default_key
+
+        if key is None or key.signing_key is None:
+            raise ValueError("No JWT signing key available")
+        return key
+
+    def refresh_if_due(self) -> None:
+        """Check the JWKS source for changes once refresh_interval has passed."""
+        if self.jwks_path and time.monotonic() - self._last_check >= self.refresh_interval:
+            self.refresh()
+
+    def _jwks_files(self) -> list[pathlib.Path]:
+        """List JWKS files to load."""
+        path = pathlib.Path(self.jwks_path)
+        if path.is_dir():
+            return sorted(path.glob("*.json"))
+        if not path.exists():
+            raise FileNotFoundError(f"JWKS file not found: {self.jwks_path}")
+        return [path]
+
+    def _read_jwks(self, path: pathlib.Path) -> list[dict[str, Any]]:
+        """Read keys from a JWKS document or a single JWK."""
+        with path.open("r") as f:
+            document = json.load(f)
+        if isinstance(document, dict) and "keys" in document:
+            return document["keys"]
+        return [document]
+
+    def _parse_jwk(self, jwk_data: dict[str, Any], path: str) -> KeyringKey:
+        """Parse one JWK, which must carry a kid."""
+        kid = jwk_data.get("kid")
+        if not kid:
+            raise ValueError(f"JWK without 'kid' in {path}")
+        return parse_key(jwk_data, jwk_data.get("alg", self.algorithm), kid)
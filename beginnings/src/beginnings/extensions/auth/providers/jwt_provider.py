@@ -7,20 +7,29 @@ validation, and refresh capabilities.
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from functools import partial
 from typing import Any
 
 from fastapi import Request
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 
+from beginnings.extensions.auth.hashing import PasswordHasher
+from beginnings.extensions.auth.user_resolver import UserResolver
 from beginnings.extensions.auth.providers.base import (
     AuthenticationError,
     BaseAuthProvider,
     User,
 )
+from beginnings.extensions.auth.keyring import JWTKeyring
 from beginnings.extensions.auth.token_blacklist import TokenBlacklistManager
+from beginnings.extensions.request_facts import RequestFacts
 
 
 class JWTProvider(BaseAuthProvider):
@@ -40,8 +49,9 @@ class JWTProvider(BaseAuthProvider):
         """
         super().__init__(config)
         
-        # Password context for hashing
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # Password hashing runs on a bounded executor during login
+        self.password_hasher = PasswordHasher(config.get("password_hashing", {}))
+        self.pwd_context = self.password_hasher.pwd_context
         
         # JWT settings
         self.secret_key = config.get("secret_key")
@@ -51,16 +61,55 @@ class JWTProvider(BaseAuthProvider):
         self.audience = config.get("audience", "beginnings-users")
         self.refresh_token_expire_days = config.get("refresh_token_expire_days", 7)
         
-        # User lookup function (to be set by extension)
+        # Keyring of pre-parsed keys indexed by kid (default key is secret_key)
+        keyring_config = config.get("keyring", {})
+        self._keyring_error: str | None = None
+        try:
+            self.keyring: JWTKeyring | None = JWTKeyring(keyring_config, self.secret_key, self.algorithm)
+        except ValueError as e:
+            # Reported by validate_config
+            self.keyring = None
+            self._keyring_error = str(e)
+        
+        # Optionally verify RSA/EC signatures off the event loop
+        self.verify_in_thread = keyring_config.get("verify_in_thread", False)
+        self.verify_workers = keyring_config.get("verify_workers", 4)
+        self._verify_executor: ThreadPoolExecutor | None = None
+        
+        # User lookup function (to be set by extension), behind a cache
         self._user_lookup_func = None
+        self.user_resolver = UserResolver(config.get("user_cache", {}), provider="jwt")
         
         # Token blacklist manager
         blacklist_config = config.get("blacklist", {"enabled": True})
         self.blacklist_manager = TokenBlacklistManager(blacklist_config)
+        
+        # LRU of verified tokens (token digest -> claims, exp, verified_at),
+        # dropped whenever the keyring reloads its keys
+        cache_config = config.get("verified_cache", {})
+        self.cache_enabled = cache_config.get("enabled", True)
+        self.cache_max_size = cache_config.get("max_size", 10000)
+        self.max_verify_age_seconds = cache_config.get("max_verify_age_seconds", 300)
+        self._verified_cache: OrderedDict[bytes, tuple[dict[str, Any], float, float]] = OrderedDict()
+        self._cache_generation = self.keyring.generation if self.keyring is not None else 0
     
     def set_user_lookup_function(self, func: Any) -> None:
         """Set the function used to lookup users."""
         self._user_lookup_func = func
+        self.user_resolver.clear()
+    
+    def invalidate_user(self, user_id: str | None = None, username: str | None = None) -> int:
+        """
+        Drop cached lookups for a user, e.g. after a profile or password change.
+        
+        Args:
+            user_id: ID of the user
+            username: Username of the user
+            
+        Returns:
+            Number of cache entries dropped
+        """
+        return self.user_resolver.invalidate(user_id=user_id, username=username)
     
     async def authenticate(self, request: Request) -> User | None:
         """
@@ -76,27 +125,30 @@ class JWTProvider(BaseAuthProvider):
             AuthenticationError: If token is invalid
         """
         # Try to get token from Authorization header
-        auth_header = request.headers.get("authorization")
-        token = None
-        
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header[7:]  # Remove "Bearer " prefix
+        facts = RequestFacts.of(request)
+        token = facts.bearer_token
         
         # Try to get token from cookie if not in header
         if not token:
-            token = request.cookies.get("access_token")
+            token = facts.cookies.get("access_token")
         
         if not token:
             return None  # No token provided
         
+        # Reuse a recent verification of the same token
+        cache_key = None
+        if self.cache_enabled:
+            cache_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+            payload = self._get_cached_verification(cache_key)
+            if payload is not None:
+                # Revocation is checked on every request, cached or not
+                if await self.blacklist_manager.is_token_blacklisted(payload):
+                    self._verified_cache.pop(cache_key, None)
+                    raise AuthenticationError("Token has been revoked")
+                return self._user_from_payload(payload)
+        
         try:
-            payload = jwt.decode(
-                token,
-                self.secret_key,
-                algorithms=[self.algorithm],
-                issuer=self.issuer,
-                audience=self.audience
-            )
+            payload = await self._decode_token(token)
             
             user_id = payload.get("sub")
             if not user_id:
@@ -106,27 +158,65 @@ class JWTProvider(BaseAuthProvider):
             if await self.blacklist_manager.is_token_blacklisted(payload):
                 raise AuthenticationError("Token has been revoked")
             
-            # Extract user information from token
-            username = payload.get("username")
-            email = payload.get("email")
-            roles = payload.get("roles", [])
-            permissions = payload.get("permissions", [])
-            
-            # Create user object
-            user = User(
-                user_id=user_id,
-                username=username,
-                email=email,
-                roles=roles,
-                permissions=permissions,
-                metadata={"provider": "jwt", "token_type": "access"}
-            )
+            if cache_key is not None:
+                self._cache_verification(cache_key, payload)
             
-            return user
+            return self._user_from_payload(payload)
             
         except JWTError as e:
             raise AuthenticationError(f"Invalid JWT token: {e}") from e
     
+    @staticmethod
+    def _user_from_payload(payload: dict[str, Any]) -> User:
+        """
+        Create the user of verified token claims.
+        
+        Each request gets its own user, so changes a handler makes to it
+        never reach the verified token cache.
+        """
+        return User(
+            user_id=payload["sub"],
+            username=payload.get("username"),
+            email=payload.get("email"),
+            roles=list(payload.get("roles", [])),
+            permissions=list(payload.get("permissions", [])),
+            metadata={"provider": "jwt", "token_type": "access"}
+        )
+    
+    def _get_cached_verification(self, cache_key: bytes) -> dict[str, Any] | None:
+        """Get cached claims if the token has not expired or aged out and the keys are unchanged."""
+        if self.keyring is not None:
+            self.keyring.refresh_if_due()
+            if self.keyring.generation != self._cache_generation:
+                # Keys were added, rotated out or replaced: verify again
+                self._verified_cache.clear()
+                self._cache_generation = self.keyring.generation
+        
+        entry = self._verified_cache.get(cache_key)
+        if entry is None:
+            return None
+        
+        payload, expires_at, verified_at = entry
+        now = time.time()
+        if now >= expires_at or now - verified_at >= self.max_verify_age_seconds:
+            del self._verified_cache[cache_key]
+            return None
+        
+        self._verified_cache.move_to_end(cache_key)
+        return payload
+    
+    def _cache_verification(self, cache_key: bytes, payload: dict[str, Any]) -> None:
+        """Cache a successful verification until the token's exp."""
+        expires_at = payload.get("exp")
+        if not isinstance(expires_at, (int, float)) or self.max_verify_age_seconds <= 0:
+            # Tokens without exp are always re-verified
+            return
+        
+        self._verified_cache[cache_key] = (payload, float(expires_at), time.time())
+        self._verified_cache.move_to_end(cache_key)
+        if len(self._verified_cache) > self.cache_max_size:
+            self._verified_cache.popitem(last=False)
+    
     async def login(self, request: Request, username: str, password: str) -> tuple[User, dict[str, Any]]:
         """
         Perform login with username and password.
@@ -148,7 +238,7 @@ class JWTProvider(BaseAuthProvider):
             raise AuthenticationError("Invalid username or password")
         
         # Verify password
-        if not self.verify_password(password, user_data.get("password_hash", "")):
+        if not await self.password_hasher.verify(password, user_data.get("password_hash", "")):
             raise AuthenticationError("Invalid username or password")
         
         # Create user object
@@ -188,24 +278,13 @@ class JWTProvider(BaseAuthProvider):
         tokens_blacklisted = 0
         
         # Extract and blacklist current access token
-        auth_header = request.headers.get("authorization")
-        access_token = None
-        
-        if auth_header and auth_header.startswith("Bearer "):
-            access_token = auth_header[7:]
-        elif not access_token:
-            access_token = request.cookies.get("access_token")
+        facts = RequestFacts.of(request)
+        access_token = facts.bearer_token or facts.cookies.get("access_token")
         
         if access_token:
             try:
                 # Decode token to get payload for blacklisting
-                payload = jwt.decode(
-                    access_token,
-                    self.secret_key,
-                    algorithms=[self.algorithm],
-                    issuer=self.issuer,
-                    audience=self.audience
-                )
+                payload = await self._decode_token(access_token)
                 await self.blacklist_manager.blacklist_token(payload)
                 tokens_blacklisted += 1
             except JWTError:
@@ -213,16 +292,10 @@ class JWTProvider(BaseAuthProvider):
                 pass
         
         # Also blacklist refresh token if available
-        refresh_token = request.cookies.get("refresh_token")
+        refresh_token = facts.cookies.get("refresh_token")
         if refresh_token:
             try:
-                payload = jwt.decode(
-                    refresh_token,
-                    self.secret_key,
-                    algorithms=[self.algorithm],
-                    issuer=self.issuer,
-                    audience=self.audience
-                )
+                payload = await self._decode_token(refresh_token)
                 await self.blacklist_manager.blacklist_token(payload)
                 tokens_blacklisted += 1
             except JWTError:
@@ -262,7 +335,7 @@ class JWTProvider(BaseAuthProvider):
             "jti": secrets.token_urlsafe(32)  # Unique token ID for blacklisting
         }
         
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return self._encode_token(payload)
     
     def create_refresh_token(self, user: User) -> str:
         """
@@ -287,7 +360,7 @@ class JWTProvider(BaseAuthProvider):
             "jti": secrets.token_urlsafe(32)  # Unique token ID for revocation
         }
         
-        return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
+        return self._encode_token(payload)
     
     async def refresh_token(self, refresh_token: str) -> tuple[str, str]:
         """
@@ -303,13 +376,7 @@ class JWTProvider(BaseAuthProvider):
             AuthenticationError: If refresh token is invalid
         """
         try:
-            payload = jwt.decode(
-                refresh_token,
-                self.secret_key,
-                algorithms=[self.algorithm],
-                issuer=self.issuer,
-                audience=self.audience
-            )
+            payload = await self._decode_token(refresh_token)
             
             if payload.get("type") != "refresh":
                 raise AuthenticationError("Invalid token type")
@@ -345,18 +412,71 @@ class JWTProvider(BaseAuthProvider):
         except JWTError as e:
             raise AuthenticationError(f"Invalid refresh token: {e}") from e
     
+    async def _decode_token(self, token: str) -> dict[str, Any]:
+        """
+        Verify a token with the keyring key named by its kid and decode it.
+        
+        Raises:
+            JWTError: If the token is invalid or no key matches
+        """
+        if self.keyring is None:
+            raise JWTError(f"JWT keyring unavailable: {self._keyring_error}")
+        
+        key = self.keyring.get_verification_key(token)
+        decode = partial(
+            jwt.decode,
+            token,
+            key.verify_key,
+            algorithms=[key.algorithm],
+            issuer=self.issuer,
+            audience=self.audience
+        )
+        
+        if self.verify_in_thread and key.is_asymmetric:
+            if self._verify_executor is None:
+                self._verify_executor = ThreadPoolExecutor(
+                    max_workers=self.verify_workers,
+                    thread_name_prefix="jwt-verify"
+                )
+            return await asyncio.get_running_loop().run_in_executor(self._verify_executor, decode)
+        
+        return decode()
+    
+    def _encode_token(self, payload: dict[str, Any]) -> str:
+        """Sign a token with the keyring's signing key, tagging it with its kid."""
+        if self.keyring is None:
+            raise ValueError(f"JWT keyring unavailable: {self._keyring_error}")
+        
+        key = self.keyring.get_signing_key()
+        headers = {"kid": key.kid} if key.kid else None
+        return jwt.encode(payload, key.signing_key, algorithm=key.algorithm, headers=headers)
+    
+    async def close(self) -> None:
+        """Shut down the verification and password hashing pools and blacklist storage."""
+        if self._verify_executor is not None:
+            self._verify_executor.shutdown(wait=False)
+            self._verify_executor = None
+        self.password_hasher.close()
+        await self.blacklist_manager.close()
+    
     def hash_password(self, password: str) -> str:
         """Hash a password for secure storage."""
-        return self.pwd_context.hash(password)
+        return self.password_hasher.hash_sync(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return self.password_hasher.verify_sync(plain_password, hashed_password)
+    
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the hashing executor."""
+        return await self.password_hasher.hash(password)
     
     async def _lookup_user(self, username: str) -> dict[str, Any] | None:
         """Look up user by username."""
         if self._user_lookup_func:
-            return await self._user_lookup_func(username=username)
+            return await self.user_resolver.resolve(
+                "username", username, lambda: self._user_lookup_func(username=username)
+            )
         
         # Default implementation for testing/development
         # In production, this should be replaced with actual user lookup
@@ -365,7 +485,9 @@ class JWTProvider(BaseAuthProvider):
     async def _lookup_user_by_id(self, user_id: str) -> dict[str, Any] | None:
         """Look up user by ID."""
         if self._user_lookup_func:
-            return await self._user_lookup_func(user_id=user_id)
+            return await self.user_resolver.resolve(
+                "user_id", user_id, lambda: self._user_lookup_func(user_id=user_id)
+            )
         
         # Default implementation for testing/development
         return None
@@ -380,12 +502,18 @@ class JWTProvider(BaseAuthProvider):
         errors = []
         
         if not self.secret_key:
-            errors.append("JWT secret_key is required")
+            if not (self.keyring and self.keyring.jwks_path):
+                errors.append("JWT secret_key is required")
         elif len(self.secret_key) < 32:
             errors.append("JWT secret_key should be at least 32 characters long")
         
-        if self.algorithm not in ["HS256", "HS384", "HS512", "RS256", "RS384", "RS512"]:
+        if self.algorithm not in ["HS256", "HS384", "HS512", "RS256", "RS384", "RS512", "ES256", "ES384", "ES512"]:
             errors.append(f"Unsupported JWT algorithm: {self.algorithm}")
+        elif self._keyring_error:
+            errors.append(f"JWT keyring: {self._keyring_error}")
+        
+        if self.verify_workers <= 0:
+            errors.append("JWT keyring verify_workers must be positive")
         
         if self.token_expire_minutes <= 0:
             errors.append("JWT token_expire_minutes must be positive")
@@ -393,9 +521,15 @@ class JWTProvider(BaseAuthProvider):
         if self.refresh_token_expire_days <= 0:
             errors.append("JWT refresh_token_expire_days must be positive")
         
+        if self.cache_enabled and self.cache_max_size <= 0:
+            errors.append("JWT verified_cache max_size must be positive")
+        
         # Validate blacklist configuration
         blacklist_errors = self.blacklist_manager.validate_config()
         for error in blacklist_errors:
             errors.append(f"JWT blacklist: {error}")
         
+        errors.extend(self.password_hasher.validate_config())
+        errors.extend(self.user_resolver.validate_config())
+        
         return errors
\ No newline at end of file
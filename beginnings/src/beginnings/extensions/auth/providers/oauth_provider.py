@@ -5,10 +5,13 @@ This module provides OAuth 2.0 authentication with PKCE support
 for multiple providers (Google, GitHub, etc.).
 """
 
+import asyncio
 import base64
 import hashlib
 import hmac
+import logging
 import secrets
+import time
 import urllib.parse
 from typing import Any
 
@@ -16,6 +19,17 @@ import httpx
 from fastapi import Request
 
 from beginnings.extensions.auth.providers.base import BaseAuthProvider, AuthenticationError, User
+from beginnings.extensions.expiry import get_expiry_service
+
+logger = logging.getLogger(__name__)
+
+# Provider config keys filled from OpenID Connect discovery documents
+DISCOVERY_ENDPOINTS = {
+    "authorization_url": "authorization_endpoint",
+    "token_url": "token_endpoint",
+    "user_info_url": "userinfo_endpoint",
+    "jwks_uri": "jwks_uri",
+}
 
 
 class OAuthProvider(BaseAuthProvider):
@@ -39,6 +53,19 @@ class OAuthProvider(BaseAuthProvider):
         self.redirect_uri = config.get("redirect_uri", "http://localhost:8000/auth/callback")
         self.state_secret = config.get("state_secret", secrets.token_urlsafe(32))
         
+        # Pooled HTTP client for identity provider calls, kept alive between logins
+        self.http_client_config = config.get("http_client", {})
+        self._client: httpx.AsyncClient | None = None
+        
+        # Discovery documents and JWKS: url -> (expires_at, document)
+        self.metadata_cache_seconds = config.get("metadata_cache_seconds", 3600)
+        self._metadata_cache: dict[str, tuple[float, dict[str, Any]]] = {}
+        self._metadata_fetches: dict[str, asyncio.Future] = {}
+        
+        # States already used in a callback, until they expire (single use per process)
+        self._used_states: dict[str, float] = {}
+        self._used_state_expiry = get_expiry_service().tracker(self._used_states.get, self._used_states.pop)
+        
         # Add default configurations for known providers
         self._add_default_provider_configs()
     
@@ -66,6 +93,141 @@ class OAuthProvider(BaseAuthProvider):
                 default_config.update(provider_config)
                 self.providers[provider_name] = default_config
     
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client, created on first use if startup did not create it."""
+        if self._client is None or self._client.is_closed:
+            http_config = self.http_client_config
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(
+                    http_config.get("timeout", 10.0),
+                    connect=http_config.get("connect_timeout", 5.0)
+                ),
+                limits=httpx.Limits(
+                    max_connections=http_config.get("max_connections", 100),
+                    max_keepalive_connections=http_config.get("max_keepalive_connections", 20),
+                    keepalive_expiry=http_config.get("keepalive_expiry", 30.0)
+                )
+            )
+        return self._client
+    
+    async def start(self) -> None:
+        """Open the pooled HTTP client and prefetch discovery documents."""
+        self.client
+        for provider_name, provider_config in self.providers.items():
+            if not self._discovery_url(provider_config):
+                continue
+            try:
+                await self.get_discovery_document(provider_name)
+            except (httpx.HTTPError, AuthenticationError) as e:
+                # Retried on first use; the identity provider may be down at startup
+                logger.warning("OAuth discovery for '%s' failed: %s", provider_name, e)
+    
+    async def close(self) -> None:
+        """Close the pooled HTTP client."""
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+    
+    def _discovery_url(self, provider_config: dict[str, Any]) -> str | None:
+        """Get a provider's discovery document URL, if it uses discovery."""
+        if provider_config.get("discovery_url"):
+            return provider_config["discovery_url"]
+        if provider_config.get("issuer"):
+            return provider_config["issuer"].rstrip("/") + "/.well-known/openid-configuration"
+        return None
+    
+    async def _get_metadata(self, url: str, refresh: bool = False) -> dict[str, Any]:
+        """
+        Get a cached metadata document, fetching it once for concurrent callers.
+        
+        Args:
+            url: Document URL
+            refresh: Fetch even if a cached copy is still fresh
+            
+        Returns:
+            Parsed JSON document
+        """
+        cached = self._metadata_cache.get(url)
+        if cached is not None and not refresh and cached[0] > time.monotonic():
+            return cached[1]
+        
+        flight = self._metadata_fetches.get(url)
+        if flight is None:
+            flight = asyncio.ensure_future(self._fetch_metadata(url))
+            self._metadata_fetches[url] = flight
+            flight.add_done_callback(lambda _: self._metadata_fetches.pop(url, None))
+        return await asyncio.shield(flight)
+    
+    async def _fetch_metadata(self, url: str) -> dict[str, Any]:
+        """Fetch a metadata document and cache it."""
+        response = await self.client.get(url, headers={"Accept": "application/json"})
+        if response.status_code != 200:
+            raise AuthenticationError(f"Failed to fetch OAuth provider metadata from {url}")
+        
+        document = response.json()
+        self._metadata_cache[url] = (time.monotonic() + self.metadata_cache_seconds, document)
+        return document
+    
+    async def get_discovery_document(self, provider_name: str, refresh: bool = False) -> dict[str, Any]:
+        """
+        Get a provider's OpenID Connect discovery document.
+        
+        Endpoints missing from the provider configuration are filled from it.
+        
+        Args:
+            provider_name: OAuth provider name
+            refresh: Fetch even if a cached copy is still fresh
+            
+        Returns:
+            Discovery document
+            
+        Raises:
+            AuthenticationError: If the provider has no discovery URL or the fetch fails
+        """
+        provider_config = self.providers.get(provider_name)
+        discovery_url = self._discovery_url(provider_config) if provider_config else None
+        if not discovery_url:
+            raise AuthenticationError(f"OAuth provider '{provider_name}' has no discovery URL")
+        
+        document = await self._get_metadata(discovery_url, refresh)
+        for config_key, document_key in DISCOVERY_ENDPOINTS.items():
+            if not provider_config.get(config_key) and document.get(document_key):
+                provider_config[config_key] = document[document_key]
+        return document
+    
+    async def get_jwks(self, provider_name: str, refresh: bool = False) -> dict[str, Any]:
+        """
+        Get a provider's JSON Web Key Set.
+        
+        Pass ``refresh=True`` when a token names a key ID missing from the
+        cached set, so key rotations are picked up before the cache expires.
+        
+        Args:
+            provider_name: OAuth provider name
+            refresh: Fetch even if a cached copy is still fresh
+            
+        Returns:
+            JWKS document
+            
+        Raises:
+            AuthenticationError: If the provider has no JWKS URI or the fetch fails
+        """
+        jwks_uri = await self._endpoint(provider_name, "jwks_uri")
+        return await self._get_metadata(jwks_uri, refresh)
+    
+    async def _endpoint(self, provider_name: str, config_key: str) -> str:
+        """Get a provider endpoint from configuration or its discovery document."""
+        provider_config = self.providers.get(provider_name)
+        if not provider_config:
+            raise AuthenticationError(f"OAuth provider '{provider_name}' not configured")
+        
+        if not provider_config.get(config_key) and self._discovery_url(provider_config):
+            await self.get_discovery_document(provider_name)
+        if not provider_config.get(config_key):
+            raise AuthenticationError(f"OAuth provider '{provider_name}' missing {config_key}")
+        return provider_config[config_key]
+    
     def generate_state(self, expire_minutes: int = 10) -> str:
         """
         Generate state parameter for CSRF protection with expiration.
@@ -110,11 +272,48 @@ class OAuthProvider(BaseAuthProvider):
         Returns:
             True if state is valid and not expired
         """
-        if not state:
+        import time
+        
+        expire_time = self._state_expire_time(state)
+        return expire_time is not None and int(time.time()) <= expire_time
+    
+    def consume_state(self, state: str) -> bool:
+        """
+        Validate a state parameter and mark it used so it cannot be replayed.
+        
+        Used states are remembered by this process until they expire, so
+        replay protection is per process: with several workers, a state
+        replayed to a worker that has not seen it is accepted again until
+        it expires.
+        
+        Args:
+            state: State parameter from the OAuth callback
+            
+        Returns:
+            True if state is valid, not expired and not used before
+        """
+        if not self.validate_state(state) or state in self._used_states:
             return False
         
+        expire_time = self._state_expire_time(state)
+        self._used_states[state] = expire_time
+        self._used_state_expiry.schedule(state, expire_time)
+        return True
+    
+    def _state_expire_time(self, state: str) -> int | None:
+        """
+        Verify a state parameter's signature and get its expiration time.
+        
+        Args:
+            state: State parameter to verify
+            
+        Returns:
+            Expiration timestamp, or None if the state is not authentic
+        """
+        if not state:
+            return None
+        
         try:
-            import time
             import struct
             
             # Add padding and decode
@@ -122,7 +321,7 @@ class OAuthProvider(BaseAuthProvider):
             state_bytes = base64.urlsafe_b64decode(padded_state)
             
             if len(state_bytes) < 52:  # 16 bytes random + 4 bytes timestamp + 32 bytes signature
-                return False
+                return None
             
             # Split payload and signature
             payload = state_bytes[:20]  # 16 bytes random + 4 bytes timestamp
@@ -137,17 +336,13 @@ class OAuthProvider(BaseAuthProvider):
             
             # Compare signatures
             if not hmac.compare_digest(received_signature, expected_signature):
-                return False
+                return None
             
-            # Check expiration
             timestamp_data = payload[16:20]
-            expire_time = struct.unpack('>I', timestamp_data)[0]
-            current_time = int(time.time())
-            
-            return current_time <= expire_time
+            return struct.unpack('>I', timestamp_data)[0]
             
         except Exception:
-            return False
+            return None
     
     def generate_pkce_challenge(self) -> tuple[str, str]:
         """
@@ -226,9 +421,8 @@ class OAuthProvider(BaseAuthProvider):
         Raises:
             AuthenticationError: If token exchange fails
         """
-        provider_config = self.providers.get(provider_name)
-        if not provider_config:
-            raise AuthenticationError(f"OAuth provider '{provider_name}' not configured")
+        token_url = await self._endpoint(provider_name, "token_url")
+        provider_config = self.providers[provider_name]
         
         # Prepare token request
         token_data = {
@@ -240,20 +434,19 @@ class OAuthProvider(BaseAuthProvider):
             "redirect_uri": self.redirect_uri
         }
         
-        # Exchange code for token
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                provider_config["token_url"],
-                data=token_data,
-                headers={"Accept": "application/json"}
-            )
-            
-            if response.status_code != 200:
-                error_data = response.json() if response.content else {}
-                error_msg = error_data.get("error_description", "OAuth token exchange failed")
-                raise AuthenticationError(f"OAuth token exchange failed: {error_msg}")
-            
-            return response.json()
+        # Exchange code for token over the pooled connection
+        response = await self.client.post(
+            token_url,
+            data=token_data,
+            headers={"Accept": "application/json"}
+        )
+        
+        if response.status_code != 200:
+            error_data = response.json() if response.content else {}
+            error_msg = error_data.get("error_description", "OAuth token exchange failed")
+            raise AuthenticationError(f"OAuth token exchange failed: {error_msg}")
+        
+        return response.json()
     
     async def get_user_info(
         self,
@@ -273,24 +466,21 @@ class OAuthProvider(BaseAuthProvider):
         Raises:
             AuthenticationError: If user info request fails
         """
-        provider_config = self.providers.get(provider_name)
-        if not provider_config:
-            raise AuthenticationError(f"OAuth provider '{provider_name}' not configured")
+        user_info_url = await self._endpoint(provider_name, "user_info_url")
+        
+        # Request user information over the pooled connection
+        response = await self.client.get(
+            user_info_url,
+            headers={
+                "Authorization": f"Bearer {access_token}",
+                "Accept": "application/json"
+            }
+        )
         
-        # Request user information
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                provider_config["user_info_url"],
-                headers={
-                    "Authorization": f"Bearer {access_token}",
-                    "Accept": "application/json"
-                }
-            )
-            
-            if response.status_code != 200:
-                raise AuthenticationError("Failed to fetch user information from OAuth provider")
-            
-            return response.json()
+        if response.status_code != 200:
+            raise AuthenticationError("Failed to fetch user information from OAuth provider")
+        
+        return response.json()
     
     def map_user_data(self, provider_name: str, user_data: dict[str, Any]) -> User:
         """
@@ -396,7 +586,7 @@ class OAuthProvider(BaseAuthProvider):
             return None  # Not an OAuth callback
         
         # Validate state parameter using cryptographic validation
-        if not self.validate_state(state):
+        if not self.consume_state(state):
             raise AuthenticationError("Invalid OAuth state parameter")
         
         # Get stored OAuth parameters
@@ -498,10 +688,10 @@ class OAuthProvider(BaseAuthProvider):
             if not provider_config.get("client_secret"):
                 errors.append(f"OAuth provider '{provider_name}' missing client_secret")
             
-            # Validate required URLs
+            # Validate required URLs (discovery fills missing ones at startup)
             required_urls = ["authorization_url", "token_url", "user_info_url"]
             for url_key in required_urls:
-                if not provider_config.get(url_key):
+                if not provider_config.get(url_key) and not self._discovery_url(provider_config):
                     errors.append(f"OAuth provider '{provider_name}' missing {url_key}")
         
         # Validate redirect URI
@@ -512,4 +702,13 @@ class OAuthProvider(BaseAuthProvider):
         if not self.state_secret or len(self.state_secret) < 16:
             errors.append("OAuth state_secret must be at least 16 characters")
         
+        # Validate HTTP client settings
+        for key in ("timeout", "connect_timeout", "keepalive_expiry", "max_connections", "max_keepalive_connections"):
+            value = self.http_client_config.get(key)
+            if value is not None and value <= 0:
+                errors.append(f"OAuth http_client {key} must be positive")
+        
+        if self.metadata_cache_seconds < 0:
+            errors.append("OAuth metadata_cache_seconds must not be negative")
+        
         return errors
\ No newline at end of file
@@ -7,23 +7,38 @@ management, cookie handling, and configurable storage backends.
 
 from __future__ import annotations
 
+import json
+import logging
 import secrets
 import time
 from typing import Any
 
 from fastapi import Request, Response
-from passlib.context import CryptContext
 
+from beginnings.extensions.auth.hashing import PasswordHasher
+from beginnings.extensions.auth.user_resolver import UserResolver
+from beginnings.extensions.expiry import ExpiryService, get_expiry_service
+from beginnings.extensions.redis_connections import acquire_redis_connection, release_redis_connection
+from beginnings.extensions.request_facts import RequestFacts
 from beginnings.extensions.auth.providers.base import (
     AuthenticationError,
     BaseAuthProvider,
     User,
 )
+from beginnings.tracing import trace_methods
+
+logger = logging.getLogger(__name__)
+
+# Storage methods traced when tracing is enabled
+TRACED_STORAGE_METHODS = ("get", "save", "touch", "delete", "delete_user_sessions")
 
 
 class SessionStorage:
     """Abstract interface for session storage backends."""
     
+    # Stateless backends keep the session in the cookie value itself
+    stateless = False
+    
     async def get(self, session_id: str) -> dict[str, Any] | None:
         """Get session data by ID."""
         raise NotImplementedError
@@ -40,16 +55,42 @@ class SessionStorage:
         """Delete session by ID."""
         raise NotImplementedError
     
+    async def save(self, session_id: str, data: dict[str, Any], expire_seconds: int) -> str:
+        """Store session data and return the value to put in the session cookie."""
+        await self.set(session_id, data, expire_seconds)
+        return session_id
+    
+    async def touch(self, session_id: str, expire_seconds: int) -> dict[str, Any] | None:
+        """Get session data by ID and extend its expiration (sliding expiration)."""
+        data = await self.get(session_id)
+        if data is not None:
+            data["last_accessed"] = time.time()
+            await self.set(session_id, data, expire_seconds)
+        return data
+    
+    async def delete_user_sessions(self, user_id: str) -> int:
+        """Delete all sessions belonging to a user and return count removed."""
+        raise NotImplementedError
+    
     async def cleanup_expired(self) -> int:
         """Clean up expired sessions and return count removed."""
         raise NotImplementedError
+    
+    async def close(self) -> None:
+        """Release storage resources."""
 
 
 class MemorySessionStorage(SessionStorage):
     """In-memory session storage for development."""
     
-    def __init__(self) -> None:
+    def __init__(self, expiry_service: ExpiryService | None = None) -> None:
         self._sessions: dict[str, dict[str, Any]] = {}
+        self._expiry = (expiry_service or get_expiry_service()).tracker(self._expires_at, self._sessions.pop)
+    
+    def _expires_at(self, session_id: str) -> float | None:
+        """Get a session's expiration time for the expiry service."""
+        session = self._sessions.get(session_id)
+        return session["expires"] if session is not None else None
     
     async def get(self, session_id: str) -> dict[str, Any] | None:
         """Get session data by ID."""
@@ -66,28 +107,201 @@ class MemorySessionStorage(SessionStorage):
     
     async def set(self, session_id: str, data: dict[str, Any], expire_seconds: int) -> None:
         """Set session data with expiration."""
+        expires = time.time() + expire_seconds
         self._sessions[session_id] = {
             "data": data,
-            "expires": time.time() + expire_seconds,
+            "expires": expires,
             "created": time.time()
         }
+        self._expiry.schedule(session_id, expires)
     
     async def delete(self, session_id: str) -> None:
         """Delete session by ID."""
         self._sessions.pop(session_id, None)
     
-    async def cleanup_expired(self) -> int:
-        """Clean up expired sessions and return count removed."""
-        current_time = time.time()
-        expired_sessions = [
+    async def delete_user_sessions(self, user_id: str) -> int:
+        """Delete all sessions belonging to a user and return count removed."""
+        session_ids = [
             session_id for session_id, session in self._sessions.items()
-            if session.get("expires", 0) < current_time
+            if session["data"].get("user_id") == user_id
         ]
         
-        for session_id in expired_sessions:
+        for session_id in session_ids:
             del self._sessions[session_id]
         
-        return len(expired_sessions)
+        return len(session_ids)
+    
+    async def cleanup_expired(self) -> int:
+        """Clean up expired sessions and return count removed."""
+        return self._expiry.cleanup()
+
+
+class RedisSessionStorage(SessionStorage):
+    """
+    Redis/Valkey session storage for multi-process deployments.
+    
+    Sessions are stored as compact JSON blobs under ``{prefix}{session_id}``
+    with a Redis TTL, so expiry needs no cleanup pass. ``touch`` reads a
+    session and extends its TTL in a single pipelined round trip. Each user
+    has an index set of their session IDs under ``{prefix}user:{user_id}``
+    so all of a user's sessions can be deleted at once; entries for expired
+    sessions are pruned when the index grows past ``index_prune_size``.
+    The index expires twice the session lifetime after a session is saved,
+    and is extended when a touch would make a session outlive it, so
+    indexes of users who stop logging in do not accumulate.
+    The connection pool is shared with other Redis storage on the same URL.
+    """
+    
+    def __init__(
+        self,
+        redis_url: str,
+        key_prefix: str = "session:",
+        max_connections: int = 20,
+        index_prune_size: int = 32
+    ) -> None:
+        """
+        Initialize Redis session storage.
+        
+        Args:
+            redis_url: Redis connection URL
+            key_prefix: Prefix for all Redis keys
+            max_connections: Maximum connections in the shared pool
+            index_prune_size: Index size at which stale session IDs are pruned
+        """
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.max_connections = max_connections
+        self.index_prune_size = index_prune_size
+        self._redis = None
+        # user_id -> time the user's index was last set to expire
+        self._index_expires_at: dict[str, float] = {}
+    
+    async def _get_redis(self):
+        """Get Redis client on the shared connection pool (lazy initialization)."""
+        if self._redis is None:
+            self._redis, _ = acquire_redis_connection(self.redis_url, self.max_connections)
+        return self._redis
+    
+    async def close(self) -> None:
+        """Release the shared Redis connection pool."""
+        if self._redis is not None:
+            self._redis = None
+            await release_redis_connection(self.redis_url)
+    
+    def _session_key(self, session_id: str) -> str:
+        """Create Redis key for a session."""
+        return f"{self.key_prefix}{session_id}"
+    
+    def _user_key(self, user_id: str) -> str:
+        """Create Redis key for a user's session index."""
+        return f"{self.key_prefix}user:{user_id}"
+    
+    @staticmethod
+    def _dumps(data: dict[str, Any]) -> bytes:
+        """Serialize session data to a compact blob."""
+        return json.dumps(data, separators=(",", ":")).encode()
+    
+    @staticmethod
+    def _loads(blob: bytes | None) -> dict[str, Any] | None:
+        """Deserialize a session blob."""
+        if blob is None:
+            return None
+        return json.loads(blob)
+    
+    async def get(self, session_id: str) -> dict[str, Any] | None:
+        """Get session data by ID."""
+        redis = await self._get_redis()
+        return self._loads(await redis.get(self._session_key(session_id)))
+    
+    async def set(self, session_id: str, data: dict[str, Any], expire_seconds: int) -> None:
+        """Set session data with expiration and add it to the user's index."""
+        redis = await self._get_redis()
+        user_id = data.get("user_id")
+        
+        pipeline = redis.pipeline(transaction=False)
+        pipeline.set(self._session_key(session_id), self._dumps(data), ex=expire_seconds)
+        if user_id:
+            pipeline.sadd(self._user_key(user_id), session_id)
+            pipeline.expire(self._user_key(user_id), expire_seconds * 2)
+            pipeline.smembers(self._user_key(user_id))
+        results = await pipeline.execute()
+        
+        if user_id:
+            self._note_index_expiry(user_id, time.time() + expire_seconds * 2)
+            if len(results[3]) > self.index_prune_size:
+                await self._prune_index(redis, user_id, results[3])
+    
+    async def touch(self, session_id: str, expire_seconds: int) -> dict[str, Any] | None:
+        """Get session data by ID and extend its expiration in one round trip."""
+        redis = await self._get_redis()
+        session_key = self._session_key(session_id)
+        
+        pipeline = redis.pipeline(transaction=False)
+        pipeline.get(session_key)
+        pipeline.expire(session_key, expire_seconds)
+        blob, _ = await pipeline.execute()
+        
+        data = self._loads(blob)
+        if data is not None:
+            # Not written back; the TTL carries the sliding expiration
+            data["last_accessed"] = time.time()
+            
+            # The index must outlive the session; extend it at most once per lifetime
+            user_id = data.get("user_id")
+            if user_id and data["last_accessed"] + expire_seconds > self._index_expires_at.get(user_id, 0):
+                await redis.expire(self._user_key(user_id), expire_seconds * 2)
+                self._note_index_expiry(user_id, data["last_accessed"] + expire_seconds * 2)
+        return data
+    
+    async def delete(self, session_id: str) -> None:
+        """Delete session by ID (its index entry is pruned lazily)."""
+        redis = await self._get_redis()
+        await redis.delete(self._session_key(session_id))
+    
+    async def delete_user_sessions(self, user_id: str) -> int:
+        """Delete all sessions belonging to a user and return count removed."""
+        redis = await self._get_redis()
+        user_key = self._user_key(user_id)
+        
+        session_ids = await redis.smembers(user_key)
+        session_keys = [self._session_key(self._decode(session_id)) for session_id in session_ids]
+        
+        pipeline = redis.pipeline(transaction=False)
+        if session_keys:
+            pipeline.delete(*session_keys)
+        pipeline.delete(user_key)
+        results = await pipeline.execute()
+        self._index_expires_at.pop(user_id, None)
+        
+        return results[0] if session_keys else 0
+    
+    async def cleanup_expired(self) -> int:
+        """Clean up expired sessions (Redis expires keys itself)."""
+        return 0
+    
+    def _note_index_expiry(self, user_id: str, expires_at: float) -> None:
+        """Remember when a user's index was set to expire."""
+        self._index_expires_at[user_id] = expires_at
+        if len(self._index_expires_at) > 10000:
+            self._index_expires_at.clear()
+    
+    async def _prune_index(self, redis: Any, user_id: str, session_ids: set[Any]) -> None:
+        """Remove IDs of expired sessions from a user's index."""
+        session_ids = [self._decode(session_id) for session_id in session_ids]
+        
+        pipeline = redis.pipeline(transaction=False)
+        for session_id in session_ids:
+            pipeline.exists(self._session_key(session_id))
+        alive = await pipeline.execute()
+        
+        stale = [session_id for session_id, exists in zip(session_ids, alive) if not exists]
+        if stale:
+            await redis.srem(self._user_key(user_id), *stale)
+    
+    @staticmethod
+    def _decode(value: bytes | str) -> str:
+        """Decode a Redis reply to a string."""
+        return value.decode() if isinstance(value, bytes) else value
 
 
 class SessionProvider(BaseAuthProvider):
@@ -107,8 +321,9 @@ class SessionProvider(BaseAuthProvider):
         """
         super().__init__(config)
         
-        # Password context for hashing
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+        # Password hashing runs on a bounded executor during login
+        self.password_hasher = PasswordHasher(config.get("password_hashing", {}))
+        self.pwd_context = self.password_hasher.pwd_context
         
         # Session settings
         self.secret_key = config.get("secret_key")
@@ -121,14 +336,31 @@ class SessionProvider(BaseAuthProvider):
         self.cookie_path = config.get("cookie_path", "/")
         
         # Storage backend
-        storage_type = config.get("storage", {}).get("type", "memory")
+        storage_config = config.get("storage", {})
+        storage_type = storage_config.get("type", "memory")
         if storage_type == "memory":
             self._storage = MemorySessionStorage()
+        elif storage_type in ("redis", "valkey"):
+            self._storage = RedisSessionStorage(
+                storage_config.get("redis_url", storage_config.get("valkey_url", "redis://localhost:6379")),
+                key_prefix=storage_config.get("key_prefix", "session:"),
+                max_connections=storage_config.get("max_connections", 20),
+                index_prune_size=storage_config.get("index_prune_size", 32)
+            )
+        elif storage_type == "cookie":
+            # Imported here; cookie_sessions builds on SessionStorage from this module
+            from beginnings.extensions.auth.cookie_sessions import CookieSessionStorage
+            self._storage = CookieSessionStorage(storage_config, self.secret_key, self.session_timeout)
         else:
             raise ValueError(f"Unsupported session storage type: {storage_type}")
+        trace_methods(
+            self._storage, "session.storage", TRACED_STORAGE_METHODS,
+            {"storage.backend": type(self._storage).__name__}
+        )
         
-        # User lookup function (to be set by extension)
+        # User lookup function (to be set by extension), behind a cache
         self._user_lookup_func = None
+        self.user_resolver = UserResolver(config.get("user_cache", {}), provider="session")
     
     @property
     def storage(self) -> SessionStorage:
@@ -138,6 +370,20 @@ class SessionProvider(BaseAuthProvider):
     def set_user_lookup_function(self, func: Any) -> None:
         """Set the function used to lookup users."""
         self._user_lookup_func = func
+        self.user_resolver.clear()
+    
+    def invalidate_user(self, user_id: str | None = None, username: str | None = None) -> int:
+        """
+        Drop cached lookups for a user, e.g. after a profile or password change.
+        
+        Args:
+            user_id: ID of the user
+            username: Username of the user
+            
+        Returns:
+            Number of cache entries dropped
+        """
+        return self.user_resolver.invalidate(user_id=user_id, username=username)
     
     def generate_session_id(self) -> str:
         """Generate a cryptographically secure session ID."""
@@ -151,7 +397,7 @@ class SessionProvider(BaseAuthProvider):
             user: The user to create a session for
             
         Returns:
-            Session ID for the created session
+            Session ID for the created session (the session cookie value)
         """
         # Generate new session ID
         session_id = self._generate_session_id()
@@ -159,6 +405,7 @@ class SessionProvider(BaseAuthProvider):
         # Create session data
         created_time = time.time()
         session_data = {
+            "session_id": session_id,
             "user_id": user.user_id,
             "username": user.username,
             "email": user.email,
@@ -170,9 +417,7 @@ class SessionProvider(BaseAuthProvider):
         }
         
         # Store session
-        await self._storage.set(session_id, session_data, self.session_timeout)
-        
-        return session_id
+        return await self._storage.save(session_id, session_data, self.session_timeout)
     
     async def get_session(self, session_id: str) -> dict[str, Any] | None:
         """
@@ -219,11 +464,14 @@ class SessionProvider(BaseAuthProvider):
         session_data["expires_at"] = current_time + self.session_timeout
         
         # Extend session
-        await self._storage.set(session_id, session_data, self.session_timeout)
+        cookie_value = await self._storage.save(
+            session_data.get("session_id", session_id), session_data, self.session_timeout
+        )
         
         return {
             "message": "Session refreshed",
-            "expires_in": self.session_timeout
+            "expires_in": self.session_timeout,
+            "cookie_settings": self._cookie_settings(cookie_value)
         }
     
     async def authenticate(self, request: Request) -> User | None:
@@ -240,12 +488,12 @@ class SessionProvider(BaseAuthProvider):
             AuthenticationError: If session is invalid
         """
         # Get session ID from cookie
-        session_id = request.cookies.get(self.cookie_name)
+        session_id = RequestFacts.of(request).cookies.get(self.cookie_name)
         if not session_id:
             return None  # No session cookie
         
-        # Retrieve session data
-        session_data = await self._storage.get(session_id)
+        # Retrieve session data and slide its expiration
+        session_data = await self._storage.touch(session_id, self.session_timeout)
         if not session_data:
             return None  # Session not found or expired
         
@@ -268,15 +516,11 @@ class SessionProvider(BaseAuthProvider):
             permissions=permissions,
             metadata={
                 "provider": "session",
-                "session_id": session_id,
+                "session_id": session_data.get("session_id", session_id),
                 "session_created": session_data.get("created")
             }
         )
         
-        # Update session last accessed time
-        session_data["last_accessed"] = time.time()
-        await self._storage.set(session_id, session_data, self.session_timeout)
-        
         return user
     
     async def login(self, request: Request, username: str, password: str) -> tuple[User, dict[str, Any]]:
@@ -313,7 +557,7 @@ class SessionProvider(BaseAuthProvider):
             user_data = lookup_result
             # For compatibility, check if we have a password hash to verify
             if "password_hash" in user_data:
-                if not self.verify_password(password, user_data.get("password_hash", "")):
+                if not await self.password_hasher.verify(password, user_data.get("password_hash", "")):
                     raise AuthenticationError("Invalid username or password")
         
         # Generate new session ID
@@ -322,6 +566,7 @@ class SessionProvider(BaseAuthProvider):
         # Create session data
         created_time = time.time()
         session_data = {
+            "session_id": session_id,
             "user_id": str(user_data.get("id", user_data.get("user_id", ""))),
             "username": user_data.get("username"),
             "email": user_data.get("email"),
@@ -335,7 +580,7 @@ class SessionProvider(BaseAuthProvider):
         }
         
         # Store session
-        await self._storage.set(session_id, session_data, self.session_timeout)
+        cookie_value = await self._storage.save(session_id, session_data, self.session_timeout)
         
         # Create user object
         user = User(
@@ -352,16 +597,7 @@ class SessionProvider(BaseAuthProvider):
         response_data = {
             "session_id": session_id,
             "expires_at": expires_at,
-            "cookie_settings": {
-                "key": self.cookie_name,
-                "value": session_id,
-                "max_age": self.session_timeout,
-                "secure": self.cookie_secure,
-                "httponly": self.cookie_httponly,
-                "samesite": self.cookie_samesite,
-                "domain": self.cookie_domain,
-                "path": self.cookie_path
-            }
+            "cookie_settings": self._cookie_settings(cookie_value)
         }
         
         return user, response_data
@@ -380,10 +616,10 @@ class SessionProvider(BaseAuthProvider):
         """
         sessions_deleted = 0
         
-        # Get session ID from user metadata or cookie
+        # Get session ID from user metadata or cookie (stateless storage needs the cookie)
         session_id = user.metadata.get("session_id")
-        if not session_id:
-            session_id = request.cookies.get(self.cookie_name)
+        if not session_id or self._storage.stateless:
+            session_id = RequestFacts.of(request).cookies.get(self.cookie_name) or session_id
         
         # Delete current session if found
         if session_id:
@@ -392,10 +628,7 @@ class SessionProvider(BaseAuthProvider):
         
         # If requested, delete all sessions for this user (security feature)
         if logout_all:
-            # Note: This would require extending storage interface to support
-            # user-based session lookup, which is not implemented yet
-            # For now, we just delete the current session
-            pass
+            sessions_deleted += await self._storage.delete_user_sessions(user.user_id)
         
         return {
             "message": "Session logout successful",
@@ -415,6 +648,8 @@ class SessionProvider(BaseAuthProvider):
             Dictionary with refresh response data
         """
         session_id = user.metadata.get("session_id")
+        if self._storage.stateless:
+            session_id = RequestFacts.of(request).cookies.get(self.cookie_name)
         if not session_id:
             raise AuthenticationError("No session to refresh")
         
@@ -427,11 +662,27 @@ class SessionProvider(BaseAuthProvider):
         session_data["last_accessed"] = time.time()
         
         # Extend session
-        await self._storage.set(session_id, session_data, self.session_timeout)
+        cookie_value = await self._storage.save(
+            session_data.get("session_id", session_id), session_data, self.session_timeout
+        )
         
         return {
             "message": "Session refreshed",
-            "expires_in": self.session_timeout
+            "expires_in": self.session_timeout,
+            "cookie_settings": self._cookie_settings(cookie_value)
+        }
+    
+    def _cookie_settings(self, value: str) -> dict[str, Any]:
+        """Build session cookie settings for a cookie value."""
+        return {
+            "key": self.cookie_name,
+            "value": value,
+            "max_age": self.session_timeout,
+            "secure": self.cookie_secure,
+            "httponly": self.cookie_httponly,
+            "samesite": self.cookie_samesite,
+            "domain": self.cookie_domain,
+            "path": self.cookie_path
         }
     
     def _generate_session_id(self) -> str:
@@ -440,6 +691,11 @@ class SessionProvider(BaseAuthProvider):
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP address from request."""
+        # Prefer the proxy-validated IP resolved earlier in the chain
+        facts = RequestFacts.of(request)
+        if facts.client_ip is not None:
+            return facts.client_ip
+        
         # Check for forwarded headers first
         forwarded_for = request.headers.get("x-forwarded-for")
         if forwarded_for:
@@ -450,28 +706,38 @@ class SessionProvider(BaseAuthProvider):
             return real_ip
         
         # Fall back to direct client IP
-        if hasattr(request, "client") and request.client:
-            return request.client.host
-        
-        return "unknown"
+        return facts.remote_addr
     
     def hash_password(self, password: str) -> str:
         """Hash a password for secure storage."""
-        return self.pwd_context.hash(password)
+        return self.password_hasher.hash_sync(password)
     
     def verify_password(self, plain_password: str, hashed_password: str) -> bool:
         """Verify a password against its hash."""
-        return self.pwd_context.verify(plain_password, hashed_password)
+        return self.password_hasher.verify_sync(plain_password, hashed_password)
+    
+    async def hash_password_async(self, password: str) -> str:
+        """Hash a password on the hashing executor."""
+        return await self.password_hasher.hash(password)
+    
+    async def close(self) -> None:
+        """Shut down the password hashing pool and release storage."""
+        self.password_hasher.close()
+        await self._storage.close()
     
     async def _lookup_user(self, username: str, password: str = None) -> dict[str, Any] | None:
         """Look up user by username and optionally password."""
         if self._user_lookup_func:
-            # Try to call with both parameters first
-            try:
-                return await self._user_lookup_func(username, password)
-            except TypeError:
-                # Fall back to username only for compatibility
-                return await self._user_lookup_func(username=username)
+            async def call() -> Any:
+                # Try to call with both parameters first
+                try:
+                    return await self._user_lookup_func(username, password)
+                except TypeError:
+                    # Fall back to username only for compatibility
+                    return await self._user_lookup_func(username=username)
+            
+            # The lookup may check the password, so cached answers are tied to it
+            return await self.user_resolver.resolve("username", username, call, credential=password)
         
         # Default implementation for testing/development
         return None
@@ -502,4 +768,14 @@ class SessionProvider(BaseAuthProvider):
         if self.cookie_samesite not in ["strict", "lax", "none"]:
             errors.append("Session cookie_samesite must be 'strict', 'lax', or 'none'")
         
+        revocation = getattr(self._storage, "revocation", None)
+        if revocation is not None and revocation.store_type == "memory":
+            logger.warning(
+                "Cookie session revocation type 'memory' keeps revocations only in the current process; "
+                "use type 'redis' when running more than one worker"
+            )
+        
+        errors.extend(self.password_hasher.validate_config())
+        errors.extend(self.user_resolver.validate_config())
+        
         return errors
\ No newline at end of file
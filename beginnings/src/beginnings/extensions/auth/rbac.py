@@ -3,11 +3,20 @@ Role-Based Access Control (RBAC) system for authentication extension.
 
 This module provides role and permission management with inheritance,
 route-based access control, and flexible permission checking.
+
+Role hierarchies are compiled into bitsets: every permission and role name
+is interned to a bit position, each role's inherited permissions flatten
+into one integer, and route requirements compile into masks, so an access
+check is a handful of integer operations. The compiled form is rebuilt
+lazily after roles or permissions change.
 """
 
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable
+
+# Bit reserved for the "*" wildcard permission
+WILDCARD_BIT = 1
 
 
 class Permission:
@@ -62,19 +71,29 @@ class Role:
         self.permissions = set(permissions or [])
         self.inherits = inherits or []
         self._resolved_permissions: set[str] | None = None
+        self._on_change: Callable[[], None] | None = None
     
     def add_permission(self, permission: str) -> None:
         """Add a permission to this role."""
         self.permissions.add(permission)
-        self._resolved_permissions = None  # Clear cache
+        self._changed()
     
     def remove_permission(self, permission: str) -> None:
         """Remove a permission from this role."""
         self.permissions.discard(permission)
-        self._resolved_permissions = None  # Clear cache
+        self._changed()
+    
+    def _changed(self) -> None:
+        """Clear cached permissions and notify the owning manager."""
+        self._resolved_permissions = None
+        if self._on_change is not None:
+            self._on_change()
     
     def has_permission(self, permission: str, rbac_manager: RBACManager) -> bool:
         """Check if this role has a specific permission (including inherited)."""
+        if rbac_manager.roles.get(self.name) is self:
+            return rbac_manager.check_permission([self.name], permission)
+        
         resolved_permissions = self.get_all_permissions(rbac_manager)
         return permission in resolved_permissions or "*" in resolved_permissions
     
@@ -108,13 +127,154 @@ class Role:
         return hash(self.name)
 
 
+class CompiledRoute:
+    """Route access requirements compiled into bitmasks."""
+    
+    __slots__ = ("any_roles", "permissions", "all_roles", "route_config")
+    
+    def __init__(
+        self,
+        route_config: dict[str, Any],
+        any_roles: int,
+        permissions: int,
+        all_roles: int
+    ) -> None:
+        """
+        Initialize compiled route requirements.
+        
+        Args:
+            route_config: Route configuration the masks were compiled from
+            any_roles: Mask of roles of which the user needs at least one
+            permissions: Mask of permissions the user needs all of
+            all_roles: Mask of roles the user needs all of
+        """
+        self.route_config = route_config
+        self.any_roles = any_roles
+        self.permissions = permissions
+        self.all_roles = all_roles
+
+
+class CompiledRBAC:
+    """
+    Flattened, interned form of a role hierarchy.
+    
+    Permission bits start after the wildcard bit; role bits are numbered
+    separately. A permission that no role grants compiles to a bit no user
+    holds, so only the wildcard satisfies it. Role names are matched as
+    given, whether or not they are configured roles, so role names used by
+    route requirements are interned as routes compile; user roles that no
+    requirement or configured role mentions cannot match anything and get
+    no bit.
+    """
+    
+    def __init__(self, roles: dict[str, Role], permissions: dict[str, Permission]) -> None:
+        """
+        Compile roles and permissions into bitsets.
+        
+        Args:
+            roles: Role name to role mapping
+            permissions: Registered permissions
+        """
+        self.permission_bits: dict[str, int] = {"*": WILDCARD_BIT}
+        for name in permissions:
+            self._intern_permission(name)
+        for role in roles.values():
+            for name in sorted(role.permissions):
+                self._intern_permission(name)
+        
+        self.role_bits = {name: 1 << index for index, name in enumerate(roles)}
+        self.role_permission_masks: dict[str, int] = {}
+        self.role_permission_names: dict[str, frozenset[str]] = {}
+        
+        for name in roles:
+            # Union over every role reachable through inheritance; the
+            # visited set also makes circular inheritance terminate
+            mask = 0
+            names: set[str] = set()
+            visited = {name}
+            pending = [name]
+            while pending:
+                role = roles[pending.pop()]
+                names.update(role.permissions)
+                for permission in role.permissions:
+                    mask |= self.permission_bits[permission]
+                for parent in role.inherits:
+                    if parent in roles and parent not in visited:
+                        visited.add(parent)
+                        pending.append(parent)
+            self.role_permission_masks[name] = mask
+            self.role_permission_names[name] = frozenset(names)
+        
+        self._next_missing_bit = 1 << len(self.permission_bits)
+        self._missing_bits: dict[str, int] = {}
+    
+    def _intern_permission(self, name: str) -> None:
+        """Assign a bit to a permission name."""
+        if name not in self.permission_bits:
+            self.permission_bits[name] = 1 << len(self.permission_bits)
+    
+    def permission_bit(self, name: str) -> int:
+        """Get the bit for a permission, assigning an ungranted bit to unknown names."""
+        bit = self.permission_bits.get(name)
+        if bit is None:
+            bit = self._missing_bits.get(name)
+            if bit is None:
+                bit = self._missing_bits[name] = self._next_missing_bit
+                self._next_missing_bit <<= 1
+        return bit
+    
+    def role_mask(self, role_names: list[str]) -> int:
+        """Get the role bits of a list of role names (unknown roles have none)."""
+        mask = 0
+        role_bits = self.role_bits
+        for name in role_names:
+            mask |= role_bits.get(name, 0)
+        return mask
+    
+    def permission_mask(self, role_names: list[str]) -> int:
+        """Get the flattened permission bits of a list of role names."""
+        mask = 0
+        role_permission_masks = self.role_permission_masks
+        for name in role_names:
+            mask |= role_permission_masks.get(name, 0)
+        return mask
+    
+    def compile_route(self, route_config: dict[str, Any]) -> CompiledRoute:
+        """Compile route requirements into masks."""
+        permissions = 0
+        for name in route_config.get("permissions", []):
+            permissions |= self.permission_bit(name)
+        return CompiledRoute(
+            route_config,
+            self._role_requirement_mask(route_config.get("roles", [])),
+            permissions,
+            self._role_requirement_mask(route_config.get("require_all_roles", []))
+        )
+    
+    def _role_requirement_mask(self, role_names: list[str]) -> int:
+        """Get the role bits for required roles, interning new role names."""
+        mask = 0
+        role_bits = self.role_bits
+        for name in role_names:
+            bit = role_bits.get(name)
+            if bit is None:
+                bit = role_bits[name] = 1 << len(role_bits)
+            mask |= bit
+        return mask
+
+
 class RBACManager:
     """
     Role-Based Access Control manager.
     
     Manages roles, permissions, inheritance, and access control decisions.
+    Checks run against a compiled bitset form of the hierarchy, rebuilt on
+    first use after any role or permission change.
     """
     
+    # Compiled route requirements kept per route configuration
+    max_compiled_routes = 4096
+    
     def __init__(self, config: dict[str, Any] | None = None) -> None:
         """
         Initialize RBAC manager.
@@ -124,6 +284,9 @@ class RBACManager:
         """
         self.roles: dict[str, Role] = {}
         self.permissions: dict[str, Permission] = {}
+        self._compiled: CompiledRBAC | None = None
+        # id(route_config) -> compiled route, which holds the config alive so ids stay unique
+        self._compiled_routes: dict[int, CompiledRoute] = {}
         
         if config:
             self.load_from_config(config)
@@ -173,6 +336,7 @@ class RBACManager:
         """
         permission = Permission(name, description)
         self.permissions[name] = permission
+        self.invalidate()
         return permission
     
     def get_permission(self, name: str) -> Permission | None:
@@ -199,14 +363,54 @@ class RBACManager:
             The created Role object
         """
         role = Role(name, description, permissions, inherits)
+        role._on_change = self.invalidate
         self.roles[name] = role
         
         # Clear permission caches for all roles (inheritance might have changed)
         for existing_role in self.roles.values():
             existing_role._resolved_permissions = None
+        self.invalidate()
         
         return role
     
+    def invalidate(self) -> None:
+        """Discard the compiled hierarchy so the next check recompiles it."""
+        self._compiled = None
+        self._compiled_routes = {}
+    
+    def compile(self) -> CompiledRBAC:
+        """
+        Get the compiled hierarchy, compiling it if roles or permissions changed.
+        
+        Returns:
+            Compiled role and permission bitsets
+        """
+        compiled = self._compiled
+        if compiled is None:
+            compiled = self._compiled = CompiledRBAC(self.roles, self.permissions)
+        return compiled
+    
+    def compile_route(self, route_config: dict[str, Any]) -> CompiledRoute:
+        """
+        Get the compiled requirements of a route configuration.
+        
+        Compiled routes are cached by configuration identity, so route
+        configurations are expected not to be mutated after first use.
+        
+        Args:
+            route_config: Route configuration with access requirements
+            
+        Returns:
+            Route requirements as bitmasks
+        """
+        compiled_route = self._compiled_routes.get(id(route_config))
+        if compiled_route is None or compiled_route.route_config is not route_config:
+            compiled_route = self.compile().compile_route(route_config)
+            if len(self._compiled_routes) >= self.max_compiled_routes:
+                self._compiled_routes.clear()
+            self._compiled_routes[id(route_config)] = compiled_route
+        return compiled_route
+    
     def get_role(self, name: str) -> Role | None:
         """Get a role by name."""
         return self.roles.get(name)
@@ -222,11 +426,9 @@ class RBACManager:
         Returns:
             True if user has the permission
         """
-        for role_name in user_roles:
-            role = self.get_role(role_name)
-            if role and role.has_permission(required_permission, self):
-                return True
-        return False
+        compiled = self.compile()
+        mask = compiled.permission_mask(user_roles)
+        return bool(mask & (compiled.permission_bit(required_permission) | WILDCARD_BIT))
     
     def check_role(self, user_roles: list[str], required_roles: list[str]) -> bool:
         """
@@ -265,11 +467,10 @@ class RBACManager:
             Set of all permissions the user has
         """
         all_permissions: set[str] = set()
+        role_permission_names = self.compile().role_permission_names
         
         for role_name in user_roles:
-            role = self.get_role(role_name)
-            if role:
-                all_permissions.update(role.get_all_permissions(self))
+            all_permissions.update(role_permission_names.get(role_name, ()))
         
         return all_permissions
     
@@ -292,24 +493,26 @@ class RBACManager:
         if not route_config.get("required", False):
             return True, "No authentication required"
         
+        route = self.compile_route(route_config)
+        compiled = self.compile()
+        role_mask = compiled.role_mask(user_roles)
+        
         # Check role requirements
-        required_roles = route_config.get("roles", [])
-        if required_roles:
-            if not self.check_role(user_roles, required_roles):
-                return False, f"Requires one of roles: {', '.join(required_roles)}"
+        if route.any_roles and not role_mask & route.any_roles:
+            return False, f"Requires one of roles: {', '.join(route_config['roles'])}"
         
         # Check permission requirements
-        required_permissions = route_config.get("permissions", [])
-        if required_permissions:
-            for permission in required_permissions:
-                if not self.check_permission(user_roles, permission):
-                    return False, f"Missing required permission: {permission}"
+        if route.permissions:
+            permission_mask = compiled.permission_mask(user_roles)
+            missing = route.permissions & ~permission_mask
+            if missing and not permission_mask & WILDCARD_BIT:
+                for permission in route_config["permissions"]:
+                    if missing & compiled.permission_bit(permission):
+                        return False, f"Missing required permission: {permission}"
         
         # Check if all required roles are present (if specified)
-        required_all_roles = route_config.get("require_all_roles", [])
-        if required_all_roles:
-            if not self.check_all_roles(user_roles, required_all_roles):
-                return False, f"Requires all roles: {', '.join(required_all_roles)}"
+        if route.all_roles and route.all_roles & ~role_mask:
+            return False, f"Requires all roles: {', '.join(route_config['require_all_roles'])}"
         
         return True, "Access granted"
     
@@ -7,9 +7,80 @@ for JWT token revocation and security.
 
 from __future__ import annotations
 
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Iterable
+
+from beginnings.extensions.expiry import ExpiryService, get_expiry_service
+from beginnings.extensions.redis_connections import acquire_redis_connection, release_redis_connection
+from beginnings.extensions.shared_memory import (
+    default_shared_memory_path,
+    lock_backoff,
+    open_shared_memory_file,
+    try_lock,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def token_digest(token_id: str) -> bytes:
+    """Hash a token ID to the fixed-size digest used by shared backends."""
+    return hashlib.blake2b(token_id.encode(), digest_size=16).digest()
+
+
+class BloomFilter:
+    """
+    Bloom filter over 16-byte digests.
+    
+    Answers "definitely not present" or "possibly present"; sized for
+    ``capacity`` entries at a false positive rate of ``error_rate``.
+    Positions come from double hashing the two halves of the digest.
+    """
+    
+    def __init__(self, capacity: int = 10000, error_rate: float = 0.001) -> None:
+        """
+        Initialize Bloom filter.
+        
+        Args:
+            capacity: Expected number of entries
+            error_rate: Target false positive rate at capacity
+        """
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, digest: bytes) -> Iterable[int]:
+        """Get bit positions for a digest."""
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        size = self.size
+        return ((first + index * second) % size for index in range(self.hash_count))
+    
+    def add(self, digest: bytes) -> None:
+        """Add a digest to the filter."""
+        bits = self._bits
+        for position in self._positions(digest):
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+    
+    def __contains__(self, digest: bytes) -> bool:
+        """Check if a digest may be in the filter."""
+        bits = self._bits
+        for position in self._positions(digest):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
 
 
 class TokenBlacklistStorage(ABC):
@@ -29,17 +100,24 @@ class TokenBlacklistStorage(ABC):
     async def cleanup_expired(self) -> int:
         """Remove expired tokens and return count removed."""
         pass
+    
+    async def close(self) -> None:
+        """Release storage resources."""
 
 
 class MemoryTokenBlacklistStorage(TokenBlacklistStorage):
     """In-memory token blacklist storage for single-instance applications."""
     
-    def __init__(self) -> None:
+    def __init__(self, expiry_service: ExpiryService | None = None) -> None:
         self._blacklisted_tokens: dict[str, float] = {}
+        self._expiry = (expiry_service or get_expiry_service()).tracker(
+            self._blacklisted_tokens.get, self._blacklisted_tokens.pop
+        )
     
     async def add_token(self, token_id: str, expiry_timestamp: float) -> None:
         """Add a token to the blacklist with expiry timestamp."""
         self._blacklisted_tokens[token_id] = expiry_timestamp
+        self._expiry.schedule(token_id, expiry_timestamp)
     
     async def is_blacklisted(self, token_id: str) -> bool:
         """Check if a token is blacklisted."""
@@ -58,16 +136,505 @@ class MemoryTokenBlacklistStorage(TokenBlacklistStorage):
     
     async def cleanup_expired(self) -> int:
         """Remove expired tokens and return count removed."""
-        current_time = time.time()
-        expired_tokens = [
-            token_id for token_id, expiry in self._blacklisted_tokens.items()
-            if current_time > expiry
-        ]
+        return self._expiry.cleanup()
+
+
+class SharedTokenBlacklistStorage(TokenBlacklistStorage):
+    """
+    Base for blacklist storage shared between worker processes.
+    
+    Each process keeps a Bloom filter of revoked token digests, so the
+    common "not revoked" answer needs no I/O; only filter hits (revoked
+    tokens and rare false positives) consult the shared backend. The filter
+    is brought up to date incrementally from the backend's change log at
+    most every ``sync_interval`` seconds, and immediately for revocations
+    made by this process. Bloom filters cannot forget entries, so the
+    number of entries expiring in each time bucket is tracked and the
+    filter is rebuilt from a backend snapshot once more than half of its
+    entries have expired, or when the change log no longer reaches back
+    to the last sync.
+    
+    Subclasses implement the shared backend operations.
+    """
+    
+    def __init__(
+        self,
+        capacity: int = 10000,
+        error_rate: float = 0.001,
+        sync_interval: float = 1.0,
+        bucket_seconds: int = 60
+    ) -> None:
+        """
+        Initialize shared blacklist storage.
         
-        for token_id in expired_tokens:
-            del self._blacklisted_tokens[token_id]
+        Args:
+            capacity: Expected number of live revoked tokens (sizes the filter)
+            error_rate: Target Bloom filter false positive rate
+            sync_interval: Seconds between change log polls
+            bucket_seconds: Width of expiry buckets in seconds
+        """
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.bucket_seconds = bucket_seconds
+        
+        self._filter = BloomFilter(capacity, error_rate)
+        self._expiring: dict[int, int] = {}
+        self._expired = 0
+        self._cursor: Any = None
+        self._last_sync = float("-inf")
+        self.shared_lookups = 0
+    
+    @abstractmethod
+    async def _add_shared(self, digest: bytes, expiry_timestamp: float) -> None:
+        """Record a revoked digest in the shared backend."""
+    
+    @abstractmethod
+    async def _contains_shared(self, digest: bytes) -> bool:
+        """Check the shared backend for a live revoked digest."""
+    
+    @abstractmethod
+    async def _changes_since(self, cursor: Any) -> tuple[list[tuple[bytes, float]], Any, bool]:
+        """
+        Read change log entries added after a cursor.
+        
+        Returns:
+            Tuple of (entries, new cursor, complete); complete is False when
+            the log no longer reaches back to the cursor
+        """
+    
+    @abstractmethod
+    async def _snapshot(self) -> tuple[list[tuple[bytes, float]], Any]:
+        """
+        Read all live revoked digests.
+        
+        Returns:
+            Tuple of (entries, change log cursor at the time of the snapshot)
+        """
+    
+    async def add_token(self, token_id: str, expiry_timestamp: float) -> None:
+        """Add a token to the blacklist with expiry timestamp."""
+        digest = token_digest(token_id)
+        await self._add_shared(digest, expiry_timestamp)
+        self._track(digest, expiry_timestamp)
+    
+    async def is_blacklisted(self, token_id: str) -> bool:
+        """Check if a token is blacklisted."""
+        if time.monotonic() - self._last_sync >= self.sync_interval:
+            await self.sync()
+        
+        digest = token_digest(token_id)
+        if digest not in self._filter:
+            return False
+        
+        self.shared_lookups += 1
+        return await self._contains_shared(digest)
+    
+    async def sync(self) -> None:
+        """Apply change log entries from other processes to the filter."""
+        self._last_sync = time.monotonic()
+        if self._cursor is None:
+            await self.rebuild()
+            return
+        
+        entries, cursor, complete = await self._changes_since(self._cursor)
+        if not complete:
+            await self.rebuild()
+            return
+        
+        self._cursor = cursor
+        for digest, expiry_timestamp in entries:
+            self._track(digest, expiry_timestamp)
+    
+    async def rebuild(self) -> None:
+        """Rebuild the filter from a snapshot of the shared backend."""
+        entries, cursor = await self._snapshot()
+        self._filter = BloomFilter(max(self.capacity, 2 * len(entries)), self.error_rate)
+        self._expiring = {}
+        self._expired = 0
+        self._cursor = cursor
+        self._last_sync = time.monotonic()
+        for digest, expiry_timestamp in entries:
+            self._track(digest, expiry_timestamp)
+    
+    async def cleanup_expired(self) -> int:
+        """Drop expired entries from the local filter and return count expired."""
+        current_bucket = int(time.time() // self.bucket_seconds)
+        expired = 0
+        for bucket in [bucket for bucket in self._expiring if bucket < current_bucket]:
+            expired += self._expiring.pop(bucket)
+        
+        self._expired += expired
+        if self._expired and self._expired * 2 > self._filter.count:
+            await self.rebuild()
+        return expired
+    
+    def _track(self, digest: bytes, expiry_timestamp: float) -> None:
+        """Add a digest to the filter and its expiry bucket count."""
+        self._filter.add(digest)
+        bucket = int(expiry_timestamp // self.bucket_seconds)
+        self._expiring[bucket] = self._expiring.get(bucket, 0) + 1
+
+
+class RedisTokenBlacklistStorage(SharedTokenBlacklistStorage):
+    """
+    Redis/Valkey token blacklist storage.
+    
+    Each revoked token is a key that Redis expires at the token's own
+    expiry. Revocations are also appended to a change log sorted set
+    scored by time, which other processes read incrementally, and to
+    time-bucketed expiry sets listed in an index sorted set. A snapshot
+    reads only the buckets that have not ended yet, and ended buckets are
+    trimmed from the index as part of each revocation. All writes for a
+    revocation go out in one pipelined round trip.
+    """
+    
+    def __init__(
+        self,
+        redis_url: str,
+        key_prefix: str = "token_blacklist:",
+        max_connections: int = 20,
+        log_retention: int = 3600,
+        clock_skew: float = 5.0,
+        **options: Any
+    ) -> None:
+        """
+        Initialize Redis blacklist storage.
+        
+        Args:
+            redis_url: Redis connection URL
+            key_prefix: Prefix for all Redis keys
+            max_connections: Maximum connections in the shared pool
+            log_retention: Seconds change log entries are kept
+            clock_skew: Seconds of overlap re-read on each poll to allow for clock skew
+            **options: SharedTokenBlacklistStorage options
+        """
+        super().__init__(**options)
+        self.redis_url = redis_url
+        self.key_prefix = key_prefix
+        self.max_connections = max_connections
+        self.log_retention = log_retention
+        self.clock_skew = clock_skew
+        self._redis = None
+    
+    async def _get_redis(self):
+        """Get Redis client on the shared connection pool (lazy initialization)."""
+        if self._redis is None:
+            self._redis, _ = acquire_redis_connection(self.redis_url, self.max_connections)
+        return self._redis
+    
+    async def close(self) -> None:
+        """Release the shared Redis connection pool."""
+        if self._redis is not None:
+            self._redis = None
+            await release_redis_connection(self.redis_url)
+    
+    @staticmethod
+    def _encode_entry(digest: bytes, expiry_timestamp: float) -> str:
+        """Encode a log/bucket member."""
+        return f"{digest.hex()}:{expiry_timestamp!r}"
+    
+    @staticmethod
+    def _decode_entry(member: bytes | str) -> tuple[bytes, float]:
+        """Decode a log/bucket member."""
+        if isinstance(member, bytes):
+            member = member.decode()
+        digest, expiry_timestamp = member.split(":", 1)
+        return bytes.fromhex(digest), float(expiry_timestamp)
+    
+    async def _add_shared(self, digest: bytes, expiry_timestamp: float) -> None:
+        """Record a revoked digest, its log entry and its expiry bucket."""
+        redis = await self._get_redis()
+        now = time.time()
+        ttl = max(1, math.ceil(expiry_timestamp - now))
+        bucket = int(expiry_timestamp // self.bucket_seconds)
+        bucket_end = (bucket + 1) * self.bucket_seconds
+        bucket_key = f"{self.key_prefix}expiry:{bucket}"
+        member = self._encode_entry(digest, expiry_timestamp)
+        
+        pipeline = redis.pipeline(transaction=False)
+        pipeline.set(f"{self.key_prefix}token:{digest.hex()}", 1, ex=ttl)
+        pipeline.zadd(f"{self.key_prefix}log", {member: now})
+        pipeline.zremrangebyscore(f"{self.key_prefix}log", "-inf", now - self.log_retention)
+        pipeline.sadd(bucket_key, member)
+        pipeline.expire(bucket_key, max(1, math.ceil(bucket_end - now)))
+        pipeline.zadd(f"{self.key_prefix}expiry", {str(bucket): bucket_end})
+        pipeline.zremrangebyscore(f"{self.key_prefix}expiry", "-inf", now)
+        await pipeline.execute()
+    
+    async def _contains_shared(self, digest: bytes) -> bool:
+        """Check for the token key."""
+        redis = await self._get_redis()
+        return bool(await redis.exists(f"{self.key_prefix}token:{digest.hex()}"))
+    
+    async def _changes_since(self, cursor: float) -> tuple[list[tuple[bytes, float]], float, bool]:
+        """Read log entries scored after the cursor time, less the skew allowance."""
+        now = time.time()
+        if cursor < now - self.log_retention + self.clock_skew:
+            return [], cursor, False
+        
+        redis = await self._get_redis()
+        members = await redis.zrangebyscore(f"{self.key_prefix}log", cursor - self.clock_skew, "+inf")
+        return [self._decode_entry(member) for member in members], now, True
+    
+    async def _snapshot(self) -> tuple[list[tuple[bytes, float]], float]:
+        """Read every bucket that has not ended yet."""
+        redis = await self._get_redis()
+        now = time.time()
+        buckets = await redis.zrangebyscore(f"{self.key_prefix}expiry", now, "+inf")
+        if not buckets:
+            return [], now
         
-        return len(expired_tokens)
+        pipeline = redis.pipeline(transaction=False)
+        for bucket in buckets:
+            bucket = bucket.decode() if isinstance(bucket, bytes) else bucket
+            pipeline.smembers(f"{self.key_prefix}expiry:{bucket}")
+        
+        entries = []
+        for members in await pipeline.execute():
+            for member in members:
+                digest, expiry_timestamp = self._decode_entry(member)
+                if expiry_timestamp > now:
+                    entries.append((digest, expiry_timestamp))
+        return entries, now
+
+
+class SharedMemoryTokenBlacklistStorage(SharedTokenBlacklistStorage):
+    """
+    Shared-memory token blacklist storage for multi-worker single-host deployments.
+    
+    An mmap'd file (on ``/dev/shm`` when available) holds a hash table of
+    revoked digests, split into buckets of a few slots, plus a ring buffer
+    change log with a running write count in the header. Expired slots are
+    reused in place, so nothing is ever scanned to clean up. A digest whose
+    bucket is full spills into the next few buckets; only when all of them
+    hold live tokens is the one expiring soonest evicted. A process
+    whose last sync fell more than a full ring behind the write count
+    rebuilds from a table scan. Access is serialized by an ``fcntl`` lock,
+    retried without blocking the event loop when contended; revocations are
+    rare and lookups only happen on Bloom filter hits. The backing file must
+    belong to the current user with mode 600, and the default path is
+    private to the application and user.
+    """
+    
+    _MAGIC = b"BGTBSHM1"
+    _VERSION = 1
+    _HEADER = struct.Struct("<8sIII")  # magic, version, buckets, log_capacity
+    _COUNT = struct.Struct("<Q")
+    _COUNT_OFFSET = 32
+    _HEADER_SIZE = 64
+    
+    _SLOTS_PER_BUCKET = 8
+    _MAX_PROBES = 4
+    _ENTRY = struct.Struct("<16sd")  # digest, expires_at
+    _EMPTY_DIGEST = bytes(16)
+    
+    def __init__(
+        self,
+        path: str | None = None,
+        buckets: int = 8192,
+        log_capacity: int = 65536,
+        **options: Any
+    ) -> None:
+        """
+        Initialize shared memory blacklist storage.
+        
+        Args:
+            path: Backing file shared by all worker processes (defaults to one
+                per application and user)
+            buckets: Number of hash buckets (each holds several tokens)
+            log_capacity: Entries in the change log ring buffer
+            **options: SharedTokenBlacklistStorage options
+        """
+        options.setdefault("sync_interval", 0.1)
+        super().__init__(**options)
+        self.path = path or default_shared_memory_path("token_blacklist")
+        self.buckets = buckets
+        self.log_capacity = log_capacity
+        
+        self._table_offset = self._HEADER_SIZE
+        self._bucket_size = self._SLOTS_PER_BUCKET * self._ENTRY.size
+        self._log_offset = self._table_offset + buckets * self._bucket_size
+        self._size = self._log_offset + log_capacity * self._ENTRY.size
+        
+        self._fd: int | None = None
+        self._mmap: mmap.mmap | None = None
+        self._fcntl: Any = None
+        self._thread_lock = threading.Lock()
+    
+    def _ensure_open(self) -> mmap.mmap:
+        """Open and map the backing file (lazy initialization)."""
+        if self._mmap is None:
+            try:
+                import fcntl
+            except ImportError:
+                raise ImportError("fcntl is required for shared memory storage backend (POSIX only)")
+            self._fcntl = fcntl
+            
+            fd = open_shared_memory_file(self.path)
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX, 1, 0)
+                try:
+                    self._initialize_table(fd)
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, 0)
+                self._mmap = mmap.mmap(fd, self._size)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        return self._mmap
+    
+    def _initialize_table(self, fd: int) -> None:
+        """Create the table header or verify it matches this configuration."""
+        header = os.pread(fd, self._HEADER.size, 0)
+        if len(header) == self._HEADER.size and header.startswith(self._MAGIC):
+            _, version, buckets, log_capacity = self._HEADER.unpack(header)
+            if (version, buckets, log_capacity) != (self._VERSION, self.buckets, self.log_capacity):
+                raise ValueError(
+                    f"Shared memory token blacklist at '{self.path}' was created with "
+                    f"buckets={buckets}, log_capacity={log_capacity}; "
+                    "all workers must use the same configuration"
+                )
+            return
+        
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, self._size)
+        os.pwrite(fd, self._HEADER.pack(self._MAGIC, self._VERSION, self.buckets, self.log_capacity), 0)
+    
+    async def close(self) -> None:
+        """Unmap the shared table and close the backing file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    async def _lock(self) -> mmap.mmap:
+        """Acquire the table lock and return the mapping."""
+        table = self._ensure_open()
+        attempt = 0
+        while True:
+            self._thread_lock.acquire()
+            if try_lock(self._fcntl, self._fd, 1):
+                return table
+            # Held by another process: wait without holding the thread lock
+            self._thread_lock.release()
+            await lock_backoff(attempt)
+            attempt += 1
+    
+    def _unlock(self) -> None:
+        """Release the table lock."""
+        self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, 1, 1)
+        self._thread_lock.release()
+    
+    def _probe_offsets(self, digest: bytes) -> Iterable[int]:
+        """
+        Yield the slot offsets a digest may occupy, bucket by bucket.
+        
+        Slots are filled in probe order and never emptied once written
+        (expired ones are reused in place), so nothing is stored past an
+        empty slot and probing stops at the first one.
+        """
+        home = int.from_bytes(digest[:8], "little") % self.buckets
+        for probe in range(min(self._MAX_PROBES, self.buckets)):
+            base = self._table_offset + (home + probe) % self.buckets * self._bucket_size
+            for index in range(self._SLOTS_PER_BUCKET):
+                yield base + index * self._ENTRY.size
+    
+    async def _add_shared(self, digest: bytes, expiry_timestamp: float) -> None:
+        """
+        Store a digest in its bucket and append it to the change log.
+        
+        A full bucket spills into the following ones. When every probed slot
+        holds a live token, the token expiring soonest is evicted so that a
+        revocation never fails.
+        """
+        table = await self._lock()
+        try:
+            now = time.time()
+            target = None
+            evict = None
+            evict_expires_at = float("inf")
+            for offset in self._probe_offsets(digest):
+                slot_digest, expires_at = self._ENTRY.unpack_from(table, offset)
+                if slot_digest == digest:
+                    target = offset
+                    break
+                if slot_digest == self._EMPTY_DIGEST:
+                    target = target if target is not None else offset
+                    break
+                if expires_at <= now:
+                    target = target if target is not None else offset
+                elif expires_at < evict_expires_at:
+                    evict, evict_expires_at = offset, expires_at
+            if target is None:
+                logger.warning(
+                    "Shared memory token blacklist at '%s' is full around a bucket; "
+                    "evicting a token expiring in %.0fs, increase buckets",
+                    self.path, evict_expires_at - now
+                )
+                target = evict
+            self._ENTRY.pack_into(table, target, digest, expiry_timestamp)
+            
+            (count,) = self._COUNT.unpack_from(table, self._COUNT_OFFSET)
+            self._ENTRY.pack_into(table, self._log_offset + count % self.log_capacity * self._ENTRY.size, digest, expiry_timestamp)
+            self._COUNT.pack_into(table, self._COUNT_OFFSET, count + 1)
+        finally:
+            self._unlock()
+    
+    async def _contains_shared(self, digest: bytes) -> bool:
+        """Check the digest's probe sequence for a live entry."""
+        table = await self._lock()
+        try:
+            now = time.time()
+            for offset in self._probe_offsets(digest):
+                slot_digest, expires_at = self._ENTRY.unpack_from(table, offset)
+                if slot_digest == digest:
+                    return expires_at > now
+                if slot_digest == self._EMPTY_DIGEST:
+                    return False
+            return False
+        finally:
+            self._unlock()
+    
+    async def _changes_since(self, cursor: int) -> tuple[list[tuple[bytes, float]], int, bool]:
+        """Read ring entries written after the cursor count."""
+        table = self._ensure_open()
+        (count,) = self._COUNT.unpack_from(table, self._COUNT_OFFSET)
+        if count == cursor:
+            return [], cursor, True
+        if count - cursor > self.log_capacity:
+            return [], cursor, False
+        
+        table = await self._lock()
+        try:
+            (count,) = self._COUNT.unpack_from(table, self._COUNT_OFFSET)
+            if count - cursor > self.log_capacity:
+                return [], cursor, False
+            entries = [
+                self._ENTRY.unpack_from(table, self._log_offset + position % self.log_capacity * self._ENTRY.size)
+                for position in range(cursor, count)
+            ]
+        finally:
+            self._unlock()
+        return entries, count, True
+    
+    async def _snapshot(self) -> tuple[list[tuple[bytes, float]], int]:
+        """Scan the table for live entries."""
+        table = await self._lock()
+        try:
+            now = time.time()
+            (count,) = self._COUNT.unpack_from(table, self._COUNT_OFFSET)
+            entries = []
+            for offset in range(self._table_offset, self._log_offset, self._ENTRY.size):
+                digest, expires_at = self._ENTRY.unpack_from(table, offset)
+                if digest != self._EMPTY_DIGEST and expires_at > now:
+                    entries.append((digest, expires_at))
+        finally:
+            self._unlock()
+        return entries, count
 
 
 class TokenBlacklistManager:
@@ -90,9 +657,32 @@ class TokenBlacklistManager:
         # Storage backend configuration
         storage_config = config.get("storage", {})
         storage_type = storage_config.get("type", "memory")
+        self.bucket_seconds = storage_config.get("bucket_seconds", 60)
+        shared_options = {
+            "capacity": storage_config.get("capacity", 10000),
+            "error_rate": storage_config.get("error_rate", 0.001),
+            "bucket_seconds": self.bucket_seconds
+        }
+        if "sync_interval" in storage_config:
+            shared_options["sync_interval"] = storage_config["sync_interval"]
         
         if storage_type == "memory":
             self._storage = MemoryTokenBlacklistStorage()
+        elif storage_type in ("redis", "valkey"):
+            self._storage = RedisTokenBlacklistStorage(
+                storage_config.get("redis_url", storage_config.get("valkey_url", "redis://localhost:6379")),
+                key_prefix=storage_config.get("key_prefix", "token_blacklist:"),
+                max_connections=storage_config.get("max_connections", 20),
+                log_retention=storage_config.get("log_retention", 3600),
+                **shared_options
+            )
+        elif storage_type == "shared_memory":
+            self._storage = SharedMemoryTokenBlacklistStorage(
+                path=storage_config.get("path"),
+                buckets=storage_config.get("buckets", 8192),
+                log_capacity=storage_config.get("log_capacity", 65536),
+                **shared_options
+            )
         else:
             raise ValueError(f"Unsupported blacklist storage type: {storage_type}")
         
@@ -168,6 +758,10 @@ class TokenBlacklistManager:
         self.last_cleanup = time.time()
         return count
     
+    async def close(self) -> None:
+        """Release storage resources."""
+        await self._storage.close()
+    
     async def _maybe_cleanup(self) -> None:
         """Perform cleanup if interval has passed."""
         current_time = time.time()
@@ -186,4 +780,15 @@ class TokenBlacklistManager:
         if self.cleanup_interval <= 0:
             errors.append("Token blacklist cleanup_interval_minutes must be positive")
         
+        storage = self._storage
+        if isinstance(storage, SharedTokenBlacklistStorage):
+            if storage.capacity <= 0:
+                errors.append("Token blacklist storage capacity must be positive")
+            if not 0 < storage.error_rate < 1:
+                errors.append("Token blacklist storage error_rate must be between 0 and 1")
+            if storage.sync_interval < 0:
+                errors.append("Token blacklist storage sync_interval must not be negative")
+        if self.bucket_seconds <= 0:
+            errors.append("Token blacklist storage bucket_seconds must be positive")
+        
         return errors
\ No newline at end of file
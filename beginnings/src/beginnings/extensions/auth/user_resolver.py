@@ -0,0 +1,258 @@
+"""
+Cached user resolution for authentication extension.
+
+This module wraps the application's user lookup function with a TTL cache,
+negative caching and single-flight deduplication, so concurrent requests
+for the same user share one lookup and repeated requests skip it entirely.
+Profile-update code calls ``invalidate`` to make changes visible at once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from beginnings.monitoring import get_metrics_collector
+
+# Per-process key for credential fingerprints; never leaves memory
+_FINGERPRINT_KEY = os.urandom(32)
+
+
+def credential_fingerprint(secret: str | None) -> bytes | None:
+    """
+    Fingerprint a credential passed to the lookup function.
+
+    Lookups that receive a password may answer differently per password, so
+    cached answers are tied to a keyed hash of it rather than the password.
+
+    Args:
+        secret: Credential passed to the lookup, if any
+
+    Returns:
+        Keyed digest of the credential, or None if there is none
+    """
+    if secret is None:
+        return None
+    return hmac.new(_FINGERPRINT_KEY, secret.encode(), hashlib.sha256).digest()
+
+
+def _result_user_id(result: Any) -> str | None:
+    """Get the user ID from a lookup result (dict or User)."""
+    if result is None:
+        return None
+    if isinstance(result, dict):
+        user_id = result.get("id", result.get("user_id"))
+    else:
+        user_id = getattr(result, "user_id", None)
+    return None if user_id is None else str(user_id)
+
+
+class UserResolver:
+    """
+    TTL-cached, single-flight front for a user lookup function.
+
+    Entries are keyed by ``(field, value)``, e.g. ``("username", "alice")``
+    or ``("user_id", "42")``. Misses (lookups returning None) are cached for
+    ``negative_ttl_seconds`` so unknown names do not reach the database on
+    every attempt. Concurrent resolutions of the same key share one call.
+    A lookup that completes after an invalidation is returned to its
+    callers but not cached.
+    """
+
+    def __init__(self, config: dict[str, Any] | None = None, provider: str = "auth") -> None:
+        """
+        Initialize user resolver.
+
+        Args:
+            config: User cache configuration dictionary
+            provider: Provider name used to tag metrics
+        """
+        config = config or {}
+        self.enabled = config.get("enabled", True)
+        self.ttl_seconds = config.get("ttl_seconds", 30)
+        self.negative_ttl_seconds = config.get("negative_ttl_seconds", 5)
+        self.max_size = config.get("max_size", 10000)
+        self.provider = provider
+
+        # (field, value) -> (result, credential fingerprint, expires_at)
+        self._cache: OrderedDict[tuple[str, str], tuple[Any, bytes | None, float]] = OrderedDict()
+        # user ID -> cache keys whose result is that user
+        self._keys_by_user: dict[str, set[tuple[str, str]]] = {}
+        self._in_flight: dict[tuple[str, str, bytes | None], asyncio.Future] = {}
+        self._generation = 0
+
+        self.lookups = 0
+        self.calls = 0
+        self.metrics = get_metrics_collector()
+
+    async def resolve(
+        self,
+        field: str,
+        value: str,
+        call: Callable[[], Awaitable[Any]],
+        credential: str | None = None
+    ) -> Any:
+        """
+        Resolve a user, calling the lookup only on a cache miss.
+
+        Args:
+            field: Field the lookup is by ("username" or "user_id")
+            value: Value of the field
+            call: Zero-argument coroutine function performing the lookup
+            credential: Credential passed to the lookup, if any
+
+        Returns:
+            Lookup result (None if the user does not exist)
+        """
+        self.lookups += 1
+        if not self.enabled:
+            return await self._call(call)
+
+        key = (field, value)
+        fingerprint = credential_fingerprint(credential)
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] == fingerprint and cached[2] > time.monotonic():
+            self._cache.move_to_end(key)
+            self._record("negative_hit" if cached[0] is None else "hit")
+            return cached[0]
+
+        flight_key = (field, value, fingerprint)
+        flight = self._in_flight.get(flight_key)
+        if flight is not None:
+            self._record("coalesced")
+            return await asyncio.shield(flight)
+
+        self._record("miss")
+        flight = asyncio.ensure_future(self._fill(key, fingerprint, call, self._generation))
+        self._in_flight[flight_key] = flight
+
+        def finished(_: asyncio.Future) -> None:
+            # An invalidation may already have replaced this flight
+            if self._in_flight.get(flight_key) is flight:
+                del self._in_flight[flight_key]
+
+        flight.add_done_callback(finished)
+        return await asyncio.shield(flight)
+
+    async def _fill(
+        self,
+        key: tuple[str, str],
+        fingerprint: bytes | None,
+        call: Callable[[], Awaitable[Any]],
+        generation: int
+    ) -> Any:
+        """Call the lookup and cache its result unless invalidated meanwhile."""
+        result = await self._call(call)
+        if generation == self._generation:
+            self._store(key, fingerprint, result)
+        return result
+
+    async def _call(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Call the lookup function and record the call."""
+        self.calls += 1
+        tags = {"provider": self.provider}
+        self.metrics.increment_counter("user_lookup_db_calls_total", 1, tags)
+        self.metrics.set_gauge("user_lookup_db_calls_per_lookup", self.calls / max(1, self.lookups), tags)
+        return await call()
+
+    def _store(self, key: tuple[str, str], fingerprint: bytes | None, result: Any) -> None:
+        """Cache a lookup result."""
+        ttl = self.negative_ttl_seconds if result is None else self.ttl_seconds
+        if ttl <= 0:
+            return
+
+        self._cache[key] = (result, fingerprint, time.monotonic() + ttl)
+        self._cache.move_to_end(key)
+        user_id = _result_user_id(result)
+        if user_id is not None:
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+
+        while len(self._cache) > self.max_size:
+            evicted_key, (evicted, _, _) = self._cache.popitem(last=False)
+            self._unindex(evicted_key, evicted)
+
+    def _unindex(self, key: tuple[str, str], result: Any) -> None:
+        """Remove a cache key from the per-user index."""
+        user_id = _result_user_id(result)
+        keys = self._keys_by_user.get(user_id) if user_id is not None else None
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[user_id]
+
+    def _record(self, result: str) -> None:
+        """Record a cache outcome."""
+        self.metrics.increment_counter("user_lookup_total", 1, {"provider": self.provider, "result": result})
+
+    def invalidate(self, user_id: str | None = None, username: str | None = None) -> int:
+        """
+        Drop cached entries for a user.
+
+        Entries found under either identifier are dropped, along with every
+        other entry that resolved to the same user ID. Lookups already in
+        flight complete for their callers but are not cached.
+
+        Args:
+            user_id: ID of the user to invalidate
+            username: Username of the user to invalidate
+
+        Returns:
+            Number of cache entries dropped
+        """
+        keys: set[tuple[str, str]] = set()
+        user_ids: set[str] = set()
+        if user_id is not None:
+            keys.add(("user_id", str(user_id)))
+            user_ids.add(str(user_id))
+        if username is not None:
+            keys.add(("username", username))
+            cached = self._cache.get(("username", username))
+            cached_user_id = _result_user_id(cached[0]) if cached is not None else None
+            if cached_user_id is not None:
+                user_ids.add(cached_user_id)
+        for invalidated_user_id in user_ids:
+            keys.update(self._keys_by_user.pop(invalidated_user_id, ()))
+
+        self._generation += 1
+        for flight_key in [flight_key for flight_key in self._in_flight if flight_key[:2] in keys]:
+            del self._in_flight[flight_key]
+
+        dropped = 0
+        for key in keys:
+            entry = self._cache.pop(key, None)
+            if entry is not None:
+                self._unindex(key, entry[0])
+                dropped += 1
+        return dropped
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        self._generation += 1
+        self._cache.clear()
+        self._keys_by_user.clear()
+        self._in_flight.clear()
+
+    def validate_config(self) -> list[str]:
+        """
+        Validate user cache configuration.
+
+        Returns:
+            List of error messages (empty if valid)
+        """
+        errors = []
+
+        if self.ttl_seconds < 0:
+            errors.append("User cache ttl_seconds must not be negative")
+
+        if self.negative_ttl_seconds < 0:
+            errors.append("User cache negative_ttl_seconds must not be negative")
+
+        if self.max_size <= 0:
+            errors.append("User cache max_size must be positive")
+
+        return errors
@@ -0,0 +1,10 @@
+"""
+Blocklist extension for Beginnings framework.
+
+This module provides IP/CIDR blocking with static block lists and
+automatic, expiring bans for clients that keep exceeding rate limits.
+"""
+
+from beginnings.extensions.blocklist.extension import BlocklistExtension
+
+__all__ = ["BlocklistExtension"]
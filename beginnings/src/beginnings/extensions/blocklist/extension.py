@@ -0,0 +1,386 @@
+"""
+Blocklist extension for Beginnings framework.
+
+This module provides the blocklist extension, which rejects requests from
+statically blocked networks and from clients automatically banned after
+repeatedly exceeding rate limits.
+"""
+
+from __future__ import annotations
+
+import html
+import ipaddress
+import json
+import pathlib
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Callable
+
+from fastapi import Request
+
+from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.rate_limiting.cidr import CIDRTrie
+from beginnings.extensions.rate_limiting.storage import (
+    MemoryRateLimitStorage,
+    RateLimitStorage,
+    create_storage,
+    get_extension_storage,
+)
+from beginnings.extensions.rate_limiting.trusted_proxies import TrustedProxyManager
+from beginnings.extensions.request_facts import RequestFacts
+from beginnings.extensions.responses import PreparedResponse, encode_headers
+from beginnings.monitoring import SecurityEvent, get_metrics_collector, get_structured_logger
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+
+
+class BlocklistExtension(BaseExtension):
+    """
+    Blocklist extension.
+
+    Runs first in the security middleware chain. Static blocks are compiled
+    into a CIDR prefix trie; dynamic bans are promoted when a client gets
+    ``violations`` rate limit rejections within ``window_seconds`` and
+    expire after ``ban_seconds``. Ban state lives in the RateLimitExtension's
+    storage backend unless ``storage`` is configured, so workers sharing a
+    ``shared_memory`` or ``redis`` storage share bans. Blocked clients get a
+    pre-serialized 403.
+
+    Only rejections made by RateLimitExtension count as violations; other
+    429 responses, such as ones a handler returns or proxies from an
+    upstream service, do not.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize blocklist extension.
+
+        Args:
+            config: Blocklist configuration dictionary
+        """
+        super().__init__(config)
+
+        self.enabled = config.get("enabled", True)
+
+        # Static blocks compiled into a prefix trie
+        self.static_networks: list[ipaddress.IPv4Network | ipaddress.IPv6Network] = []
+        self._load_static_networks(config)
+        self._static_trie = CIDRTrie(self.static_networks)
+
+        # Automatic bans from rate limit violations
+        auto_ban_config = config.get("auto_ban", {})
+        self.auto_ban_enabled = auto_ban_config.get("enabled", True)
+        self.ban_violations = auto_ban_config.get("violations", 10)
+        self.violation_window_seconds = auto_ban_config.get("window_seconds", 60)
+        self.ban_seconds = auto_ban_config.get("ban_seconds", 900)
+
+        # Ban state is kept in a rate limit storage backend; without one configured,
+        # the RateLimitExtension's is borrowed on first use, as it may load later
+        self._storage: RateLimitStorage | None = None
+        self._shared_storage = False
+        self._owns_storage = "storage" in config
+        if self._owns_storage:
+            self._set_storage(create_storage(config["storage"]))
+
+        # Local view of bans (ip -> expiry) and of recent "not banned" storage checks
+        self.sync_interval = config.get("sync_interval", 1.0)
+        self.cache_size = config.get("cache_size", 10000)
+        self._bans: dict[str, float] = {}
+        self._checked: OrderedDict[str, float] = OrderedDict()
+
+        # Trusted proxy manager for IP validation
+        proxy_config = config.get("trusted_proxies", {"enabled": True})
+        self.proxy_manager = TrustedProxyManager(proxy_config)
+
+        # Pre-serialized 403 responses
+        error_json = config.get("error_json", {"error": "Forbidden"})
+        error_message = config.get("error_message", "Access denied.")
+        self._json_body = json.dumps(error_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self._html_body = (
+            "<!DOCTYPE html><html><head><title>403 Forbidden</title></head>"
+            f"<body><h1>Forbidden</h1><p>{html.escape(error_message)}</p></body></html>"
+        ).encode("utf-8")
+        self._json_headers = encode_headers({"content-type": "application/json"})
+        self._html_headers = encode_headers({"content-type": "text/html; charset=utf-8"})
+
+        # Monitoring and observability
+        self.logger = get_structured_logger()
+        self.metrics = get_metrics_collector()
+
+        # Log extension startup
+        self.logger.log_extension_startup("blocklist", config)
+
+    def _load_static_networks(self, config: dict[str, Any]) -> None:
+        """Load statically blocked networks from configuration."""
+        for network in config.get("static", []):
+            try:
+                self.static_networks.append(ipaddress.ip_network(network, strict=False))
+            except ValueError as e:
+                raise ValueError(f"Invalid blocked network '{network}': {e}")
+
+        static_file = config.get("static_file")
+        if static_file:
+            self._load_from_file(static_file)
+
+    def _load_from_file(self, file_path: str) -> None:
+        """Load blocked networks from a file (one CIDR per line)."""
+        try:
+            path = pathlib.Path(file_path)
+            if not path.exists():
+                raise FileNotFoundError(f"Blocklist file not found: {file_path}")
+
+            with path.open("r") as f:
+                for line_num, line in enumerate(f, 1):
+                    line = line.strip()
+                    # Skip empty lines and comments
+                    if not line or line.startswith("#"):
+                        continue
+
+                    try:
+                        self.static_networks.append(ipaddress.ip_network(line, strict=False))
+                    except ValueError as e:
+                        raise ValueError(f"Invalid network at line {line_num} in {file_path}: {e}")
+
+        except Exception as e:
+            raise ValueError(f"Failed to load blocklist file '{file_path}': {e}")
+
+    def get_shutdown_handler(self) -> Callable[[], Awaitable[None]] | None:
+        """Get shutdown handler for cleanup."""
+        async def shutdown():
+            # Close storage connections if needed; borrowed storage is closed by its owner
+            if self._owns_storage and hasattr(self._storage, 'close'):
+                await self._storage.close()
+
+        return shutdown
+
+    def get_middleware_factory(self) -> Callable[[dict[str, Any]], Callable[..., Any]]:
+        """
+        Get middleware factory for blocklist enforcement.
+
+        Returns:
+            Middleware factory function
+        """
+        def create_middleware(route_config: dict[str, Any]) -> Callable[..., Any]:
+            async def blocklist_middleware(request: Request, call_next: Callable[..., Any]) -> Any:
+                client_ip = self._get_client_ip(request)
+
+                reason = await self._get_block_reason(client_ip)
+                if reason is not None:
+                    self.metrics.increment_counter("blocklist_blocked_total", 1, {"reason": reason})
+                    return self._render_forbidden(request)
+
+                if not self.auto_ban_enabled:
+                    return await call_next(request)
+
+                # Rate limiting runs later in the chain; count its rejections
+                facts = RequestFacts.of(request)
+                try:
+                    return await call_next(request)
+                finally:
+                    if facts.rate_limited:
+                        await self._record_violation(client_ip, facts.path)
+
+            return blocklist_middleware
+
+        return create_middleware
+
+    def should_apply_to_route(
+        self,
+        path: str,
+        methods: list[str],
+        route_config: dict[str, Any]
+    ) -> bool:
+        """
+        Determine if the blocklist should apply to a route.
+
+        Args:
+            path: Route path
+            methods: HTTP methods
+            route_config: Route configuration
+
+        Returns:
+            True unless the extension or the route opts out
+        """
+        if not self.enabled:
+            return False
+
+        return route_config.get("blocklist", {}).get("enabled", True)
+
+    async def ban(self, ip_address: str) -> float:
+        """
+        Ban a client IP for ``ban_seconds``.
+
+        Args:
+            ip_address: Client IP address
+
+        Returns:
+            Time (epoch seconds) at which the ban expires
+        """
+        _, ban_start = await self._get_storage().increment_counter(self._ban_key(ip_address), self.ban_seconds)
+        expires_at = ban_start + self.ban_seconds
+        self._bans[ip_address] = expires_at
+        self._checked.pop(ip_address, None)
+        self._prune_bans(time.time())
+        return expires_at
+
+    async def unban(self, ip_address: str) -> None:
+        """
+        Lift a dynamic ban (static blocks are unaffected).
+
+        Args:
+            ip_address: Client IP address
+        """
+        storage = self._get_storage()
+        await storage.reset_counter(self._ban_key(ip_address))
+        await storage.reset_counter(self._violation_key(ip_address))
+        self._bans.pop(ip_address, None)
+        self._checked.pop(ip_address, None)
+
+    async def is_banned(self, ip_address: str) -> bool:
+        """
+        Check whether a client IP is statically blocked or banned.
+
+        Args:
+            ip_address: Client IP address
+
+        Returns:
+            True if requests from the address are rejected
+        """
+        return await self._get_block_reason(ip_address) is not None
+
+    async def _get_block_reason(self, ip_address: str) -> str | None:
+        """Get why a client is blocked ("static" or "ban"), or None."""
+        if ip_address in self._static_trie:
+            return "static"
+
+        now = time.time()
+        expires_at = self._bans.get(ip_address)
+        if expires_at is not None:
+            if expires_at > now:
+                return "ban"
+            del self._bans[ip_address]
+
+        storage = self._get_storage()
+        if not self._shared_storage:
+            # Memory storage is per-process, so the local view is complete
+            return None
+
+        # Other workers may have banned this client; recheck at most once per sync interval
+        next_check = self._checked.get(ip_address)
+        if next_check is not None and next_check > now:
+            return None
+
+        try:
+            count, ban_start = await storage.get_counter(self._ban_key(ip_address))
+        except Exception as e:
+            # Fail open so a storage outage doesn't take the site down
+            self.logger.log_extension_error("blocklist", e, {"ip_address": ip_address})
+            return None
+
+        if count and ban_start + self.ban_seconds > now:
+            self._bans[ip_address] = ban_start + self.ban_seconds
+            self._checked.pop(ip_address, None)
+            return "ban"
+
+        self._checked[ip_address] = now + self.sync_interval
+        self._checked.move_to_end(ip_address)
+        if len(self._checked) > self.cache_size:
+            self._checked.popitem(last=False)
+        return None
+
+    async def _record_violation(self, ip_address: str, request_path: str) -> None:
+        """Count a rate limit rejection and ban the client at the threshold."""
+        try:
+            storage = self._get_storage()
+            violation_key = self._violation_key(ip_address)
+            async with storage.atomic(violation_key):
+                violations, _ = await storage.increment_counter(
+                    violation_key, self.violation_window_seconds
+                )
+                if violations < self.ban_violations:
+                    return
+                await storage.reset_counter(violation_key)
+
+            expires_at = await self.ban(ip_address)
+        except Exception as e:
+            self.logger.log_extension_error("blocklist", e, {"ip_address": ip_address})
+            return
+
+        self.metrics.increment_counter("blocklist_bans_total", 1)
+        self.logger.log_security_event(SecurityEvent(
+            event_type="client_banned",
+            ip_address=ip_address,
+            request_path=request_path,
+            details={
+                "violations": violations,
+                "window_seconds": self.violation_window_seconds,
+                "ban_seconds": self.ban_seconds,
+                "expires_at": int(expires_at)
+            },
+            severity="warning"
+        ))
+
+    def _prune_bans(self, now: float) -> None:
+        """Drop expired local bans once the table grows past the cache size."""
+        if len(self._bans) > self.cache_size:
+            self._bans = {ip: expires_at for ip, expires_at in self._bans.items() if expires_at > now}
+
+    def _get_storage(self) -> RateLimitStorage:
+        """Get the ban storage, borrowing the RateLimitExtension's if none is configured."""
+        if self._storage is None:
+            self._set_storage(get_extension_storage() or MemoryRateLimitStorage())
+        return self._storage
+
+    def _set_storage(self, storage: RateLimitStorage) -> None:
+        """Use a storage backend for ban state."""
+        self._storage = storage
+        self._shared_storage = not isinstance(storage, MemoryRateLimitStorage)
+
+    def _ban_key(self, ip_address: str) -> str:
+        """Get storage key holding a client's ban."""
+        return f"blocklist:ban:{ip_address}"
+
+    def _violation_key(self, ip_address: str) -> str:
+        """Get storage key counting a client's rate limit violations."""
+        return f"blocklist:violations:{ip_address}"
+
+    def _get_client_ip(self, request: Request) -> str:
+        """Extract client IP address from request with proxy validation."""
+        # Resolved once per request and shared with the other extensions
+        return RequestFacts.of(request).resolve_client_ip(self.proxy_manager)
+
+    def _render_forbidden(self, request: Request) -> PreparedResponse:
+        """Build the pre-serialized 403 for a blocked request."""
+        if RequestFacts.of(request).is_api:
+            return PreparedResponse(403, self._json_body, self._json_headers)
+        return PreparedResponse(403, self._html_body, self._html_headers)
+
+    def validate_config(self) -> list[str]:
+        """
+        Validate blocklist extension configuration.
+
+        Returns:
+            List of error messages (empty if valid)
+        """
+        errors = []
+
+        if self.auto_ban_enabled:
+            if self.ban_violations <= 0:
+                errors.append("Blocklist auto_ban violations must be positive")
+
+            if self.violation_window_seconds <= 0:
+                errors.append("Blocklist auto_ban window_seconds must be positive")
+
+            if self.ban_seconds <= 0:
+                errors.append("Blocklist auto_ban ban_seconds must be positive")
+
+        if self.sync_interval < 0:
+            errors.append("Blocklist sync_interval must not be negative")
+
+        # Validate trusted proxy configuration
+        proxy_errors = self.proxy_manager.validate_config()
+        for error in proxy_errors:
+            errors.append(f"Blocklist trusted proxies: {error}")
+
+        return errors
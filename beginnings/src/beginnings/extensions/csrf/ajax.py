@@ -9,6 +9,8 @@ import re
 from typing import Any
 from html import escape
 
+from beginnings.extensions.request_facts import RequestFacts
+
 
 class CSRFAjaxIntegration:
     """
@@ -48,7 +50,7 @@ class CSRFAjaxIntegration:
             return token
         
         # Fallback to cookie
-        token = request.cookies.get(self.cookie_name)
+        token = RequestFacts.of(request).cookies.get(self.cookie_name)
         if token:
             return token
         
@@ -10,11 +10,15 @@ from __future__ import annotations
 from typing import Any, Callable
 
 from fastapi import HTTPException, Request, Response
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from markupsafe import Markup
 
 from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.csrf.form_scanner import MAX_SCAN_BYTES, scan_form_token
+from beginnings.extensions.csrf.html_rewriter import CSRFHTMLRewriter, rewrite_html_stream
 from beginnings.extensions.csrf.tokens import CSRFTokenError, CSRFTokenManager
 from beginnings.extensions.csrf.template_hooks import CSRFTemplateHooks
+from beginnings.extensions.request_facts import RequestFacts
 
 
 class CSRFExtension(BaseExtension):
@@ -41,6 +45,8 @@ class CSRFExtension(BaseExtension):
         self.enabled = config.get("enabled", True)
         self.protected_methods = config.get("protected_methods", ["POST", "PUT", "PATCH", "DELETE"])
         self.protected_routes_config = config.get("protected_routes", {})
+        # Form bodies must carry the token within this many bytes
+        self.form_scan_max_bytes = config.get("form_scan_max_bytes", MAX_SCAN_BYTES)
         
         # Template integration settings
         template_config = config.get("template_integration", {})
@@ -48,6 +54,8 @@ class CSRFExtension(BaseExtension):
         self.template_function_name = template_config.get("template_function_name", "csrf_token")
         self.form_field_name = template_config.get("form_field_name", "csrf_token")
         self.meta_tag_name = template_config.get("meta_tag_name", "csrf-token")
+        # Off by default: templates usually render {{ csrf_token() }} themselves
+        self.auto_inject_forms = template_config.get("auto_inject_forms", False)
         
         # AJAX support settings
         ajax_config = config.get("ajax", {})
@@ -157,27 +165,22 @@ class CSRFExtension(BaseExtension):
     
     async def _validate_csrf_token(self, request: Request, csrf_config: dict[str, Any]) -> None:
         """Validate CSRF token from request."""
-        # Try to get token from form data first
-        token = None
-        
-        # Check form data for POST requests
-        if request.method in self.protected_methods:
-            try:
-                form_data = await request.form()
-                token = form_data.get(self.form_field_name)
-            except Exception:
-                # Form data not available or already consumed
-                pass
-        
-        # Check headers (for AJAX requests)
-        if not token:
-            token = request.headers.get(self.ajax_header_name)
+        # Check headers first (AJAX and JSON requests never touch the body)
+        token = request.headers.get(self.ajax_header_name)
         
         # Check custom header name if configured
         custom_header = csrf_config.get("header_name")
         if not token and custom_header:
             token = request.headers.get(custom_header)
         
+        # Fall back to scanning the form body, stopping at the token field
+        if not token and request.method in self.protected_methods:
+            try:
+                token = await scan_form_token(request, self.form_field_name, self.form_scan_max_bytes)
+            except Exception:
+                # Body not available or already consumed
+                pass
+        
         if not token:
             raise CSRFTokenError("CSRF token not found in request")
         
@@ -192,7 +195,7 @@ class CSRFExtension(BaseExtension):
         
         # For double-submit cookie pattern
         if self.token_manager.double_submit_cookie:
-            cookie_value = request.cookies.get(self.ajax_cookie_name)
+            cookie_value = RequestFacts.of(request).cookies.get(self.ajax_cookie_name)
             if cookie_value:
                 if not self.token_manager.validate_double_submit_cookie(token, cookie_value):
                     raise CSRFTokenError("CSRF cookie validation failed")
@@ -229,22 +232,23 @@ class CSRFExtension(BaseExtension):
                 samesite="strict"
             )
         
-        # Inject meta tag for HTML responses using proper template engine integration
-        if isinstance(response, HTMLResponse) and self.template_integration_enabled:
-            content = response.body.decode() if response.body else ""
-            if "</head>" in content and content.strip():
-                from html import escape
-                meta_tag = f'<meta name="{escape(self.meta_tag_name)}" content="{escape(token)}">'
-                
-                # Use more robust HTML injection
-                if "<!-- CSRF_META_TAG -->" in content:
-                    # Replace placeholder if it exists
-                    content = content.replace("<!-- CSRF_META_TAG -->", meta_tag)
-                elif "</head>" in content:
-                    # Fallback to head injection
-                    content = content.replace("</head>", f"    {meta_tag}\n</head>")
-                
-                response.body = content.encode()
+        # Inject the meta tag and form fields into HTML in one streaming pass
+        if self.template_integration_enabled and self._is_html_response(response):
+            from html import escape
+            meta_tag = f'<meta name="{escape(self.meta_tag_name)}" content="{escape(token)}">'
+            field = None
+            if self.auto_inject_forms:
+                field = f'<input type="hidden" name="{escape(self.form_field_name)}" value="{escape(token)}">'
+            rewriter = CSRFHTMLRewriter(field_html=field, meta_html=meta_tag, field_name=self.form_field_name)
+            
+            if isinstance(response, StreamingResponse):
+                response.body_iterator = rewrite_html_stream(response.body_iterator, rewriter, response.charset)
+                # Length changes and is unknown until the stream ends
+                if "content-length" in response.headers:
+                    del response.headers["content-length"]
+            elif response.body:
+                content = response.body.decode(response.charset, "surrogateescape")
+                response.body = rewriter.rewrite(content).encode(response.charset, "surrogateescape")
                 
                 # Update content length header if present
                 if "content-length" in response.headers:
@@ -252,6 +256,13 @@ class CSRFExtension(BaseExtension):
         
         return response
     
+    def _is_html_response(self, response: Response) -> bool:
+        """Determine if a response carries an HTML body that can be rewritten."""
+        if isinstance(response, HTMLResponse):
+            return True
+        content_type = response.headers.get("content-type", "")
+        return isinstance(response, StreamingResponse) and content_type.startswith("text/html")
+    
     async def _handle_csrf_error(
         self,
         request: Request,
@@ -260,7 +271,7 @@ class CSRFExtension(BaseExtension):
     ) -> Response:
         """Handle CSRF validation errors."""
         # Check if this is an API request
-        if self._is_api_request(request):
+        if RequestFacts.of(request).is_api:
             error_response = csrf_config.get("error_json", self.error_json_response)
             if isinstance(error_response, dict):
                 error_response = error_response.copy()
@@ -278,24 +289,6 @@ class CSRFExtension(BaseExtension):
             detail=custom_error_message
         )
     
-    def _is_api_request(self, request: Request) -> bool:
-        """Determine if request expects JSON response."""
-        # Check Accept header
-        accept_header = request.headers.get("accept", "").lower()
-        if "application/json" in accept_header:
-            return True
-        
-        # Check if path starts with /api
-        if request.url.path.startswith("/api"):
-            return True
-        
-        # Check Content-Type for non-GET requests
-        content_type = request.headers.get("content-type", "").lower()
-        if "application/json" in content_type:
-            return True
-        
-        return False
-    
     def _path_matches_pattern(self, path: str, pattern: str) -> bool:
         """Check if path matches a pattern (simple wildcard matching)."""
         if pattern == path:
@@ -345,7 +338,10 @@ class CSRFExtension(BaseExtension):
             if isinstance(request.state.user.metadata, dict):
                 session_id = request.state.user.metadata.get("session_id")
         
-        return self.token_manager.get_token_for_template(session_id)
+        token = self.token_manager.get_token_for_template(session_id)
+        # Marks the response as per-request (see routing.coalescing)
+        request.state.csrf_token = token
+        return token
     
     def create_csrf_form_field(self, request: Request) -> str:
         """
@@ -383,11 +379,12 @@ class CSRFExtension(BaseExtension):
         def csrf_token_func(request: Request) -> str:
             return self.get_csrf_token_for_template(request)
         
+        # Markup, so autoescaping templates render the tags rather than their text
         def csrf_form_field_func(request: Request) -> str:
-            return self.create_csrf_form_field(request)
+            return Markup(self.create_csrf_form_field(request))
         
         def csrf_meta_tag_func(request: Request) -> str:
-            return self.create_csrf_meta_tag(request)
+            return Markup(self.create_csrf_meta_tag(request))
         
         return {
             self.template_function_name: csrf_token_func,
@@ -412,6 +409,9 @@ class CSRFExtension(BaseExtension):
         if not self.protected_methods:
             errors.append("CSRF protected_methods cannot be empty")
         
+        if self.form_scan_max_bytes <= 0:
+            errors.append("CSRF form_scan_max_bytes must be positive")
+        
         # Validate status code
         if not (400 <= self.error_status_code < 600):
             errors.append("CSRF error_status_code must be a valid HTTP status code")
@@ -0,0 +1,190 @@
+"""
+Streaming CSRF token scanner for form bodies.
+
+The scanner reads a request body one ASGI message at a time and stops once
+the token field has been seen, so a large upload is neither buffered whole
+nor parsed just to find the token. The messages it read are replayed to the
+route handler, which therefore reads the body once as usual. A token must
+appear within the first ``MAX_SCAN_BYTES`` of the body, which bounds what is
+held in memory for replay when it comes late or not at all.
+"""
+
+from __future__ import annotations
+
+import re
+import urllib.parse
+from collections import deque
+from typing import Any
+
+from fastapi import Request
+
+# Longest token value or part header block accepted from a form body
+MAX_FIELD_BYTES = 8192
+
+# Body bytes read looking for the token before giving up
+MAX_SCAN_BYTES = 1024 * 1024
+
+_BOUNDARY_RE = re.compile(r'boundary="?([^";]+)"?', re.IGNORECASE)
+_FIELD_NAME_RE = re.compile(rb'^content-disposition:[^\r\n]*;\s*name="([^"]*)"', re.IGNORECASE | re.MULTILINE)
+
+
+class FormTokenScanner:
+    """
+    Incremental search for one field of a form body.
+
+    Supports ``application/x-www-form-urlencoded`` and ``multipart/form-data``.
+    Chunks are fed in order and only a bounded window of bytes that may
+    still hold the field is kept. ``finished`` is set once the field has
+    been found or can no longer be found.
+    """
+
+    def __init__(self, field_name: str, content_type: str) -> None:
+        """
+        Initialize form token scanner.
+
+        Args:
+            field_name: Name of the form field holding the token
+            content_type: Content-Type header of the request
+        """
+        media_type, _, params = content_type.partition(";")
+        media_type = media_type.strip().lower()
+        self.field_name = field_name
+        self.finished = False
+        self._window = bytearray()
+        self._scan = None
+
+        if media_type == "application/x-www-form-urlencoded":
+            # Leading "&" lets the first field match like the others
+            self._window += b"&"
+            self._marker = b"&" + urllib.parse.quote_plus(field_name).encode() + b"="
+            self._scan = self._scan_urlencoded
+        elif media_type == "multipart/form-data":
+            match = _BOUNDARY_RE.search(params)
+            if match:
+                # Leading CRLF lets the first delimiter match like the others
+                self._window += b"\r\n"
+                self._delimiter = b"\r\n--" + match.group(1).encode("latin-1")
+                self._state = "skip"
+                self._scan = self._scan_multipart
+
+    @property
+    def supported(self) -> bool:
+        """Whether the body's content type can be scanned."""
+        return self._scan is not None
+
+    def feed(self, chunk: bytes, final: bool = False) -> str | None:
+        """
+        Scan the next chunk of the body.
+
+        Args:
+            chunk: Next body bytes
+            final: Whether this is the last chunk
+
+        Returns:
+            Field value once found, otherwise None
+        """
+        if self.finished or self._scan is None:
+            return None
+
+        self._window += chunk
+        value = self._scan(final)
+        if value is not None or final:
+            self.finished = True
+        return value
+
+    def _scan_urlencoded(self, final: bool) -> str | None:
+        """Look for ``&name=value&`` in the window."""
+        window = self._window
+        index = window.find(self._marker)
+        if index < 0:
+            # Keep only a tail that may hold the start of the marker
+            del window[:max(0, len(window) - len(self._marker) + 1)]
+            return None
+
+        start = index + len(self._marker)
+        end = window.find(b"&", start)
+        if end < 0:
+            if not final:
+                del window[:index]
+                self.finished = len(window) > MAX_FIELD_BYTES
+                return None
+            end = len(window)
+        return urllib.parse.unquote_plus(window[start:end].decode("latin-1"))
+
+    def _scan_multipart(self, final: bool) -> str | None:
+        """Walk part delimiters and headers until the field's part body is complete."""
+        window = self._window
+        while True:
+            if self._state == "skip":
+                index = window.find(self._delimiter)
+                if index < 0:
+                    del window[:max(0, len(window) - len(self._delimiter) + 1)]
+                    return None
+                del window[:index + len(self._delimiter)]
+                self._state = "headers"
+
+            elif self._state == "headers":
+                if window[:2] == b"--":
+                    # Closing delimiter: the field is not in the body
+                    self.finished = True
+                    return None
+                end = window.find(b"\r\n\r\n")
+                if end < 0:
+                    self.finished = len(window) > MAX_FIELD_BYTES
+                    return None
+                match = _FIELD_NAME_RE.search(bytes(window[:end]))
+                del window[:end + 4]
+                is_field = match is not None and match.group(1).decode("latin-1") == self.field_name
+                self._state = "value" if is_field else "skip"
+
+            else:
+                end = window.find(self._delimiter)
+                if end < 0:
+                    self.finished = len(window) > MAX_FIELD_BYTES
+                    return None
+                return window[:end].decode("utf-8", "replace")
+
+
+async def scan_form_token(request: Request, field_name: str, max_bytes: int = MAX_SCAN_BYTES) -> str | None:
+    """
+    Find a form field by streaming the request body up to it.
+
+    The ASGI messages read are replayed ahead of the rest of the body, so
+    the route handler still sees the complete, unread request. The search
+    stops once more than ``max_bytes`` have been read without finding the
+    field, so at most that much (plus one message) is buffered.
+
+    Args:
+        request: Request whose body to scan
+        field_name: Name of the form field holding the token
+        max_bytes: Body bytes to read before giving up
+
+    Returns:
+        Field value, or None if the body is not a form or lacks the field
+        within ``max_bytes``
+    """
+    scanner = FormTokenScanner(field_name, request.headers.get("content-type", ""))
+    if not scanner.supported:
+        return None
+
+    receive = request.receive
+    messages: deque[dict[str, Any]] = deque()
+    token = None
+    scanned = 0
+    while not scanner.finished and scanned <= max_bytes:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            break
+        body = message.get("body", b"")
+        scanned += len(body)
+        more_body = message.get("more_body", False)
+        token = scanner.feed(body, final=not more_body)
+
+    async def replay() -> dict[str, Any]:
+        if messages:
+            return messages.popleft()
+        return await receive()
+
+    request._receive = replay
+    return token
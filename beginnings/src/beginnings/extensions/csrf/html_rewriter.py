@@ -0,0 +1,355 @@
+"""
+Streaming HTML rewriter for CSRF injection.
+
+This module provides an incremental HTML tokenizer that inserts the CSRF
+hidden field into state-changing forms and the CSRF meta tag into the page
+head while chunks stream through. Each character is examined once, so
+rewriting is linear in the page size. Only an unfinished ``<form>`` tag,
+a few characters of a possible end marker, or the content of a protected
+form (until its end shows whether it already has a CSRF field, up to
+``MAX_HELD_FORM_CHARS``) is held back between chunks.
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+from typing import AsyncIterable, AsyncIterator
+
+# Form methods whose submissions are CSRF protected
+PROTECTED_FORM_METHODS = frozenset({"post", "put", "patch", "delete"})
+
+# Elements whose content is text, not markup ("<form" inside them is not a form)
+RAW_TEXT_ELEMENTS = frozenset({"script", "style", "textarea", "title", "xmp"})
+
+META_PLACEHOLDER = "<!-- CSRF_META_TAG -->"
+
+# Forms whose content grows past this are given the field without waiting for their end
+MAX_HELD_FORM_CHARS = 64 * 1024
+
+_TEXT, _TAG_START, _TAG, _COMMENT, _BOGUS, _RAW = range(6)
+
+# Run of text and complete tags that need no attention, skipped in one match
+_PLAIN_RUN_RE = re.compile(
+    r"""(?:[^<]*<(?!!|(?:form|%s)[\s/>]|/(?:head|form)[\s/>])/?[A-Za-z][^>"']*(?:(?:"[^"]*"|'[^']*')[^>"']*)*>)*[^<]*"""
+    % "|".join(sorted(RAW_TEXT_ELEMENTS)),
+    re.IGNORECASE
+)
+_TAG_NAME_RE = re.compile(r"</?([A-Za-z][^\s/>]*)")
+_COMPLETE_TAG_RE = re.compile(r"""<(/?)([A-Za-z][^\s/>]*)(?:[^>"']|"[^"]*"|'[^']*')*>""")
+_TAG_DELIMITER_RE = re.compile(r"[>\"']")
+_RAW_END_RES = {name: re.compile(f"</{name}", re.IGNORECASE) for name in RAW_TEXT_ELEMENTS}
+_METHOD_RE = re.compile(r"""\smethod\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'>]+))""", re.IGNORECASE)
+
+
+class CSRFHTMLRewriter:
+    """
+    Incremental HTML rewriter injecting CSRF markup.
+
+    Call ``feed`` with each chunk and ``close`` at the end; each returns the
+    rewritten text ready to send. The hidden field is inserted right after
+    the opening tag of every form with a protected ``method``, unless the
+    form already contains a CSRF field (its content mentions ``csrf`` or
+    ``field_name``). The meta tag replaces a ``<!-- CSRF_META_TAG -->``
+    placeholder, or else is inserted before ``</head>``. Comments and raw
+    text elements such as ``<script>`` are passed through untouched.
+    """
+
+    def __init__(
+        self,
+        field_html: str | None = None,
+        meta_html: str | None = None,
+        field_name: str = "csrf_token"
+    ) -> None:
+        """
+        Initialize HTML rewriter.
+
+        Args:
+            field_html: Hidden input to insert into protected forms, if any
+            meta_html: Meta tag to insert into the head, if any
+            field_name: Name of the CSRF form field, to detect forms that already have one
+        """
+        self.field_html = field_html
+        self.meta_html = meta_html
+        self._field_markers = tuple({"csrf", field_name.lower()})
+        self._marker_overlap = max(len(marker) for marker in self._field_markers) - 1
+        self.forms_injected = 0
+        self.meta_injected = False
+
+        self._state = _TEXT
+        self._pending = ""
+        self._quote: str | None = None
+        self._tag_name = ""
+        self._closing = False
+        self._tag_parts: list[str] | None = None
+        self._raw_end: re.Pattern[str] | None = None
+
+        # Content of the open protected form, held until it is known to need the field
+        self._held: list[str] | None = None
+        self._held_scanned = 0
+        self._held_size = 0
+        self._held_tail = ""
+        self._held_has_field = False
+
+    def feed(self, chunk: str) -> str:
+        """Rewrite the next chunk of the page."""
+        return self._process(self._pending + chunk, final=False)
+
+    def close(self) -> str:
+        """Flush any held-back text at the end of the page."""
+        return self._process(self._pending, final=True)
+
+    def rewrite(self, html: str) -> str:
+        """Rewrite a complete page."""
+        return self.feed(html) + self.close()
+
+    def _process(self, text: str, final: bool) -> str:
+        """Tokenize text, emitting everything that no longer needs lookahead."""
+        result: list[str] = []
+        # Output goes to the held form content while a protected form is open
+        out = result if self._held is None else self._held
+        pos = 0
+        end = len(text)
+        self._pending = ""
+
+        while pos < end:
+            state = self._state
+
+            if state == _TEXT:
+                index = _PLAIN_RUN_RE.match(text, pos).end()
+                out.append(text[pos:index])
+                pos = index
+                if pos < end:
+                    self._state = _TAG_START
+
+            elif state == _TAG_START:
+                head = text[pos:pos + 4]
+                if head == "<!--":
+                    if self.meta_html and not self.meta_injected:
+                        if text.startswith(META_PLACEHOLDER, pos):
+                            out.append(self.meta_html)
+                            self.meta_injected = True
+                            pos += len(META_PLACEHOLDER)
+                            self._state = _TEXT
+                            continue
+                        if (
+                            not final
+                            and end - pos < len(META_PLACEHOLDER)
+                            and text.startswith(META_PLACEHOLDER[:end - pos], pos)
+                        ):
+                            break
+                    out.append("<!--")
+                    pos += 4
+                    self._state = _COMMENT
+                    continue
+                if not final and len(head) < 4 and "<!--".startswith(head):
+                    break
+                match = _COMPLETE_TAG_RE.match(text, pos)
+                if match is not None:
+                    # Whole tag available in this chunk
+                    self._start_tag(match.group(2), bool(match.group(1)), out, result)
+                    out = result if self._held is None else self._held
+                    out.append(match.group())
+                    pos = match.end()
+                    self._finish_tag(match.group())
+                    out = result if self._held is None else self._held
+                    continue
+                match = _TAG_NAME_RE.match(text, pos)
+                if match is None:
+                    if not final and (pos + 1 == end or (pos + 2 == end and text[pos + 1] == "/")):
+                        break
+                    if pos + 1 < end and text[pos + 1] in "!?":
+                        out.append(text[pos:pos + 2])
+                        pos += 2
+                        self._state = _BOGUS
+                    else:
+                        # A literal "<" in text
+                        out.append("<")
+                        pos += 1
+                        self._state = _TEXT
+                    continue
+                if match.end() == end and not final:
+                    # The tag name may continue in the next chunk
+                    break
+                self._start_tag(match.group(1), text[pos + 1] == "/", out, result)
+                out = result if self._held is None else self._held
+                # Form tags are held back until complete to read their method
+                self._tag_parts = [] if self._tag_name == "form" and not self._closing and self.field_html else None
+                self._quote = None
+                self._state = _TAG
+
+            elif state == _TAG:
+                index = self._find_tag_end(text, pos)
+                stop = end if index < 0 else index + 1
+                (out if self._tag_parts is None else self._tag_parts).append(text[pos:stop])
+                pos = stop
+                if index < 0:
+                    break
+                if self._tag_parts is not None:
+                    tag = "".join(self._tag_parts)
+                    self._tag_parts = None
+                    out.append(tag)
+                    self._finish_tag(tag)
+                    out = result if self._held is None else self._held
+                else:
+                    self._finish_tag("")
+
+            elif state == _COMMENT:
+                index = text.find("-->", pos)
+                if index < 0:
+                    keep = end if final else max(pos, end - 2)
+                    out.append(text[pos:keep])
+                    pos = keep
+                    break
+                out.append(text[pos:index + 3])
+                pos = index + 3
+                self._state = _TEXT
+
+            elif state == _BOGUS:
+                index = text.find(">", pos)
+                stop = end if index < 0 else index + 1
+                out.append(text[pos:stop])
+                pos = stop
+                if index >= 0:
+                    self._state = _TEXT
+
+            else:
+                match = self._raw_end.search(text, pos)
+                if match is None:
+                    # Hold back a possible partial end tag ("</scr")
+                    keep = end if final else max(pos, end - len(self._tag_name) - 1)
+                    out.append(text[pos:keep])
+                    pos = keep
+                    break
+                out.append(text[pos:match.start()])
+                pos = match.start()
+                self._state = _TAG_START
+
+        if final:
+            # An unterminated tag is passed through as is
+            out.extend(self._tag_parts or ())
+            self._tag_parts = None
+            out.append(text[pos:])
+            if self._held is not None:
+                # An unclosed form still gets the field, as browsers close it
+                self._release_form(result)
+        else:
+            self._pending = text[pos:]
+            if self._held is not None and self._scan_held_form():
+                self._release_form(result)
+        return "".join(result)
+
+    def _find_tag_end(self, text: str, pos: int) -> int:
+        """Find the ``>`` ending the current tag, skipping quoted attribute values."""
+        while True:
+            if self._quote is not None:
+                index = text.find(self._quote, pos)
+                if index < 0:
+                    return -1
+                self._quote = None
+                pos = index + 1
+            else:
+                match = _TAG_DELIMITER_RE.search(text, pos)
+                if match is None:
+                    return -1
+                if match.group() == ">":
+                    return match.start()
+                self._quote = match.group()
+                pos = match.end()
+
+    def _start_tag(self, name: str, closing: bool, out: list[str], result: list[str]) -> None:
+        """Record a tag's name, inserting the meta tag before ``</head>`` and releasing a form at ``</form>``."""
+        self._tag_name = name.lower()
+        self._closing = closing
+        if closing and self._tag_name == "head" and self.meta_html and not self.meta_injected:
+            out.append(f"    {self.meta_html}\n")
+            self.meta_injected = True
+        elif closing and self._tag_name == "form" and self._held is not None:
+            self._release_form(result)
+
+    def _finish_tag(self, tag: str) -> None:
+        """Switch state after a tag, holding the content of protected forms."""
+        self._state = _TEXT
+        if self._closing:
+            return
+        if self._tag_name == "form":
+            # Forms nested in a held form are ignored, as browsers do
+            if self.field_html and self._held is None and self._form_is_protected(tag):
+                self._held = []
+                self._held_scanned = 0
+                self._held_size = 0
+                self._held_tail = ""
+                self._held_has_field = False
+        elif self._tag_name in RAW_TEXT_ELEMENTS:
+            self._raw_end = _RAW_END_RES[self._tag_name]
+            self._state = _RAW
+
+    def _scan_held_form(self) -> bool:
+        """
+        Scan the form content held since the last scan.
+
+        Returns:
+            True if the form can be released: it already has a CSRF field, or
+            too much of it is held to keep waiting
+        """
+        pieces = self._held[self._held_scanned:]
+        self._held_scanned = len(self._held)
+        if not pieces:
+            return False
+
+        # The tail of the previous scan catches markers split between pieces
+        new_text = "".join(pieces)
+        self._held_size += len(new_text)
+        text = (self._held_tail + new_text).lower()
+        self._held_tail = text[-self._marker_overlap:]
+        self._held_has_field = self._held_has_field or any(marker in text for marker in self._field_markers)
+        return self._held_has_field or self._held_size > MAX_HELD_FORM_CHARS
+
+    def _release_form(self, result: list[str]) -> None:
+        """Emit the held form content, inserting the field unless the form already has one."""
+        held = self._held
+        self._scan_held_form()
+        self._held = None
+        if not self._held_has_field:
+            result.append(self.field_html)
+            self.forms_injected += 1
+        result.extend(held)
+
+    @staticmethod
+    def _form_is_protected(tag: str) -> bool:
+        """Whether a ``<form>`` tag submits with a protected method."""
+        match = _METHOD_RE.search(tag)
+        if match is None:
+            return False
+        method = next(group for group in match.groups() if group is not None)
+        return method.strip().lower() in PROTECTED_FORM_METHODS
+
+
+async def rewrite_html_stream(
+    chunks: AsyncIterable[str | bytes],
+    rewriter: CSRFHTMLRewriter,
+    charset: str = "utf-8"
+) -> AsyncIterator[bytes]:
+    """
+    Rewrite a streamed HTML body chunk by chunk.
+
+    Bytes are decoded incrementally, so multi-byte characters split across
+    chunks are handled; undecodable bytes pass through unchanged.
+
+    Args:
+        chunks: Body chunks of a streaming response
+        rewriter: Rewriter to apply
+        charset: Encoding of byte chunks
+
+    Yields:
+        Rewritten body chunks
+    """
+    decoder = codecs.getincrementaldecoder(charset)(errors="surrogateescape")
+    async for chunk in chunks:
+        text = decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        rewritten = rewriter.feed(text)
+        if rewritten:
+            yield rewritten.encode(charset, "surrogateescape")
+    rewritten = rewriter.feed(decoder.decode(b"", final=True)) + rewriter.close()
+    if rewritten:
+        yield rewritten.encode(charset, "surrogateescape")
@@ -7,6 +7,8 @@ Provides robust template integration that works with various template engines.
 from typing import Any, Dict, Protocol
 from html import escape
 
+from beginnings.extensions.csrf.html_rewriter import CSRFHTMLRewriter
+
 
 class TemplateEngine(Protocol):
     """Protocol for template engine integration."""
@@ -116,7 +118,7 @@ class CSRFTemplateHooks:
     
     def auto_inject_forms(self, html_content: str, request) -> str:
         """Automatically inject CSRF tokens into forms."""
-        if not html_content or "<form" not in html_content:
+        if not html_content:
             return html_content
         
         token = self.csrf_extension.get_csrf_token_for_template(request)
@@ -124,29 +126,7 @@ class CSRFTemplateHooks:
         token_value = escape(token)
         csrf_field = f'<input type="hidden" name="{field_name}" value="{token_value}">'
         
-        # Find and inject into forms that don't already have CSRF protection
-        import re
-        
-        def inject_csrf(match):
-            form_tag = match.group(0)
-            form_content = match.group(1) if match.lastindex else ""
-            
-            # Skip if form already has CSRF token
-            if field_name in form_content or "csrf" in form_content.lower():
-                return form_tag
-            
-            # Skip if form is GET method
-            if 'method="get"' in form_tag.lower() or "method='get'" in form_tag.lower():
-                return form_tag
-            
-            # Inject CSRF field after opening form tag
-            if form_content:
-                return form_tag.replace(form_content, f"{csrf_field}\n{form_content}", 1)
-            else:
-                return form_tag + csrf_field
-        
-        # Pattern to match form tags and their content
-        pattern = r'<form[^>]*>([^<]*(?:<(?!/form>)[^<]*)*)'
-        html_content = re.sub(pattern, inject_csrf, html_content, flags=re.IGNORECASE)
-        
-        return html_content
\ No newline at end of file
+        # Inject in one streaming pass after each protected form's opening tag,
+        # skipping forms that already have a CSRF field
+        rewriter = CSRFHTMLRewriter(field_html=csrf_field, field_name=self.csrf_extension.form_field_name)
+        return rewriter.rewrite(html_content)
@@ -10,6 +10,8 @@ import re
 from typing import Any, Callable
 from html import escape
 
+from beginnings.extensions.csrf.html_rewriter import CSRFHTMLRewriter
+
 
 class CSRFTemplateIntegration:
     """
@@ -211,20 +213,9 @@ class CSRFTemplateIntegration:
         if not self.enabled or not self.auto_inject_forms:
             return html_content
         
-        # Pattern to match form tags with method="post" (case insensitive)
-        form_pattern = re.compile(
-            r'<form\s+[^>]*method\s*=\s*["\']?post["\']?[^>]*>',
-            re.IGNORECASE
-        )
-        
-        def inject_token(match):
-            form_tag = match.group(0)
-            # Insert CSRF field after form opening tag
-            csrf_field = self.generate_hidden_field(token)
-            return f"{form_tag}\n    {csrf_field}"
-        
-        # Replace all POST forms with CSRF-protected versions
-        return form_pattern.sub(inject_token, html_content)
+        # Single streaming pass; no regex rescans of the page
+        csrf_field = self.generate_hidden_field(token)
+        return CSRFHTMLRewriter(field_html=f"\n    {csrf_field}").rewrite(html_content)
     
     def extract_forms_for_injection(self, html_content: str) -> list[dict[str, Any]]:
         """
@@ -0,0 +1,276 @@
+"""
+Shared expiry service for Beginnings extensions.
+
+This module provides a timing wheel that in-memory stores (sessions,
+token blacklists, OAuth states) register expiring keys with. Scheduling
+is O(1), and each tick only touches the keys due in it, so expiry cost
+is amortized per key instead of growing with the store. A
+background task started from extension startup handlers advances the
+wheel; stores can also advance it on demand.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Timing wheel with one slot per tick, stored sparsely.
+
+    Slots are keyed by absolute tick in a dict, so the wheel never wraps:
+    scheduling appends to the due tick's slot and each tick pops exactly
+    one slot. Unlike a hierarchical wheel there is no cascading, so no tick
+    ever moves a large batch of far-future entries. Entries are ``(owner,
+    key)``; due entries are returned grouped by owner.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0) -> None:
+        """
+        Initialize timing wheel.
+
+        Args:
+            tick_seconds: Resolution of the wheel in seconds
+        """
+        self.tick_seconds = tick_seconds
+        self._slots: dict[int, list[tuple[Any, Hashable]]] = {}
+        self._due: list[tuple[Any, Hashable]] = []
+        self._current: int | None = None
+        self.size = 0
+
+    def tick_of(self, timestamp: float) -> int:
+        """Get the first tick at or after a timestamp."""
+        return math.ceil(timestamp / self.tick_seconds)
+
+    def add(self, expires_at: float, owner: Any, key: Hashable) -> None:
+        """
+        Schedule a key to be returned once a time has passed.
+
+        Args:
+            expires_at: Time at which the key is due
+            owner: Owner the key is returned to
+            key: Key to return
+        """
+        if self._current is None:
+            self._current = math.floor(time.time() / self.tick_seconds)
+        self.size += 1
+
+        tick = self.tick_of(expires_at)
+        if tick <= self._current:
+            self._due.append((owner, key))
+        else:
+            slot = self._slots.get(tick)
+            if slot is None:
+                slot = self._slots[tick] = []
+            slot.append((owner, key))
+
+    def advance(self, now: float | None = None) -> dict[Any, list[Hashable]]:
+        """
+        Move the wheel to a time and collect the keys that became due.
+
+        Args:
+            now: Time to advance to (defaults to time.time())
+
+        Returns:
+            Due keys grouped by owner
+        """
+        target = math.floor((time.time() if now is None else now) / self.tick_seconds)
+        current = target if self._current is None else self._current
+        fired, self._due = self._due, []
+        slots = self._slots
+
+        if target - current <= len(slots):
+            for tick in range(current + 1, target + 1):
+                slot = slots.pop(tick, None)
+                if slot:
+                    fired.extend(slot)
+        else:
+            # Long gap (idle wheel or clock jump): visit occupied slots instead of ticks
+            for tick in [tick for tick in slots if tick <= target]:
+                fired.extend(slots.pop(tick))
+        # A clock that went backwards just waits for the wheel's time again
+        self._current = target
+
+        self.size -= len(fired)
+        grouped: dict[Any, list[Hashable]] = {}
+        for owner, key in fired:
+            keys = grouped.get(owner)
+            if keys is None:
+                keys = grouped[owner] = []
+            keys.append(key)
+        return grouped
+
+
+class ExpiryTracker:
+    """
+    A store's registration with the expiry service.
+
+    Keeps at most one live wheel entry per key: rescheduling a key to a
+    later time (e.g. a sliding session) is free, and when its entry fires
+    early the key is rescheduled to its current expiry. Keys removed by
+    the store meanwhile are skipped when their entry fires.
+    """
+
+    def __init__(
+        self,
+        service: ExpiryService,
+        expires_at_of: Callable[[Hashable], float | None],
+        expire: Callable[[Hashable], None]
+    ) -> None:
+        """
+        Initialize expiry tracker.
+
+        Args:
+            service: Expiry service to schedule on
+            expires_at_of: Returns a key's current expiry time, or None if it is gone
+            expire: Removes an expired key from the store
+        """
+        self.service = service
+        self._expires_at_of = expires_at_of
+        self._expire = expire
+        self._scheduled: dict[Hashable, float] = {}
+        self.expired = 0
+
+    def schedule(self, key: Hashable, expires_at: float) -> None:
+        """Make sure a key is expired no earlier than needed after a time."""
+        scheduled = self._scheduled.get(key)
+        if scheduled is None or expires_at < scheduled:
+            self._scheduled[key] = expires_at
+            self.service.wheel.add(expires_at, self, key)
+
+    def expire_due(self, keys: list[Hashable], now: float) -> int:
+        """
+        Expire or reschedule keys whose wheel entries fired.
+
+        Args:
+            keys: Keys whose entries fired
+            now: Current time
+
+        Returns:
+            Number of keys expired
+        """
+        expired = 0
+        for key in keys:
+            scheduled = self._scheduled.get(key)
+            if scheduled is None or scheduled > now:
+                # Superseded by a later entry, or already handled
+                continue
+
+            expires_at = self._expires_at_of(key)
+            if expires_at is None:
+                del self._scheduled[key]
+            elif expires_at <= now:
+                self._expire(key)
+                del self._scheduled[key]
+                expired += 1
+            else:
+                self._scheduled[key] = expires_at
+                self.service.wheel.add(expires_at, self, key)
+
+        self.expired += expired
+        return expired
+
+    def cleanup(self) -> int:
+        """
+        Advance the service now and return how many of this store's keys expired.
+
+        Returns:
+            Number of this tracker's keys expired
+        """
+        before = self.expired
+        self.service.advance()
+        return self.expired - before
+
+
+class ExpiryService:
+    """
+    Timing wheel plus the background task that advances it.
+
+    Start and stop are reference counted so several extensions can share
+    one service from their startup and shutdown handlers.
+    """
+
+    def __init__(self, tick_seconds: float = 1.0) -> None:
+        """
+        Initialize expiry service.
+
+        Args:
+            tick_seconds: Resolution of expiry in seconds
+        """
+        self.wheel = TimerWheel(tick_seconds)
+        self._task: asyncio.Task | None = None
+        self._users = 0
+
+    def tracker(
+        self,
+        expires_at_of: Callable[[Hashable], float | None],
+        expire: Callable[[Hashable], None]
+    ) -> ExpiryTracker:
+        """Register a store with the service."""
+        return ExpiryTracker(self, expires_at_of, expire)
+
+    @property
+    def running(self) -> bool:
+        """Whether the background task is running."""
+        return self._task is not None and not self._task.done()
+
+    def advance(self, now: float | None = None) -> int:
+        """
+        Expire every key that became due.
+
+        Args:
+            now: Current time (defaults to time.time())
+
+        Returns:
+            Number of keys expired
+        """
+        now = time.time() if now is None else now
+        expired = 0
+        for tracker, keys in self.wheel.advance(now).items():
+            try:
+                expired += tracker.expire_due(keys, now)
+            except Exception:
+                logger.exception("Expiry callback failed")
+        return expired
+
+    async def start(self) -> None:
+        """Start the background task (once, however many callers start it)."""
+        self._users += 1
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task once its last user stops."""
+        self._users = max(0, self._users - 1)
+        if self._users or self._task is None:
+            return
+
+        task, self._task = self._task, None
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    async def _run(self) -> None:
+        """Advance the wheel every tick."""
+        while True:
+            await asyncio.sleep(self.wheel.tick_seconds)
+            self.advance()
+
+
+_expiry_service: ExpiryService | None = None
+
+
+def get_expiry_service() -> ExpiryService:
+    """Get the process-wide expiry service."""
+    global _expiry_service
+    if _expiry_service is None:
+        _expiry_service = ExpiryService()
+    return _expiry_service
@@ -86,22 +86,23 @@ class SlidingWindowAlgorithm(RateLimitAlgorithm):
         current_time = time.time()
         window_start = current_time - window_seconds
         
-        # Get current request timestamps within window
-        timestamps = await self.storage.get_sliding_window_entries(key)
-        
-        # Filter timestamps within current window
-        valid_timestamps = [ts for ts in timestamps if ts >= window_start]
-        
-        # Check if limit exceeded
-        if len(valid_timestamps) >= limit:
-            # Find when the oldest request will expire
-            oldest_timestamp = min(valid_timestamps) if valid_timestamps else current_time
-            reset_time = oldest_timestamp + window_seconds
-            return False, 0, reset_time
-        
-        # Add current request timestamp (rounded to precision)
-        rounded_time = self._round_to_precision(current_time)
-        await self.storage.add_sliding_window_entry(key, rounded_time)
+        async with self.storage.atomic(key):
+            # Get current request timestamps within window
+            timestamps = await self.storage.get_sliding_window_entries(key)
+            
+            # Filter timestamps within current window
+            valid_timestamps = [ts for ts in timestamps if ts >= window_start]
+            
+            # Check if limit exceeded
+            if len(valid_timestamps) >= limit:
+                # Find when the oldest request will expire
+                oldest_timestamp = min(valid_timestamps) if valid_timestamps else current_time
+                reset_time = oldest_timestamp + window_seconds
+                return False, 0, reset_time
+            
+            # Add current request timestamp (rounded to precision)
+            rounded_time = self._round_to_precision(current_time)
+            await self.storage.add_sliding_window_entry(key, rounded_time)
         
         # Calculate remaining requests and reset time
         remaining = limit - len(valid_timestamps) - 1
@@ -164,37 +165,38 @@ class TokenBucketAlgorithm(RateLimitAlgorithm):
         """
         current_time = time.time()
         
-        # Get current bucket state
-        bucket_data = await self.storage.get_token_bucket(key)
-        
-        if bucket_data is None:
-            # Initialize new bucket (starts full)
-            tokens = min(limit, self.max_tokens)
-            last_refill = current_time
-        else:
-            tokens = bucket_data["tokens"]
-            last_refill = bucket_data["last_refill"]
-        
-        # Calculate tokens to add based on time elapsed
-        time_elapsed = current_time - last_refill
-        tokens_to_add = time_elapsed * self.refill_rate
-        tokens = min(tokens + tokens_to_add, min(limit, self.max_tokens))
-        
-        # Check if request can be served
-        if tokens < 1:
-            # Calculate when next token will be available
-            time_until_token = (1 - tokens) / self.refill_rate
-            reset_time = current_time + time_until_token
-            return False, 0, reset_time
-        
-        # Consume one token
-        tokens -= 1
-        
-        # Update bucket state
-        await self.storage.set_token_bucket(key, {
-            "tokens": tokens,
-            "last_refill": current_time
-        })
+        async with self.storage.atomic(key):
+            # Get current bucket state
+            bucket_data = await self.storage.get_token_bucket(key)
+            
+            if bucket_data is None:
+                # Initialize new bucket (starts full)
+                tokens = min(limit, self.max_tokens)
+                last_refill = current_time
+            else:
+                tokens = bucket_data["tokens"]
+                last_refill = bucket_data["last_refill"]
+            
+            # Calculate tokens to add based on time elapsed
+            time_elapsed = current_time - last_refill
+            tokens_to_add = time_elapsed * self.refill_rate
+            tokens = min(tokens + tokens_to_add, min(limit, self.max_tokens))
+            
+            # Check if request can be served
+            if tokens < 1:
+                # Calculate when next token will be available
+                time_until_token = (1 - tokens) / self.refill_rate
+                reset_time = current_time + time_until_token
+                return False, 0, reset_time
+            
+            # Consume one token
+            tokens -= 1
+            
+            # Update bucket state
+            await self.storage.set_token_bucket(key, {
+                "tokens": tokens,
+                "last_refill": current_time
+            })
         
         # Calculate reset time (when bucket will be full again)
         tokens_to_full = min(limit, self.max_tokens) - tokens
@@ -246,19 +248,20 @@ class FixedWindowAlgorithm(RateLimitAlgorithm):
         # Create window-specific key
         window_key = f"{key}:{int(window_start)}"
         
-        # Get current count for this window
-        count, window_start_stored = await self.storage.get_counter(window_key)
-        
-        # Reset counter if this is a new window
-        if window_start_stored < window_start:
-            count = 0
-        
-        # Check if limit exceeded
-        if count >= limit:
-            return False, 0, window_end
-        
-        # Increment counter
-        new_count, _ = await self.storage.increment_counter(window_key, window_seconds)
+        async with self.storage.atomic(window_key):
+            # Get current count for this window
+            count, window_start_stored = await self.storage.get_counter(window_key)
+            
+            # Reset counter if this is a new window
+            if window_start_stored < window_start:
+                count = 0
+            
+            # Check if limit exceeded
+            if count >= limit:
+                return False, 0, window_end
+            
+            # Increment counter
+            new_count, _ = await self.storage.increment_counter(window_key, window_seconds)
         
         remaining = limit - new_count
         return True, remaining, window_end
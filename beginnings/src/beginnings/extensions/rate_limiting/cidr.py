@@ -0,0 +1,110 @@
+"""
+CIDR prefix matching for Beginnings framework.
+
+This module provides a binary prefix trie for matching IPv4 and IPv6
+addresses against large sets of networks without scanning each one.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+from typing import Iterable, Union
+
+IPNetwork = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+IPAddress = Union[ipaddress.IPv4Address, ipaddress.IPv6Address]
+
+# Trie nodes are [zero_child, one_child, network] lists; a non-None network
+# marks the end of a prefix.
+_ZERO = 0
+_ONE = 1
+_NETWORK = 2
+
+
+class CIDRTrie:
+    """
+    Binary prefix trie of IPv4 and IPv6 networks.
+
+    Lookups walk at most 32 (IPv4) or 128 (IPv6) bits and stop at the first
+    covering prefix, so the cost is independent of the number of networks.
+    Networks nested inside an already-present prefix are dropped on insert
+    since the shorter prefix always matches first.
+    """
+
+    def __init__(self, networks: Iterable[str | IPNetwork] = ()) -> None:
+        """
+        Initialize the trie.
+
+        Args:
+            networks: Networks (CIDR strings or network objects) to insert
+        """
+        self._roots: dict[int, list] = {4: [None, None, None], 6: [None, None, None]}
+        for network in networks:
+            self.add(network)
+
+    def add(self, network: str | IPNetwork) -> None:
+        """
+        Insert a network into the trie.
+
+        Args:
+            network: CIDR string or network object
+
+        Raises:
+            ValueError: If network is not a valid CIDR
+        """
+        if isinstance(network, str):
+            network = ipaddress.ip_network(network, strict=False)
+
+        node = self._roots[network.version]
+        value = int(network.network_address)
+        bits = network.max_prefixlen
+
+        for shift in range(bits - 1, bits - 1 - network.prefixlen, -1):
+            if node[_NETWORK] is not None:
+                # Already covered by a shorter prefix
+                return
+            bit = (value >> shift) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+
+        node[_NETWORK] = network
+        # Longer prefixes below this node can never be reached first
+        node[_ZERO] = node[_ONE] = None
+
+    def match(self, address: str | IPAddress) -> IPNetwork | None:
+        """
+        Find the network covering an address.
+
+        Args:
+            address: IP address string or address object
+
+        Returns:
+            Covering network, or None if no network matches
+
+        Raises:
+            ValueError: If address is not a valid IP address
+        """
+        if isinstance(address, str):
+            address = ipaddress.ip_address(address)
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+
+        node = self._roots[address.version]
+        value = int(address)
+
+        for shift in range(address.max_prefixlen - 1, -1, -1):
+            network = node[_NETWORK]
+            if network is not None:
+                return network
+            node = node[(value >> shift) & 1]
+            if node is None:
+                return None
+
+        return node[_NETWORK]
+
+    def __contains__(self, address: str | IPAddress) -> bool:
+        """Check if any network covers an address (invalid addresses never match)."""
+        try:
+            return self.match(address) is not None
+        except ValueError:
+            return False
@@ -0,0 +1,205 @@
+"""
+Denial handling for rate limiting extension.
+
+This module keeps the rejection path cheap under request floods: denials
+are aggregated into periodic summaries, individual security events are
+sampled adaptively, and 429 responses are pre-serialized per route.
+"""
+
+from __future__ import annotations
+
+import html
+import json
+import time
+from collections import defaultdict
+from typing import Any
+
+from beginnings.extensions.responses import PreparedResponse, encode_headers
+
+# Bucket for denials beyond max_tracked_keys
+_OTHER_IDENTIFIER = "other"
+
+
+class DenialTracker:
+    """
+    Aggregates rate limit denials and decides which ones to log.
+
+    Denials are counted per (identifier, path) and emitted as one summary
+    every ``summary_interval`` seconds. At most ``log_budget`` denials per
+    second are logged individually, sampling every Nth denial with N
+    derived from the previous second's denial rate. Once the rate
+    reaches ``attack_threshold`` the tracker reports ``under_attack`` so the
+    extension can switch to its pre-serialized fast path.
+    """
+
+    def __init__(self, config: dict[str, Any]) -> None:
+        """
+        Initialize denial tracker.
+
+        Args:
+            config: Denial handling configuration dictionary
+        """
+        self.attack_threshold = config.get("attack_threshold", 100)
+        self.log_budget = config.get("log_budget", 10)
+        self.summary_interval = config.get("summary_interval", 10)
+        self.summary_top_n = config.get("summary_top_n", 10)
+        self.max_tracked_keys = config.get("max_tracked_keys", 10000)
+
+        self._counts: dict[tuple[str, str], int] = {}
+        self._fast_path_counts: dict[str, int] = defaultdict(int)
+        self._total = 0
+        self._summary_start = time.monotonic()
+
+        self._second_start = self._summary_start
+        self._second_denials = 0
+        self._last_second_denials = 0
+        self._logged_this_second = 0
+        self._sample_every = 1 if self.log_budget else 0
+
+        self.under_attack = False
+
+    def record(self, identifier: str, path: str, algorithm: str) -> int:
+        """
+        Record one denial.
+
+        Args:
+            identifier: Rate limiting identifier of the client
+            path: Request path
+            algorithm: Algorithm that denied the request
+
+        Returns:
+            Sample rate to attach if this denial should be logged
+            individually, otherwise 0
+        """
+        now = time.monotonic()
+        elapsed = now - self._second_start
+        if elapsed >= 1.0:
+            # A gap of more than a second means the flood has stopped
+            self._last_second_denials = self._second_denials if elapsed < 2.0 else 0
+            self._second_denials = 0
+            self._logged_this_second = 0
+            self._second_start = now
+            self._sample_every = max(1, self._last_second_denials // self.log_budget) if self.log_budget else 0
+            self.under_attack = 0 < self.attack_threshold <= self._last_second_denials
+
+        self._second_denials += 1
+        if not self.under_attack and 0 < self.attack_threshold <= self._second_denials:
+            self.under_attack = True
+
+        key = (identifier, path)
+        if key not in self._counts and len(self._counts) >= self.max_tracked_keys:
+            key = (_OTHER_IDENTIFIER, path)
+        self._counts[key] = self._counts.get(key, 0) + 1
+        self._total += 1
+        if self.under_attack:
+            self._fast_path_counts[algorithm] += 1
+
+        # The per-second cap covers the first second of a flood, before the
+        # sample rate has caught up with the denial rate
+        if (
+            not self._sample_every
+            or self._second_denials % self._sample_every
+            or self._logged_this_second >= self.log_budget
+        ):
+            return 0
+        self._logged_this_second += 1
+        return self._sample_every
+
+    def collect_summary(self, force: bool = False) -> dict[str, Any] | None:
+        """
+        Collect and reset the aggregated denials if the interval elapsed.
+
+        Args:
+            force: Collect even if the summary interval has not elapsed
+
+        Returns:
+            Summary details, or None if not due or nothing was denied
+        """
+        now = time.monotonic()
+        if not force and now - self._summary_start < self.summary_interval:
+            return None
+        if not self._total:
+            self._summary_start = now
+            return None
+
+        top_offenders = sorted(self._counts.items(), key=lambda item: item[1], reverse=True)
+        summary = {
+            "window_seconds": round(now - self._summary_start, 3),
+            "total_denied": self._total,
+            "distinct_keys": len(self._counts),
+            "under_attack": self.under_attack,
+            "fast_path_denials": dict(self._fast_path_counts),
+            "top_offenders": [
+                {"identifier": identifier, "path": path, "count": count}
+                for (identifier, path), count in top_offenders[:self.summary_top_n]
+            ]
+        }
+
+        self._counts = {}
+        self._fast_path_counts = defaultdict(int)
+        self._total = 0
+        self._summary_start = now
+        return summary
+
+
+class DenialResponses:
+    """
+    Pre-serialized 429 responses for one route.
+
+    Bodies and headers are encoded once when the route's middleware is
+    built; only the Retry-After value is formatted per response.
+    """
+
+    def __init__(self, rate_limit_config: dict[str, Any], retry_after_header: str) -> None:
+        """
+        Initialize denial responses.
+
+        Args:
+            rate_limit_config: Resolved rate limiting configuration for the route
+            retry_after_header: Name of the Retry-After header
+        """
+        error_json = rate_limit_config.get("error_json")
+        if error_json is None:
+            # Default body embeds retry_after, so splice it between fixed parts
+            self._json_prefix = b'{"error":"Rate limit exceeded","retry_after":'
+            self._json_suffix = b"}"
+            self._json_body = None
+        else:
+            self._json_body = json.dumps(error_json, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        error_message = rate_limit_config.get(
+            "error_message",
+            "Rate limit exceeded. Please try again later."
+        )
+        self._html_body = (
+            "<!DOCTYPE html><html><head><title>429 Too Many Requests</title></head>"
+            f"<body><h1>Too Many Requests</h1><p>{html.escape(error_message)}</p></body></html>"
+        ).encode("utf-8")
+
+        self._json_headers = encode_headers({"content-type": "application/json"})
+        self._html_headers = encode_headers({"content-type": "text/html; charset=utf-8"})
+        self._retry_after_header = retry_after_header.lower().encode("latin-1")
+
+    def render(self, is_api_request: bool, retry_after: int) -> PreparedResponse:
+        """
+        Build the 429 response for a denied request.
+
+        Args:
+            is_api_request: Whether the client expects JSON
+            retry_after: Seconds until the client may retry
+
+        Returns:
+            Pre-serialized 429 response
+        """
+        retry_after_value = str(retry_after).encode("latin-1")
+
+        if is_api_request:
+            body = self._json_body
+            if body is None:
+                body = self._json_prefix + retry_after_value + self._json_suffix
+            headers = self._json_headers
+        else:
+            body = self._html_body
+            headers = self._html_headers
+
+        return PreparedResponse(429, body, [*headers, (self._retry_after_header, retry_after_value)])
@@ -8,16 +8,29 @@ multiple algorithms, storage backends, and identifier resolution.
 from __future__ import annotations
 
 import time
-from typing import Any, Callable
+from typing import TYPE_CHECKING, Any, Callable
 
 from fastapi import HTTPException, Request, Response
 from fastapi.responses import JSONResponse
 
 from beginnings.extensions.base import BaseExtension
 from beginnings.extensions.rate_limiting.algorithms import create_algorithm, RateLimitAlgorithm
-from beginnings.extensions.rate_limiting.storage import create_storage, RateLimitStorage
+from beginnings.extensions.rate_limiting.denials import DenialResponses, DenialTracker
+from beginnings.extensions.rate_limiting.storage import create_storage, set_extension_storage, RateLimitStorage
 from beginnings.extensions.rate_limiting.trusted_proxies import TrustedProxyManager
+from beginnings.extensions.request_facts import RequestFacts
 from beginnings.monitoring import get_structured_logger, get_metrics_collector, SecurityEvent, PerformanceEvent
+from beginnings.tracing import trace_methods
+
+if TYPE_CHECKING:
+    from collections.abc import Awaitable
+
+# Storage methods traced when tracing is enabled
+TRACED_STORAGE_METHODS = (
+    "get_counter", "increment_counter", "reset_counter",
+    "get_sliding_window_entries", "add_sliding_window_entry", "cleanup_sliding_window_entries",
+    "get_token_bucket", "set_token_bucket",
+)
 
 
 class RateLimitExtension(BaseExtension):
@@ -40,6 +53,12 @@ class RateLimitExtension(BaseExtension):
         # Storage backend configuration and initialization
         storage_config = config.get("storage", {})
         self._storage = create_storage(storage_config)
+        trace_methods(
+            self._storage, "rate_limit.storage", TRACED_STORAGE_METHODS,
+            {"storage.backend": type(self._storage).__name__}
+        )
+        # Shared with the blocklist so bans live alongside the limits
+        set_extension_storage(self._storage)
         
         # Algorithm configuration
         algorithm_config = config.get("algorithms", {})
@@ -74,6 +93,9 @@ class RateLimitExtension(BaseExtension):
         proxy_config = config.get("trusted_proxies", {"enabled": True})
         self.proxy_manager = TrustedProxyManager(proxy_config)
         
+        # Denial aggregation, log sampling and under-attack fast path
+        self._denials = DenialTracker(config.get("denials", {}))
+        
         # Monitoring and observability
         self.logger = get_structured_logger()
         self.metrics = get_metrics_collector()
@@ -81,9 +103,12 @@ class RateLimitExtension(BaseExtension):
         # Log extension startup
         self.logger.log_extension_startup("rate_limiting", config)
     
-    async def get_shutdown_handler(self) -> Callable[[], None] | None:
+    def get_shutdown_handler(self) -> Callable[[], Awaitable[None]] | None:
         """Get shutdown handler for cleanup."""
         async def shutdown():
+            # Emit denials aggregated since the last summary
+            self._emit_denial_summary(force=True)
+            
             # Close storage connections if needed
             if hasattr(self._storage, 'close'):
                 await self._storage.close()
@@ -101,6 +126,7 @@ class RateLimitExtension(BaseExtension):
             # Cache the parsed configuration for this route to avoid re-parsing
             route_path = route_config.get("path", "unknown")
             cached_config = self._get_cached_route_config(route_path, route_config)
+            denial_responses = DenialResponses(cached_config, self.retry_after_header)
             
             async def rate_limit_middleware(request: Request, call_next: Callable[..., Any]) -> Any:
                 # Use cached configuration
@@ -123,7 +149,7 @@ class RateLimitExtension(BaseExtension):
                     identifier = await self._get_identifier(request, identifier_type)
                     
                     # Create rate limit key
-                    rate_limit_key = f"rate_limit:{identifier}:{request.url.path}"
+                    rate_limit_key = f"rate_limit:{identifier}:{RequestFacts.of(request).path}"
                     
                     # Get algorithm instance for this configuration
                     algorithm = self._get_algorithm(algorithm_type)
@@ -133,37 +159,16 @@ class RateLimitExtension(BaseExtension):
                         rate_limit_key, limit, window_seconds
                     )
                     
-                    # Record performance metrics
-                    duration_ms = (time.time() - start_time) * 1000
-                    self.metrics.record_histogram("rate_limit_check_duration", duration_ms, {
-                        "algorithm": algorithm_type,
-                        "identifier_type": identifier_type
-                    })
-                    self.metrics.increment_counter("rate_limit_checks_total", 1, {
-                        "algorithm": algorithm_type,
-                        "allowed": str(allowed)
-                    })
-                    
                     # Check if limit exceeded
                     if not allowed:
-                        # Log security event
-                        self.logger.log_security_event(SecurityEvent(
-                            event_type="rate_limited",
-                            ip_address=identifier if identifier_type == "ip" else None,
-                            user_id=identifier if identifier_type == "user" else None,
-                            request_path=str(request.url.path),
-                            details={
-                                "limit": limit,
-                                "algorithm": algorithm_type,
-                                "reset_time": int(reset_time)
-                            },
-                            severity="warning"
-                        ))
-                        
-                        return await self._handle_rate_limit_exceeded(
-                            request, rate_limit_config, int(reset_time)
+                        return await self._reject_request(
+                            request, rate_limit_config, denial_responses, identifier,
+                            identifier_type, algorithm_type, limit, reset_time, start_time
                         )
                     
+                    # Record performance metrics
+                    self._record_check_metrics(start_time, algorithm_type, identifier_type, allowed)
+                    
                     # Continue to route handler
                     response = await call_next(request)
                     
@@ -175,10 +180,13 @@ class RateLimitExtension(BaseExtension):
                     
                     return response
                     
+                except HTTPException:
+                    # Rate limit rejections for HTML requests
+                    raise
                 except Exception as e:
                     # Log error and continue without rate limiting
                     self.logger.log_extension_error("rate_limiting", e, {
-                        "request_path": str(request.url.path),
+                        "request_path": RequestFacts.of(request).path,
                         "identifier_type": identifier_type if 'identifier_type' in locals() else "unknown"
                     })
                     self.metrics.increment_counter("rate_limit_errors_total", 1, {
@@ -284,23 +292,92 @@ class RateLimitExtension(BaseExtension):
     
     def _get_client_ip(self, request: Request) -> str:
         """Extract client IP address from request with proxy validation."""
-        # Get direct connection IP
-        remote_addr = "unknown"
-        if hasattr(request, "client") and request.client:
-            remote_addr = request.client.host
-        
-        # Get forwarded headers
-        forwarded_for = request.headers.get("x-forwarded-for")
-        real_ip = request.headers.get("x-real-ip")
-        
-        # Use trusted proxy manager to extract real IP
-        real_ip_address = self.proxy_manager.extract_real_ip(
-            remote_addr=remote_addr,
-            forwarded_for=forwarded_for,
-            real_ip=real_ip
-        )
+        # Resolved once per request and shared with the other extensions
+        return f"ip:{RequestFacts.of(request).resolve_client_ip(self.proxy_manager)}"
+    
+    def _record_check_metrics(
+        self,
+        start_time: float,
+        algorithm_type: str,
+        identifier_type: str,
+        allowed: bool
+    ) -> None:
+        """Record duration and outcome metrics for one rate limit check."""
+        duration_ms = (time.time() - start_time) * 1000
+        self.metrics.record_histogram("rate_limit_check_duration", duration_ms, {
+            "algorithm": algorithm_type,
+            "identifier_type": identifier_type
+        })
+        self.metrics.increment_counter("rate_limit_checks_total", 1, {
+            "algorithm": algorithm_type,
+            "allowed": str(allowed)
+        })
+    
+    async def _reject_request(
+        self,
+        request: Request,
+        rate_limit_config: dict[str, Any],
+        denial_responses: DenialResponses,
+        identifier: str,
+        identifier_type: str,
+        algorithm_type: str,
+        limit: int,
+        reset_time: float,
+        start_time: float
+    ) -> Response:
+        """
+        Reject a rate limited request.
         
-        return f"ip:{real_ip_address}"
+        Every denial is aggregated, but only a sample is logged individually.
+        Under attack, per-denial metrics are deferred to the summary and the
+        pre-serialized response is returned directly.
+        """
+        facts = RequestFacts.of(request)
+        facts.rate_limited = True
+        request_path = facts.path
+        sample_rate = self._denials.record(identifier, request_path, algorithm_type)
+        
+        if sample_rate:
+            self.logger.log_security_event(SecurityEvent(
+                event_type="rate_limited",
+                ip_address=identifier if identifier_type == "ip" else None,
+                user_id=identifier if identifier_type == "user" else None,
+                request_path=request_path,
+                details={
+                    "limit": limit,
+                    "algorithm": algorithm_type,
+                    "reset_time": int(reset_time),
+                    "sample_rate": sample_rate
+                },
+                severity="warning"
+            ))
+        
+        self._emit_denial_summary()
+        
+        if self._denials.under_attack:
+            retry_after = int(reset_time) - int(time.time())
+            return denial_responses.render(facts.is_api, retry_after)
+        
+        self._record_check_metrics(start_time, algorithm_type, identifier_type, allowed=False)
+        return await self._handle_rate_limit_exceeded(request, rate_limit_config, int(reset_time))
+    
+    def _emit_denial_summary(self, force: bool = False) -> None:
+        """Log aggregated denials and flush deferred metrics when due."""
+        summary = self._denials.collect_summary(force=force)
+        if summary is None:
+            return
+        
+        for algorithm_type, count in summary["fast_path_denials"].items():
+            self.metrics.increment_counter("rate_limit_checks_total", count, {
+                "algorithm": algorithm_type,
+                "allowed": "False"
+            })
+        
+        self.logger.log_security_event(SecurityEvent(
+            event_type="rate_limit_summary",
+            details=summary,
+            severity="warning"
+        ))
     
     async def _handle_rate_limit_exceeded(
         self,
@@ -312,7 +389,7 @@ class RateLimitExtension(BaseExtension):
         retry_after = reset_time - int(time.time())
         
         # Check if this is an API request
-        if self._is_api_request(request):
+        if RequestFacts.of(request).is_api:
             error_response = rate_limit_config.get(
                 "error_json",
                 {
@@ -343,19 +420,6 @@ class RateLimitExtension(BaseExtension):
         
         return response
     
-    def _is_api_request(self, request: Request) -> bool:
-        """Determine if request expects JSON response."""
-        # Check Accept header
-        accept_header = request.headers.get("accept", "").lower()
-        if "application/json" in accept_header:
-            return True
-        
-        # Check if path starts with /api
-        if request.url.path.startswith("/api"):
-            return True
-        
-        return False
-    
     def _path_matches_pattern(self, path: str, pattern: str) -> bool:
         """Check if path matches a pattern (simple wildcard matching)."""
         if pattern == path:
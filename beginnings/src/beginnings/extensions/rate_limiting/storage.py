@@ -2,12 +2,53 @@
 Storage backends for rate limiting.
 
 This module provides different storage backends for rate limiting data
-including in-memory and Redis/Valkey distributed storage.
+including in-memory, host-wide shared memory, and Redis/Valkey distributed
+storage.
 """
 
+import hashlib
+import mmap
+import os
+import struct
+import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Any
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+from beginnings.extensions.redis_connections import acquire_redis_connection, release_redis_connection
+from beginnings.extensions.shared_memory import (
+    default_shared_memory_path,
+    lock_backoff,
+    open_shared_memory_file,
+    try_lock,
+)
+
+# Storage of the loaded RateLimitExtension, reused by the blocklist for bans
+_extension_storage: "RateLimitStorage | None" = None
+
+
+def set_extension_storage(storage: "RateLimitStorage | None") -> None:
+    """
+    Set the storage backend the loaded RateLimitExtension uses.
+
+    Called by ``RateLimitExtension`` on initialization.
+
+    Args:
+        storage: Storage backend, or None to clear it
+    """
+    global _extension_storage
+    _extension_storage = storage
+
+
+def get_extension_storage() -> "RateLimitStorage | None":
+    """
+    Get the storage backend the loaded RateLimitExtension uses.
+
+    Returns:
+        Storage backend, or None if no RateLimitExtension is loaded
+    """
+    return _extension_storage
 
 
 class RateLimitStorage(ABC):
@@ -54,6 +95,17 @@ class RateLimitStorage(ABC):
     async def set_token_bucket(self, key: str, data: dict[str, Any]) -> None:
         """Set token bucket state."""
         pass
+    
+    @asynccontextmanager
+    async def atomic(self, key: str) -> AsyncIterator[None]:
+        """
+        Make a read-modify-write sequence on ``key`` atomic.
+        
+        Algorithms wrap their get/update calls in this context so backends
+        shared between processes can serialize them. The default is a no-op,
+        which is sufficient for single-process storage.
+        """
+        yield
 
 
 class MemoryRateLimitStorage(RateLimitStorage):
@@ -123,6 +175,387 @@ class MemoryRateLimitStorage(RateLimitStorage):
         self._token_buckets[key] = data.copy()
 
 
+class SharedMemoryRateLimitStorage(RateLimitStorage):
+    """
+    Shared-memory rate limit storage for multi-worker single-host deployments.
+    
+    All state lives in an mmap'd fixed-size hash table backed by a file
+    (on ``/dev/shm`` when available), so every worker process on the host
+    enforces the same limits without Redis. The table is split into buckets
+    of a few slots each; a key always hashes to one bucket and each bucket is
+    guarded by its own ``fcntl`` byte-range lock, so operations on unrelated
+    keys never contend. A contended lock is retried without blocking the
+    event loop. The backing file must belong to the current user with mode
+    600; the default path is private to the application and user.
+    
+    Counters and token buckets share the scalar region. Sliding windows are
+    stored as ``(timestamp, count)`` pairs, which stays compact because the
+    sliding window algorithm rounds timestamps to its precision. When a
+    window runs out of pairs the two oldest are merged into the newer
+    timestamp, which can only over-count and never over-admit.
+    """
+    
+    _MAGIC = b"BGRLSHM1"
+    _VERSION = 1
+    _HEADER = struct.Struct("<8sIII")  # magic, version, buckets, window_capacity
+    _HEADER_SIZE = 64
+    
+    _SCALAR_SLOTS_PER_BUCKET = 8
+    _SCALAR_SLOT = struct.Struct("<B7x16s3d")  # kind, digest, expires_at, value_a, value_b
+    _WINDOW_SLOTS_PER_BUCKET = 4
+    _WINDOW_SLOT = struct.Struct("<B3xI16sd")  # used, entry_count, digest, expires_at
+    _WINDOW_ENTRY = struct.Struct("<2d")  # timestamp, count
+    
+    _KIND_EMPTY = 0
+    _KIND_COUNTER = 1
+    _KIND_BUCKET = 2
+    
+    def __init__(
+        self,
+        path: str | None = None,
+        buckets: int = 4096,
+        window_capacity: int = 64,
+        entry_ttl: int = 3600
+    ) -> None:
+        """
+        Initialize shared memory storage.
+        
+        Args:
+            path: Backing file shared by all worker processes (defaults to one
+                per application and user)
+            buckets: Number of hash buckets (each holds several keys)
+            window_capacity: Distinct timestamps kept per sliding window
+            entry_ttl: Seconds before idle sliding window and bucket entries expire
+        """
+        self.path = path or default_shared_memory_path("rate_limit")
+        self.buckets = buckets
+        self.window_capacity = window_capacity
+        self.entry_ttl = entry_ttl
+        
+        self._scalar_offset = self._HEADER_SIZE
+        self._scalar_bucket_size = self._SCALAR_SLOTS_PER_BUCKET * self._SCALAR_SLOT.size
+        self._window_slot_size = self._WINDOW_SLOT.size + window_capacity * self._WINDOW_ENTRY.size
+        self._window_bucket_size = self._WINDOW_SLOTS_PER_BUCKET * self._window_slot_size
+        self._window_offset = self._scalar_offset + buckets * self._scalar_bucket_size
+        self._size = self._window_offset + buckets * self._window_bucket_size
+        
+        self._fd: int | None = None
+        self._mmap: mmap.mmap | None = None
+        self._fcntl: Any = None
+        
+        # fcntl locks are per-process, so threads within a process are
+        # serialized separately; the depth map makes atomic() reentrant.
+        self._thread_lock = threading.RLock()
+        self._lock_depth: dict[int, int] = {}
+    
+    def _ensure_open(self) -> mmap.mmap:
+        """Open and map the backing file (lazy initialization)."""
+        if self._mmap is None:
+            try:
+                import fcntl
+            except ImportError:
+                raise ImportError("fcntl is required for shared memory storage backend (POSIX only)")
+            self._fcntl = fcntl
+            
+            fd = open_shared_memory_file(self.path)
+            try:
+                # Byte 0 serializes table initialization between workers
+                fcntl.lockf(fd, fcntl.LOCK_EX, 1, 0)
+                try:
+                    self._initialize_table(fd)
+                finally:
+                    fcntl.lockf(fd, fcntl.LOCK_UN, 1, 0)
+                self._mmap = mmap.mmap(fd, self._size)
+            except BaseException:
+                os.close(fd)
+                raise
+            self._fd = fd
+        return self._mmap
+    
+    def _initialize_table(self, fd: int) -> None:
+        """Create the table header or verify it matches this configuration."""
+        header = os.pread(fd, self._HEADER.size, 0)
+        if len(header) == self._HEADER.size and header.startswith(self._MAGIC):
+            _, version, buckets, window_capacity = self._HEADER.unpack(header)
+            if (version, buckets, window_capacity) != (self._VERSION, self.buckets, self.window_capacity):
+                raise ValueError(
+                    f"Shared memory rate limit table at '{self.path}' was created with "
+                    f"buckets={buckets}, window_capacity={window_capacity}; "
+                    "all workers must use the same configuration"
+                )
+            return
+        
+        os.ftruncate(fd, 0)
+        os.ftruncate(fd, self._size)
+        os.pwrite(fd, self._HEADER.pack(self._MAGIC, self._VERSION, self.buckets, self.window_capacity), 0)
+    
+    async def close(self) -> None:
+        """Unmap the shared table and close the backing file."""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+    
+    def _locate(self, key: str) -> tuple[bytes, int]:
+        """Hash key into its digest and bucket index."""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        return digest, int.from_bytes(digest[:8], "little") % self.buckets
+    
+    async def _acquire(self, bucket: int) -> None:
+        """Acquire the lock for a bucket (reentrant within a thread)."""
+        attempt = 0
+        while True:
+            self._thread_lock.acquire()
+            depth = self._lock_depth.get(bucket, 0)
+            # Offset 0 is the init lock, bucket locks start at byte 1
+            if depth or try_lock(self._fcntl, self._fd, bucket + 1):
+                self._lock_depth[bucket] = depth + 1
+                return
+            # Held by another process: wait without holding the thread lock
+            self._thread_lock.release()
+            await lock_backoff(attempt)
+            attempt += 1
+    
+    def _release(self, bucket: int) -> None:
+        """Release the lock for a bucket."""
+        depth = self._lock_depth[bucket] - 1
+        if depth == 0:
+            del self._lock_depth[bucket]
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, 1, bucket + 1)
+        else:
+            self._lock_depth[bucket] = depth
+        self._thread_lock.release()
+    
+    @asynccontextmanager
+    async def atomic(self, key: str) -> AsyncIterator[None]:
+        """Hold the bucket lock for ``key`` across several operations."""
+        self._ensure_open()
+        _, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            yield
+        finally:
+            self._release(bucket)
+    
+    # Scalar region (counters and token buckets)
+    
+    def _find_scalar(self, table: mmap.mmap, bucket: int, kind: int, digest: bytes, now: float) -> tuple[int, tuple[Any, ...] | None]:
+        """
+        Find the slot for a key, or the slot a new entry should take.
+        
+        Returns:
+            Tuple of (slot offset, live slot values or None if not present)
+        """
+        base = self._scalar_offset + bucket * self._scalar_bucket_size
+        free_offset = None
+        victim_offset = base
+        victim_expiry = float("inf")
+        
+        for index in range(self._SCALAR_SLOTS_PER_BUCKET):
+            offset = base + index * self._SCALAR_SLOT.size
+            values = self._SCALAR_SLOT.unpack_from(table, offset)
+            slot_kind, slot_digest, expires_at = values[0], values[1], values[2]
+            
+            if slot_kind == self._KIND_EMPTY or expires_at < now:
+                if slot_kind == kind and slot_digest == digest:
+                    return offset, None
+                if free_offset is None:
+                    free_offset = offset
+                continue
+            
+            if slot_kind == kind and slot_digest == digest:
+                return offset, values
+            
+            if expires_at < victim_expiry:
+                victim_offset, victim_expiry = offset, expires_at
+        
+        # Bucket full: evict the entry closest to expiring
+        return (free_offset if free_offset is not None else victim_offset), None
+    
+    async def _read_scalar(self, key: str, kind: int) -> tuple[float, float] | None:
+        """Read the two values stored for a scalar entry."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            _, values = self._find_scalar(table, bucket, kind, digest, time.time())
+        finally:
+            self._release(bucket)
+        return None if values is None else (values[3], values[4])
+    
+    async def get_counter(self, key: str) -> tuple[int, float]:
+        """Get current count and window start time for key."""
+        values = await self._read_scalar(key, self._KIND_COUNTER)
+        if values is None:
+            return 0, time.time()
+        return int(values[0]), values[1]
+    
+    async def increment_counter(self, key: str, window_seconds: int) -> tuple[int, float]:
+        """Increment counter and return new count with window start."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            current_time = time.time()
+            offset, values = self._find_scalar(table, bucket, self._KIND_COUNTER, digest, current_time)
+            count, window_start = (0, current_time) if values is None else (int(values[3]), values[4])
+            
+            # Reset if window has expired
+            if current_time - window_start >= window_seconds:
+                count = 0
+                window_start = current_time
+            
+            count += 1
+            self._SCALAR_SLOT.pack_into(
+                table, offset, self._KIND_COUNTER, digest,
+                window_start + window_seconds * 2, float(count), window_start
+            )
+        finally:
+            self._release(bucket)
+        return count, window_start
+    
+    async def reset_counter(self, key: str) -> None:
+        """Reset counter for key."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            offset, values = self._find_scalar(table, bucket, self._KIND_COUNTER, digest, time.time())
+            if values is not None:
+                self._SCALAR_SLOT.pack_into(table, offset, self._KIND_EMPTY, b"", 0.0, 0.0, 0.0)
+        finally:
+            self._release(bucket)
+    
+    async def get_token_bucket(self, key: str) -> dict[str, Any] | None:
+        """Get token bucket state."""
+        values = await self._read_scalar(key, self._KIND_BUCKET)
+        if values is None:
+            return None
+        return {"tokens": values[0], "last_refill": values[1]}
+    
+    async def set_token_bucket(self, key: str, data: dict[str, Any]) -> None:
+        """Set token bucket state."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            current_time = time.time()
+            offset, _ = self._find_scalar(table, bucket, self._KIND_BUCKET, digest, current_time)
+            self._SCALAR_SLOT.pack_into(
+                table, offset, self._KIND_BUCKET, digest,
+                current_time + self.entry_ttl, float(data["tokens"]), float(data["last_refill"])
+            )
+        finally:
+            self._release(bucket)
+    
+    # Window region (sliding windows)
+    
+    def _find_window(self, table: mmap.mmap, bucket: int, digest: bytes, now: float, create: bool) -> int | None:
+        """Find the slot offset for a sliding window, optionally claiming one."""
+        base = self._window_offset + bucket * self._window_bucket_size
+        free_offset = None
+        victim_offset = base
+        victim_expiry = float("inf")
+        
+        for index in range(self._WINDOW_SLOTS_PER_BUCKET):
+            offset = base + index * self._window_slot_size
+            used, _, slot_digest, expires_at = self._WINDOW_SLOT.unpack_from(table, offset)
+            
+            if not used or expires_at < now:
+                if free_offset is None:
+                    free_offset = offset
+                continue
+            
+            if slot_digest == digest:
+                return offset
+            
+            if expires_at < victim_expiry:
+                victim_offset, victim_expiry = offset, expires_at
+        
+        if not create:
+            return None
+        
+        offset = free_offset if free_offset is not None else victim_offset
+        self._WINDOW_SLOT.pack_into(table, offset, 1, 0, digest, now + self.entry_ttl)
+        return offset
+    
+    def _read_window_entries(self, table: mmap.mmap, offset: int) -> list[list[float]]:
+        """Read the (timestamp, count) pairs stored in a window slot."""
+        _, entry_count, _, _ = self._WINDOW_SLOT.unpack_from(table, offset)
+        entries_offset = offset + self._WINDOW_SLOT.size
+        return [
+            list(self._WINDOW_ENTRY.unpack_from(table, entries_offset + index * self._WINDOW_ENTRY.size))
+            for index in range(entry_count)
+        ]
+    
+    def _write_window_entries(self, table: mmap.mmap, offset: int, digest: bytes, entries: list[list[float]]) -> None:
+        """Write (timestamp, count) pairs back to a window slot."""
+        if not entries:
+            self._WINDOW_SLOT.pack_into(table, offset, 0, 0, b"", 0.0)
+            return
+        
+        entries_offset = offset + self._WINDOW_SLOT.size
+        for index, (timestamp, count) in enumerate(entries):
+            self._WINDOW_ENTRY.pack_into(table, entries_offset + index * self._WINDOW_ENTRY.size, timestamp, count)
+        self._WINDOW_SLOT.pack_into(table, offset, 1, len(entries), digest, entries[-1][0] + self.entry_ttl)
+    
+    async def get_sliding_window_entries(self, key: str) -> list[float]:
+        """Get list of timestamps for sliding window."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            offset = self._find_window(table, bucket, digest, time.time(), create=False)
+            entries = [] if offset is None else self._read_window_entries(table, offset)
+        finally:
+            self._release(bucket)
+        
+        timestamps: list[float] = []
+        for timestamp, count in entries:
+            timestamps.extend([timestamp] * int(count))
+        return timestamps
+    
+    async def add_sliding_window_entry(self, key: str, timestamp: float) -> None:
+        """Add timestamp to sliding window."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            offset = self._find_window(table, bucket, digest, time.time(), create=True)
+            entries = self._read_window_entries(table, offset)
+            
+            for entry in entries:
+                if entry[0] == timestamp:
+                    entry[1] += 1
+                    break
+            else:
+                entries.append([timestamp, 1.0])
+                entries.sort()
+                if len(entries) > self.window_capacity:
+                    # Fold the oldest pair into the next one (conservative)
+                    oldest = entries.pop(0)
+                    entries[0][1] += oldest[1]
+            
+            self._write_window_entries(table, offset, digest, entries)
+        finally:
+            self._release(bucket)
+    
+    async def cleanup_sliding_window_entries(self, key: str, cutoff_time: float) -> None:
+        """Remove timestamps older than cutoff_time."""
+        table = self._ensure_open()
+        digest, bucket = self._locate(key)
+        await self._acquire(bucket)
+        try:
+            offset = self._find_window(table, bucket, digest, time.time(), create=False)
+            if offset is not None:
+                entries = [entry for entry in self._read_window_entries(table, offset) if entry[0] >= cutoff_time]
+                self._write_window_entries(table, offset, digest, entries)
+        finally:
+            self._release(bucket)
+
+
 class RedisRateLimitStorage(RateLimitStorage):
     """Redis-based rate limit storage for distributed applications."""
     
@@ -142,28 +575,17 @@ class RedisRateLimitStorage(RateLimitStorage):
         self._pool = None
     
     async def _get_redis(self):
-        """Get Redis connection pool (lazy initialization)."""
+        """Get Redis client on the shared connection pool (lazy initialization)."""
         if self._redis is None:
-            try:
-                import redis.asyncio as redis
-                # Create connection pool for better performance
-                self._pool = redis.ConnectionPool.from_url(
-                    self.redis_url,
-                    max_connections=self.max_connections,
-                    retry_on_timeout=True,
-                    health_check_interval=30
-                )
-                self._redis = redis.Redis(connection_pool=self._pool)
-            except ImportError:
-                raise ImportError("redis package is required for Redis storage backend")
+            self._redis, self._pool = acquire_redis_connection(self.redis_url, self.max_connections)
         return self._redis
     
     async def close(self) -> None:
-        """Close Redis connection pool."""
-        if self._pool:
-            await self._pool.disconnect()
-        if self._redis:
-            await self._redis.close()
+        """Release the shared Redis connection pool."""
+        if self._redis is not None:
+            self._redis = None
+            self._pool = None
+            await release_redis_connection(self.redis_url)
     
     def _make_key(self, key: str) -> str:
         """Create Redis key with prefix."""
@@ -319,6 +741,13 @@ def create_storage(config: dict[str, Any]) -> RateLimitStorage:
     
     if storage_type == "memory":
         return MemoryRateLimitStorage()
+    elif storage_type == "shared_memory":
+        return SharedMemoryRateLimitStorage(
+            path=config.get("path"),
+            buckets=config.get("buckets", 4096),
+            window_capacity=config.get("window_capacity", 64),
+            entry_ttl=config.get("entry_ttl", 3600)
+        )
     elif storage_type == "redis":
         redis_url = config.get("redis_url", "redis://localhost:6379")
         key_prefix = config.get("key_prefix", "rate_limit:")
@@ -9,8 +9,11 @@ from __future__ import annotations
 
 import ipaddress
 import pathlib
+from collections import OrderedDict
 from typing import Any
 
+from beginnings.extensions.rate_limiting.cidr import CIDRTrie
+
 
 class TrustedProxyManager:
     """
@@ -37,6 +40,16 @@ class TrustedProxyManager:
         
         # Load trusted proxies from configuration
         self._load_trusted_proxies(config)
+        
+        # Compiled prefix trie so lookups don't scan every network
+        self._trie = CIDRTrie(self.trusted_networks)
+        
+        # Managers with equal policies resolve every request to the same IP
+        self.policy = (self.enabled, frozenset(self.trusted_networks), self.strict_validation)
+        
+        # LRU of resolved (remote_addr, forwarded_for, real_ip) chains
+        self.cache_size = config.get("cache_size", 1024)
+        self._resolved_cache: OrderedDict[tuple[str, str | None, str | None], str] = OrderedDict()
     
     def _load_trusted_proxies(self, config: dict[str, Any]) -> None:
         """Load trusted proxy networks from configuration."""
@@ -105,18 +118,8 @@ class TrustedProxyManager:
         if not self.enabled:
             return False
         
-        try:
-            ip = ipaddress.ip_address(ip_address)
-            
-            for network in self.trusted_networks:
-                if ip in network:
-                    return True
-            
-            return False
-        
-        except ValueError:
-            # Invalid IP address
-            return False
+        # Invalid IP addresses never match
+        return ip_address in self._trie
     
     def extract_real_ip(self, remote_addr: str, forwarded_for: str | None = None, real_ip: str | None = None) -> str:
         """
@@ -130,6 +133,23 @@ class TrustedProxyManager:
         Returns:
             Validated real IP address
         """
+        cache_key = (remote_addr, forwarded_for, real_ip)
+        cached_ip = self._resolved_cache.get(cache_key)
+        if cached_ip is not None:
+            self._resolved_cache.move_to_end(cache_key)
+            return cached_ip
+        
+        resolved_ip = self._resolve_real_ip(remote_addr, forwarded_for, real_ip)
+        
+        if self.cache_size > 0:
+            self._resolved_cache[cache_key] = resolved_ip
+            if len(self._resolved_cache) > self.cache_size:
+                self._resolved_cache.popitem(last=False)
+        
+        return resolved_ip
+    
+    def _resolve_real_ip(self, remote_addr: str, forwarded_for: str | None, real_ip: str | None) -> str:
+        """Resolve the real client IP without consulting the cache."""
         if not self.enabled or not self.is_trusted_proxy(remote_addr):
             # No trusted proxy or proxy not trusted, use remote address
             return self._normalize_ip(remote_addr)
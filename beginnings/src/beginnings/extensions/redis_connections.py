@@ -0,0 +1,87 @@
+"""
+Shared Redis connections for Beginnings extensions.
+
+This module keeps one connection pool per Redis/Valkey URL so storage
+backends in different extensions (rate limiting, sessions) share
+connections instead of each opening their own pool.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+# redis_url -> [client, pool, reference count]
+_connections: dict[str, list[Any]] = {}
+
+
+def acquire_redis_connection(redis_url: str, max_connections: int = 20) -> tuple[Any, Any]:
+    """
+    Get the shared client for a Redis URL, creating its pool on first use.
+
+    The first caller's ``max_connections`` sizes the pool; later callers
+    share it as is.
+
+    Args:
+        redis_url: Redis connection URL
+        max_connections: Maximum connections in pool
+
+    Returns:
+        Tuple of (client, connection pool)
+
+    Raises:
+        ImportError: If the redis package is not installed
+    """
+    connection = _connections.get(redis_url)
+    if connection is None:
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ImportError("redis package is required for Redis storage backends")
+
+        pool = redis.ConnectionPool.from_url(
+            redis_url,
+            max_connections=max_connections,
+            retry_on_timeout=True,
+            health_check_interval=30
+        )
+        connection = _connections[redis_url] = [redis.Redis(connection_pool=pool), pool, 0]
+
+    connection[2] += 1
+    return connection[0], connection[1]
+
+
+def register_redis_connection(redis_url: str, client: Any, pool: Any = None) -> None:
+    """
+    Register an existing client as the shared connection for a URL.
+
+    Used to point storage backends at a pre-built client, such as the
+    in-process stand-in in ``beginnings.testing.redis_stand_in``.
+
+    Args:
+        redis_url: Redis connection URL
+        client: Client to share
+        pool: Connection pool backing the client, if any
+    """
+    _connections[redis_url] = [client, pool, 0]
+
+
+async def release_redis_connection(redis_url: str) -> None:
+    """
+    Release one reference to a shared connection, closing it after the last.
+
+    Args:
+        redis_url: Redis connection URL
+    """
+    connection = _connections.get(redis_url)
+    if connection is None:
+        return
+
+    connection[2] -= 1
+    if connection[2] > 0:
+        return
+
+    del _connections[redis_url]
+    client, pool, _ = connection
+    if pool is not None:
+        await pool.disconnect()
+    await client.close()
@@ -0,0 +1,166 @@
+"""
+Request-scoped facts shared by Beginnings extensions.
+
+Several extensions look at the same parts of a request: the client IP,
+whether the client wants JSON, the bearer token, cookies and the path.
+``RequestFacts`` derives each of these on first use and stores the result
+on the ASGI scope, so every extension and every ``Request`` object built
+for the same scope reads the same parsed values.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Protocol
+
+# ASGI scope key holding the request's facts
+SCOPE_KEY = "beginnings.request_facts"
+
+_UNSET: Any = object()
+_REPEATED_SLASHES_RE = re.compile(r"/{2,}")
+
+
+class ClientIPResolver(Protocol):
+    """
+    Protocol for resolving the client IP behind trusted proxies.
+
+    Resolvers with equal ``policy`` values must resolve every request to
+    the same IP, so they can share one resolution.
+    """
+
+    policy: Any
+
+    def extract_real_ip(
+        self,
+        remote_addr: str,
+        forwarded_for: str | None = None,
+        real_ip: str | None = None
+    ) -> str:
+        """Resolve the client IP from the connection and forwarding headers."""
+        ...
+
+
+class RequestFacts:
+    """
+    Lazily parsed facts about one request.
+
+    Get the instance for a request with ``RequestFacts.of(request)``.
+    Requests without a dict ASGI scope, such as test doubles, get a fresh
+    unshared instance on every call.
+    """
+
+    __slots__ = (
+        "_request", "_path", "_is_api", "_bearer_token", "_cookies", "_client_ips", "client_ip", "rate_limited"
+    )
+
+    def __init__(self, request: Any) -> None:
+        """
+        Initialize request facts.
+
+        Args:
+            request: Request the facts describe
+        """
+        self._request = request
+        self._path = _UNSET
+        self._is_api = _UNSET
+        self._bearer_token = _UNSET
+        self._cookies = _UNSET
+        # Resolver policy -> client IP resolved under it
+        self._client_ips: dict[Any, str] = {}
+        # First IP resolved through trusted proxies, for layers without a resolver
+        self.client_ip: str | None = None
+        # Set when RateLimitExtension rejects the request
+        self.rate_limited = False
+
+    @classmethod
+    def of(cls, request: Any) -> RequestFacts:
+        """
+        Get the facts of a request, creating them on first use.
+
+        Args:
+            request: The request object
+
+        Returns:
+            Facts shared by everything handling the request
+        """
+        scope = getattr(request, "scope", None)
+        if type(scope) is not dict:
+            return cls(request)
+
+        facts = scope.get(SCOPE_KEY)
+        if facts is None:
+            facts = scope[SCOPE_KEY] = cls(request)
+        return facts
+
+    @property
+    def path(self) -> str:
+        """Request path with repeated slashes collapsed."""
+        if self._path is _UNSET:
+            scope = getattr(self._request, "scope", None)
+            path = scope["path"] if type(scope) is dict else self._request.url.path
+            if "//" in path:
+                path = _REPEATED_SLASHES_RE.sub("/", path)
+            self._path = path
+        return self._path
+
+    @property
+    def is_api(self) -> bool:
+        """Whether the client expects a JSON rather than an HTML response."""
+        if self._is_api is _UNSET:
+            headers = self._request.headers
+            self._is_api = (
+                "application/json" in headers.get("accept", "").lower()
+                or self.path.startswith("/api")
+                or "application/json" in headers.get("content-type", "").lower()
+            )
+        return self._is_api
+
+    @property
+    def bearer_token(self) -> str | None:
+        """Token from a ``Bearer`` Authorization header, if any."""
+        if self._bearer_token is _UNSET:
+            auth_header = self._request.headers.get("authorization")
+            token = None
+            if auth_header and auth_header.startswith("Bearer "):
+                token = auth_header[7:] or None
+            self._bearer_token = token
+        return self._bearer_token
+
+    @property
+    def cookies(self) -> dict[str, str]:
+        """Cookies sent with the request."""
+        if self._cookies is _UNSET:
+            self._cookies = self._request.cookies
+        return self._cookies
+
+    @property
+    def remote_addr(self) -> str:
+        """Address of the direct peer, usually the nearest proxy."""
+        client = getattr(self._request, "client", None)
+        return client.host if client else "unknown"
+
+    def resolve_client_ip(self, resolver: ClientIPResolver) -> str:
+        """
+        Get the client IP, resolving it through trusted proxies on first use.
+
+        The IP is resolved once per resolver policy: layers whose trusted
+        proxy configurations match share it, and a layer with a different
+        configuration gets its own resolution rather than another's.
+
+        Args:
+            resolver: Trusted proxy manager of the calling layer
+
+        Returns:
+            Client IP address
+        """
+        client_ip = self._client_ips.get(resolver.policy)
+        if client_ip is None:
+            headers = self._request.headers
+            client_ip = self._client_ips[resolver.policy] = resolver.extract_real_ip(
+                remote_addr=self.remote_addr,
+                forwarded_for=headers.get("x-forwarded-for"),
+                real_ip=headers.get("x-real-ip")
+            )
+            if self.client_ip is None:
+                self.client_ip = client_ip
+        return client_ip
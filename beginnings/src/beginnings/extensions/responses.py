@@ -0,0 +1,55 @@
+"""
+Pre-serialized responses for Beginnings extensions.
+
+This module provides responses whose body and headers are encoded once
+up front, for rejection paths that have to stay cheap at flood rates.
+"""
+
+from __future__ import annotations
+
+from fastapi import Response
+
+
+def encode_headers(headers: dict[str, str]) -> list[tuple[bytes, bytes]]:
+    """
+    Encode headers into raw ASGI header pairs.
+
+    Args:
+        headers: Header names and values
+
+    Returns:
+        List of lowercase (name, value) byte pairs
+    """
+    return [
+        (name.lower().encode("latin-1"), value.encode("latin-1"))
+        for name, value in headers.items()
+    ]
+
+
+class PreparedResponse(Response):
+    """
+    Response built from pre-serialized body bytes and raw header pairs.
+
+    Skips content rendering and header encoding; only the content length is
+    added per response. The header list is copied so later middleware can
+    still modify ``response.headers`` safely.
+    """
+
+    def __init__(
+        self,
+        status_code: int,
+        body: bytes,
+        raw_headers: list[tuple[bytes, bytes]]
+    ) -> None:
+        """
+        Initialize prepared response.
+
+        Args:
+            status_code: HTTP status code
+            body: Pre-serialized response body
+            raw_headers: Pre-encoded headers (without content-length)
+        """
+        self.status_code = status_code
+        self.background = None
+        self.body = body
+        self.raw_headers = [*raw_headers, (b"content-length", str(len(body)).encode("latin-1"))]
@@ -6,6 +6,8 @@ and origin validation capabilities.
 """
 
 import fnmatch
+import re
+from collections import OrderedDict
 from typing import Any
 
 from fastapi import Request, Response
@@ -43,6 +45,20 @@ class CORSManager:
         self.expose_headers = config.get("expose_headers", [])
         self.allow_credentials = config.get("allow_credentials", False)
         self.max_age = config.get("max_age", 86400)  # 24 hours
+        
+        # Origins compiled into an exact-match set and one wildcard regex
+        self._allow_any_origin = "*" in self.allow_origins
+        self._exact_origins = frozenset(self.allow_origins)
+        wildcard_patterns = [
+            fnmatch.translate(origin) for origin in self.allow_origins
+            if any(char in origin for char in "*?[")
+        ]
+        self._origin_pattern = re.compile("|".join(wildcard_patterns)) if wildcard_patterns else None
+        
+        # LRU of serialized preflight headers keyed by (origin, method, headers)
+        self.preflight_cache_size = config.get("preflight_cache_size", 1024)
+        self._preflight_cache: OrderedDict[tuple[str, str, str], list[tuple[bytes, bytes]]] = OrderedDict()
+        self._allow_headers_lower = {header.lower() for header in self.allow_headers}
     
     def is_cors_request(self, request: Request) -> bool:
         """
@@ -82,19 +98,11 @@ class CORSManager:
         Returns:
             True if origin is allowed
         """
-        if "*" in self.allow_origins:
+        if self._allow_any_origin or origin in self._exact_origins:
             return True
         
-        for allowed_origin in self.allow_origins:
-            # Support wildcard patterns like https://*.example.com
-            if fnmatch.fnmatch(origin, allowed_origin):
-                return True
-            
-            # Exact match
-            if origin == allowed_origin:
-                return True
-        
-        return False
+        # Wildcard patterns like https://*.example.com
+        return self._origin_pattern is not None and self._origin_pattern.match(origin) is not None
     
     def create_preflight_response(
         self,
@@ -114,31 +122,69 @@ class CORSManager:
             Preflight response with appropriate CORS headers
         """
         response = Response(status_code=200)
+        response.raw_headers.extend(self._build_preflight_headers(origin, requested_headers or []))
+        return response
+    
+    def get_preflight_response(
+        self,
+        origin: str,
+        requested_method: str,
+        requested_headers: str = ""
+    ) -> Response:
+        """
+        Get preflight response for CORS request from the preflight cache.
         
-        # Add basic CORS headers
-        response.headers["Access-Control-Allow-Origin"] = origin
-        response.headers["Access-Control-Allow-Methods"] = ", ".join(self.allow_methods)
+        Headers are serialized once per distinct (origin, method, headers)
+        preflight and kept in a bounded LRU, so repeated preflights from the
+        same client only copy a header list.
+        
+        Args:
+            origin: Request origin
+            requested_method: Requested method from access-control-request-method
+            requested_headers: Raw access-control-request-headers value
+            
+        Returns:
+            Preflight response with appropriate CORS headers
+        """
+        cache_key = (origin, requested_method, requested_headers)
+        raw_headers = self._preflight_cache.get(cache_key)
+        if raw_headers is not None:
+            self._preflight_cache.move_to_end(cache_key)
+        else:
+            parsed_headers = [h.strip() for h in requested_headers.split(",")] if requested_headers else []
+            raw_headers = self._build_preflight_headers(origin, parsed_headers)
+            if self.preflight_cache_size > 0:
+                self._preflight_cache[cache_key] = raw_headers
+                if len(self._preflight_cache) > self.preflight_cache_size:
+                    self._preflight_cache.popitem(last=False)
         
+        response = Response(status_code=200)
+        response.raw_headers.extend(raw_headers)
+        return response
+    
+    def _build_preflight_headers(self, origin: str, requested_headers: list[str]) -> list[tuple[bytes, bytes]]:
+        """Serialize the CORS headers of a preflight response."""
         # Handle allowed headers
         allowed_headers = self.allow_headers.copy()
-        if requested_headers:
-            # Add requested headers that are in our allow list
-            for header in requested_headers:
-                if header.lower() not in [h.lower() for h in allowed_headers]:
-                    # Only add if it's a simple header or explicitly allowed
-                    if self._is_simple_header(header):
-                        allowed_headers.append(header)
+        allowed_lower = set(self._allow_headers_lower)
+        for header in requested_headers:
+            # Only add requested headers that are simple headers
+            if header.lower() not in allowed_lower and self._is_simple_header(header):
+                allowed_headers.append(header)
+                allowed_lower.add(header.lower())
         
-        response.headers["Access-Control-Allow-Headers"] = ", ".join(allowed_headers)
+        headers = [
+            ("access-control-allow-origin", origin),
+            ("access-control-allow-methods", ", ".join(self.allow_methods)),
+            ("access-control-allow-headers", ", ".join(allowed_headers)),
+            # Max age for preflight caching
+            ("access-control-max-age", str(self.max_age))
+        ]
         
-        # Add max age for preflight caching
-        response.headers["Access-Control-Max-Age"] = str(self.max_age)
-        
-        # Add credentials header if enabled
         if self.allow_credentials:
-            response.headers["Access-Control-Allow-Credentials"] = "true"
+            headers.append(("access-control-allow-credentials", "true"))
         
-        return response
+        return [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
     
     def add_cors_headers_to_response(self, response: Response, origin: str) -> None:
         """
@@ -5,10 +5,58 @@ This module provides CSP directive generation, nonce generation,
 and template integration capabilities.
 """
 
-import base64
 import secrets
 from typing import Any
 
+# Placeholders substituted for nonces while a header template is compiled
+_SCRIPT_SLOT = "\x00script\x00"
+_STYLE_SLOT = "\x00style\x00"
+
+
+class CSPHeaderTemplate:
+    """
+    CSP header compiled once for a route.
+    
+    The header name and value are pre-encoded; when nonces are enabled the
+    value keeps a slot for each nonce source, so rendering a response's
+    header is a single bytes substitution. A nonce that the response never
+    used leaves its slot empty.
+    """
+    
+    __slots__ = ("name", "value", "has_nonces", "_without_nonces")
+    
+    def __init__(self, name: bytes, value: bytes, has_nonces: bool) -> None:
+        """
+        Initialize CSP header template.
+        
+        Args:
+            name: Lowercase header name
+            value: Header value, with ``%(script)s``/``%(style)s`` nonce source slots
+            has_nonces: Whether the value contains nonce slots
+        """
+        self.name = name
+        self.value = value
+        self.has_nonces = has_nonces
+        self._without_nonces = value % {b"script": b"", b"style": b""} if has_nonces else value
+    
+    def render(self, script_nonce: str | None = None, style_nonce: str | None = None) -> tuple[bytes, bytes]:
+        """
+        Render the raw header pair for one response.
+        
+        Args:
+            script_nonce: Nonce for script-src directive, if used
+            style_nonce: Nonce for style-src directive, if used
+            
+        Returns:
+            Tuple of (header_name, header_value) bytes
+        """
+        if not (script_nonce or style_nonce):
+            return self.name, self._without_nonces
+        return self.name, self.value % {
+            b"script": b" 'nonce-%s'" % script_nonce.encode("ascii") if script_nonce else b"",
+            b"style": b" 'nonce-%s'" % style_nonce.encode("ascii") if style_nonce else b""
+        }
+
 
 class CSPManager:
     """
@@ -38,10 +86,6 @@ class CSPManager:
         self.style_nonce = nonce_config.get("style_nonce", True)
         self.nonce_length = max(16, nonce_config.get("nonce_length", 16))  # Enforce minimum 16 bytes
         
-        # Nonce tracking for reuse prevention
-        self._nonce_cache: set[str] = set()
-        self._cache_max_size = 10000  # Prevent memory bloat
-        
         # Valid CSP directives for validation
         self.valid_directives = {
             "default_src", "script_src", "style_src", "img_src", "font_src",
@@ -52,32 +96,36 @@ class CSPManager:
     
     def generate_nonce(self) -> str:
         """
-        Generate a cryptographically secure nonce for CSP with reuse prevention.
+        Generate a cryptographically secure nonce for CSP.
+        
+        Nonces carry at least 128 bits of randomness, so a repeat is not
+        a practical concern and no record of issued nonces is kept.
         
         Returns:
             Base64-encoded nonce string
         """
-        max_attempts = 10
+        return secrets.token_urlsafe(self.nonce_length)
+    
+    def get_nonce(self, request: Any, directive: str = "script") -> str:
+        """
+        Get the request's nonce for a directive, generating it on first use.
+        
+        The nonce is stored in request state, and only nonces that were
+        requested this way are added to the response's CSP header.
         
-        for _ in range(max_attempts):
-            # Generate cryptographically secure nonce
-            nonce_bytes = secrets.token_bytes(self.nonce_length)
-            nonce = base64.urlsafe_b64encode(nonce_bytes).decode('ascii').rstrip('=')
+        Args:
+            request: The request object
+            directive: "script" or "style"
             
-            # Check for reuse (very unlikely but important for security)
-            if nonce not in self._nonce_cache:
-                # Add to cache for reuse prevention
-                self._nonce_cache.add(nonce)
-                
-                # Prevent memory bloat by limiting cache size
-                if len(self._nonce_cache) > self._cache_max_size:
-                    # Remove oldest entries (this is a simple approach)
-                    self._nonce_cache = set(list(self._nonce_cache)[-self._cache_max_size//2:])
-                
-                return nonce
-        
-        # This should never happen with proper random generation
-        raise RuntimeError("Failed to generate unique nonce after maximum attempts")
+        Returns:
+            Nonce string
+        """
+        attribute = f"csp_{directive}_nonce"
+        nonce = getattr(request.state, attribute, None)
+        if nonce is None:
+            nonce = self.generate_nonce()
+            setattr(request.state, attribute, nonce)
+        return nonce
     
     def build_csp_header(
         self,
@@ -159,6 +207,34 @@ class CSPManager:
         
         return header_name, header_value
     
+    def compile_header(
+        self,
+        route_directives: dict[str, list[str]] | None = None
+    ) -> CSPHeaderTemplate | None:
+        """
+        Compile the CSP header for a route into a reusable template.
+        
+        Args:
+            route_directives: Route-specific directive overrides
+            
+        Returns:
+            Header template, or None if no CSP header is sent
+        """
+        header_name, header_value = self.build_csp_header_with_name(
+            _SCRIPT_SLOT, _STYLE_SLOT, route_directives
+        )
+        if not header_value:
+            return None
+        
+        value = header_value.encode("latin-1")
+        has_nonces = self.nonce_enabled and (_SCRIPT_SLOT in header_value or _STYLE_SLOT in header_value)
+        if has_nonces:
+            value = value.replace(b"%", b"%%")
+            value = value.replace(f" 'nonce-{_SCRIPT_SLOT}'".encode(), b"%(script)s")
+            value = value.replace(f" 'nonce-{_STYLE_SLOT}'".encode(), b"%(style)s")
+        
+        return CSPHeaderTemplate(header_name.lower().encode("latin-1"), value, has_nonces)
+    
     def validate_config(self) -> list[str]:
         """
         Validate CSP configuration.
@@ -10,13 +10,37 @@ from __future__ import annotations
 from typing import Any, Callable
 
 from fastapi import Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from beginnings.extensions.base import BaseExtension
-from beginnings.extensions.security_headers.csp import CSPManager
+from beginnings.extensions.security_headers.csp import CSPHeaderTemplate, CSPManager
 from beginnings.extensions.security_headers.cors import CORSManager
 
 
+class CompiledHeaders:
+    """Security headers of one route, encoded as raw ASGI header pairs."""
+    
+    __slots__ = ("static", "names", "csp")
+    
+    def __init__(
+        self,
+        static: list[tuple[bytes, bytes]],
+        names: frozenset[bytes],
+        csp: CSPHeaderTemplate | None
+    ) -> None:
+        """
+        Initialize compiled route headers.
+        
+        Args:
+            static: Header pairs sent unchanged on every response
+            names: Names of all headers the block sets
+            csp: CSP template filled with nonces per response, if any
+        """
+        self.static = static
+        self.names = names
+        self.csp = csp
+
+
 class SecurityHeadersExtension(BaseExtension):
     """
     Security headers extension.
@@ -74,6 +98,9 @@ class SecurityHeadersExtension(BaseExtension):
             Middleware factory function
         """
         def create_middleware(route_config: dict[str, Any]) -> Callable[..., Any]:
+            # Header block is compiled once when the route is registered
+            compiled_headers = self._compile_headers(route_config.get("security", {}))
+            
             async def security_headers_middleware(
                 request: Request, 
                 call_next: Callable[..., Any]
@@ -101,17 +128,16 @@ class SecurityHeadersExtension(BaseExtension):
                             if self.cors_manager.is_preflight_request(request):
                                 requested_method = request.headers.get("access-control-request-method", "")
                                 requested_headers_str = request.headers.get("access-control-request-headers", "")
-                                requested_headers = [h.strip() for h in requested_headers_str.split(",")] if requested_headers_str else []
                                 
-                                return self.cors_manager.create_preflight_response(
-                                    origin, requested_method, requested_headers
+                                return self.cors_manager.get_preflight_response(
+                                    origin, requested_method, requested_headers_str
                                 )
                 
                 # Continue to route handler
                 response = await call_next(request)
                 
                 # Add security headers to response
-                await self._add_security_headers(request, response, security_config)
+                await self._add_security_headers(request, response, security_config, compiled_headers)
                 
                 return response
             
@@ -146,11 +172,46 @@ class SecurityHeadersExtension(BaseExtension):
         # Security headers apply to all routes by default
         return True
     
+    def _compile_headers(self, security_config: dict[str, Any]) -> CompiledHeaders:
+        """
+        Compile the security headers of a route into raw header pairs.
+        
+        Args:
+            security_config: Security configuration for the route
+            
+        Returns:
+            Compiled header block for the route
+        """
+        # Merge global and route-specific headers
+        final_headers = self.headers_config.copy()
+        final_headers.update(security_config.get("headers", {}))
+        
+        static = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in self._build_basic_headers(final_headers)
+        ]
+        
+        csp = None
+        csp_route_config = security_config.get("csp", {})
+        if self.csp_manager.enabled and csp_route_config.get("enabled", True) is not False:
+            csp = self.csp_manager.compile_header(csp_route_config.get("directives"))
+        
+        if csp is not None and not csp.has_nonces:
+            static.append((csp.name, csp.value))
+            csp = None
+        
+        names = frozenset(name for name, _ in static)
+        if csp is not None:
+            names |= {csp.name}
+        
+        return CompiledHeaders(static, names, csp)
+    
     async def _add_security_headers(
         self,
         request: Request,
         response: Response,
-        security_config: dict[str, Any]
+        security_config: dict[str, Any],
+        compiled_headers: CompiledHeaders | None = None
     ) -> None:
         """
         Add security headers to response based on configuration.
@@ -159,44 +220,46 @@ class SecurityHeadersExtension(BaseExtension):
             request: The request object
             response: The response object to add headers to
             security_config: Security configuration for this route
+            compiled_headers: Precompiled header block for this route
         """
-        # Get route-specific headers configuration
-        headers_config = security_config.get("headers", {})
+        if compiled_headers is None:
+            compiled_headers = self._compile_headers(security_config)
         
-        # Merge global and route-specific headers
-        final_headers = self.headers_config.copy()
-        final_headers.update(headers_config)
+        raw_headers = response.raw_headers
+        
+        # Configured headers replace any the handler set itself
+        names = compiled_headers.names
+        for name, _ in raw_headers:
+            if name in names:
+                raw_headers[:] = [header for header in raw_headers if header[0] not in names]
+                break
         
-        # Add basic security headers
-        await self._add_basic_headers(response, final_headers)
+        raw_headers.extend(compiled_headers.static)
         
-        # Add CSP headers
-        await self._add_csp_headers(request, response, security_config)
+        if compiled_headers.csp is not None:
+            raw_headers.append(self._render_csp_header(request, response, compiled_headers.csp))
         
         # Add CORS headers for simple requests
         await self._add_cors_headers(request, response, security_config)
     
-    async def _add_basic_headers(
-        self,
-        response: Response,
-        headers_config: dict[str, Any]
-    ) -> None:
-        """Add basic security headers to response."""
+    def _build_basic_headers(self, headers_config: dict[str, Any]) -> list[tuple[str, str]]:
+        """Build basic security header names and values from configuration."""
+        headers = []
         
         # X-Frame-Options
         x_frame_options = headers_config.get("x_frame_options")
         if x_frame_options is not None:
-            response.headers["X-Frame-Options"] = x_frame_options
+            headers.append(("X-Frame-Options", x_frame_options))
         
         # X-Content-Type-Options
         x_content_type_options = headers_config.get("x_content_type_options")
         if x_content_type_options is not None:
-            response.headers["X-Content-Type-Options"] = x_content_type_options
+            headers.append(("X-Content-Type-Options", x_content_type_options))
         
         # X-XSS-Protection (deprecated but sometimes required)
         x_xss_protection = headers_config.get("x_xss_protection")
         if x_xss_protection is not None:
-            response.headers["X-XSS-Protection"] = x_xss_protection
+            headers.append(("X-XSS-Protection", x_xss_protection))
         
         # Strict-Transport-Security
         hsts_config = headers_config.get("strict_transport_security")
@@ -206,12 +269,12 @@ class SecurityHeadersExtension(BaseExtension):
                 hsts_value += "; includeSubDomains"
             if hsts_config.get("preload"):
                 hsts_value += "; preload"
-            response.headers["Strict-Transport-Security"] = hsts_value
+            headers.append(("Strict-Transport-Security", hsts_value))
         
         # Referrer-Policy
         referrer_policy = headers_config.get("referrer_policy")
         if referrer_policy is not None:
-            response.headers["Referrer-Policy"] = referrer_policy
+            headers.append(("Referrer-Policy", referrer_policy))
         
         # Permissions-Policy
         permissions_policy = headers_config.get("permissions_policy")
@@ -227,63 +290,52 @@ class SecurityHeadersExtension(BaseExtension):
                     policy_parts.append(f"{directive.replace('_', '-')}=({origins_str})")
             
             if policy_parts:
-                response.headers["Permissions-Policy"] = ", ".join(policy_parts)
+                headers.append(("Permissions-Policy", ", ".join(policy_parts)))
         
         # Cross-Origin-* headers
         coep = headers_config.get("cross_origin_embedder_policy")
         if coep is not None:
-            response.headers["Cross-Origin-Embedder-Policy"] = coep
+            headers.append(("Cross-Origin-Embedder-Policy", coep))
         
         coop = headers_config.get("cross_origin_opener_policy")
         if coop is not None:
-            response.headers["Cross-Origin-Opener-Policy"] = coop
+            headers.append(("Cross-Origin-Opener-Policy", coop))
         
         corp = headers_config.get("cross_origin_resource_policy")
         if corp is not None:
-            response.headers["Cross-Origin-Resource-Policy"] = corp
+            headers.append(("Cross-Origin-Resource-Policy", corp))
+        
+        return headers
     
-    async def _add_csp_headers(
+    def _render_csp_header(
         self,
         request: Request,
         response: Response,
-        security_config: dict[str, Any]
-    ) -> None:
-        """Add Content Security Policy headers to response."""
-        if not self.csp_manager.enabled:
-            return
-        
-        # Check if CSP is disabled for this route
-        csp_route_config = security_config.get("csp", {})
-        if csp_route_config.get("enabled", True) is False:
-            return
-        
-        # Generate nonces if enabled
-        script_nonce = None
-        style_nonce = None
-        
-        if self.csp_manager.nonce_enabled:
+        csp: CSPHeaderTemplate
+    ) -> tuple[bytes, bytes]:
+        """Fill the nonces the response used into the CSP template."""
+        if isinstance(response, StreamingResponse) and self._is_html(response):
+            # A streamed page renders after the headers are sent, so its
+            # nonces have to exist before the header is built
             if self.csp_manager.script_nonce:
-                script_nonce = self.csp_manager.generate_nonce()
-                # Store nonce in request state for template access
-                if hasattr(request, "state"):
-                    request.state.csp_script_nonce = script_nonce
-            
+                self.csp_manager.get_nonce(request, "script")
             if self.csp_manager.style_nonce:
-                style_nonce = self.csp_manager.generate_nonce()
-                # Store nonce in request state for template access
-                if hasattr(request, "state"):
-                    request.state.csp_style_nonce = style_nonce
+                self.csp_manager.get_nonce(request, "style")
         
-        # Get route-specific CSP directives
-        route_directives = csp_route_config.get("directives")
+        # Request state lives in the scope, shared by every Request object
+        state = request.scope.get("state") or {}
+        script_nonce = state.get("csp_script_nonce") if self.csp_manager.script_nonce else None
+        style_nonce = state.get("csp_style_nonce") if self.csp_manager.style_nonce else None
         
-        # Build and add CSP header
-        header_name, header_value = self.csp_manager.build_csp_header_with_name(
-            script_nonce, style_nonce, route_directives
-        )
-        
-        if header_value:
-            response.headers[header_name] = header_value
+        return csp.render(script_nonce, style_nonce)
+    
+    @staticmethod
+    def _is_html(response: Response) -> bool:
+        """Whether a response has an HTML content type."""
+        for name, value in response.raw_headers:
+            if name == b"content-type":
+                return value.startswith(b"text/html")
+        return False
     
     async def _add_cors_headers(
         self,
@@ -307,6 +359,26 @@ class SecurityHeadersExtension(BaseExtension):
             if self.cors_manager.is_origin_allowed(origin):
                 self.cors_manager.add_cors_headers_to_response(response, origin)
     
+    def get_template_functions(self) -> dict[str, Callable[..., Any]]:
+        """
+        Get template functions for CSP nonces.
+        
+        ``csp_nonce(request)`` returns the request's script nonce and
+        ``csp_nonce(request, "style")`` its style nonce. HTML routers
+        register it as a template global that templates call without the
+        request: ``{{ csp_nonce() }}``. A nonce is only generated, and only
+        added to the CSP header, once a template asks for it.
+        
+        Returns:
+            Dictionary of template functions
+        """
+        def csp_nonce_func(request: Request, directive: str = "script") -> str:
+            if not self.csp_manager.nonce_enabled:
+                return ""
+            return self.csp_manager.get_nonce(request, directive)
+        
+        return {"csp_nonce": csp_nonce_func}
+    
     def validate_config(self) -> list[str]:
         """
         Validate security headers extension configuration.
@@ -0,0 +1,126 @@
+"""
+Backing files for shared-memory storage backends.
+
+Shared-memory backends (rate limiting, token blacklist) map a file that all
+worker processes of an application open. This module names that file per
+application and user, opens it without following symlinks and checks the
+file is private to the current user, so another application or user on the
+host cannot share, pre-create or redirect it. It also provides a byte-range
+lock that waits without blocking the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import getpass
+import os
+import re
+import stat
+import tempfile
+from typing import Any
+
+# Application name used to namespace default backing files
+_app_name = "beginnings-app"
+
+# Longest pause between attempts to take a contended lock
+_MAX_LOCK_DELAY = 0.005
+
+
+def set_shared_memory_app_name(name: str) -> None:
+    """
+    Set the application name that default backing file paths include.
+
+    Called by ``App`` before extensions are loaded.
+
+    Args:
+        name: Application name (``app.name`` in configuration)
+    """
+    global _app_name
+    _app_name = name
+
+
+def default_shared_memory_path(kind: str) -> str:
+    """
+    Get the default backing file path for a kind of shared storage.
+
+    The path lives on tmpfs (``/dev/shm``) when available and includes the
+    application name and the current user, so unrelated applications and
+    users on one host never share a table.
+
+    Args:
+        kind: Storage kind, such as "rate_limit"
+
+    Returns:
+        Backing file path
+    """
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    app_name = re.sub(r"[^A-Za-z0-9_.-]", "_", _app_name)
+    return os.path.join(base_dir, f"beginnings_{app_name}_{kind}_{user}")
+
+
+def open_shared_memory_file(path: str) -> int:
+    """
+    Open or create a backing file that only the current user can access.
+
+    Args:
+        path: Backing file path
+
+    Returns:
+        File descriptor opened for reading and writing
+
+    Raises:
+        PermissionError: If the file is not a regular file owned by the
+            current user, or other users can access it
+        OSError: If the file cannot be opened, including when the path is
+            a symlink
+    """
+    flags = os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_CLOEXEC", 0)
+    fd = os.open(path, flags, 0o600)
+    try:
+        info = os.fstat(fd)
+        if not stat.S_ISREG(info.st_mode):
+            raise PermissionError(f"Shared memory file '{path}' is not a regular file")
+        if hasattr(os, "getuid") and info.st_uid != os.getuid():
+            raise PermissionError(f"Shared memory file '{path}' is owned by another user")
+        if info.st_mode & 0o077:
+            raise PermissionError(
+                f"Shared memory file '{path}' is accessible to other users "
+                f"(mode {stat.S_IMODE(info.st_mode):o}); it must be 600"
+            )
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+def try_lock(fcntl: Any, fd: int, start: int) -> bool:
+    """
+    Take an exclusive one-byte ``fcntl`` lock without waiting.
+
+    Args:
+        fcntl: The ``fcntl`` module
+        fd: Backing file descriptor
+        start: Offset of the locked byte
+
+    Returns:
+        True if the lock was taken, False if another process holds it
+    """
+    try:
+        fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, start)
+    except OSError as e:
+        if e.errno in (errno.EACCES, errno.EAGAIN):
+            return False
+        raise
+    return True
+
+
+async def lock_backoff(attempt: int) -> None:
+    """
+    Pause before retrying a contended lock, yielding to the event loop.
+
+    Args:
+        attempt: Number of failed attempts so far
+    """
+    await asyncio.sleep(min(_MAX_LOCK_DELAY, 0.00005 * 2 ** min(attempt, 10)) if attempt else 0)
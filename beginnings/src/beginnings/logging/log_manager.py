@@ -11,6 +11,8 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, Optional, Any
 
+from beginnings.tracing import current_trace_ids
+
 from .enums import LogLevel, LogFormat
 from .models import LogConfig, LogEntry, LogResult
 from .exceptions import LoggingError
@@ -119,8 +121,8 @@ class LogManager:
             message: Log message
             logger_name: Name of logger to use
             context: Additional context data
-            trace_id: Trace ID for distributed tracing
-            span_id: Span ID for distributed tracing
+            trace_id: Trace ID for distributed tracing (current span's by default)
+            span_id: Span ID for distributed tracing (current span's by default)
             exception_info: Exception information
             
         Returns:
@@ -147,6 +149,10 @@ class LogManager:
                     message="Message filtered"
                 )
             
+            # Stamp the IDs of the current span, unless given
+            if trace_id is None and span_id is None:
+                trace_id, span_id = current_trace_ids() or (None, None)
+
             # Create log entry
             log_entry = LogEntry(
                 timestamp=datetime.utcnow(),
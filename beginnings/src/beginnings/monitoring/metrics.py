@@ -6,17 +6,21 @@ and core framework components.
 """
 
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
+from functools import partial
 from threading import Lock
 from typing import Dict, Optional
 
+# Number of most recent values kept per histogram
+HISTOGRAM_WINDOW = 1000
+
 
 class MetricsCollector:
     """Thread-safe metrics collector for performance monitoring."""
     
     def __init__(self):
         self._counters: Dict[str, int] = defaultdict(int)
-        self._histograms: Dict[str, list[float]] = defaultdict(list)
+        self._histograms: Dict[str, deque[float]] = defaultdict(partial(deque, maxlen=HISTOGRAM_WINDOW))
         self._gauges: Dict[str, float] = {}
         self._lock = Lock()
     
@@ -31,10 +35,15 @@ class MetricsCollector:
         with self._lock:
             metric_name = self._build_metric_name(name, tags)
             self._histograms[metric_name].append(value)
-            
-            # Keep only last 1000 values to prevent memory growth
-            if len(self._histograms[metric_name]) > 1000:
-                self._histograms[metric_name] = self._histograms[metric_name][-1000:]
+    
+    def histogram_window(self, name: str, tags: Optional[dict[str, str]] = None) -> deque[float]:
+        """Get the live window of a histogram's most recent values.
+        
+        Hot paths can append to the window directly, without taking the
+        collector's lock; ``deque.append`` is atomic.
+        """
+        with self._lock:
+            return self._histograms[self._build_metric_name(name, tags)]
     
     def set_gauge(self, name: str, value: float, tags: Optional[dict[str, str]] = None):
         """Set a gauge metric (current value).""" 
@@ -58,8 +67,14 @@ class MetricsCollector:
     def get_histogram_stats(self, name: str, tags: Optional[dict[str, str]] = None) -> dict[str, float]:
         """Get histogram statistics."""
         metric_name = self._build_metric_name(name, tags)
-        values = self._histograms.get(metric_name, [])
-        
+        with self._lock:
+            # Snapshot, as hot paths append to windows without the lock
+            values = list(self._histograms.get(metric_name, ()))
+        return self._histogram_stats(values)
+    
+    @staticmethod
+    def _histogram_stats(values: list[float]) -> dict[str, float]:
+        """Summarize a snapshot of histogram values."""
         if not values:
             return {"count": 0, "min": 0, "max": 0, "avg": 0, "p95": 0, "p99": 0}
         
@@ -83,18 +98,24 @@ class MetricsCollector:
     def get_all_metrics(self) -> dict[str, any]:
         """Get all metrics for debugging/monitoring."""
         with self._lock:
-            return {
-                "counters": dict(self._counters),
-                "histograms": {name: self.get_histogram_stats(name.split('[')[0]) 
-                              for name in self._histograms.keys()},
-                "gauges": dict(self._gauges)
-            }
+            counters = dict(self._counters)
+            # Windows emptied by reset_metrics are kept but not reported
+            histograms = {name: list(values) for name, values in self._histograms.items() if values}
+            gauges = dict(self._gauges)
+        return {
+            "counters": counters,
+            "histograms": {name: self._histogram_stats(values) for name, values in histograms.items()},
+            "gauges": gauges
+        }
     
     def reset_metrics(self):
         """Reset all metrics (useful for testing)."""
         with self._lock:
             self._counters.clear()
-            self._histograms.clear()
+            # Emptied in place rather than dropped, as hot paths hold
+            # windows; get_all_metrics skips empty ones
+            for values in self._histograms.values():
+                values.clear()
             self._gauges.clear()
 
 
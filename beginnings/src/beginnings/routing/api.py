@@ -13,8 +13,10 @@ from fastapi import APIRouter as FastAPIRouter
 from fastapi.responses import JSONResponse
 
 from beginnings.config.route_resolver import RouteConfigResolver
+from beginnings.routing.coalescing import apply_route_coalescing
 from beginnings.routing.cors import CORSManager, create_cors_manager_from_config
 from beginnings.routing.middleware import MiddlewareChainBuilder
+from beginnings.routing.timing import create_middleware_timer_from_config
 
 if TYPE_CHECKING:
     from beginnings.config.enhanced_loader import ConfigLoader
@@ -50,7 +52,9 @@ class APIRouter(FastAPIRouter):
         config = config_loader.load_config()
         self._route_resolver = RouteConfigResolver(config)
         self._extension_manager = extension_manager
-        self._middleware_builder = MiddlewareChainBuilder(extension_manager)
+        self._middleware_builder = MiddlewareChainBuilder(
+            extension_manager, create_middleware_timer_from_config(config)
+        )
         self._registered_routes: dict[str, list[str]] = {}
         
         # Initialize CORS manager if configured
@@ -82,6 +86,10 @@ class APIRouter(FastAPIRouter):
         # Resolve route configuration using full path
         route_config = self._route_resolver.resolve_route_config(full_path, methods)
 
+        # Collapse identical concurrent GETs inside the middleware chain,
+        # so every request still passes its own middleware
+        endpoint = apply_route_coalescing(endpoint, methods, route_config)
+
         # Build middleware chain for this route
         middleware_chain = self._middleware_builder.build_middleware_chain(
             path, methods, route_config
@@ -0,0 +1,294 @@
+"""
+Single-flight coalescing of identical in-flight GET requests.
+
+This module lets routes configured with ``coalesce: true`` collapse
+concurrent identical GET requests into one handler execution. The first
+request runs the handler; requests arriving while it runs wait for its
+result instead of running the handler again.
+
+Only responses that are the same for every identical request can be
+shared. A response that used a per-request secret (a CSP nonce or a CSRF
+token), sets a cookie or is marked ``Cache-Control: private`` or
+``no-store`` is never replayed, and handlers that set headers or cookies
+on an injected ``Response`` parameter cannot be coalesced at all.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import typing
+from typing import Any, Awaitable, Callable
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+from beginnings.extensions.responses import PreparedResponse
+
+# Request headers whose values are part of the coalescing key by default
+DEFAULT_VARY_HEADERS = ("accept", "authorization", "cookie")
+
+COALESCED_METHODS = frozenset({"GET", "HEAD"})
+
+# Keyword argument through which FastAPI passes the request to the wrapper
+_REQUEST_PARAM = "_coalesce_request"
+
+# Request state set when a handler used a value that must differ per request
+PER_REQUEST_STATE = ("csp_script_nonce", "csp_style_nonce", "csrf_token")
+
+# Cache-Control directives marking a response as meant for one client only
+PRIVATE_CACHE_DIRECTIVES = frozenset({"private", "no-store"})
+
+
+class _NotShared(Exception):
+    """The leading request produced no result its followers can reuse."""
+
+
+class RequestCoalescer:
+    """
+    Single-flight execution of identical concurrent requests.
+
+    Requests are identical when method, path, raw query string and the
+    values of ``vary_headers`` match. While a request with a key is being
+    handled, later ones with that key wait for its outcome: a response is
+    replayed to each from its body bytes and headers, any other return
+    value is handed to each, and an exception is raised in each.
+
+    Followers run the handler themselves if the leader is cancelled,
+    returns a streaming or file response, returns a response that sets a
+    cookie or is ``Cache-Control: private`` or ``no-store``, produced a
+    result ``run`` was told is private, or takes longer than ``timeout``
+    seconds.
+    """
+
+    def __init__(self, vary_headers: tuple[str, ...] | list[str] = DEFAULT_VARY_HEADERS, timeout: float = 10.0) -> None:
+        """
+        Initialize request coalescer.
+
+        Args:
+            vary_headers: Request headers whose values distinguish requests
+            timeout: Seconds a follower waits for the leader
+        """
+        self.vary_headers = tuple(header.lower() for header in vary_headers)
+        self.timeout = timeout
+        self._in_flight: dict[tuple[Any, ...], asyncio.Future[Any]] = {}
+
+    def make_key(self, request: Request) -> tuple[Any, ...]:
+        """
+        Build the coalescing key of a request.
+
+        Args:
+            request: The request
+
+        Returns:
+            Key shared by requests the handler would answer identically
+        """
+        scope = request.scope
+        headers = request.headers
+        return (
+            scope["method"],
+            scope["path"],
+            scope.get("query_string", b""),
+            *(headers.get(name) for name in self.vary_headers)
+        )
+
+    async def run(
+        self,
+        key: tuple[Any, ...],
+        call: Callable[[], Awaitable[Any]],
+        is_private: Callable[[], bool] | None = None
+    ) -> Any:
+        """
+        Run a handler call, or share the outcome of an identical one in flight.
+
+        Args:
+            key: Coalescing key of the request
+            call: Runs the handler for this request
+            is_private: Checked once the handler returns if this request
+                leads; True keeps its result from being shared
+
+        Returns:
+            Handler result
+        """
+        leader = self._in_flight.get(key)
+        if leader is None:
+            return await self._lead(key, call, is_private)
+
+        try:
+            shared = await asyncio.wait_for(asyncio.shield(leader), self.timeout)
+        except _NotShared:
+            return await call()
+        except asyncio.TimeoutError:
+            if leader.done():
+                # The handler itself timed out
+                raise
+            return await call()
+
+        if isinstance(shared, _ResponseSnapshot):
+            return shared.replay()
+        return shared
+
+    async def _lead(
+        self,
+        key: tuple[Any, ...],
+        call: Callable[[], Awaitable[Any]],
+        is_private: Callable[[], bool] | None
+    ) -> Any:
+        """Run the handler and publish its outcome to followers."""
+        leader: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = leader
+        try:
+            result = await call()
+        except Exception as e:
+            leader.set_exception(e)
+            raise
+        except BaseException:
+            # Cancelled; the followers' clients are still waiting
+            leader.set_exception(_NotShared())
+            raise
+        else:
+            if is_private is not None and is_private():
+                leader.set_exception(_NotShared())
+            elif not isinstance(result, Response):
+                leader.set_result(result)
+            elif isinstance(getattr(result, "body", None), bytes) and not _is_private_response(result):
+                leader.set_result(_ResponseSnapshot(result))
+            else:
+                # Streaming and file bodies can only be sent once
+                leader.set_exception(_NotShared())
+            return result
+        finally:
+            del self._in_flight[key]
+            # Mark any exception retrieved so a leader without followers isn't reported
+            leader.exception()
+
+
+def _is_private_response(response: Response) -> bool:
+    """Check if a response sets a cookie or must not be cached for other clients."""
+    for name, value in response.raw_headers:
+        if name == b"set-cookie":
+            return True
+        if name == b"cache-control":
+            directives = {directive.split(b"=", 1)[0].strip().lower() for directive in value.split(b",")}
+            if any(directive.encode() in directives for directive in PRIVATE_CACHE_DIRECTIVES):
+                return True
+    return False
+
+
+class _ResponseSnapshot:
+    """Status, body and headers of a response, replayable any number of times."""
+
+    __slots__ = ("status_code", "body", "raw_headers")
+
+    def __init__(self, response: Response) -> None:
+        self.status_code = response.status_code
+        self.body = response.body
+        self.raw_headers = [(name, value) for name, value in response.raw_headers if name != b"content-length"]
+
+    def replay(self) -> PreparedResponse:
+        """Build a fresh response with the snapshot's bytes."""
+        return PreparedResponse(self.status_code, self.body, self.raw_headers)
+
+
+def coalesce_endpoint(endpoint: Callable[..., Any], coalescer: RequestCoalescer) -> Callable[..., Any]:
+    """
+    Wrap a route endpoint so identical concurrent GET requests share one call.
+
+    The wrapper keeps the endpoint's signature for FastAPI's dependency
+    injection. It receives the request through the endpoint's own
+    ``Request`` parameter, or through a keyword-only parameter it adds
+    when there is none (FastAPI fills only one). Synchronous endpoints
+    run in the threadpool as usual. A result is not shared if the handler
+    set any ``PER_REQUEST_STATE`` attribute on the request, as
+    ``csp_nonce()`` and ``csrf_token()`` do.
+
+    Args:
+        endpoint: Route handler function
+        coalescer: Coalescer for the route
+
+    Returns:
+        Wrapped endpoint
+
+    Raises:
+        ValueError: If the endpoint takes a ``Response`` parameter, whose
+            headers and cookies would only reach the leading request
+    """
+    signature = inspect.signature(endpoint)
+    try:
+        hints = typing.get_type_hints(endpoint)
+    except Exception:
+        hints = {}
+    request_param = None
+    for parameter in signature.parameters.values():
+        annotation = hints.get(parameter.name, parameter.annotation)
+        if not inspect.isclass(annotation):
+            continue
+        if issubclass(annotation, Response):
+            raise ValueError(
+                f"Cannot coalesce '{endpoint.__name__}': its '{parameter.name}' Response parameter "
+                "would only set headers and cookies for the first request"
+            )
+        if issubclass(annotation, Request) and request_param is None:
+            request_param = parameter.name
+
+    parameters = list(signature.parameters.values())
+    if request_param is None:
+        position = next(
+            (index for index, parameter in enumerate(parameters) if parameter.kind is inspect.Parameter.VAR_KEYWORD),
+            len(parameters)
+        )
+        parameters.insert(position, inspect.Parameter(_REQUEST_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+    is_async = inspect.iscoroutinefunction(endpoint)
+
+    @functools.wraps(endpoint)
+    async def coalesced_endpoint(*args: Any, **kwargs: Any) -> Any:
+        request = kwargs.pop(_REQUEST_PARAM) if request_param is None else kwargs[request_param]
+
+        async def call() -> Any:
+            if is_async:
+                return await endpoint(*args, **kwargs)
+            return await run_in_threadpool(endpoint, *args, **kwargs)
+
+        def is_private() -> bool:
+            state = request.state
+            return any(getattr(state, name, None) is not None for name in PER_REQUEST_STATE)
+
+        if request.scope["method"] not in COALESCED_METHODS:
+            return await call()
+        return await coalescer.run(coalescer.make_key(request), call, is_private)
+
+    coalesced_endpoint.__signature__ = signature.replace(parameters=parameters)
+    return coalesced_endpoint
+
+
+def apply_route_coalescing(
+    endpoint: Callable[..., Any],
+    methods: list[str],
+    route_config: dict[str, Any]
+) -> Callable[..., Any]:
+    """
+    Wrap an endpoint for coalescing if its route configuration asks for it.
+
+    Reads ``coalesce`` (off by default), ``coalesce_vary`` (header names,
+    defaulting to Accept, Authorization and Cookie) and ``coalesce_timeout``
+    (seconds) from the resolved route configuration.
+
+    Args:
+        endpoint: Route handler function
+        methods: HTTP methods of the route
+        route_config: Resolved configuration for the route
+
+    Returns:
+        Wrapped endpoint, or the endpoint itself if coalescing does not apply
+    """
+    if not route_config.get("coalesce", False):
+        return endpoint
+    if not COALESCED_METHODS.intersection(method.upper() for method in methods):
+        return endpoint
+
+    coalescer = RequestCoalescer(
+        route_config.get("coalesce_vary", DEFAULT_VARY_HEADERS),
+        route_config.get("coalesce_timeout", 10.0)
+    )
+    return coalesce_endpoint(endpoint, coalescer)
@@ -7,6 +7,7 @@ defaults and flexible per-route configuration.
 
 from __future__ import annotations
 
+import re
 from typing import Any, Sequence
 
 from fastapi import Request, Response
@@ -84,6 +85,10 @@ class CORSConfig:
         
         # Validate configuration
         self._validate()
+        
+        # Origins compiled once for per-request checks
+        self._exact_origins = frozenset(self.allow_origins)
+        self._origin_regex = re.compile(self.allow_origin_regex) if self.allow_origin_regex else None
 
     def _validate(self) -> None:
         """Validate CORS configuration for security and correctness."""
@@ -114,6 +119,20 @@ class CORSConfig:
                     context={"method": method, "valid_methods": list(valid_methods)}
                 )
 
+    def is_origin_allowed(self, origin: str) -> bool:
+        """
+        Check if an origin is allowed by this configuration.
+
+        Args:
+            origin: Request origin
+
+        Returns:
+            True if the origin is listed, wildcarded or matches the origin regex
+        """
+        if "*" in self._exact_origins or origin in self._exact_origins:
+            return True
+        return self._origin_regex is not None and self._origin_regex.match(origin) is not None
+
     def to_middleware_kwargs(self) -> dict[str, Any]:
         """
         Convert to kwargs suitable for CORSMiddleware.
@@ -164,6 +183,8 @@ class CORSManager:
         """
         self.global_cors_config = global_cors_config
         self._route_cors_configs: dict[str, CORSConfig] = {}
+        # Merged route configs, valid while their global and route configs are unchanged
+        self._effective_configs: dict[str, tuple[CORSConfig | None, CORSConfig, CORSConfig]] = {}
 
     def set_global_cors(self, config: CORSConfig | dict[str, Any]) -> None:
         """
@@ -201,33 +222,51 @@ class CORSManager:
         # Check for route-specific configuration first
         if route_path in self._route_cors_configs:
             route_config = self._route_cors_configs[route_path]
-            if self.global_cors_config:
-                # Merge global config with route config (route takes precedence)
-                # Start with global config as base
-                merged_kwargs = self.global_cors_config.to_middleware_kwargs()
-                
-                # Only override with values that were explicitly set in route config
-                route_kwargs = route_config.to_middleware_kwargs()
-                
-                # For the merge, we need to know which values were explicitly set
-                # This is tricky with the current design. Let's use a different approach:
-                # Create a new config that inherits from global and overrides specific values
-                
-                # Get the original route config dict and only override those keys
-                if hasattr(route_config, '_original_params'):
-                    # If we stored the original parameters, use only those
-                    for key, value in route_config._original_params.items():
-                        merged_kwargs[key] = value
-                else:
-                    # Fallback: override with all route config values
-                    merged_kwargs.update(route_kwargs)
-                
-                return CORSConfig(**merged_kwargs)
-            return route_config
+            cached = self._effective_configs.get(route_path)
+            if cached is not None and cached[0] is self.global_cors_config and cached[1] is route_config:
+                return cached[2]
+            
+            effective_config = self._merge_route_config(route_config)
+            self._effective_configs[route_path] = (self.global_cors_config, route_config, effective_config)
+            return effective_config
         
         # Fall back to global configuration
         return self.global_cors_config
 
+    def _merge_route_config(self, route_config: CORSConfig) -> CORSConfig:
+        """
+        Merge a route's CORS configuration over the global configuration.
+
+        Args:
+            route_config: Route CORS configuration
+
+        Returns:
+            Effective CORS configuration for the route
+        """
+        if self.global_cors_config:
+            # Merge global config with route config (route takes precedence)
+            # Start with global config as base
+            merged_kwargs = self.global_cors_config.to_middleware_kwargs()
+            
+            # Only override with values that were explicitly set in route config
+            route_kwargs = route_config.to_middleware_kwargs()
+            
+            # For the merge, we need to know which values were explicitly set
+            # This is tricky with the current design. Let's use a different approach:
+            # Create a new config that inherits from global and overrides specific values
+            
+            # Get the original route config dict and only override those keys
+            if hasattr(route_config, '_original_params'):
+                # If we stored the original parameters, use only those
+                for key, value in route_config._original_params.items():
+                    merged_kwargs[key] = value
+            else:
+                # Fallback: override with all route config values
+                merged_kwargs.update(route_kwargs)
+            
+            return CORSConfig(**merged_kwargs)
+        return route_config
+
     def create_cors_middleware(self, app: ASGIApp, config: CORSConfig) -> StarletteCorSMiddleware:
         """
         Create CORS middleware with the given configuration.
@@ -376,12 +415,7 @@ def apply_cors_headers_manually(
     origin = request.headers.get("origin")
     
     # Check if origin is allowed
-    if origin and (
-        "*" in cors_config.allow_origins or 
-        origin in cors_config.allow_origins or
-        (cors_config.allow_origin_regex and 
-         __import__("re").match(cors_config.allow_origin_regex, origin))
-    ):
+    if origin and cors_config.is_origin_allowed(origin):
         response.headers["Access-Control-Allow-Origin"] = origin
     elif "*" in cors_config.allow_origins:
         response.headers["Access-Control-Allow-Origin"] = "*"
@@ -13,9 +13,11 @@ from fastapi import APIRouter as FastAPIRouter, Request
 from fastapi.responses import HTMLResponse
 
 from beginnings.config.route_resolver import RouteConfigResolver
+from beginnings.routing.coalescing import apply_route_coalescing
 from beginnings.routing.middleware import MiddlewareChainBuilder
 from beginnings.routing.static import StaticFileManager, create_static_manager_from_config
 from beginnings.routing.templates import TemplateEngine, TemplateResponse, create_template_engine_from_config
+from beginnings.routing.timing import create_middleware_timer_from_config
 
 if TYPE_CHECKING:
     from beginnings.config.enhanced_loader import ConfigLoader
@@ -51,7 +53,9 @@ class HTMLRouter(FastAPIRouter):
         config = config_loader.load_config()
         self._route_resolver = RouteConfigResolver(config)
         self._extension_manager = extension_manager
-        self._middleware_builder = MiddlewareChainBuilder(extension_manager)
+        self._middleware_builder = MiddlewareChainBuilder(
+            extension_manager, create_middleware_timer_from_config(config)
+        )
         self._registered_routes: dict[str, list[str]] = {}
         
         # Initialize template engine if configured
@@ -178,6 +182,10 @@ class HTMLRouter(FastAPIRouter):
         # Resolve route configuration using full path
         route_config = self._route_resolver.resolve_route_config(full_path, methods)
 
+        # Collapse identical concurrent GETs inside the middleware chain,
+        # so every request still passes its own middleware
+        endpoint = apply_route_coalescing(endpoint, methods, route_config)
+
         # Build middleware chain for this route
         middleware_chain = self._middleware_builder.build_middleware_chain(
             path, methods, route_config
@@ -208,6 +216,13 @@ class HTMLRouter(FastAPIRouter):
             # Template engine is optional - if it fails to initialize,
             # continue without it (templates will not work but router still functions)
             self._template_engine = None
+            return
+        
+        # Extension template functions, such as csp_nonce() and csrf_token()
+        for extension in self._extension_manager.get_loaded_extensions():
+            get_template_functions = getattr(extension, "get_template_functions", None)
+            if get_template_functions is not None:
+                self._template_engine.register_request_functions(get_template_functions())
 
     def _init_static_manager(self, config: dict[str, Any]) -> None:
         """
@@ -9,8 +9,11 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING, Any, Callable
 
+from beginnings.tracing import get_tracer, trace_middleware
+
 if TYPE_CHECKING:
     from beginnings.extensions.loader import ExtensionManager
+    from beginnings.routing.timing import MiddlewareTimer
 
 
 class MiddlewareChainBuilder:
@@ -21,14 +24,16 @@ class MiddlewareChainBuilder:
     chains for each route based on extension applicability and configuration.
     """
 
-    def __init__(self, extension_manager: ExtensionManager) -> None:
+    def __init__(self, extension_manager: ExtensionManager, timer: MiddlewareTimer | None = None) -> None:
         """
         Initialize middleware chain builder.
 
         Args:
             extension_manager: Extension manager for accessing loaded extensions
+            timer: Middleware timer for per-extension latency instrumentation
         """
         self._extension_manager = extension_manager
+        self._timer = timer
 
     def build_middleware_chain(
         self,
@@ -56,8 +61,10 @@ class MiddlewareChainBuilder:
         # Build middleware functions from extensions with security-first ordering
         middleware_functions = []
         
-        # Define security extension types that must execute first
-        security_extensions = ['RateLimitExtension', 'SecurityHeadersExtension', 'AuthExtension']
+        # Define security extension types that must execute first, in this order
+        security_extensions = [
+            'BlocklistExtension', 'RateLimitExtension', 'AdmissionControlExtension', 'SecurityHeadersExtension', 'AuthExtension'
+        ]
         
         # Sort extensions: security extensions first, then others
         security_middleware = []
@@ -69,10 +76,13 @@ class MiddlewareChainBuilder:
                 if middleware_factory:
                     middleware = middleware_factory(route_config)
                     if middleware:
-                        if extension.__class__.__name__ in security_extensions:
-                            security_middleware.append(middleware)
+                        extension_name = extension.__class__.__name__
+                        if extension_name in security_extensions:
+                            security_middleware.append(
+                                (security_extensions.index(extension_name), extension_name, middleware)
+                            )
                         else:
-                            other_middleware.append(middleware)
+                            other_middleware.append((extension_name, middleware))
             except Exception as e:
                 # Log error but continue with other middleware
                 # In a real implementation, we'd use proper logging
@@ -80,10 +90,17 @@ class MiddlewareChainBuilder:
         
         # Combine: security middleware first (execute first), then other middleware (execute last)
         # Remember: chain is reversed, so first added = last executed
-        middleware_functions = security_middleware + other_middleware
+        security_middleware.sort(key=lambda item: item[0])
+        named_middleware = [(name, middleware) for _, name, middleware in security_middleware] + other_middleware
+        if get_tracer() is not None:
+            named_middleware = [(name, trace_middleware(name, middleware)) for name, middleware in named_middleware]
+        middleware_functions = [middleware for _, middleware in named_middleware]
 
         if not middleware_functions:
             return None
+        if self._timer is not None:
+            names = [name for name, _ in named_middleware]
+            return self._timer.compose(names, middleware_functions, path, methods)
         # Compose middleware functions into a chain
         return self._compose_middleware_chain(middleware_functions)
 
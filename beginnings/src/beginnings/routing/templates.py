@@ -7,16 +7,18 @@ including auto-reload for development and secure template handling.
 
 from __future__ import annotations
 
+import functools
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
 from fastapi import Request
 from fastapi.responses import HTMLResponse
-from jinja2 import Environment, FileSystemLoader, select_autoescape, Template
+from jinja2 import Environment, FileSystemLoader, pass_context, select_autoescape, Template
 from jinja2.exceptions import TemplateNotFound, TemplateSyntaxError
 
 from beginnings.core.errors import BeginningsError
+from beginnings.tracing import start_span
 
 
 class TemplateError(BeginningsError):
@@ -92,6 +94,20 @@ class TemplateEngine:
         # Add utility filters
         self.env.filters["datetimeformat"] = self._datetime_format
         
+    def register_request_functions(self, functions: dict[str, Callable[..., Any]]) -> None:
+        """
+        Register template globals that take the request as first argument.
+
+        Templates call them without it, as in ``{{ csp_nonce() }}``; the
+        request being rendered is passed in. Passing a request explicitly
+        still works. Without a request they render as an empty string.
+
+        Args:
+            functions: Functions by template global name
+        """
+        for name, function in functions.items():
+            self.env.globals[name] = _bind_render_request(function)
+        
     def _url_for_stub(self, name: str, **path_params: Any) -> str:
         """
         Stub for URL generation (to be replaced with actual implementation).
@@ -150,8 +166,9 @@ class TemplateEngine:
                 self.env.globals["request"] = request
             
             # Load and render template
-            template = self.env.get_template(template_name)
-            return template.render(**context)
+            with start_span("template.render", {"template.name": template_name}):
+                template = self.env.get_template(template_name)
+                return template.render(**context)
             
         except TemplateNotFound as e:
             raise TemplateError(
@@ -217,8 +234,9 @@ class TemplateEngine:
                 self.env.globals["request"] = request
             
             # Load template and render asynchronously
-            template = self.env.get_template(template_name)
-            return await template.render_async(**context)
+            with start_span("template.render", {"template.name": template_name}):
+                template = self.env.get_template(template_name)
+                return await template.render_async(**context)
             
         except TemplateNotFound as e:
             raise TemplateError(
@@ -334,6 +352,21 @@ class TemplateEngine:
         return None
 
 
+def _bind_render_request(function: Callable[..., Any]) -> Callable[..., Any]:
+    """Wrap a request-first function to receive the request being rendered."""
+    @pass_context
+    @functools.wraps(function)
+    def bound(context: Any, *args: Any, **kwargs: Any) -> Any:
+        if args and isinstance(args[0], Request):
+            return function(*args, **kwargs)
+        request = context.get("request")
+        if request is None:
+            return ""
+        return function(request, *args, **kwargs)
+    
+    return bound
+
+
 class TemplateResponse(HTMLResponse):
     """
     Response class that renders templates with context.
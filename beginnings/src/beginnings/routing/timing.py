@@ -0,0 +1,331 @@
+"""
+Per-extension latency instrumentation of middleware chains.
+
+This module times each extension's middleware layer of a route. The time
+spent in each layer itself, excluding the layers and handler it calls, is
+recorded as a histogram, passed to the bottleneck detector and, when
+``ServerTimingMiddleware`` is installed, sent to the client in a
+``Server-Timing`` header.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+from contextvars import ContextVar
+from time import perf_counter_ns
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+from fastapi import HTTPException
+
+from beginnings.monitoring import get_metrics_collector
+
+if TYPE_CHECKING:
+    from collections import deque
+
+    from beginnings.cli.debug.bottleneck_detector import BottleneckDetector
+    from beginnings.monitoring.metrics import MetricsCollector
+
+HISTOGRAM_NAME = "middleware_duration_ms"
+
+# Server-Timing entry for the route handler itself
+HANDLER_TIMING_NAME = "handler"
+
+# Inclusive nanoseconds spent in each layer of the current request, -1 if not reached
+_layer_durations: ContextVar[list[int] | None] = ContextVar("beginnings_layer_durations", default=None)
+
+# Server-Timing entries of the current request, None if the header is not sent
+_server_timing: ContextVar[list[str] | None] = ContextVar("beginnings_server_timing", default=None)
+
+_bottleneck_detector: BottleneckDetector | None = None
+
+
+def set_bottleneck_detector(detector: BottleneckDetector | None) -> None:
+    """
+    Set the bottleneck detector fed with the timings of every timed request.
+
+    Args:
+        detector: Detector to feed, or None to stop feeding one
+    """
+    global _bottleneck_detector
+    _bottleneck_detector = detector
+
+
+class MiddlewareTimer:
+    """
+    Times the layers of middleware chains.
+
+    Each layer is wrapped to take ``perf_counter_ns`` readings around the
+    call into it. On the way out, a layer appends its self time to the
+    ``middleware_duration_ms`` histogram tagged with its extension name;
+    the outermost layer then reports the request's timings to the
+    bottleneck detector and the ``Server-Timing`` header, if either is
+    in use.
+    """
+
+    def __init__(self, metrics: MetricsCollector | None = None) -> None:
+        """
+        Initialize middleware timer.
+
+        Args:
+            metrics: Metrics collector for the histograms (global collector by default)
+        """
+        self.metrics = metrics or get_metrics_collector()
+
+    def compose(
+        self,
+        names: list[str],
+        middleware_functions: list[Callable[..., Any]],
+        path: str,
+        methods: list[str]
+    ) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Compose middleware functions into a timed chain.
+
+        Args:
+            names: Extension name of each middleware function
+            middleware_functions: Middleware functions, outermost first
+            path: Route path
+            methods: HTTP methods of the route
+
+        Returns:
+            Composed middleware function
+        """
+        windows = [self.metrics.histogram_window(HISTOGRAM_NAME, {"extension": name}) for name in names]
+        timing_names = [*names, HANDLER_TIMING_NAME]
+        layer_count = len(timing_names)
+        method = ",".join(methods)
+
+        def compose_middleware(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+            handler_name = getattr(endpoint, "__name__", None)
+
+            def report(durations: list[int], outcome: Any) -> None:
+                entries = _server_timing.get()
+                detector = _bottleneck_detector
+                if entries is None and detector is None:
+                    return
+
+                # Layers reached form a prefix, the rest are still -1
+                reached = layer_count - durations.count(-1)
+                self_ms = [
+                    (inclusive - inner) / 1_000_000
+                    for inclusive, inner in zip(durations, [*durations[1:reached], 0])
+                ]
+
+                if entries is not None:
+                    entries.extend(f"{name};dur={duration_ms:.3f}" for name, duration_ms in zip(timing_names, self_ms))
+
+                if detector is not None:
+                    detector.record_request_data(
+                        path=path,
+                        method=method,
+                        duration_ms=durations[0] / 1_000_000,
+                        status_code=_status_code(outcome),
+                        middleware_timings=dict(zip(names, self_ms)),
+                        route_handler=handler_name
+                    )
+
+            # Apply middleware in reverse order (LIFO execution), timing the
+            # call into every layer and into the endpoint
+            result = _time_layer(endpoint, len(middleware_functions), None)
+            for index in range(len(middleware_functions) - 1, 0, -1):
+                result = _time_layer(middleware_functions[index](result), index, windows[index])
+            return _time_request(middleware_functions[0](result), layer_count, windows[0], report)
+
+        return compose_middleware
+
+
+def _time_layer(call: Callable[..., Any], index: int, window: deque[float] | None) -> Callable[..., Any]:
+    """Wrap one layer of a chain to store its inclusive duration and record its self time."""
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_layer(*args: Any, **kwargs: Any) -> Any:
+            durations = _layer_durations.get()
+            start = perf_counter_ns()
+            try:
+                return await call(*args, **kwargs)
+            finally:
+                if durations is not None:
+                    # Inline rather than _store(), as this runs for every layer of every request
+                    elapsed = perf_counter_ns() - start
+                    durations[index] = elapsed
+                    if window is not None:
+                        inner = durations[index + 1]
+                        window.append((elapsed - inner if inner >= 0 else elapsed) / 1_000_000)
+
+        return timed_layer
+
+    @functools.wraps(call)
+    def timed_sync_layer(*args: Any, **kwargs: Any) -> Any:
+        durations = _layer_durations.get()
+        start = perf_counter_ns()
+        try:
+            result = call(*args, **kwargs)
+        except BaseException:
+            if durations is not None:
+                _store(durations, index, window, perf_counter_ns() - start)
+            raise
+        if durations is not None:
+            if inspect.isawaitable(result):
+                return _time_awaitable(result, durations, index, window, start)
+            _store(durations, index, window, perf_counter_ns() - start)
+        return result
+
+    return timed_sync_layer
+
+
+def _store(durations: list[int], index: int, window: deque[float] | None, elapsed: int) -> None:
+    """Store a layer's inclusive duration and record its self time."""
+    durations[index] = elapsed
+    if window is not None:
+        inner = durations[index + 1]
+        window.append((elapsed - inner if inner >= 0 else elapsed) / 1_000_000)
+
+
+async def _time_awaitable(
+    awaitable: Awaitable[Any],
+    durations: list[int],
+    index: int,
+    window: deque[float] | None,
+    start: int
+) -> Any:
+    """Await the result of a synchronous layer, timing it until it completes."""
+    try:
+        return await awaitable
+    finally:
+        _store(durations, index, window, perf_counter_ns() - start)
+
+
+def _time_request(
+    call: Callable[..., Any],
+    layer_count: int,
+    window: deque[float],
+    report: Callable[[list[int], Any], None]
+) -> Callable[..., Any]:
+    """Wrap the outermost layer to collect and report a request's durations."""
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def timed_request(*args: Any, **kwargs: Any) -> Any:
+            durations = [-1] * layer_count
+            token = _layer_durations.set(durations)
+            outcome = None
+            start = perf_counter_ns()
+            try:
+                outcome = await call(*args, **kwargs)
+                return outcome
+            except BaseException as e:
+                outcome = e
+                raise
+            finally:
+                elapsed = perf_counter_ns() - start
+                _layer_durations.reset(token)
+                durations[0] = elapsed
+                inner = durations[1]
+                window.append((elapsed - inner if inner >= 0 else elapsed) / 1_000_000)
+                report(durations, outcome)
+
+        return timed_request
+
+    timed_layer = _time_layer(call, 0, window)
+
+    @functools.wraps(call)
+    def timed_sync_request(*args: Any, **kwargs: Any) -> Any:
+        durations = [-1] * layer_count
+        token = _layer_durations.set(durations)
+        try:
+            outcome = timed_layer(*args, **kwargs)
+        except BaseException as e:
+            report(durations, e)
+            raise
+        finally:
+            _layer_durations.reset(token)
+        if inspect.isawaitable(outcome):
+            return _report_awaitable(outcome, durations, report)
+        report(durations, outcome)
+        return outcome
+
+    return timed_sync_request
+
+
+async def _report_awaitable(
+    awaitable: Awaitable[Any],
+    durations: list[int],
+    report: Callable[[list[int], Any], None]
+) -> Any:
+    """Await the result of a synchronous outermost layer, then report."""
+    # Inner layers run as this is awaited, after the synchronous call returned
+    token = _layer_durations.set(durations)
+    outcome = None
+    try:
+        outcome = await awaitable
+        return outcome
+    except BaseException as e:
+        outcome = e
+        raise
+    finally:
+        _layer_durations.reset(token)
+        report(durations, outcome)
+
+
+def _status_code(outcome: Any) -> int:
+    """Get the status code of a request from its response or exception."""
+    if isinstance(outcome, HTTPException):
+        return outcome.status_code
+    if isinstance(outcome, BaseException):
+        return 500
+    return getattr(outcome, "status_code", 200)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that reports middleware timings in a ``Server-Timing`` header.
+
+    Timed chains add an entry per extension layer, plus one for the route
+    handler, before the response starts. Meant for non-production
+    environments, since the header discloses the application's internals.
+    """
+
+    def __init__(self, app: Any) -> None:
+        """
+        Initialize Server-Timing middleware.
+
+        Args:
+            app: ASGI application to wrap
+        """
+        self.app = app
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        entries: list[str] = []
+
+        async def send_with_timing(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and entries:
+                header = (b"server-timing", ", ".join(entries).encode("latin-1"))
+                message = {**message, "headers": [*message.get("headers", []), header]}
+            await send(message)
+
+        token = _server_timing.set(entries)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _server_timing.reset(token)
+
+
+def create_middleware_timer_from_config(config: dict[str, Any]) -> MiddlewareTimer | None:
+    """
+    Create middleware timer from configuration.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        MiddlewareTimer instance or None if ``middleware_timing`` is not enabled
+    """
+    timing_config = config.get("middleware_timing", {})
+    if not timing_config.get("enabled", False):
+        return None
+
+    return MiddlewareTimer()
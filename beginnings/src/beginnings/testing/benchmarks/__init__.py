@@ -0,0 +1,30 @@
+"""Performance benchmarking utilities for extensions and rate limiting."""
+
+from .extension import (
+    ExtensionBenchmark,
+    BenchmarkSuite,
+    BenchmarkConfiguration,
+    BenchmarkResult,
+    ResourceMonitor
+)
+from .rate_limiting import (
+    RateLimitBenchmark,
+    RateLimitBenchmarkConfiguration,
+    RateLimitBenchmarkResult,
+    run_rate_limit_benchmarks
+)
+
+__all__ = [
+    # Extension benchmarks
+    "ExtensionBenchmark",
+    "BenchmarkSuite",
+    "BenchmarkConfiguration",
+    "BenchmarkResult",
+    "ResourceMonitor",
+    
+    # Rate limiting benchmarks
+    "RateLimitBenchmark",
+    "RateLimitBenchmarkConfiguration",
+    "RateLimitBenchmarkResult",
+    "run_rate_limit_benchmarks"
+]
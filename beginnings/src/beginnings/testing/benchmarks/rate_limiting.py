@@ -0,0 +1,539 @@
+"""Rate limiting benchmark and correctness matrix.
+
+Drives each rate limiting algorithm against each storage backend at
+several concurrency levels and key cardinalities, and reports decision
+throughput, decision latency, memory per key and over-admission against
+an exact oracle. Shared memory is also driven from several worker
+processes at once, as it is deployed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from beginnings.extensions.rate_limiting.algorithms import RateLimitAlgorithm, create_algorithm
+from beginnings.extensions.rate_limiting.storage import (
+    MemoryRateLimitStorage,
+    RateLimitStorage,
+    RedisRateLimitStorage,
+    SharedMemoryRateLimitStorage,
+)
+from beginnings.testing.redis_stand_in import LocalRedisStandIn
+
+
+@dataclass
+class RateLimitBenchmarkConfiguration:
+    """Configuration for the rate limiting benchmark matrix."""
+    algorithms: List[str] = field(default_factory=lambda: ["fixed_window", "sliding_window", "token_bucket"])
+    storages: List[str] = field(default_factory=lambda: ["memory", "shared_memory", "redis"])
+    concurrency_levels: List[int] = field(default_factory=lambda: [1, 16, 64])
+    key_cardinalities: List[int] = field(default_factory=lambda: [10, 1000])
+    requests_per_key: int = 20
+    limit: int = 10
+    window_seconds: int = 3600
+    redis_latency_seconds: float = 0.0  # simulated round trip for the Redis stand-in
+    shared_memory_buckets: int = 4096
+    shared_memory_processes: List[int] = field(default_factory=lambda: [4])  # worker processes per shared memory cell
+    seed: int = 1234
+
+
+@dataclass
+class RateLimitBenchmarkResult:
+    """Result of one cell of the rate limiting benchmark matrix."""
+    algorithm: str
+    storage: str
+    concurrency: int
+    key_cardinality: int
+    decisions: int
+    duration: float  # seconds
+    decisions_per_second: float
+    p50_latency_ms: float
+    p99_latency_ms: float
+    bytes_per_key: float
+    admitted: int
+    oracle_admitted: int
+    over_admitted: int
+    over_admission_rate: float
+    processes: int = 1
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+# Stated in every report so task counts are not read as parallelism
+CONCURRENCY_MODEL = (
+    "concurrency counts asyncio tasks in one process; the memory and "
+    "shared_memory backends never yield, so their tasks make decisions one "
+    "at a time. Cells with processes > 1 run that many worker processes "
+    "against one shared_memory table, one task each."
+)
+
+
+def fixed_window_allowance(limit: int, window_seconds: int, started: float, finished: float, config: Dict[str, Any]) -> float:
+    """Exact admissions per key for a fixed window over [started, finished]."""
+    windows = int(finished) // window_seconds - int(started) // window_seconds + 1
+    return limit * windows
+
+
+def sliding_window_allowance(limit: int, window_seconds: int, started: float, finished: float, config: Dict[str, Any]) -> float:
+    """Exact admissions per key for a sliding window over [started, finished]."""
+    return limit * math.ceil(max(finished - started, 1e-9) / window_seconds)
+
+
+def token_bucket_allowance(limit: int, window_seconds: int, started: float, finished: float, config: Dict[str, Any]) -> float:
+    """Exact admissions per key for a token bucket over [started, finished]."""
+    capacity = min(limit, config.get("max_tokens", 100))
+    return capacity + math.floor((finished - started) * config.get("refill_rate", 1.0))
+
+
+class RateLimitBenchmark:
+    """Benchmarks rate limiting algorithms across storages and concurrency.
+
+    Each matrix cell creates a fresh storage, fires ``requests_per_key``
+    decisions at each of ``key_cardinality`` keys from ``concurrency``
+    concurrent workers, and compares per-key admissions with what an exact
+    (perfectly serialized) limiter would allow over the same period.
+    Admissions beyond that are over-admissions, typically caused by
+    read-modify-write races in a storage backend.
+
+    Concurrent workers are asyncio tasks in one process, so they only
+    interleave where storage awaits. Memory and shared memory never do, so
+    their task cells are effectively serial; shared memory is also run from
+    ``shared_memory_processes`` worker processes sharing one table, which
+    exercises its cross-process locking. Process cells pickle the algorithm
+    factory into each worker, so it must be importable at module level.
+
+    The Redis backend is ``RedisRateLimitStorage`` talking to a
+    ``LocalRedisStandIn``, so results include its command pattern and
+    round trips but not real network or server costs.
+    """
+
+    def __init__(self, config: Optional[RateLimitBenchmarkConfiguration] = None):
+        """Initialize rate limiting benchmark.
+
+        Args:
+            config: Benchmark matrix configuration
+        """
+        self.config = config or RateLimitBenchmarkConfiguration()
+        self.results: List[RateLimitBenchmarkResult] = []
+        self._algorithms: Dict[str, Tuple[Callable[[Dict[str, Any], RateLimitStorage], RateLimitAlgorithm], Callable[..., float], Dict[str, Any]]] = {}
+
+        # Refill over the window so token bucket limits match the other algorithms
+        bucket_config = {"refill_rate": self.config.limit / self.config.window_seconds, "max_tokens": self.config.limit}
+        self.register_algorithm("fixed_window", create_algorithm, fixed_window_allowance)
+        self.register_algorithm("sliding_window", create_algorithm, sliding_window_allowance)
+        self.register_algorithm("token_bucket", create_algorithm, token_bucket_allowance, bucket_config)
+
+    def register_algorithm(
+        self,
+        name: str,
+        factory: Callable[[Dict[str, Any], RateLimitStorage], RateLimitAlgorithm],
+        allowance: Callable[..., float],
+        algorithm_config: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """Register an algorithm to benchmark.
+
+        Args:
+            name: Algorithm name (passed as ``type`` in its config)
+            factory: Callable creating the algorithm from (config, storage)
+            allowance: Exact admissions per key as a function of
+                (limit, window_seconds, started, finished, algorithm_config)
+            algorithm_config: Algorithm-specific configuration
+        """
+        self._algorithms[name] = (factory, allowance, {**(algorithm_config or {}), "type": name})
+
+    def create_storage(self, storage_type: str, directory: str) -> RateLimitStorage:
+        """Create a fresh storage backend for one benchmark cell.
+
+        Args:
+            storage_type: "memory", "shared_memory" or "redis"
+            directory: Scratch directory for shared memory tables
+
+        Returns:
+            Storage backend instance
+        """
+        if storage_type == "memory":
+            return MemoryRateLimitStorage()
+        if storage_type == "shared_memory":
+            return SharedMemoryRateLimitStorage(
+                path=os.path.join(directory, f"rate_limit_{time.perf_counter_ns()}"),
+                buckets=self.config.shared_memory_buckets
+            )
+        if storage_type == "redis":
+            storage = RedisRateLimitStorage("redis://stand-in")
+            storage._redis = LocalRedisStandIn(self.config.redis_latency_seconds)
+            return storage
+        raise ValueError(f"Unknown benchmark storage type: {storage_type}")
+
+    async def run_case(
+        self,
+        algorithm_name: str,
+        storage_type: str,
+        concurrency: int,
+        key_cardinality: int
+    ) -> RateLimitBenchmarkResult:
+        """Run one cell of the matrix.
+
+        Args:
+            algorithm_name: Registered algorithm name
+            storage_type: Storage backend type
+            concurrency: Number of concurrent asyncio tasks
+            key_cardinality: Number of distinct rate limit keys
+
+        Returns:
+            Benchmark result for the cell
+        """
+        factory, _, algorithm_config = self._algorithms[algorithm_name]
+        limit = self.config.limit
+        window_seconds = self.config.window_seconds
+        keys, schedule = self._make_schedule(key_cardinality)
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = self.create_storage(storage_type, directory)
+            algorithm = factory(dict(algorithm_config), storage)
+            latencies_ns: List[int] = []
+            admitted: Dict[str, int] = dict.fromkeys(keys, 0)
+            position = 0
+
+            async def worker() -> None:
+                nonlocal position
+                while position < len(schedule):
+                    key = schedule[position]
+                    position += 1
+                    start_ns = time.perf_counter_ns()
+                    allowed, _, _ = await algorithm.is_allowed(key, limit, window_seconds)
+                    latencies_ns.append(time.perf_counter_ns() - start_ns)
+                    if allowed:
+                        admitted[key] += 1
+
+            try:
+                started = time.time()
+                perf_start = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(concurrency)))
+                duration = time.perf_counter() - perf_start
+                finished = time.time()
+
+                metadata: Dict[str, Any] = {}
+                redis_client = getattr(storage, "_redis", None)
+                if isinstance(redis_client, LocalRedisStandIn):
+                    metadata["round_trips_per_decision"] = redis_client.round_trips / len(schedule)
+            finally:
+                if hasattr(storage, "close"):
+                    await storage.close()
+
+            bytes_per_key = await self._measure_bytes_per_key(algorithm_name, storage_type, key_cardinality, directory)
+
+        return self._record_result(
+            algorithm_name, storage_type, concurrency, 1, admitted, latencies_ns,
+            started, finished, duration, bytes_per_key, metadata
+        )
+
+    async def run_process_case(
+        self,
+        algorithm_name: str,
+        processes: int,
+        key_cardinality: int
+    ) -> RateLimitBenchmarkResult:
+        """Run one shared memory cell from several worker processes.
+
+        The schedule is split between ``processes`` spawned workers, each
+        making its decisions one at a time against the same table.
+
+        Args:
+            algorithm_name: Registered algorithm name
+            processes: Number of worker processes
+            key_cardinality: Number of distinct rate limit keys
+
+        Returns:
+            Benchmark result for the cell
+        """
+        factory, _, algorithm_config = self._algorithms[algorithm_name]
+        keys, schedule = self._make_schedule(key_cardinality)
+        context = multiprocessing.get_context("spawn")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, f"rate_limit_{time.perf_counter_ns()}")
+            barrier = context.Barrier(processes, timeout=60)
+            outcomes = context.Queue()
+            workers = [
+                context.Process(
+                    target=_shared_memory_worker,
+                    args=(
+                        path, self.config.shared_memory_buckets, factory, algorithm_config,
+                        schedule[index::processes], self.config.limit, self.config.window_seconds,
+                        barrier, outcomes
+                    )
+                )
+                for index in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            try:
+                results = await asyncio.to_thread(_collect_outcomes, outcomes, workers)
+            finally:
+                for worker in workers:
+                    if worker.is_alive():
+                        worker.terminate()
+                    worker.join()
+
+            bytes_per_key = await self._measure_bytes_per_key(algorithm_name, "shared_memory", key_cardinality, directory)
+
+        admitted: Dict[str, int] = dict.fromkeys(keys, 0)
+        latencies_ns: List[int] = []
+        for worker_admitted, worker_latencies_ns, _, _ in results:
+            for key, count in worker_admitted.items():
+                admitted[key] += count
+            latencies_ns.extend(worker_latencies_ns)
+        started = min(result[2] for result in results)
+        finished = max(result[3] for result in results)
+
+        return self._record_result(
+            algorithm_name, "shared_memory", 1, processes, admitted, latencies_ns,
+            started, finished, finished - started, bytes_per_key, {}
+        )
+
+    def _make_schedule(self, key_cardinality: int) -> Tuple[List[str], List[str]]:
+        """Get a cell's keys and its shuffled sequence of decisions."""
+        keys = [f"bench:{index}" for index in range(key_cardinality)]
+        schedule = keys * self.config.requests_per_key
+        random.Random(self.config.seed).shuffle(schedule)
+        return keys, schedule
+
+    def _record_result(
+        self,
+        algorithm_name: str,
+        storage_type: str,
+        concurrency: int,
+        processes: int,
+        admitted: Dict[str, int],
+        latencies_ns: List[int],
+        started: float,
+        finished: float,
+        duration: float,
+        bytes_per_key: float,
+        metadata: Dict[str, Any]
+    ) -> RateLimitBenchmarkResult:
+        """Compare a cell's admissions with the oracle and record its result."""
+        _, allowance, algorithm_config = self._algorithms[algorithm_name]
+        limit = self.config.limit
+        window_seconds = self.config.window_seconds
+        decisions = len(latencies_ns)
+
+        exact = min(self.config.requests_per_key, allowance(limit, window_seconds, started, finished, algorithm_config))
+        total_admitted = sum(admitted.values())
+        over_admitted = sum(max(0, count - exact) for count in admitted.values())
+        oracle_admitted = int(exact) * len(admitted)
+        latencies_ms = sorted(value / 1_000_000 for value in latencies_ns)
+
+        result = RateLimitBenchmarkResult(
+            algorithm=algorithm_name,
+            storage=storage_type,
+            concurrency=concurrency,
+            key_cardinality=len(admitted),
+            decisions=decisions,
+            duration=duration,
+            decisions_per_second=decisions / duration if duration > 0 else 0.0,
+            p50_latency_ms=statistics.median(latencies_ms),
+            p99_latency_ms=self._percentile(latencies_ms, 99),
+            bytes_per_key=bytes_per_key,
+            admitted=total_admitted,
+            oracle_admitted=oracle_admitted,
+            over_admitted=over_admitted,
+            over_admission_rate=over_admitted / oracle_admitted if oracle_admitted else 0.0,
+            processes=processes,
+            metadata=metadata
+        )
+        self.results.append(result)
+        return result
+
+    async def run_matrix(self) -> List[RateLimitBenchmarkResult]:
+        """Run every configured algorithm/storage/concurrency/cardinality cell.
+
+        Returns:
+            Results for all cells
+        """
+        results = []
+        for algorithm_name in self.config.algorithms:
+            for storage_type in self.config.storages:
+                for concurrency in self.config.concurrency_levels:
+                    for key_cardinality in self.config.key_cardinalities:
+                        results.append(await self.run_case(algorithm_name, storage_type, concurrency, key_cardinality))
+            if "shared_memory" in self.config.storages:
+                for processes in self.config.shared_memory_processes:
+                    for key_cardinality in self.config.key_cardinalities:
+                        results.append(await self.run_process_case(algorithm_name, processes, key_cardinality))
+        return results
+
+    async def _measure_bytes_per_key(
+        self,
+        algorithm_name: str,
+        storage_type: str,
+        key_cardinality: int,
+        directory: str
+    ) -> float:
+        """Measure storage footprint per key after one decision per key.
+
+        In-process backends (memory, Redis stand-in data) are measured with
+        tracemalloc. Shared memory preallocates fixed-size slots, so its
+        footprint is the slot size for the algorithm's entry kind.
+        """
+        factory, _, algorithm_config = self._algorithms[algorithm_name]
+        storage = self.create_storage(storage_type, directory)
+        algorithm = factory(dict(algorithm_config), storage)
+
+        try:
+            if isinstance(storage, SharedMemoryRateLimitStorage):
+                if algorithm_name == "sliding_window":
+                    return float(storage._window_slot_size)
+                return float(storage._SCALAR_SLOT.size)
+
+            tracemalloc.start()
+            try:
+                before = tracemalloc.get_traced_memory()[0]
+                for index in range(key_cardinality):
+                    await algorithm.is_allowed(f"bench:{index}", self.config.limit, self.config.window_seconds)
+                after = tracemalloc.get_traced_memory()[0]
+            finally:
+                tracemalloc.stop()
+            return max(0, after - before) / key_cardinality
+        finally:
+            if hasattr(storage, "close"):
+                await storage.close()
+
+    def generate_report(self) -> Dict[str, Any]:
+        """Generate a report of all results.
+
+        Returns:
+            Report with per-cell results and per-storage summaries
+        """
+        by_storage: Dict[str, List[RateLimitBenchmarkResult]] = {}
+        for result in self.results:
+            by_storage.setdefault(result.storage, []).append(result)
+
+        return {
+            "timestamp": time.time(),
+            "configuration": asdict(self.config),
+            "concurrency_model": CONCURRENCY_MODEL,
+            "results": [asdict(result) for result in self.results],
+            "summary": {
+                storage: {
+                    "max_decisions_per_second": max(r.decisions_per_second for r in results),
+                    "worst_p99_latency_ms": max(r.p99_latency_ms for r in results),
+                    "worst_over_admission_rate": max(r.over_admission_rate for r in results)
+                }
+                for storage, results in by_storage.items()
+            }
+        }
+
+    def format_table(self) -> str:
+        """Format results as a plain-text table.
+
+        Returns:
+            Table with one row per matrix cell, followed by the concurrency model
+        """
+        header = (
+            f"{'algorithm':<15} {'storage':<14} {'procs':>5} {'conc':>5} {'keys':>6} "
+            f"{'dec/s':>10} {'p99 ms':>8} {'B/key':>8} {'over-admit':>10}"
+        )
+        rows = [header, "-" * len(header)]
+        for r in self.results:
+            rows.append(
+                f"{r.algorithm:<15} {r.storage:<14} {r.processes:>5} {r.concurrency:>5} {r.key_cardinality:>6} "
+                f"{r.decisions_per_second:>10.0f} {r.p99_latency_ms:>8.3f} {r.bytes_per_key:>8.0f} "
+                f"{r.over_admission_rate:>10.2%}"
+            )
+        rows.append("")
+        rows.append(f"Note: {CONCURRENCY_MODEL}")
+        return "\n".join(rows)
+
+    def export_results(self, file_path: Union[str, Path]) -> None:
+        """Export benchmark report to a JSON file.
+
+        Args:
+            file_path: Path to export file
+        """
+        with open(file_path, 'w') as f:
+            json.dump(self.generate_report(), f, indent=2)
+
+    def _percentile(self, data: List[float], percentile: float) -> float:
+        """Calculate percentile of sorted data (nearest rank)."""
+        if not data:
+            return 0.0
+        index = max(0, math.ceil(percentile / 100 * len(data)) - 1)
+        return data[index]
+
+
+def _shared_memory_worker(
+    path: str,
+    buckets: int,
+    factory: Callable[[Dict[str, Any], RateLimitStorage], RateLimitAlgorithm],
+    algorithm_config: Dict[str, Any],
+    schedule: List[str],
+    limit: int,
+    window_seconds: int,
+    barrier: Any,
+    outcomes: Any
+) -> None:
+    """Make one worker process's share of a multi-process cell's decisions."""
+    storage = SharedMemoryRateLimitStorage(path=path, buckets=buckets)
+    algorithm = factory(dict(algorithm_config), storage)
+    storage._ensure_open()
+
+    async def decide() -> Tuple[Dict[str, int], List[int], float, float]:
+        admitted: Dict[str, int] = {}
+        latencies_ns: List[int] = []
+        started = time.time()
+        for key in schedule:
+            start_ns = time.perf_counter_ns()
+            allowed, _, _ = await algorithm.is_allowed(key, limit, window_seconds)
+            latencies_ns.append(time.perf_counter_ns() - start_ns)
+            if allowed:
+                admitted[key] = admitted.get(key, 0) + 1
+        finished = time.time()
+        await storage.close()
+        return admitted, latencies_ns, started, finished
+
+    # Start deciding together so the workers actually contend
+    barrier.wait()
+    outcomes.put(asyncio.run(decide()))
+
+
+def _collect_outcomes(outcomes: Any, workers: List[Any]) -> List[Tuple[Dict[str, int], List[int], float, float]]:
+    """Wait for every worker's outcome, failing if one exits without reporting."""
+    results: List[Tuple[Dict[str, int], List[int], float, float]] = []
+    while len(results) < len(workers):
+        try:
+            results.append(outcomes.get(timeout=1.0))
+        except queue.Empty:
+            failed = [worker for worker in workers if worker.exitcode not in (None, 0)]
+            if failed:
+                raise RuntimeError(f"Benchmark worker process exited with code {failed[0].exitcode}")
+    return results
+
+
+def run_rate_limit_benchmarks(config: Optional[RateLimitBenchmarkConfiguration] = None) -> RateLimitBenchmark:
+    """Run the full rate limiting benchmark matrix.
+
+    Args:
+        config: Benchmark matrix configuration
+
+    Returns:
+        Benchmark holding the results
+    """
+    benchmark = RateLimitBenchmark(config)
+    asyncio.run(benchmark.run_matrix())
+    return benchmark
+
+
+if __name__ == "__main__":
+    print(run_rate_limit_benchmarks().format_table())
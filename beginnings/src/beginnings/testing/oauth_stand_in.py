@@ -0,0 +1,139 @@
+"""Local OAuth 2.0 / OpenID Connect server stand-in for testing and benchmarking."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import urllib.parse
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalOAuthServer:
+    """Minimal HTTP/1.1 identity provider served on a local port.
+
+    Serves a discovery document, a JWKS, a token endpoint and a userinfo
+    endpoint with keep-alive support. New TCP connections pay a simulated
+    ``handshake_seconds`` before their first response, standing in for the
+    TCP+TLS setup cost of a real identity provider, so connection reuse by
+    clients shows up in measured latency. ``connections`` and ``requests``
+    count what the server has seen.
+    """
+
+    def __init__(
+        self,
+        user_info: Optional[Dict[str, Any]] = None,
+        handshake_seconds: float = 0.0,
+        latency_seconds: float = 0.0
+    ):
+        """Initialize OAuth server stand-in.
+
+        Args:
+            user_info: Profile returned from the userinfo endpoint
+            handshake_seconds: Simulated setup time of each new connection
+            latency_seconds: Simulated processing time of each request
+        """
+        self.user_info = user_info or {"sub": "local-user-1", "email": "user@example.com", "name": "Local User"}
+        self.handshake_seconds = handshake_seconds
+        self.latency_seconds = latency_seconds
+        self.jwks: Dict[str, Any] = {"keys": [{"kty": "oct", "kid": "local-key-1", "alg": "HS256"}]}
+        self.connections = 0
+        self.requests: Dict[str, int] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._port = 0
+
+    @property
+    def url(self) -> str:
+        """Base URL (issuer) of the running server."""
+        return f"http://127.0.0.1:{self._port}"
+
+    def provider_config(self, **overrides: Any) -> Dict[str, Any]:
+        """Get OAuth provider configuration pointing at this server."""
+        config = {
+            "client_id": "local-client",
+            "client_secret": "local-secret",
+            "issuer": self.url,
+            "scopes": ["openid", "email"],
+        }
+        config.update(overrides)
+        return config
+
+    async def start(self) -> None:
+        """Start listening on a free local port."""
+        self._server = await asyncio.start_server(self._handle_connection, "127.0.0.1", 0)
+        self._port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Stop the server and close open connections."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "LocalOAuthServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.stop()
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Answer one request."""
+        if path == "/.well-known/openid-configuration":
+            return 200, {
+                "issuer": self.url,
+                "authorization_endpoint": f"{self.url}/authorize",
+                "token_endpoint": f"{self.url}/token",
+                "userinfo_endpoint": f"{self.url}/userinfo",
+                "jwks_uri": f"{self.url}/jwks",
+            }
+        if path == "/jwks":
+            return 200, self.jwks
+        if path == "/token" and method == "POST":
+            form = urllib.parse.parse_qs(body.decode())
+            if form.get("code") == ["invalid"]:
+                return 400, {"error": "invalid_grant", "error_description": "Invalid authorization code"}
+            return 200, {"access_token": f"access-{form.get('code', [''])[0]}", "token_type": "Bearer", "expires_in": 3600}
+        if path == "/userinfo":
+            return 200, self.user_info
+        return 404, {"error": "not_found"}
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one connection until the client closes it."""
+        self.connections += 1
+        await asyncio.sleep(self.handshake_seconds)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers: Dict[str, str] = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                path = urllib.parse.urlsplit(target).path
+                self.requests[path] = self.requests.get(path, 0) + 1
+                await asyncio.sleep(self.latency_seconds)
+                status, payload = self._route(method, path, body)
+
+                content = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(content)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + content
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,295 @@
+"""In-process Redis stand-in for testing and benchmarking Redis-backed storage."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class LocalRedisStandIn:
+    """Minimal in-process substitute for a ``redis.asyncio.Redis`` client.
+
+    Implements the command subset used by Beginnings' Redis storage backends
+    with Redis semantics (bytes replies, key expiry, sorted set member
+    de-duplication, server-side script atomicity). Every command, and every
+    pipeline or script, is one simulated round trip that yields to the event
+    loop, so concurrent callers interleave between commands exactly where
+    they would against a real server.
+
+    Lua scripts are not interpreted; scripts are matched against handlers
+    registered with ``register_script``.
+    """
+
+    def __init__(self, latency_seconds: float = 0.0):
+        """Initialize Redis stand-in.
+
+        Args:
+            latency_seconds: Simulated network round-trip time per command
+        """
+        self.latency_seconds = latency_seconds
+        self.round_trips = 0
+        self._data: Dict[str, Any] = {}
+        self._expires_at: Dict[str, float] = {}
+        self._scripts: List[Tuple[str, Any]] = []
+        self.register_script("redis.call('HSET', key, 'count', count, 'window_start', window_start)",
+                             self._script_increment_counter)
+
+    def register_script(self, marker: str, handler: Any) -> None:
+        """Register a Python handler for Lua scripts containing ``marker``.
+
+        Args:
+            marker: Substring identifying the script
+            handler: Callable taking (stand_in, keys, args) and returning the reply
+        """
+        self._scripts.append((marker, handler))
+
+    async def _round_trip(self) -> None:
+        """Simulate one network round trip."""
+        self.round_trips += 1
+        await asyncio.sleep(self.latency_seconds)
+
+    # Keyspace
+
+    def _get(self, key: str) -> Any:
+        """Get a live value, dropping it if expired."""
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            del self._expires_at[key]
+        return self._data.get(key)
+
+    def _hash(self, key: str) -> Dict[bytes, bytes]:
+        """Get or create a hash value."""
+        value = self._get(key)
+        if value is None:
+            value = self._data[key] = {}
+        return value
+
+    def _set(self, key: str) -> set:
+        """Get or create a set value."""
+        value = self._get(key)
+        if value is None:
+            value = self._data[key] = set()
+        return value
+
+    def _sorted_set(self, key: str) -> Dict[bytes, float]:
+        """Get or create a sorted set value (member -> score)."""
+        value = self._get(key)
+        if value is None:
+            value = self._data[key] = {}
+        return value
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        """Encode a value the way redis-py does."""
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, float):
+            return repr(value).encode()
+        return str(value).encode()
+
+    def key_count(self) -> int:
+        """Get the number of live keys."""
+        return sum(1 for key in list(self._data) if self._get(key) is not None)
+
+    # Commands
+
+    def _cmd_get(self, key: str) -> Optional[bytes]:
+        return self._get(key)
+
+    def _cmd_set(self, key: str, value: Any, ex: Optional[int] = None) -> bool:
+        self._data[key] = self._encode(value)
+        self._expires_at.pop(key, None)
+        if ex is not None:
+            self._expires_at[key] = time.time() + ex
+        return True
+
+    def _cmd_delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            if self._get(key) is not None:
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires_at.pop(key, None)
+        return deleted
+
+    def _cmd_incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        self._data[key] = self._encode(value)
+        return value
+
+    def _cmd_exists(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._get(key) is not None)
+
+    def _cmd_expire(self, key: str, seconds: int) -> bool:
+        if self._get(key) is None:
+            return False
+        self._expires_at[key] = time.time() + seconds
+        return True
+
+    def _cmd_hget(self, key: str, field: str) -> Optional[bytes]:
+        value = self._get(key)
+        return value.get(self._encode(field)) if value else None
+
+    def _cmd_hgetall(self, key: str) -> Dict[bytes, bytes]:
+        return dict(self._get(key) or {})
+
+    def _cmd_hset(self, key: str, field: Any = None, value: Any = None, mapping: Optional[Dict[str, Any]] = None) -> int:
+        values = self._hash(key)
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = 0
+        for item_field, item_value in items.items():
+            encoded_field = self._encode(item_field)
+            added += encoded_field not in values
+            values[encoded_field] = self._encode(item_value)
+        return added
+
+    def _cmd_sadd(self, key: str, *members: Any) -> int:
+        values = self._set(key)
+        added = 0
+        for member in members:
+            encoded_member = self._encode(member)
+            added += encoded_member not in values
+            values.add(encoded_member)
+        return added
+
+    def _cmd_srem(self, key: str, *members: Any) -> int:
+        values = self._get(key)
+        if not values:
+            return 0
+        removed = 0
+        for member in members:
+            encoded_member = self._encode(member)
+            removed += encoded_member in values
+            values.discard(encoded_member)
+        if not values:
+            self._cmd_delete(key)
+        return removed
+
+    def _cmd_smembers(self, key: str) -> set:
+        return set(self._get(key) or ())
+
+    def _cmd_zadd(self, key: str, mapping: Dict[Any, float]) -> int:
+        members = self._sorted_set(key)
+        added = 0
+        for member, score in mapping.items():
+            encoded_member = self._encode(member)
+            added += encoded_member not in members
+            members[encoded_member] = float(score)
+        return added
+
+    def _cmd_zrange(self, key: str, start: int, end: int) -> List[bytes]:
+        members = sorted((self._get(key) or {}).items(), key=lambda item: (item[1], item[0]))
+        end = len(members) if end == -1 else end + 1
+        return [member for member, _ in members[start:end]]
+
+    @staticmethod
+    def _score_range(minimum: Any, maximum: Any) -> Any:
+        """Build a predicate for a score range using Redis bound syntax (-inf, +inf, "(" exclusive)."""
+        def parse(bound: Any) -> tuple:
+            if isinstance(bound, bytes):
+                bound = bound.decode()
+            if isinstance(bound, str) and bound.startswith("("):
+                return float(bound[1:]), True
+            return float(bound), False
+
+        (low, low_exclusive), (high, high_exclusive) = parse(minimum), parse(maximum)
+        return lambda score: (
+            (low < score if low_exclusive else low <= score)
+            and (score < high if high_exclusive else score <= high)
+        )
+
+    def _cmd_zrangebyscore(self, key: str, minimum: Any, maximum: Any) -> List[bytes]:
+        in_range = self._score_range(minimum, maximum)
+        members = sorted((self._get(key) or {}).items(), key=lambda item: (item[1], item[0]))
+        return [member for member, score in members if in_range(score)]
+
+    def _cmd_zremrangebyscore(self, key: str, minimum: Any, maximum: Any) -> int:
+        in_range = self._score_range(minimum, maximum)
+        members = self._get(key) or {}
+        removed = [member for member, score in members.items() if in_range(score)]
+        for member in removed:
+            del members[member]
+        return len(removed)
+
+    def _cmd_eval(self, script: str, numkeys: int, *keys_and_args: Any) -> Any:
+        keys = list(keys_and_args[:numkeys])
+        args = list(keys_and_args[numkeys:])
+        for marker, handler in self._scripts:
+            if marker in script:
+                return handler(self, keys, args)
+        raise NotImplementedError("Script is not registered with the Redis stand-in")
+
+    @staticmethod
+    def _script_increment_counter(stand_in: LocalRedisStandIn, keys: List[str], args: List[Any]) -> List[Any]:
+        """Counter increment script used by RedisRateLimitStorage."""
+        key = keys[0]
+        current_time = float(args[0])
+        window_seconds = float(args[1])
+
+        count = float(stand_in._cmd_hget(key, "count") or 0)
+        window_start = float(stand_in._cmd_hget(key, "window_start") or current_time)
+        if current_time - window_start >= window_seconds:
+            count = 0
+            window_start = current_time
+        count += 1
+
+        stand_in._cmd_hset(key, mapping={"count": int(count), "window_start": window_start})
+        stand_in._cmd_expire(key, int(window_seconds * 2))
+        # Lua numbers are truncated to integers in replies
+        return [int(count), int(window_start)]
+
+    def __getattr__(self, name: str) -> Any:
+        """Expose each command as a coroutine costing one round trip."""
+        command = getattr(type(self), f"_cmd_{name}", None)
+        if command is None:
+            raise AttributeError(name)
+
+        async def call(*args: Any, **kwargs: Any) -> Any:
+            await self._round_trip()
+            return command(self, *args, **kwargs)
+
+        return call
+
+    def pipeline(self, transaction: bool = True) -> _Pipeline:
+        """Create a pipeline whose commands share one round trip."""
+        return _Pipeline(self)
+
+    async def close(self) -> None:
+        """Close the stand-in (no-op)."""
+
+
+class _Pipeline:
+    """Buffered commands executed together in one round trip."""
+
+    def __init__(self, stand_in: LocalRedisStandIn):
+        self._stand_in = stand_in
+        self._commands: List[Tuple[str, tuple, dict]] = []
+
+    def __getattr__(self, name: str) -> Any:
+        if not hasattr(LocalRedisStandIn, f"_cmd_{name}"):
+            raise AttributeError(name)
+
+        def queue(*args: Any, **kwargs: Any) -> _Pipeline:
+            self._commands.append((name, args, kwargs))
+            return self
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        """Run queued commands and return their replies."""
+        await self._stand_in._round_trip()
+        commands, self._commands = self._commands, []
+        return [
+            getattr(LocalRedisStandIn, f"_cmd_{name}")(self._stand_in, *args, **kwargs)
+            for name, args, kwargs in commands
+        ]
+
+    async def __aenter__(self) -> _Pipeline:
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self._commands = []
@@ -0,0 +1,66 @@
+"""
+Request tracing for Beginnings framework.
+
+This package records spans for requests, extension middleware, template
+rendering and storage calls, with W3C ``traceparent`` propagation, head
+and tail sampling, and batched OTLP/JSON export.
+"""
+
+from __future__ import annotations
+
+from beginnings.tracing.context import SpanContext, format_traceparent, parse_traceparent
+from beginnings.tracing.exporters import (
+    BatchSpanProcessor,
+    InMemoryExporter,
+    OTLPJsonFileExporter,
+    SpanExporter,
+    create_exporter,
+)
+from beginnings.tracing.middleware import TracingMiddleware
+from beginnings.tracing.sampling import HeadSampler, TailSampler
+from beginnings.tracing.spans import (
+    NonRecordingSpan,
+    Span,
+    SpanKind,
+    StatusCode,
+    current_span,
+    current_trace_ids,
+    start_span,
+)
+from beginnings.tracing.tracer import (
+    Tracer,
+    create_tracer_from_config,
+    get_tracer,
+    set_tracer,
+    trace_call,
+    trace_methods,
+    trace_middleware,
+)
+
+__all__ = [
+    "BatchSpanProcessor",
+    "HeadSampler",
+    "InMemoryExporter",
+    "NonRecordingSpan",
+    "OTLPJsonFileExporter",
+    "Span",
+    "SpanContext",
+    "SpanExporter",
+    "SpanKind",
+    "StatusCode",
+    "TailSampler",
+    "Tracer",
+    "TracingMiddleware",
+    "create_exporter",
+    "create_tracer_from_config",
+    "current_span",
+    "current_trace_ids",
+    "format_traceparent",
+    "get_tracer",
+    "parse_traceparent",
+    "set_tracer",
+    "start_span",
+    "trace_call",
+    "trace_methods",
+    "trace_middleware",
+]
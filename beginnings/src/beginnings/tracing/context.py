@@ -0,0 +1,105 @@
+"""
+Trace identifiers and W3C Trace Context propagation.
+
+This module generates trace and span IDs and parses and formats the
+``traceparent`` header defined by the W3C Trace Context specification.
+"""
+
+from __future__ import annotations
+
+import random
+
+# Trace flags bit marking the trace as sampled by the caller
+SAMPLED_FLAG = 0x01
+
+_HEX_DIGITS = frozenset("0123456789abcdef")
+
+
+class SpanContext:
+    """
+    Identifiers of a span, as propagated between services.
+
+    Trace IDs are 128-bit and span IDs 64-bit integers; neither is ever 0.
+    """
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: int, span_id: int, sampled: bool) -> None:
+        """
+        Initialize span context.
+
+        Args:
+            trace_id: Trace ID
+            span_id: Span ID
+            sampled: Whether the trace is recorded
+        """
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def trace_id_hex(self) -> str:
+        """Trace ID as 32 lowercase hex digits."""
+        return format(self.trace_id, "032x")
+
+    @property
+    def span_id_hex(self) -> str:
+        """Span ID as 16 lowercase hex digits."""
+        return format(self.span_id, "016x")
+
+
+def new_trace_id() -> int:
+    """Generate a random trace ID."""
+    return random.getrandbits(128) or 1
+
+
+def new_span_id() -> int:
+    """Generate a random span ID."""
+    return random.getrandbits(64) or 1
+
+
+def parse_traceparent(header: str) -> SpanContext | None:
+    """
+    Parse a ``traceparent`` header.
+
+    Headers of future versions are read by their version 00 fields, as the
+    specification requires.
+
+    Args:
+        header: Header value, e.g. ``00-<trace-id>-<parent-id>-<flags>``
+
+    Returns:
+        Context of the caller's span, or None if the header is invalid
+    """
+    header = header.strip()
+    if len(header) < 55 or (len(header) > 55 and header[55] != "-"):
+        return None
+
+    version, trace_id, span_id, flags = header[:2], header[3:35], header[36:52], header[53:55]
+    if header[2] != "-" or header[35] != "-" or header[52] != "-":
+        return None
+    if not _HEX_DIGITS.issuperset(version + trace_id + span_id + flags):
+        return None
+    if version == "ff" or (version == "00" and len(header) != 55):
+        return None
+
+    trace_id_value = int(trace_id, 16)
+    span_id_value = int(span_id, 16)
+    if trace_id_value == 0 or span_id_value == 0:
+        return None
+
+    return SpanContext(trace_id_value, span_id_value, bool(int(flags, 16) & SAMPLED_FLAG))
+
+
+def format_traceparent(context: SpanContext) -> str:
+    """
+    Format a ``traceparent`` header for a span context.
+
+    Args:
+        context: Context of the span calling out
+
+    Returns:
+        Version 00 header value
+    """
+    flags = SAMPLED_FLAG if context.sampled else 0
+    return f"00-{context.trace_id:032x}-{context.span_id:016x}-{flags:02x}"
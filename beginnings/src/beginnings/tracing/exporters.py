@@ -0,0 +1,319 @@
+"""
+Batching and export of finished spans.
+
+Finished traces are queued by ``BatchSpanProcessor`` and exported in
+batches from a background thread, so request handling never waits on
+the exporter. Spans are encoded as OTLP/JSON ``ExportTraceServiceRequest``
+messages, which OpenTelemetry collectors read with their ``otlpjsonfile``
+receiver.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from beginnings.monitoring import get_metrics_collector
+from beginnings.monitoring.logger import get_structured_logger
+from beginnings.tracing.spans import Span
+
+# Instrumentation scope of every exported span
+SCOPE_NAME = "beginnings"
+
+
+def encode_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Encode attributes as OTLP/JSON key-values.
+
+    Args:
+        attributes: Attribute values by name
+
+    Returns:
+        List of ``{"key": ..., "value": {...}}`` objects
+    """
+    encoded = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            any_value = {"boolValue": value}
+        elif isinstance(value, int):
+            # 64-bit integers are strings in OTLP/JSON
+            any_value = {"intValue": str(value)}
+        elif isinstance(value, float):
+            any_value = {"doubleValue": value}
+        else:
+            any_value = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": any_value})
+    return encoded
+
+
+def encode_span(span: Span) -> dict[str, Any]:
+    """
+    Encode a span as an OTLP/JSON span.
+
+    Args:
+        span: Ended span
+
+    Returns:
+        OTLP/JSON span object
+    """
+    encoded: dict[str, Any] = {
+        "traceId": span.context.trace_id_hex,
+        "spanId": span.context.span_id_hex,
+        "name": span.name,
+        "kind": int(span.kind),
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": encode_attributes(span.attributes),
+        "status": {"code": int(span.status)},
+    }
+    if span.parent_span_id is not None:
+        encoded["parentSpanId"] = format(span.parent_span_id, "016x")
+    if span.status_message:
+        encoded["status"]["message"] = span.status_message
+    return encoded
+
+
+def encode_spans(spans: list[Span], service_name: str) -> dict[str, Any]:
+    """
+    Encode spans as an OTLP/JSON ``ExportTraceServiceRequest``.
+
+    Args:
+        spans: Ended spans
+        service_name: Value of the ``service.name`` resource attribute
+
+    Returns:
+        OTLP/JSON export request
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": encode_attributes({"service.name": service_name})},
+            "scopeSpans": [{
+                "scope": {"name": SCOPE_NAME},
+                "spans": [encode_span(span) for span in spans],
+            }],
+        }]
+    }
+
+
+class SpanExporter(ABC):
+    """Abstract base class for span exporters."""
+
+    @abstractmethod
+    def export(self, spans: list[Span]) -> None:
+        """
+        Export a batch of spans.
+
+        Args:
+            spans: Ended spans
+        """
+        pass
+
+    def shutdown(self) -> None:
+        """Release the exporter's resources."""
+        pass
+
+
+class OTLPJsonFileExporter(SpanExporter):
+    """Appends each batch to a file as one line of OTLP/JSON."""
+
+    def __init__(self, path: str | Path, service_name: str = "beginnings") -> None:
+        """
+        Initialize OTLP/JSON file exporter.
+
+        Args:
+            path: File to append to; parent directories are created
+            service_name: Value of the ``service.name`` resource attribute
+        """
+        self.path = Path(path)
+        self.service_name = service_name
+
+    def export(self, spans: list[Span]) -> None:
+        """Append the batch to the file."""
+        line = json.dumps(encode_spans(spans, self.service_name), separators=(",", ":"))
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+class InMemoryExporter(SpanExporter):
+    """
+    Keeps exported spans in memory, standing in for a local collector.
+
+    Useful in development and tests to inspect the traces of recent
+    requests; only the most recent ``max_spans`` spans are kept.
+    """
+
+    def __init__(self, max_spans: int = 10000) -> None:
+        """
+        Initialize in-memory exporter.
+
+        Args:
+            max_spans: Maximum number of spans kept
+        """
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        """Keep the batch."""
+        with self._lock:
+            self.spans.extend(spans)
+
+    def get_finished_spans(self) -> list[Span]:
+        """Get the spans kept, oldest first."""
+        with self._lock:
+            return list(self.spans)
+
+    def get_trace(self, trace_id: str) -> list[Span]:
+        """
+        Get the spans kept of one trace.
+
+        Args:
+            trace_id: Trace ID as 32 hex digits
+
+        Returns:
+            Spans of the trace, in the order they ended
+        """
+        trace_id_value = int(trace_id, 16)
+        with self._lock:
+            return [span for span in self.spans if span.context.trace_id == trace_id_value]
+
+    def clear(self) -> None:
+        """Forget the spans kept."""
+        with self._lock:
+            self.spans.clear()
+
+
+class BatchSpanProcessor:
+    """
+    Queues the spans of finished traces and exports them in batches.
+
+    A daemon thread, started with the first trace, exports a batch every
+    ``schedule_delay_ms`` or as soon as ``max_batch_size`` spans are
+    queued. Spans arriving while ``max_queue_size`` are queued are dropped
+    and counted in the ``tracing_spans_dropped`` metric.
+    """
+
+    def __init__(
+        self,
+        exporter: SpanExporter,
+        max_queue_size: int = 2048,
+        max_batch_size: int = 512,
+        schedule_delay_ms: float = 5000
+    ) -> None:
+        """
+        Initialize batch span processor.
+
+        Args:
+            exporter: Exporter to send batches to
+            max_queue_size: Maximum number of spans queued
+            max_batch_size: Maximum number of spans per export
+            schedule_delay_ms: Delay between exports
+        """
+        self.exporter = exporter
+        self.max_queue_size = max_queue_size
+        self.max_batch_size = max_batch_size
+        self.schedule_delay = schedule_delay_ms / 1000
+        self.metrics = get_metrics_collector()
+        self.logger = get_structured_logger()
+
+        self._queue: deque[Span] = deque()
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker: threading.Thread | None = None
+        self._shutdown = False
+
+    def on_end(self, spans: list[Span]) -> None:
+        """
+        Queue the spans of a finished trace.
+
+        Args:
+            spans: Ended spans of the trace
+        """
+        with self._lock:
+            if self._shutdown:
+                return
+
+            free = self.max_queue_size - len(self._queue)
+            if free < len(spans):
+                self.metrics.increment_counter("tracing_spans_dropped", len(spans) - max(free, 0))
+                spans = spans[:max(free, 0)]
+            self._queue.extend(spans)
+
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="beginnings-span-export", daemon=True)
+                self._worker.start()
+            if len(self._queue) >= self.max_batch_size:
+                self._wakeup.set()
+
+    def force_flush(self) -> None:
+        """Export every queued span before returning."""
+        while self._export_batch():
+            pass
+
+    def shutdown(self) -> None:
+        """Stop the export thread, exporting the spans still queued."""
+        with self._lock:
+            if self._shutdown:
+                return
+            self._shutdown = True
+            worker = self._worker
+
+        self._wakeup.set()
+        if worker is not None:
+            worker.join(timeout=self.schedule_delay + 5)
+        self.force_flush()
+        self.exporter.shutdown()
+
+    def _run(self) -> None:
+        """Export batches until shut down."""
+        while not self._shutdown:
+            self._wakeup.wait(self.schedule_delay)
+            self._wakeup.clear()
+            while self._export_batch():
+                pass
+
+    def _export_batch(self) -> bool:
+        """Export up to one batch of queued spans, returning False if none were queued."""
+        with self._export_lock:
+            with self._lock:
+                count = min(len(self._queue), self.max_batch_size)
+                batch = [self._queue.popleft() for _ in range(count)]
+            if not batch:
+                return False
+
+            try:
+                self.exporter.export(batch)
+                self.metrics.increment_counter("tracing_spans_exported", len(batch))
+            except Exception as e:
+                self.metrics.increment_counter("tracing_export_errors")
+                self.logger.log_extension_error("tracing", e, {"spans": len(batch)})
+            return True
+
+
+def create_exporter(config: dict[str, Any], service_name: str = "beginnings") -> SpanExporter:
+    """
+    Create span exporter from configuration.
+
+    Args:
+        config: Export configuration, with ``type`` "file" or "memory"
+        service_name: Value of the ``service.name`` resource attribute
+
+    Returns:
+        Span exporter
+
+    Raises:
+        ValueError: If the exporter type is unknown
+    """
+    exporter_type = config.get("type", "file")
+
+    if exporter_type == "file":
+        return OTLPJsonFileExporter(config.get("path", "traces.jsonl"), service_name)
+    elif exporter_type == "memory":
+        return InMemoryExporter(config.get("max_spans", 10000))
+    else:
+        raise ValueError(f"Unknown span exporter type: {exporter_type}")
@@ -0,0 +1,72 @@
+"""
+ASGI middleware starting the trace of each request.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable
+
+from beginnings.tracing.spans import StatusCode
+from beginnings.tracing.tracer import Tracer
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that makes each HTTP request a trace.
+
+    The request's root span continues the trace of an incoming
+    ``traceparent`` header and is current while the request is handled,
+    so extension, template and storage spans nest under it. Once routed,
+    the span is named after the method and route path. 5xx responses and
+    unhandled exceptions set its status to ERROR.
+    """
+
+    def __init__(self, app: Any, tracer: Tracer) -> None:
+        """
+        Initialize tracing middleware.
+
+        Args:
+            app: ASGI application to wrap
+            tracer: Tracer starting the requests' traces
+        """
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: dict[str, Any], receive: Callable[..., Any], send: Callable[..., Any]) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        method = scope["method"]
+        span = self.tracer.start_request(method, traceparent)
+        if not span.recording:
+            with span:
+                await self.app(scope, receive, send)
+            return
+
+        span.set_attribute("http.request.method", method)
+        span.set_attribute("url.path", scope["path"])
+
+        async def send_with_status(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                span.set_attribute("http.response.status_code", status_code)
+                if status_code >= 500:
+                    span.set_status(StatusCode.ERROR)
+            await send(message)
+
+        with span:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router adds the matched route to the scope
+                route = scope.get("route")
+                if route is not None:
+                    span.name = f"{method} {route.path}"
+                    span.set_attribute("http.route", route.path)
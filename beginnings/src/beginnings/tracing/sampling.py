@@ -0,0 +1,111 @@
+"""
+Head and tail sampling of traces.
+
+Head sampling decides when a request starts whether its spans are
+recorded at all. Tail sampling decides, once a recorded trace is
+complete, whether it is exported, so errors and slow requests can be
+kept while most fast, successful ones are dropped.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import TYPE_CHECKING
+
+from beginnings.tracing.spans import StatusCode
+
+if TYPE_CHECKING:
+    from beginnings.tracing.context import SpanContext
+    from beginnings.tracing.spans import Span
+
+_TRACE_ID_LOW_BITS = (1 << 64) - 1
+
+
+class HeadSampler:
+    """
+    Samples a fixed ratio of traces by their trace ID.
+
+    The decision is a function of the trace ID, so every service using the
+    same rate makes the same decision for a trace. With ``parent_based``,
+    requests carrying a ``traceparent`` follow the caller's decision.
+    """
+
+    def __init__(self, rate: float, parent_based: bool = True) -> None:
+        """
+        Initialize head sampler.
+
+        Args:
+            rate: Ratio of traces to record, from 0.0 to 1.0
+            parent_based: Follow the sampled flag of the caller's span
+        """
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"Sampling rate must be between 0.0 and 1.0, got {rate}")
+
+        self.rate = rate
+        self.parent_based = parent_based
+        self._threshold = int(rate * (1 << 64))
+
+    def should_sample(self, trace_id: int, parent: SpanContext | None = None) -> bool:
+        """
+        Decide whether to record a trace.
+
+        Args:
+            trace_id: Trace ID
+            parent: Context of the caller's span, if the request carried one
+
+        Returns:
+            True if the trace should be recorded
+        """
+        if parent is not None and self.parent_based:
+            return parent.sampled
+        return (trace_id & _TRACE_ID_LOW_BITS) < self._threshold
+
+
+class TailSampler:
+    """
+    Decides which complete traces to export.
+
+    Traces containing an error span, or whose root span took at least
+    ``latency_threshold_ms``, are always kept; a ``rate`` ratio of the
+    others is kept at random.
+    """
+
+    def __init__(
+        self,
+        keep_errors: bool = True,
+        latency_threshold_ms: float | None = None,
+        rate: float = 1.0
+    ) -> None:
+        """
+        Initialize tail sampler.
+
+        Args:
+            keep_errors: Always keep traces containing an error span
+            latency_threshold_ms: Always keep traces at least this slow
+            rate: Ratio of the other traces to keep, from 0.0 to 1.0
+        """
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError(f"Sampling rate must be between 0.0 and 1.0, got {rate}")
+
+        self.keep_errors = keep_errors
+        self.latency_threshold_ns = None if latency_threshold_ms is None else int(latency_threshold_ms * 1_000_000)
+        self.rate = rate
+
+    def should_keep(self, root: Span, spans: list[Span]) -> bool:
+        """
+        Decide whether to export a complete trace.
+
+        Args:
+            root: Root span of the trace
+            spans: Ended spans of the trace, including the root
+
+        Returns:
+            True if the trace should be exported
+        """
+        if self.rate >= 1.0:
+            return True
+        if self.keep_errors and any(span.status is StatusCode.ERROR for span in spans):
+            return True
+        if self.latency_threshold_ns is not None and root.duration_ns >= self.latency_threshold_ns:
+            return True
+        return random.random() < self.rate
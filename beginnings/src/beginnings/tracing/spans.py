@@ -0,0 +1,310 @@
+"""
+Spans and the propagation of the current span.
+
+The current span is held in a context variable, so it follows a request
+through ``await`` and into tasks started while handling it. Spans of
+sampled requests are buffered per trace until the request's root span
+ends; unsampled requests get a ``NonRecordingSpan`` that only carries
+their IDs, and spans started under it are the shared ``NOOP_SPAN``.
+"""
+
+from __future__ import annotations
+
+from contextvars import ContextVar, Token
+from enum import IntEnum
+from time import time_ns
+from typing import TYPE_CHECKING, Any
+
+from beginnings.tracing.context import SpanContext, new_span_id
+
+if TYPE_CHECKING:
+    from beginnings.tracing.tracer import Tracer
+
+
+class SpanKind(IntEnum):
+    """Span kinds, numbered as in OTLP."""
+
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+
+class StatusCode(IntEnum):
+    """Span status codes, numbered as in OTLP."""
+
+    UNSET = 0
+    OK = 1
+    ERROR = 2
+
+
+_current_span: ContextVar[Span | NonRecordingSpan | None] = ContextVar("beginnings_current_span", default=None)
+
+
+class Span:
+    """
+    A recorded operation of a sampled trace.
+
+    Used as a context manager, a span becomes the current span until it
+    exits, then ends. An exception leaving the span sets its status to
+    ERROR, except HTTP exceptions with a status code below 500.
+    """
+
+    __slots__ = (
+        "name", "context", "parent_span_id", "kind", "attributes",
+        "start_time", "end_time", "status", "status_message", "_trace", "_token",
+    )
+
+    recording = True
+
+    def __init__(
+        self,
+        trace: _Trace,
+        name: str,
+        context: SpanContext,
+        parent_span_id: int | None,
+        kind: SpanKind,
+        attributes: dict[str, Any] | None
+    ) -> None:
+        """
+        Initialize span, starting it.
+
+        Args:
+            trace: Buffer of the spans of the trace
+            name: Operation name
+            context: IDs of the span
+            parent_span_id: Span ID of the parent, None for a root span
+            kind: Span kind
+            attributes: Initial attributes
+        """
+        self.name = name
+        self.context = context
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = StatusCode.UNSET
+        self.status_message: str | None = None
+        self._trace = trace
+        self._token: Token[Any] | None = None
+        self.end_time = 0
+        self.start_time = time_ns()
+
+    @property
+    def duration_ns(self) -> int:
+        """Duration of the span, 0 if it hasn't ended."""
+        return self.end_time - self.start_time if self.end_time else 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """
+        Set an attribute.
+
+        Args:
+            key: Attribute name
+            value: String, bool, int or float value
+        """
+        self.attributes[key] = value
+
+    def set_status(self, status: StatusCode, message: str | None = None) -> None:
+        """
+        Set the status.
+
+        Args:
+            status: Status code
+            message: Description of an error
+        """
+        self.status = status
+        self.status_message = message
+
+    def record_exception(self, exception: BaseException) -> None:
+        """
+        Record an exception that ended the operation.
+
+        Args:
+            exception: Exception raised
+        """
+        status_code = getattr(exception, "status_code", None)
+        if isinstance(status_code, int):
+            self.attributes["http.response.status_code"] = status_code
+            if status_code < 500:
+                return
+
+        self.attributes["exception.type"] = type(exception).__name__
+        self.set_status(StatusCode.ERROR, str(exception) or type(exception).__name__)
+
+    def child(self, name: str, attributes: dict[str, Any] | None = None, kind: SpanKind = SpanKind.INTERNAL) -> Span:
+        """
+        Start a child span.
+
+        Args:
+            name: Operation name
+            attributes: Initial attributes
+            kind: Span kind
+
+        Returns:
+            Started span
+        """
+        context = SpanContext(self.context.trace_id, new_span_id(), True)
+        return Span(self._trace, name, context, self.context.span_id, kind, attributes)
+
+    def end(self) -> None:
+        """End the span; ending it again has no effect."""
+        if not self.end_time:
+            self.end_time = time_ns()
+            self._trace.on_end(self)
+
+    def __enter__(self) -> Span:
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.record_exception(exc)
+        self.end()
+
+
+class NonRecordingSpan:
+    """
+    The root span of an unsampled request.
+
+    It records nothing, but is current while the request is handled, so
+    the request's trace and span IDs still reach its log entries and any
+    ``traceparent`` headers sent on.
+    """
+
+    __slots__ = ("context", "_token")
+
+    recording = False
+
+    def __init__(self, context: SpanContext) -> None:
+        """
+        Initialize non-recording span.
+
+        Args:
+            context: IDs of the span
+        """
+        self.context = context
+        self._token: Token[Any] | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Ignore an attribute."""
+
+    def set_status(self, status: StatusCode, message: str | None = None) -> None:
+        """Ignore a status."""
+
+    def record_exception(self, exception: BaseException) -> None:
+        """Ignore an exception."""
+
+    def end(self) -> None:
+        """Do nothing, as nothing was recorded."""
+
+    def __enter__(self) -> NonRecordingSpan:
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        _current_span.reset(self._token)
+
+
+class _NoopSpan:
+    """Span started outside a sampled trace; it is never current and records nothing."""
+
+    __slots__ = ()
+
+    recording = False
+    context = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_status(self, status: StatusCode, message: str | None = None) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type: Any, exc: BaseException | None, tb: Any) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Buffer of the ended spans of a sampled trace, handed to the tracer when its root ends."""
+
+    __slots__ = ("tracer", "root", "spans", "dropped", "finished")
+
+    def __init__(self, tracer: Tracer) -> None:
+        self.tracer = tracer
+        self.root: Span | None = None
+        self.spans: list[Span] = []
+        self.dropped = 0
+        self.finished = False
+
+    def on_end(self, span: Span) -> None:
+        """Buffer an ended span, finishing the trace if it is the root."""
+        if self.finished:
+            # Spans ending after the root, e.g. of background tasks, are dropped
+            self.tracer.record_dropped(1)
+            return
+
+        if len(self.spans) < self.tracer.max_spans_per_trace:
+            self.spans.append(span)
+        else:
+            self.dropped += 1
+
+        if span is self.root:
+            self.finished = True
+            self.tracer.finish_trace(self)
+
+
+def current_span() -> Span | NonRecordingSpan | None:
+    """
+    Get the current span.
+
+    Returns:
+        Current span, or None outside a traced request
+    """
+    return _current_span.get()
+
+
+def start_span(name: str, attributes: dict[str, Any] | None = None, kind: SpanKind = SpanKind.INTERNAL) -> Span | _NoopSpan:
+    """
+    Start a child of the current span.
+
+    Use as a context manager, so the span is current within the block and
+    ends with it. Outside a sampled trace the shared no-op span is
+    returned, so instrumentation costs one context variable lookup.
+
+    Args:
+        name: Operation name
+        attributes: Initial attributes
+        kind: Span kind
+
+    Returns:
+        Started span
+    """
+    parent = _current_span.get()
+    if parent is None or not parent.recording:
+        return NOOP_SPAN
+    return parent.child(name, attributes, kind)
+
+
+def current_trace_ids() -> tuple[str, str] | None:
+    """
+    Get the IDs of the current span, e.g. to stamp them into log entries.
+
+    Returns:
+        Trace ID and span ID as hex strings, or None outside a traced request
+    """
+    span = _current_span.get()
+    if span is None:
+        return None
+    context = span.context
+    return format(context.trace_id, "032x"), format(context.span_id, "016x")
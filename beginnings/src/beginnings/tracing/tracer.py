@@ -0,0 +1,259 @@
+"""
+Tracer and instrumentation helpers.
+
+The tracer starts the root span of each request, applying head sampling,
+and hands complete traces through tail sampling to the span processor.
+The helpers wrap middleware layers and storage backends in spans; they
+leave their targets untouched unless a tracer is configured.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+from typing import Any, Callable, Iterable
+
+from beginnings.monitoring import get_metrics_collector
+from beginnings.tracing.context import SpanContext, new_span_id, new_trace_id, parse_traceparent
+from beginnings.tracing.exporters import BatchSpanProcessor, create_exporter
+from beginnings.tracing.sampling import HeadSampler, TailSampler
+from beginnings.tracing.spans import NonRecordingSpan, Span, SpanKind, _current_span, _Trace
+
+
+class Tracer:
+    """
+    Creates the traces of requests.
+
+    Requests not head sampled get a ``NonRecordingSpan``, so they still
+    have IDs for their log entries at almost no cost. Sampled requests
+    record up to ``max_spans_per_trace`` spans, exported if the tail
+    sampler keeps the trace once its root span ends.
+    """
+
+    def __init__(
+        self,
+        processor: BatchSpanProcessor,
+        head_sampler: HeadSampler | None = None,
+        tail_sampler: TailSampler | None = None,
+        max_spans_per_trace: int = 1000
+    ) -> None:
+        """
+        Initialize tracer.
+
+        Args:
+            processor: Processor exporting kept traces
+            head_sampler: Head sampler (records every trace by default)
+            tail_sampler: Tail sampler (keeps every trace by default)
+            max_spans_per_trace: Maximum number of spans recorded per trace
+        """
+        self.processor = processor
+        self.head_sampler = head_sampler or HeadSampler(1.0)
+        self.tail_sampler = tail_sampler or TailSampler()
+        self.max_spans_per_trace = max_spans_per_trace
+        self.metrics = get_metrics_collector()
+
+    def start_request(
+        self,
+        name: str,
+        traceparent: str | None = None,
+        attributes: dict[str, Any] | None = None,
+        kind: SpanKind = SpanKind.SERVER
+    ) -> Span | NonRecordingSpan:
+        """
+        Start the root span of a request.
+
+        Args:
+            name: Operation name
+            traceparent: Incoming ``traceparent`` header, continuing the caller's trace
+            attributes: Initial attributes
+            kind: Span kind
+
+        Returns:
+            Started span, recording only if the trace is sampled
+        """
+        parent = parse_traceparent(traceparent) if traceparent else None
+        trace_id = parent.trace_id if parent is not None else new_trace_id()
+
+        if not self.head_sampler.should_sample(trace_id, parent):
+            return NonRecordingSpan(SpanContext(trace_id, new_span_id(), False))
+
+        trace = _Trace(self)
+        parent_span_id = parent.span_id if parent is not None else None
+        span = Span(trace, name, SpanContext(trace_id, new_span_id(), True), parent_span_id, kind, attributes)
+        trace.root = span
+        return span
+
+    def finish_trace(self, trace: _Trace) -> None:
+        """
+        Pass a trace whose root span ended through tail sampling to the processor.
+
+        Args:
+            trace: Buffered trace
+        """
+        if trace.dropped:
+            self.record_dropped(trace.dropped)
+        if self.tail_sampler.should_keep(trace.root, trace.spans):
+            self.processor.on_end(trace.spans)
+
+    def record_dropped(self, count: int) -> None:
+        """
+        Count spans recorded but not buffered.
+
+        Args:
+            count: Number of spans dropped
+        """
+        self.metrics.increment_counter("tracing_spans_dropped", count)
+
+    def force_flush(self) -> None:
+        """Export every kept span before returning."""
+        self.processor.force_flush()
+
+    def shutdown(self) -> None:
+        """Export every kept span and stop exporting."""
+        self.processor.shutdown()
+
+
+_tracer: Tracer | None = None
+
+
+def set_tracer(tracer: Tracer | None) -> None:
+    """
+    Set the global tracer used by the instrumentation helpers.
+
+    Args:
+        tracer: Tracer, or None to disable tracing
+    """
+    global _tracer
+    _tracer = tracer
+
+
+def get_tracer() -> Tracer | None:
+    """
+    Get the global tracer.
+
+    Returns:
+        Tracer, or None if tracing is disabled
+    """
+    return _tracer
+
+
+def trace_call(
+    call: Callable[..., Any],
+    name: str,
+    attributes: dict[str, Any] | None = None,
+    kind: SpanKind = SpanKind.INTERNAL
+) -> Callable[..., Any]:
+    """
+    Wrap a function so each call within a sampled trace is a span.
+
+    Args:
+        call: Synchronous or asynchronous function
+        name: Span name
+        attributes: Attributes of every span
+        kind: Span kind
+
+    Returns:
+        Wrapped function
+    """
+    if inspect.iscoroutinefunction(call):
+        @functools.wraps(call)
+        async def traced(*args: Any, **kwargs: Any) -> Any:
+            parent = _current_span.get()
+            if parent is None or not parent.recording:
+                return await call(*args, **kwargs)
+            with parent.child(name, attributes, kind):
+                return await call(*args, **kwargs)
+
+        return traced
+
+    @functools.wraps(call)
+    def traced_sync(*args: Any, **kwargs: Any) -> Any:
+        parent = _current_span.get()
+        if parent is None or not parent.recording:
+            return call(*args, **kwargs)
+        with parent.child(name, attributes, kind):
+            return call(*args, **kwargs)
+
+    return traced_sync
+
+
+def trace_middleware(name: str, middleware: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap an extension's middleware so its layer of each request is a span.
+
+    Args:
+        name: Extension name, used as the span name
+        middleware: Middleware returning the layer around an endpoint
+
+    Returns:
+        Middleware returning the traced layer
+    """
+    attributes = {"beginnings.extension": name}
+
+    @functools.wraps(middleware)
+    def traced_middleware(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        return trace_call(middleware(endpoint), name, attributes)
+
+    return traced_middleware
+
+
+def trace_methods(target: Any, prefix: str, method_names: Iterable[str], attributes: dict[str, Any] | None = None) -> None:
+    """
+    Trace calls to methods of an object, e.g. a storage backend.
+
+    Each method found is replaced on the instance with one creating a
+    span named ``<prefix>.<method>``. Does nothing if tracing is disabled.
+
+    Args:
+        target: Object whose methods to trace
+        prefix: Span name prefix
+        method_names: Names of the methods
+        attributes: Attributes of every span
+    """
+    if _tracer is None:
+        return
+
+    for method_name in method_names:
+        method = getattr(target, method_name, None)
+        if callable(method):
+            setattr(target, method_name, trace_call(method, f"{prefix}.{method_name}", attributes, SpanKind.CLIENT))
+
+
+def create_tracer_from_config(config: dict[str, Any]) -> Tracer | None:
+    """
+    Create tracer from configuration.
+
+    Args:
+        config: Configuration dictionary
+
+    Returns:
+        Tracer instance or None if ``tracing`` is not enabled
+    """
+    tracing_config = config.get("tracing", {})
+    if not tracing_config.get("enabled", False):
+        return None
+
+    service_name = tracing_config.get("service_name") or config.get("app", {}).get("name", "beginnings")
+    sampling_config = tracing_config.get("sampling", {})
+    tail_config = sampling_config.get("tail", {})
+    export_config = tracing_config.get("export", {})
+
+    processor = BatchSpanProcessor(
+        create_exporter(export_config, service_name),
+        max_queue_size=export_config.get("queue_size", 2048),
+        max_batch_size=export_config.get("batch_size", 512),
+        schedule_delay_ms=export_config.get("schedule_delay_ms", 5000)
+    )
+    return Tracer(
+        processor,
+        head_sampler=HeadSampler(
+            sampling_config.get("head_rate", 0.01),
+            parent_based=sampling_config.get("parent_based", True)
+        ),
+        tail_sampler=TailSampler(
+            keep_errors=tail_config.get("keep_errors", True),
+            latency_threshold_ms=tail_config.get("latency_threshold_ms"),
+            rate=tail_config.get("rate", 1.0)
+        ),
+        max_spans_per_trace=tracing_config.get("max_spans_per_trace", 1000)
+    )
@@ -0,0 +1,407 @@
+"""Tests for admission control extension."""
+
+import asyncio
+import json
+import time
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.admission_control import AdmissionControlExtension
+from beginnings.extensions.admission_control.limiter import ConcurrencyLimiter
+from beginnings.extensions.admission_control.limits import AIMDLimit, GradientLimit, create_limit
+from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.responses import PreparedResponse
+from beginnings.routing.middleware import MiddlewareChainBuilder
+
+
+def _make_request(path="/api/data", headers=None):
+    """Build a minimal ASGI request."""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": ("198.51.100.7", 54321),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+def _make_extension(config=None):
+    """Create extension with a silent logger."""
+    extension = AdmissionControlExtension(config or {})
+    extension.logger = MagicMock()
+    extension.metrics = MagicMock()
+    return extension
+
+
+def _fixed_limiter(limit, queue_size=10, priorities=4):
+    """Create a limiter whose limit never adapts."""
+    return ConcurrencyLimiter(AIMDLimit({"initial": limit, "min": limit, "max": limit}), queue_size, priorities)
+
+
+async def _ok(request):
+    """Downstream handler."""
+    return MagicMock(status_code=200)
+
+
+class TestLimits:
+    """Test adaptive limit algorithms."""
+
+    def test_aimd_backs_off_on_slow_requests(self):
+        """Test AIMD shrinks on slow or failed requests and grows while in use."""
+        limit = AIMDLimit({"initial": 20, "latency_threshold_ms": 100})
+
+        limit.on_sample(0.5, 20, False)
+        assert limit.current == 18
+
+        limit.on_sample(0.01, 20, True)
+        assert limit.current == 16
+
+        for _ in range(100):
+            limit.on_sample(0.01, 20, False)
+        assert limit.current > 16
+
+    def test_aimd_does_not_grow_unused_limit(self):
+        """Test AIMD leaves the limit alone when little of it is in use."""
+        limit = AIMDLimit({"initial": 20})
+
+        for _ in range(100):
+            limit.on_sample(0.01, 2, False)
+
+        assert limit.current == 20
+
+    def test_gradient_shrinks_when_latency_rises(self):
+        """Test the gradient limit falls toward its minimum as latency climbs."""
+        limit = GradientLimit({"initial": 50, "min": 5})
+        for _ in range(200):
+            limit.on_sample(0.01, 50, False)
+        grown = limit.current
+
+        for _ in range(200):
+            limit.on_sample(0.2, 50, False)
+
+        assert limit.current < grown / 4
+        assert limit.current >= 5
+
+    def test_gradient_grows_at_steady_latency(self):
+        """Test the gradient limit probes upward while latency stays flat."""
+        limit = GradientLimit({"initial": 10, "max": 40})
+
+        for _ in range(200):
+            limit.on_sample(0.01, limit.current, False)
+
+        assert limit.current == 40
+
+    def test_unknown_algorithm(self):
+        """Test unknown algorithms are rejected."""
+        with pytest.raises(ValueError, match="Unknown admission control algorithm"):
+            create_limit({"algorithm": "vegas"})
+
+
+class TestConcurrencyLimiter:
+    """Test slots, queueing and deadlines."""
+
+    @pytest.mark.asyncio
+    async def test_waiters_admitted_by_priority(self):
+        """Test freed slots go to the most important waiter first."""
+        limiter = _fixed_limiter(1)
+        assert await limiter.acquire(2, 1.0)
+        admitted = []
+
+        async def wait(name, priority):
+            if await limiter.acquire(priority, 1.0):
+                admitted.append(name)
+
+        tasks = [asyncio.ensure_future(wait(name, priority)) for name, priority in [("low", 3), ("critical", 0), ("normal", 2)]]
+        await asyncio.sleep(0)
+        for _ in range(3):
+            limiter.release()
+            await asyncio.sleep(0)
+        await asyncio.gather(*tasks)
+
+        assert admitted == ["critical", "normal", "low"]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_displaces_less_important(self):
+        """Test a full queue turns away its least important waiter for a more important newcomer."""
+        limiter = _fixed_limiter(1, queue_size=1)
+        assert await limiter.acquire(2, 1.0)
+
+        low = asyncio.ensure_future(limiter.acquire(3, 1.0))
+        await asyncio.sleep(0)
+        assert not await limiter.acquire(3, 1.0)
+
+        high = asyncio.ensure_future(limiter.acquire(1, 1.0))
+        await asyncio.sleep(0)
+        assert not await low
+
+        limiter.release()
+        assert await high
+
+    @pytest.mark.asyncio
+    async def test_waiter_gives_up_at_deadline(self):
+        """Test waiters are turned away once their timeout passes."""
+        limiter = _fixed_limiter(1)
+        assert await limiter.acquire(2, 1.0)
+
+        start_time = time.monotonic()
+        assert not await limiter.acquire(2, 0.05)
+
+        assert time.monotonic() - start_time < 0.5
+        assert limiter.waiting == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_frees_its_place(self):
+        """Test cancelled waiters leave the queue without leaking slots."""
+        limiter = _fixed_limiter(1)
+        assert await limiter.acquire(2, 1.0)
+
+        waiter = asyncio.ensure_future(limiter.acquire(2, 1.0))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.waiting == 0
+        limiter.release()
+        assert limiter.in_flight == 0
+
+
+class TestAdmissionControlExtension:
+    """Test middleware admission and rejection."""
+
+    @pytest.mark.asyncio
+    async def test_rejects_with_prepared_503(self):
+        """Test requests that cannot be admitted get a pre-serialized 503 with Retry-After."""
+        extension = _make_extension({"limit": {"initial": 1, "min": 1, "max": 1}, "queue": {"size": 0}, "retry_after": 2})
+        middleware = extension.get_middleware_factory()({})
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return MagicMock(status_code=200)
+
+        first = asyncio.ensure_future(middleware(_make_request(), slow))
+        await asyncio.sleep(0)
+        json_response = await middleware(_make_request(), _ok)
+        html_response = await middleware(_make_request("/page"), _ok)
+        release.set()
+        await first
+
+        assert isinstance(json_response, PreparedResponse)
+        assert json_response.status_code == 503
+        assert json_response.headers["retry-after"] == "2"
+        assert json.loads(json_response.body) == {"error": "Service overloaded", "retry_after": 2}
+        assert html_response.headers["content-type"] == "text/html; charset=utf-8"
+        assert extension.get_status() == {"limit": 1, "in_flight": 0, "waiting": 0}
+
+    @pytest.mark.asyncio
+    async def test_authenticated_and_critical_routes_first(self):
+        """Test route priority and authenticated clients are served ahead of anonymous ones."""
+        extension = _make_extension({"limit": {"initial": 1, "min": 1, "max": 1}})
+        factory = extension.get_middleware_factory()
+        normal = factory({})
+        health = factory({"admission_control": {"priority": "critical"}})
+        release = asyncio.Event()
+        order = []
+
+        async def hold(request):
+            await release.wait()
+            return MagicMock(status_code=200)
+
+        def handler(name):
+            async def call_next(request):
+                order.append(name)
+                return MagicMock(status_code=200)
+            return call_next
+
+        first = asyncio.ensure_future(normal(_make_request(), hold))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(normal(_make_request(), handler("anonymous"))),
+            asyncio.ensure_future(normal(_make_request(headers={"cookie": "sessionid=s1"}), handler("session"))),
+            asyncio.ensure_future(health(_make_request("/health"), handler("health"))),
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiters)
+
+        assert order == ["health", "session", "anonymous"]
+
+    @pytest.mark.asyncio
+    async def test_route_limit(self):
+        """Test a route's own limit rejects while the global limit has room."""
+        extension = _make_extension({"queue": {"size": 0}})
+        middleware = extension.get_middleware_factory()({"admission_control": {"limit": {"initial": 1, "max": 1}}})
+        release = asyncio.Event()
+
+        async def slow(request):
+            await release.wait()
+            return MagicMock(status_code=200)
+
+        first = asyncio.ensure_future(middleware(_make_request(), slow))
+        await asyncio.sleep(0)
+        response = await middleware(_make_request(), _ok)
+        release.set()
+        await first
+
+        assert response.status_code == 503
+        extension.metrics.increment_counter.assert_called_once_with("admission_rejected_total", 1, {"limit": "route"})
+        assert extension.get_status()["in_flight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_while_waiting_for_global_limit(self):
+        """Test a request cancelled in the global queue gives back its route slot."""
+        extension = _make_extension({"limit": {"initial": 1, "min": 1, "max": 1}, "queue": {"timeout_ms": 50}})
+        factory = extension.get_middleware_factory()
+        other = factory({})
+        limited = factory({"admission_control": {"limit": {"initial": 1, "max": 1}}})
+        release = asyncio.Event()
+
+        async def hold(request):
+            await release.wait()
+            return MagicMock(status_code=200)
+
+        first = asyncio.ensure_future(other(_make_request(), hold))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(limited(_make_request(), _ok))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        release.set()
+        await first
+
+        response = await limited(_make_request(), _ok)
+        assert response.status_code == 200
+        assert extension.get_status() == {"limit": 1, "in_flight": 0, "waiting": 0}
+
+    def test_route_opt_out(self):
+        """Test routes can disable admission control."""
+        extension = _make_extension()
+
+        assert extension.should_apply_to_route("/", ["GET"], {})
+        assert not extension.should_apply_to_route("/", ["GET"], {"admission_control": {"enabled": False}})
+
+    def test_validate_config(self):
+        """Test invalid priorities and limits are reported."""
+        extension = _make_extension({
+            "default_priority": "urgent",
+            "limit": {"min": 10, "max": 5},
+            "queue": {"size": -1}
+        })
+
+        errors = extension.validate_config()
+
+        assert any("default_priority 'urgent'" in error for error in errors)
+        assert any("queue size" in error for error in errors)
+        assert any("1 <= min <= max" in error for error in errors)
+
+    def test_runs_after_rate_limiting(self):
+        """Test admission control runs after the blocklist and rate limiting, before auth."""
+        execution_log = []
+
+        def make_extension(name):
+            class _Recording(BaseExtension):
+                def get_middleware_factory(self):
+                    def factory(route_config):
+                        def middleware(endpoint):
+                            def wrapped():
+                                execution_log.append(name)
+                                return endpoint()
+                            return wrapped
+                        return middleware
+                    return factory
+
+                def should_apply_to_route(self, path, methods, route_config):
+                    return True
+
+            _Recording.__name__ = name
+            return _Recording({})
+
+        manager = MagicMock()
+        manager.get_loaded_extensions.return_value = [
+            make_extension("AuthExtension"),
+            make_extension("AdmissionControlExtension"),
+            make_extension("RateLimitExtension"),
+        ]
+
+        chain = MiddlewareChainBuilder(manager).build_middleware_chain("/", ["GET"], {})
+        chain(lambda: None)()
+
+        assert execution_log == ["RateLimitExtension", "AdmissionControlExtension", "AuthExtension"]
+
+
+async def _run_overload(extension, capacity, service_seconds, overload, duration, deadline):
+    """
+    Drive a simulated server at a multiple of its capacity.
+
+    The handler shares ``capacity`` workers between all requests it is
+    serving, so each takes longer the more run at once. Returns goodput:
+    successful responses within the client deadline per second, as a
+    fraction of the server's capacity.
+    """
+    active = 0
+
+    async def handler(request):
+        nonlocal active
+        active += 1
+        try:
+            await asyncio.sleep(service_seconds * max(1.0, active / capacity))
+        finally:
+            active -= 1
+        return MagicMock(status_code=200)
+
+    middleware = extension.get_middleware_factory()({}) if extension else None
+    good = 0
+
+    async def client():
+        nonlocal good
+        start_time = time.monotonic()
+        request = _make_request()
+        response = await (middleware(request, handler) if middleware else handler(request))
+        if response.status_code == 200 and time.monotonic() - start_time <= deadline:
+            good += 1
+
+    interval = service_seconds / capacity / overload
+    tasks = []
+    start_time = time.monotonic()
+    sent = 0
+    while time.monotonic() - start_time < duration:
+        # Open-loop arrivals: keep to schedule even if the event loop lags
+        due = int((time.monotonic() - start_time) / interval) + 1
+        for _ in range(due - sent):
+            tasks.append(asyncio.ensure_future(client()))
+        sent = due
+        await asyncio.sleep(interval)
+
+    # Whatever has not finished within the deadline no longer counts
+    await asyncio.wait(tasks, timeout=deadline)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    capacity_per_second = capacity / service_seconds
+    return good / duration / capacity_per_second
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+@pytest.mark.parametrize("algorithm", ["gradient", "aimd"])
+async def test_goodput_under_3x_overload(algorithm):
+    """Load test: goodput holds up at 3x overload with admission control and collapses without."""
+    params = {"capacity": 10, "service_seconds": 0.05, "overload": 3, "duration": 2.0, "deadline": 0.5}
+    extension = _make_extension({
+        "limit": {"algorithm": algorithm, "initial": 10, "min": 2, "max": 200, "latency_threshold_ms": 100},
+        "queue": {"size": 20, "timeout_ms": 200}
+    })
+
+    unprotected = await _run_overload(None, **params)
+    protected = await _run_overload(extension, **params)
+
+    assert protected > 0.6
+    assert protected > unprotected * 2
@@ -3,10 +3,11 @@
 import pytest
 from unittest.mock import AsyncMock, MagicMock
 
-from fastapi import Request
+from fastapi import HTTPException, Request
 from fastapi.responses import JSONResponse, RedirectResponse
 
 from beginnings.extensions.auth.extension import AuthExtension
+from beginnings.extensions.auth.hashing import PasswordHashingBusyError
 from beginnings.extensions.auth.providers.base import User
 
 
@@ -260,6 +261,28 @@ class TestAuthExtension:
         assert user.username == "testuser"
         assert "access_token" in tokens
     
+    async def test_middleware_hashing_busy(self, auth_extension, mock_request):
+        """Test a full password hashing queue is a 503 with Retry-After, not a 401."""
+        jwt_provider = auth_extension.providers["jwt"]
+        jwt_provider.authenticate = AsyncMock(side_effect=PasswordHashingBusyError("busy", retry_after=3))
+        middleware = auth_extension.get_middleware_factory()({"auth": {"required": True}})
+        
+        response = await middleware(mock_request, AsyncMock())
+        
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "3"
+    
+    async def test_login_user_hashing_busy(self, auth_extension, mock_request):
+        """Test login while the hashing queue is full raises a 503."""
+        jwt_provider = auth_extension.providers["jwt"]
+        jwt_provider.login = AsyncMock(side_effect=PasswordHashingBusyError("busy", retry_after=2))
+        
+        with pytest.raises(HTTPException) as exc_info:
+            await auth_extension.login_user(mock_request, "testuser", "password123")
+        
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.headers == {"Retry-After": "2"}
+    
     async def test_logout_user(self, auth_extension, mock_request, test_user):
         """Test user logout."""
         logout_data = await auth_extension.logout_user(mock_request, test_user)
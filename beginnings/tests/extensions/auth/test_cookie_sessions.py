@@ -0,0 +1,248 @@
+"""Tests for stateless cookie sessions."""
+
+import base64
+import os
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.auth.cookie_sessions import (
+    MAX_COOKIE_VALUE_SIZE,
+    CookieSessionStorage,
+    SessionRevocationStore,
+)
+from beginnings.extensions.auth.providers.base import AuthenticationError, User
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.extensions.redis_connections import register_redis_connection, release_redis_connection
+from beginnings.testing.redis_stand_in import LocalRedisStandIn
+
+OLD_KEY = "old-cookie-session-key-that-is-long-enough-1234"
+NEW_KEY = "new-cookie-session-key-that-is-long-enough-5678"
+
+
+def _request(cookie_value=None):
+    """Create a mock request carrying a session cookie."""
+    request = MagicMock(spec=Request)
+    request.headers = {"user-agent": "pytest"}
+    request.cookies = {"sessionid": cookie_value} if cookie_value else {}
+    request.client = MagicMock(host="127.0.0.1")
+    return request
+
+
+def _provider(**storage):
+    """Create a session provider with cookie storage."""
+    return SessionProvider({"storage": {"type": "cookie", "secret_keys": [NEW_KEY], **storage}})
+
+
+class TestCookieSessionStorage:
+    """Test sealing, rotation and tamper detection."""
+
+    async def test_round_trip(self):
+        """Test a sealed session opens to the same data."""
+        storage = CookieSessionStorage({"secret_keys": [NEW_KEY]})
+
+        value = await storage.save("sid", {"user_id": "1", "roles": ["admin"]}, 60)
+
+        assert await storage.get(value) == {"user_id": "1", "roles": ["admin"]}
+        assert b"admin" not in base64.urlsafe_b64decode(value + "==")
+
+    async def test_tampered_cookie_rejected(self):
+        """Test any modified byte invalidates the cookie."""
+        storage = CookieSessionStorage({"secret_keys": [NEW_KEY]})
+        value = await storage.save("sid", {"user_id": "1"}, 60)
+        raw = bytearray(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+        raw[-1] ^= 1
+        tampered = base64.urlsafe_b64encode(bytes(raw)).rstrip(b"=").decode()
+
+        assert await storage.get(tampered) is None
+        assert await storage.get("not-a-cookie") is None
+        assert await storage.get("") is None
+
+    async def test_expired_cookie_rejected(self):
+        """Test the expiry inside the payload is enforced."""
+        storage = CookieSessionStorage({"secret_keys": [NEW_KEY]})
+        with patch("time.time", return_value=1000.0):
+            value = await storage.save("sid", {"user_id": "1"}, 60)
+        with patch("time.time", return_value=1061.0):
+            assert await storage.get(value) is None
+
+    async def test_key_rotation(self):
+        """Test cookies sealed with a retired key still open while it is listed."""
+        old_storage = CookieSessionStorage({"secret_keys": [OLD_KEY]})
+        rotated = CookieSessionStorage({"secret_keys": [NEW_KEY, OLD_KEY]})
+        dropped = CookieSessionStorage({"secret_keys": [NEW_KEY]})
+        old_value = await old_storage.save("sid", {"user_id": "1"}, 60)
+
+        assert await rotated.get(old_value) == {"user_id": "1"}
+        assert await dropped.get(old_value) is None
+        assert await dropped.get(await rotated.save("sid", {"user_id": "1"}, 60)) == {"user_id": "1"}
+
+    async def test_large_sessions_compressed(self):
+        """Test compressible payloads shrink and oversize payloads are refused."""
+        storage = CookieSessionStorage({"secret_keys": [NEW_KEY]})
+        permissions = [f"documents:read:{index}" for index in range(100)]
+
+        value = await storage.save("sid", {"user_id": "1", "permissions": permissions}, 60)
+
+        assert len(value) < len(str(permissions))
+        with pytest.raises(ValueError, match="too large"):
+            await storage.save("sid", {"blob": base64.b64encode(os.urandom(4096)).decode()}, 60)
+        assert MAX_COOKIE_VALUE_SIZE < 4096
+
+    def test_requires_a_key(self):
+        """Test cookie storage refuses to run without a key."""
+        with pytest.raises(ValueError, match="secret_keys"):
+            CookieSessionStorage({})
+
+
+class TestSessionRevocationStore:
+    """Test revocation epochs and revoked session IDs."""
+
+    async def test_epoch_revokes_older_sessions(self):
+        """Test bumping a user's epoch revokes sessions issued before it."""
+        store = SessionRevocationStore({"cache_seconds": 60})
+
+        assert not await store.is_revoked("alice", "s1", 0)
+        await store.revoke_user("alice")
+
+        assert await store.is_revoked("alice", "s1", 0)
+        assert not await store.is_revoked("alice", "s2", 1)
+        assert not await store.is_revoked("bob", "s3", 0)
+
+    async def test_revoking_drops_cached_check(self):
+        """Test revoking a session ID takes effect despite a cached check."""
+        store = SessionRevocationStore({"cache_seconds": 60})
+
+        assert not await store.is_revoked("alice", "s1", 0)
+        await store.revoke_session("s1", time.time() + 60)
+
+        assert await store.is_revoked("alice", "s1", 0)
+
+    async def test_redis_store_is_one_round_trip(self):
+        """Test the Redis check is pipelined and cached."""
+        redis = LocalRedisStandIn()
+        register_redis_connection("redis://revocation", redis)
+        store = SessionRevocationStore({"type": "redis", "redis_url": "redis://revocation", "cache_seconds": 60})
+        try:
+            await store.revoke_session("s1", time.time() + 60)
+
+            round_trips = redis.round_trips
+            assert await store.is_revoked("alice", "s1", 0)
+            assert not await store.is_revoked("alice", "s2", 0)
+            assert not await store.is_revoked("alice", "s2", 0)
+            assert redis.round_trips == round_trips + 2
+
+            assert await store.revoke_user("alice") == 1
+            assert await store.is_revoked("alice", "s2", 0)
+        finally:
+            await store.close()
+            await release_redis_connection("redis://revocation")
+
+
+class TestSessionProviderCookieStorage:
+    """Test SessionProvider with cookie storage."""
+
+    async def test_login_and_authenticate_without_storage(self):
+        """Test the cookie carries the session through authentication."""
+        provider = _provider()
+
+        async def lookup(username, password=None):
+            return User(user_id="42", username=username, roles=["editor"])
+
+        provider.set_user_lookup_function(lookup)
+        user, response = await provider.login(_request(), "alice", "secret")
+        cookie_value = response["cookie_settings"]["value"]
+
+        assert cookie_value != response["session_id"]
+        authenticated = await provider.authenticate(_request(cookie_value))
+        assert authenticated.user_id == "42"
+        assert authenticated.roles == ["editor"]
+        # CSRF binding sees the stable inner session ID
+        assert authenticated.metadata["session_id"] == response["session_id"] == user.metadata["session_id"]
+
+    async def test_create_and_get_session(self):
+        """Test the provider session API works with cookie values as IDs."""
+        provider = _provider()
+
+        session_id = await provider.create_session(User(user_id="1", username="alice"))
+        session = await provider.get_session(session_id)
+
+        assert session["username"] == "alice"
+
+    async def test_refresh_issues_new_cookie(self):
+        """Test refreshing re-seals the session with a new expiry."""
+        provider = _provider()
+        with patch("time.time", return_value=1000.0):
+            cookie_value = await provider.create_session(User(user_id="1", username="alice"))
+        with patch("time.time", return_value=4000.0):
+            result = await provider.refresh_session(cookie_value)
+        with patch("time.time", return_value=4700.0):
+            assert await provider.get_session(cookie_value) is None
+            assert await provider.get_session(result["cookie_settings"]["value"]) is not None
+
+    async def test_logout_revokes_cookie(self):
+        """Test logout revokes the cookie when revocation is enabled."""
+        provider = _provider(revocation={"enabled": True})
+        cookie_value = await provider.create_session(User(user_id="1", username="alice"))
+        other_value = await provider.create_session(User(user_id="1", username="alice"))
+        user = await provider.authenticate(_request(cookie_value))
+
+        await provider.logout(_request(cookie_value), user)
+
+        assert await provider.authenticate(_request(cookie_value)) is None
+        assert await provider.authenticate(_request(other_value)) is not None
+
+    async def test_delete_by_inner_session_id(self):
+        """Test deleting by the inner session ID revokes an already checked cookie."""
+        provider = _provider(revocation={"enabled": True})
+        cookie_value = await provider.create_session(User(user_id="1", username="alice"))
+        user = await provider.authenticate(_request(cookie_value))
+
+        await provider._storage.delete(user.metadata["session_id"])
+
+        assert await provider.authenticate(_request(cookie_value)) is None
+
+    def test_memory_revocation_warns(self, caplog):
+        """Test validation warns that memory revocation is per-process."""
+        with caplog.at_level("WARNING"):
+            assert _provider(revocation={"enabled": True}).validate_config() == []
+        assert "only in the current process" in caplog.text
+
+        caplog.clear()
+        with caplog.at_level("WARNING"):
+            _provider(revocation={"enabled": True, "type": "redis"}).validate_config()
+        assert caplog.text == ""
+
+    async def test_logout_all_bumps_epoch(self):
+        """Test logout_all revokes every cookie issued to the user."""
+        provider = _provider(revocation={"enabled": True})
+        cookie_value = await provider.create_session(User(user_id="1", username="alice"))
+        other_value = await provider.create_session(User(user_id="1", username="alice"))
+        user = await provider.authenticate(_request(cookie_value))
+
+        await provider.logout(_request(cookie_value), user, logout_all=True)
+
+        assert await provider.authenticate(_request(other_value)) is None
+        new_value = await provider.create_session(User(user_id="1", username="alice"))
+        assert await provider.authenticate(_request(new_value)) is not None
+
+    async def test_session_id_stable_across_refresh(self):
+        """Test the session ID that CSRF binds to survives cookie refreshes."""
+        provider = _provider()
+        cookie_value = await provider.create_session(User(user_id="1", username="alice"))
+        user = await provider.authenticate(_request(cookie_value))
+
+        refreshed = (await provider.refresh_user_session(_request(cookie_value), user))["cookie_settings"]["value"]
+        refreshed_user = await provider.authenticate(_request(refreshed))
+
+        assert refreshed != cookie_value
+        assert refreshed_user.metadata["session_id"] == user.metadata["session_id"]
+
+    async def test_refresh_without_cookie(self):
+        """Test refreshing needs the session cookie."""
+        provider = _provider()
+
+        with pytest.raises(AuthenticationError):
+            await provider.refresh_user_session(_request(), User(user_id="1", username="alice"))
@@ -0,0 +1,182 @@
+"""Tests for non-blocking password hashing."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.auth import hashing
+from beginnings.extensions.auth.hashing import PasswordHasher, PasswordHashingBusyError
+from beginnings.extensions.auth.providers.base import AuthenticationError
+from beginnings.extensions.auth.providers.jwt_provider import JWTProvider
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.monitoring import get_metrics_collector
+
+SECRET = "test-secret-key-for-jwt-that-is-long-enough-for-security"
+
+
+@pytest.fixture
+def hasher():
+    """Create a fast hasher for testing."""
+    hasher = PasswordHasher({"bcrypt_rounds": 4})
+    yield hasher
+    hasher.close()
+
+
+def _request():
+    """Create a mock login request."""
+    request = MagicMock(spec=Request)
+    request.headers = {}
+    request.cookies = {}
+    request.client = MagicMock(host="127.0.0.1")
+    return request
+
+
+class TestPasswordHasher:
+    """Test PasswordHasher execution and sizing."""
+
+    async def test_hash_and_verify_round_trip(self, hasher):
+        """Test async hashing and verification on the executor."""
+        hashed = await hasher.hash("password123")
+
+        assert hashed.startswith("$2b$04$")
+        assert await hasher.verify("password123", hashed)
+        assert not await hasher.verify("wrong", hashed)
+        assert hasher.verify_sync("password123", hashed)
+        assert hasher.pending == 0
+
+    async def test_malformed_hash_fails_verification(self, hasher, caplog):
+        """Test malformed stored hashes are treated as a mismatch and logged."""
+        with caplog.at_level("WARNING", logger="beginnings.extensions.auth.hashing"):
+            assert not await hasher.verify("password123", "not-a-hash")
+            assert not await hasher.verify("password123", "")
+
+        assert "could not be checked" in caplog.text
+
+    async def test_process_executor(self):
+        """Test hashing on a process pool."""
+        hasher = PasswordHasher({"bcrypt_rounds": 4, "executor": "process", "max_workers": 1})
+        try:
+            assert await hasher.verify("secret", await hasher.hash("secret"))
+        finally:
+            hasher.close()
+
+    def test_queue_sized_from_cost_factor(self):
+        """Test cheaper hashes allow a deeper queue for the same wait budget."""
+        default = PasswordHasher({"max_workers": 2, "max_queue_wait": 2.0})
+        cheap = PasswordHasher({"max_workers": 2, "max_queue_wait": 2.0, "bcrypt_rounds": 10})
+        expensive = PasswordHasher({"max_workers": 2, "max_queue_wait": 2.0, "bcrypt_rounds": 14})
+
+        assert default.max_queue == 2 * 8
+        assert cheap.max_queue == 2 * 32
+        assert expensive.max_queue == 2 * 2
+
+    @pytest.mark.filterwarnings("ignore::passlib.exc.PasslibHashWarning")
+    def test_validate_config(self):
+        """Test invalid settings are reported."""
+        hasher = PasswordHasher({"executor": "fibers", "bcrypt_rounds": 3, "max_workers": -1, "max_queue": -1})
+
+        assert len(hasher.validate_config()) == 4
+        assert PasswordHasher().validate_config() == []
+
+    async def test_backpressure_rejects_when_queue_full(self):
+        """Test calls beyond workers plus queue fail fast."""
+        hasher = PasswordHasher({"bcrypt_rounds": 4, "max_workers": 1, "max_queue": 1, "max_queue_wait": 3})
+        release = threading.Event()
+        metrics = get_metrics_collector()
+        rejected = metrics.get_counter("password_hash_rejected_total", {"operation": "verify"})
+
+        def blocked_verify(*args):
+            release.wait(5)
+            return True
+
+        try:
+            with patch.object(hashing, "_verify", blocked_verify):
+                running = asyncio.create_task(hasher.verify("a", "b"))
+                queued = asyncio.create_task(hasher.verify("a", "b"))
+                await asyncio.sleep(0.01)
+
+                with pytest.raises(PasswordHashingBusyError) as exc_info:
+                    await hasher.verify("a", "b")
+
+                release.set()
+                assert await running and await queued
+        finally:
+            release.set()
+            hasher.close()
+
+        assert exc_info.value.retry_after == 3
+        assert metrics.get_counter("password_hash_rejected_total", {"operation": "verify"}) == rejected + 1
+        assert hasher.pending == 0
+
+    async def test_records_queue_wait_and_duration(self, hasher):
+        """Test hashing metrics are recorded."""
+        metrics = get_metrics_collector()
+        before = metrics.get_histogram_stats("password_hash_duration", {"operation": "hash"}).get("count", 0)
+
+        await hasher.hash("password123")
+
+        assert metrics.get_histogram_stats("password_hash_duration", {"operation": "hash"})["count"] == before + 1
+        assert metrics.get_histogram_stats("password_hash_queue_wait", {"operation": "hash"})["count"] >= 1
+
+
+class TestProviderLogin:
+    """Test providers hash off the event loop during login."""
+
+    async def test_busy_hasher_surfaces_as_authentication_error(self):
+        """Test a full hashing queue fails the login like any auth failure."""
+        provider = SessionProvider({"password_hashing": {"bcrypt_rounds": 4, "max_workers": 1, "max_queue": 0}})
+        password_hash = provider.hash_password("password123")
+
+        async def lookup(username, password=None):
+            return {"id": 1, "username": username, "password_hash": password_hash}
+
+        provider.set_user_lookup_function(lookup)
+        provider.password_hasher._pending = 1
+
+        with pytest.raises(AuthenticationError):
+            await provider.login(_request(), "alice", "password123")
+
+        provider.password_hasher._pending = 0
+        user, _ = await provider.login(_request(), "alice", "password123")
+        assert user.username == "alice"
+        await provider.close()
+
+    async def test_login_storm_keeps_event_loop_responsive(self):
+        """Test unrelated work keeps flowing while many logins hash passwords."""
+        provider = JWTProvider({"secret_key": SECRET, "password_hashing": {"bcrypt_rounds": 9, "max_queue": 100}})
+        password_hash = provider.hash_password("password123")
+
+        async def lookup(username):
+            return {"id": 1, "username": username, "password_hash": password_hash}
+
+        provider.set_user_lookup_function(lookup)
+        single_hash_start = time.perf_counter()
+        provider.verify_password("password123", password_hash)
+        blocking_seconds = time.perf_counter() - single_hash_start
+        await provider.password_hasher.verify("password123", password_hash)
+
+        lags = []
+        stop = asyncio.Event()
+
+        async def unrelated_requests():
+            while not stop.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(0.002)
+                lags.append(time.perf_counter() - start - 0.002)
+
+        probe = asyncio.create_task(unrelated_requests())
+        await asyncio.sleep(0.01)
+        results = await asyncio.gather(*[provider.login(_request(), "alice", "password123") for _ in range(8)])
+        stop.set()
+        await probe
+        await provider.close()
+
+        lags.sort()
+        assert len(results) == 8
+        # Blocking hashes would stall the loop for a full hash at least once
+        assert lags[-1] < blocking_seconds
+        assert lags[int(len(lags) * 0.95)] < 0.02
@@ -1,9 +1,10 @@
 """Tests for JWT authentication provider."""
 
 import os
+import time
 import pytest
 from datetime import datetime, timezone
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, patch
 
 from fastapi import Request
 from jose import jwt
@@ -331,4 +332,156 @@ class TestJWTProvider:
         provider = JWTProvider(config)
         
         errors = provider.validate_config()
-        assert any("token_expire_minutes must be positive" in error for error in errors)
\ No newline at end of file
+        assert any("token_expire_minutes must be positive" in error for error in errors)
+
+def _rsa_key_pair():
+    """Generate a PEM-encoded RSA key pair."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    return private_pem, public_pem
+
+
+class TestVerifiedTokenCache:
+    """Test caching of verified JWT claims."""
+    
+    async def test_repeated_token_skips_verification(self, jwt_provider, mock_request, test_user):
+        """Test the same token is verified once and the user is reused."""
+        token = jwt_provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        
+        with patch("beginnings.extensions.auth.providers.jwt_provider.jwt.decode", wraps=jwt.decode) as decode:
+            first_user = await jwt_provider.authenticate(mock_request)
+            second_user = await jwt_provider.authenticate(mock_request)
+        
+        assert decode.call_count == 1
+        assert second_user.user_id == first_user.user_id == test_user.user_id
+    
+    async def test_cached_user_is_per_request(self, jwt_provider, mock_request, test_user):
+        """Test changes to one request's user do not leak into later requests."""
+        token = jwt_provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        
+        first_user = await jwt_provider.authenticate(mock_request)
+        first_user.roles.append("admin")
+        first_user.metadata["session_id"] = "leaked"
+        second_user = await jwt_provider.authenticate(mock_request)
+        
+        assert second_user is not first_user
+        assert second_user.roles == test_user.roles
+        assert "session_id" not in second_user.metadata
+    
+    async def test_revoked_token_rejected_from_cache(self, jwt_provider, mock_request, test_user):
+        """Test revocation takes effect immediately for cached tokens."""
+        token = jwt_provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        await jwt_provider.authenticate(mock_request)
+        
+        await jwt_provider.logout(mock_request, test_user)
+        
+        with pytest.raises(AuthenticationError, match="revoked"):
+            await jwt_provider.authenticate(mock_request)
+        assert not jwt_provider._verified_cache
+    
+    async def test_reverified_after_max_verify_age(self, jwt_config, mock_request, test_user):
+        """Test cached verifications are redone after max_verify_age_seconds."""
+        provider = JWTProvider({**jwt_config, "verified_cache": {"max_verify_age_seconds": 60}})
+        token = provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        now = time.time()
+        
+        with patch("beginnings.extensions.auth.providers.jwt_provider.jwt.decode", wraps=jwt.decode) as decode:
+            with patch("time.time", return_value=now):
+                await provider.authenticate(mock_request)
+            with patch("time.time", return_value=now + 30):
+                await provider.authenticate(mock_request)
+            assert decode.call_count == 1
+            
+            with patch("time.time", return_value=now + 61):
+                await provider.authenticate(mock_request)
+            assert decode.call_count == 2
+    
+    async def test_cached_token_expires_at_exp(self, jwt_provider, mock_request, test_user):
+        """Test a cached token is not served past its exp claim."""
+        token = jwt_provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        await jwt_provider.authenticate(mock_request)
+        
+        expires_at = jwt.get_unverified_claims(token)["exp"]
+        jwt_provider.max_verify_age_seconds = 10 ** 9
+        
+        with patch("time.time", return_value=expires_at + 1):
+            assert jwt_provider._get_cached_verification(next(iter(jwt_provider._verified_cache))) is None
+    
+    async def test_cache_is_bounded(self, jwt_config, mock_request, test_user):
+        """Test the least recently used token is evicted."""
+        provider = JWTProvider({**jwt_config, "verified_cache": {"max_size": 2}})
+        tokens = [provider.create_access_token(test_user) for _ in range(3)]
+        
+        for token in tokens:
+            mock_request.headers = {"authorization": f"Bearer {token}"}
+            await provider.authenticate(mock_request)
+        
+        assert len(provider._verified_cache) == 2
+    
+    async def test_cache_disabled(self, jwt_config, mock_request, test_user):
+        """Test every request is verified when the cache is disabled."""
+        provider = JWTProvider({**jwt_config, "verified_cache": {"enabled": False}})
+        token = provider.create_access_token(test_user)
+        mock_request.headers = {"authorization": f"Bearer {token}"}
+        
+        with patch("beginnings.extensions.auth.providers.jwt_provider.jwt.decode", wraps=jwt.decode) as decode:
+            await provider.authenticate(mock_request)
+            await provider.authenticate(mock_request)
+        
+        assert decode.call_count == 2
+    
+    @pytest.mark.slow
+    @pytest.mark.parametrize("algorithm", ["HS256", "RS256"])
+    async def test_auth_middleware_latency_benchmark(self, jwt_config, test_user, algorithm):
+        """Benchmark auth middleware latency with and without the cache."""
+        from beginnings.extensions.auth.extension import AuthExtension
+        
+        signing_key = jwt_config["secret_key"]
+        if algorithm == "RS256":
+            signing_key, _ = _rsa_key_pair()
+        
+        iterations = 500
+        latencies = {}
+        for cache_enabled in (False, True):
+            provider_config = {
+                **jwt_config,
+                "secret_key": signing_key,
+                "algorithm": algorithm,
+                "verified_cache": {"enabled": cache_enabled}
+            }
+            extension = AuthExtension({"providers": {"jwt": provider_config}})
+            provider = extension.providers["jwt"]
+            token = provider.create_access_token(test_user)
+            middleware = extension.get_middleware_factory()({"auth": {"required": True}})
+            
+            request = MagicMock(spec=Request)
+            request.headers = {"authorization": f"Bearer {token}"}
+            request.cookies = {}
+            response = MagicMock(headers={})
+            
+            async def call_next(request):
+                return response
+            
+            await middleware(request, call_next)
+            start_time = time.perf_counter()
+            for _ in range(iterations):
+                await middleware(request, call_next)
+            latencies[cache_enabled] = (time.perf_counter() - start_time) / iterations
+        
+        assert latencies[True] < latencies[False]
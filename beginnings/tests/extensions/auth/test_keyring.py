@@ -0,0 +1,330 @@
+"""Tests for the JWT keyring."""
+
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+from jose import JWTError, jwk, jwt
+
+from beginnings.extensions.auth.keyring import JWTKeyring, parse_key
+from beginnings.extensions.auth.providers.base import AuthenticationError, User
+from beginnings.extensions.auth.providers.jwt_provider import JWTProvider
+
+SECRET = "test-secret-key-for-jwt-that-is-long-enough-for-security"
+
+
+def _rsa_private_pem():
+    """Generate a PEM-encoded RSA private key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+
+
+def _ec_private_pem():
+    """Generate a PEM-encoded P-256 private key."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+
+
+def _jwk(pem, algorithm, kid, private=False):
+    """Convert a PEM private key into a JWK dictionary."""
+    key = jwk.construct(pem, algorithm)
+    if not private:
+        key = key.public_key()
+    return {**key.to_dict(), "kid": kid, "alg": algorithm}
+
+
+def _hmac_jwk(secret, kid):
+    """Build an HMAC JWK dictionary."""
+    return {**jwk.construct(secret, "HS256").to_dict(), "kid": kid}
+
+
+def _write_jwks(path, keys):
+    """Write a JWKS document and bump its modification time."""
+    path.write_text(json.dumps({"keys": keys}))
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+
+def _request(token):
+    """Create a mock request carrying a bearer token."""
+    request = MagicMock(spec=Request)
+    request.headers = {"authorization": f"Bearer {token}"}
+    request.cookies = {}
+    return request
+
+
+@pytest.fixture
+def test_user():
+    """Create test user for testing."""
+    return User(user_id="123", username="testuser", roles=["user"])
+
+
+class TestParseKey:
+    """Test pre-parsing of key material."""
+
+    def test_hmac_key_signs_and_verifies(self):
+        """Test HMAC keys use the same secret both ways."""
+        key = parse_key(SECRET, "HS256")
+
+        assert key.signing_key is key.verify_key
+        assert not key.is_asymmetric
+
+    def test_private_key_derives_public_verify_key(self):
+        """Test private RSA keys verify with their public half."""
+        key = parse_key(_rsa_private_pem(), "RS256", "rsa-1")
+
+        assert key.is_asymmetric
+        assert key.verify_key.is_public()
+        assert not key.signing_key.is_public()
+
+    def test_public_key_cannot_sign(self):
+        """Test public-only keys are verification-only."""
+        key = parse_key(_jwk(_rsa_private_pem(), "RS256", "rsa-1"), "RS256", "rsa-1")
+
+        assert key.signing_key is None
+
+    def test_invalid_key_raises(self):
+        """Test unparseable material is reported with its kid."""
+        with pytest.raises(ValueError, match="'broken'"):
+            parse_key("not a pem", "RS256", "broken")
+
+
+class TestJWTKeyring:
+    """Test kid lookup and JWKS loading."""
+
+    def test_kid_lookup_from_jwks_file(self, tmp_path):
+        """Test tokens are verified with the key named by their kid."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one"), _hmac_jwk("second-secret-for-kid-two", "two")])
+        keyring = JWTKeyring({"jwks_path": str(jwks_file)})
+
+        token = jwt.encode({"sub": "1"}, "second-secret-for-kid-two", algorithm="HS256", headers={"kid": "two"})
+
+        assert keyring.get_verification_key(token).kid == "two"
+        assert sorted(keyring.kids) == ["one", "two"]
+
+    def test_unknown_kid_raises(self, tmp_path):
+        """Test tokens with an unknown kid are rejected."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one")])
+        keyring = JWTKeyring({"jwks_path": str(jwks_file)}, SECRET)
+
+        token = jwt.encode({"sub": "1"}, SECRET, algorithm="HS256", headers={"kid": "missing"})
+
+        with pytest.raises(JWTError, match="Unknown key ID"):
+            keyring.get_verification_key(token)
+
+    def test_token_without_kid_uses_default_key(self, tmp_path):
+        """Test legacy tokens without kid fall back to secret_key."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one")])
+        keyring = JWTKeyring({"jwks_path": str(jwks_file)}, SECRET)
+
+        token = jwt.encode({"sub": "1"}, SECRET, algorithm="HS256")
+
+        assert keyring.get_verification_key(token).kid is None
+
+    def test_directory_of_jwk_files(self, tmp_path):
+        """Test every JSON file in a directory is loaded, JWKS or single JWK."""
+        (tmp_path / "a.json").write_text(json.dumps(_hmac_jwk("first-secret-for-kid-one", "one")))
+        _write_jwks(tmp_path / "b.json", [_jwk(_ec_private_pem(), "ES256", "ec-1")])
+        (tmp_path / "notes.txt").write_text("ignored")
+
+        keyring = JWTKeyring({"jwks_path": str(tmp_path)})
+
+        assert sorted(keyring.kids) == ["ec-1", "one"]
+
+    def test_hot_refresh_picks_up_rotation(self, tmp_path):
+        """Test keys added to the JWKS file are picked up after refresh_interval."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one")])
+        keyring = JWTKeyring({"jwks_path": str(jwks_file), "refresh_interval": 0})
+        token = jwt.encode({"sub": "1"}, "second-secret-for-kid-two", algorithm="HS256", headers={"kid": "two"})
+
+        with pytest.raises(JWTError):
+            keyring.get_verification_key(token)
+
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one"), _hmac_jwk("second-secret-for-kid-two", "two")])
+
+        assert keyring.get_verification_key(token).kid == "two"
+
+    def test_failed_refresh_keeps_previous_keys(self, tmp_path):
+        """Test a broken JWKS file doesn't drop the active keys."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one")])
+        keyring = JWTKeyring({"jwks_path": str(jwks_file)})
+
+        jwks_file.write_text("{not json")
+        os.utime(jwks_file, (time.time(), time.time() + 10))
+
+        assert not keyring.refresh()
+        assert keyring.kids == ["one"]
+
+    def test_missing_jwks_raises_at_startup(self, tmp_path):
+        """Test a missing JWKS source fails loudly at startup."""
+        with pytest.raises(ValueError, match="Failed to load JWKS"):
+            JWTKeyring({"jwks_path": str(tmp_path / "missing.json")})
+
+    def test_signing_kid(self, tmp_path):
+        """Test signing_kid selects a private key from the JWKS."""
+        private_pem = _rsa_private_pem()
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_jwk(private_pem, "RS256", "rsa-2", private=True)])
+
+        keyring = JWTKeyring({"jwks_path": str(jwks_file), "signing_kid": "rsa-2"}, SECRET)
+
+        assert keyring.get_signing_key().kid == "rsa-2"
+
+    def test_public_only_signing_key_raises(self, tmp_path):
+        """Test signing requires private key material."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_jwk(_rsa_private_pem(), "RS256", "rsa-1")])
+
+        keyring = JWTKeyring({"jwks_path": str(jwks_file), "signing_kid": "rsa-1"})
+
+        with pytest.raises(ValueError, match="No JWT signing key"):
+            keyring.get_signing_key()
+
+
+class TestJWTProviderKeyring:
+    """Test JWTProvider integration with the keyring."""
+
+    async def test_rotation_keeps_old_tokens_valid(self, tmp_path, test_user):
+        """Test tokens signed with a retired signing key still verify."""
+        old_pem, new_pem = _rsa_private_pem(), _rsa_private_pem()
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_jwk(old_pem, "RS256", "old", private=True)])
+        config = {
+            "algorithm": "RS256",
+            "keyring": {"jwks_path": str(jwks_file), "signing_kid": "old", "refresh_interval": 0}
+        }
+        provider = JWTProvider(config)
+        old_token = provider.create_access_token(test_user)
+
+        _write_jwks(jwks_file, [_jwk(old_pem, "RS256", "old"), _jwk(new_pem, "RS256", "new", private=True)])
+        provider.keyring.signing_kid = "new"
+        new_token = provider.create_access_token(test_user)
+
+        assert jwt.get_unverified_header(new_token)["kid"] == "new"
+        assert (await provider.authenticate(_request(old_token))).user_id == "123"
+        assert (await provider.authenticate(_request(new_token))).user_id == "123"
+        assert provider.validate_config() == []
+
+    async def test_key_reload_drops_verified_cache(self, tmp_path, test_user):
+        """Test tokens cached before a key reload are verified again."""
+        jwks_file = tmp_path / "jwks.json"
+        _write_jwks(jwks_file, [_hmac_jwk("first-secret-for-kid-one", "one")])
+        provider = JWTProvider({"keyring": {"jwks_path": str(jwks_file), "signing_kid": "one", "refresh_interval": 0}})
+        token = provider.create_access_token(test_user)
+        assert (await provider.authenticate(_request(token))).user_id == "123"
+
+        # Key "one" is withdrawn
+        _write_jwks(jwks_file, [_hmac_jwk("second-secret-for-kid-two", "two")])
+
+        with pytest.raises(AuthenticationError, match="Unknown key ID"):
+            await provider.authenticate(_request(token))
+        assert not provider._verified_cache
+
+    async def test_asymmetric_verification_offloaded(self, test_user):
+        """Test RS256 verification runs on the thread pool when enabled."""
+        provider = JWTProvider({
+            "secret_key": _rsa_private_pem(),
+            "algorithm": "RS256",
+            "keyring": {"verify_in_thread": True, "verify_workers": 2},
+            "verified_cache": {"enabled": False}
+        })
+        token = provider.create_access_token(test_user)
+        threads = []
+        original_decode = jwt.decode
+
+        def recording_decode(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return original_decode(*args, **kwargs)
+
+        with patch("beginnings.extensions.auth.providers.jwt_provider.jwt.decode", side_effect=recording_decode):
+            user = await provider.authenticate(_request(token))
+
+        assert user.user_id == "123"
+        assert threads[0].startswith("jwt-verify")
+        await provider.close()
+        assert provider._verify_executor is None
+
+    async def test_hmac_stays_on_event_loop(self, test_user):
+        """Test cheap HMAC verification is never offloaded."""
+        provider = JWTProvider({"secret_key": SECRET, "keyring": {"verify_in_thread": True}})
+
+        await provider.authenticate(_request(provider.create_access_token(test_user)))
+
+        assert provider._verify_executor is None
+
+    async def test_es256_round_trip(self, test_user):
+        """Test EC keys work end to end."""
+        provider = JWTProvider({"secret_key": _ec_private_pem(), "algorithm": "ES256"})
+
+        user = await provider.authenticate(_request(provider.create_access_token(test_user)))
+
+        assert user.user_id == "123"
+
+    def test_invalid_key_reported_by_validation(self):
+        """Test unparseable key material surfaces as a config error."""
+        provider = JWTProvider({"secret_key": "x" * 40, "algorithm": "RS256"})
+
+        assert any("JWT keyring" in error for error in provider.validate_config())
+
+    async def test_invalid_token_header(self):
+        """Test malformed tokens are rejected before key lookup."""
+        provider = JWTProvider({"secret_key": SECRET})
+
+        with pytest.raises(AuthenticationError):
+            await provider.authenticate(_request("garbage"))
+
+    @pytest.mark.slow
+    @pytest.mark.parametrize("algorithm", ["HS256", "RS256", "ES256"])
+    async def test_verification_throughput(self, algorithm, test_user, record_property):
+        """Benchmark verifications/sec with pre-parsed keys versus raw key material.
+
+        Rates are reported as test properties rather than asserted, as
+        they depend on the machine and its load.
+        """
+        key_material = {"HS256": SECRET, "RS256": _rsa_private_pem(), "ES256": _ec_private_pem()}[algorithm]
+        provider = JWTProvider({"secret_key": key_material, "algorithm": algorithm, "verified_cache": {"enabled": False}})
+        token = provider.create_access_token(test_user)
+        raw_verify_key = provider.keyring.get_verification_key(token).verify_key.to_pem().decode() \
+            if algorithm != "HS256" else SECRET
+        iterations = 1000
+
+        async def rate(verify):
+            start_time = time.perf_counter()
+            for _ in range(iterations):
+                await verify()
+            return iterations / (time.perf_counter() - start_time)
+
+        async def verify_raw():
+            jwt.decode(token, raw_verify_key, algorithms=[algorithm], issuer=provider.issuer, audience=provider.audience)
+
+        assert (await provider._decode_token(token))["sub"] == test_user.user_id
+
+        # Best of interleaved rounds so load changes affect both alike
+        rounds = [(await rate(verify_raw), await rate(lambda: provider._decode_token(token))) for _ in range(3)]
+        raw_rate, keyring_rate = (max(rates) for rates in zip(*rounds))
+
+        record_property("raw_verifications_per_second", round(raw_rate))
+        record_property("keyring_verifications_per_second", round(keyring_rate))
@@ -8,7 +8,9 @@ and user profile mapping features.
 import base64
 import hashlib
 import json
+import asyncio
 import secrets
+import time
 import urllib.parse
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -16,6 +18,21 @@ import pytest
 
 from beginnings.extensions.auth.providers.oauth_provider import OAuthProvider
 from beginnings.extensions.auth.providers.base import AuthenticationError, User
+from beginnings.extensions.auth.extension import AuthExtension
+from beginnings.testing.oauth_stand_in import LocalOAuthServer
+
+
+@pytest.fixture
+async def oauth_server():
+    """Run a local OAuth server stand-in."""
+    async with LocalOAuthServer() as server:
+        yield server
+
+
+async def _oauth_login(provider, code="code"):
+    """Run the token exchange and profile fetch of one OAuth login."""
+    token_response = await provider.exchange_code_for_token("local", code, "verifier")
+    return await provider.get_user_info("local", token_response["access_token"])
 
 
 class TestOAuthProvider:
@@ -544,4 +561,114 @@ class TestOAuthProvider:
         
         errors = provider.validate_config()
         assert len(errors) > 0
-        assert any("client_secret" in error for error in errors)
\ No newline at end of file
+        assert any("client_secret" in error for error in errors)
+
+
+class TestOAuthHTTPClient:
+    """Test the pooled HTTP client and metadata cache against a local server."""
+    
+    async def test_logins_reuse_one_connection(self, oauth_server):
+        """Test repeated logins share a kept-alive connection."""
+        provider = OAuthProvider({"providers": {"local": oauth_server.provider_config()}})
+        await provider.start()
+        
+        for index in range(10):
+            user_info = await _oauth_login(provider, f"code-{index}")
+        
+        assert user_info["sub"] == "local-user-1"
+        assert oauth_server.connections == 1
+        assert oauth_server.requests["/.well-known/openid-configuration"] == 1
+        assert oauth_server.requests["/token"] == 10
+        await provider.close()
+    
+    async def test_discovery_fills_endpoints(self, oauth_server):
+        """Test endpoints missing from configuration come from discovery."""
+        provider = OAuthProvider({
+            "providers": {"local": oauth_server.provider_config()},
+            "state_secret": "local-state-secret"
+        })
+        assert provider.validate_config() == []
+        
+        await provider.start()
+        
+        assert provider.providers["local"]["token_url"] == f"{oauth_server.url}/token"
+        assert provider.build_authorization_url("local", "state", "challenge").startswith(f"{oauth_server.url}/authorize?")
+        await provider.close()
+    
+    async def test_jwks_cached_and_refreshable(self, oauth_server):
+        """Test JWKS fetches are cached, coalesced and refreshed on demand."""
+        provider = OAuthProvider({"providers": {"local": oauth_server.provider_config()}})
+        
+        results = await asyncio.gather(*[provider.get_jwks("local") for _ in range(5)])
+        assert results[0]["keys"][0]["kid"] == "local-key-1"
+        assert oauth_server.requests["/jwks"] == 1
+        
+        oauth_server.jwks = {"keys": [{"kty": "oct", "kid": "local-key-2"}]}
+        assert (await provider.get_jwks("local"))["keys"][0]["kid"] == "local-key-1"
+        assert (await provider.get_jwks("local", refresh=True))["keys"][0]["kid"] == "local-key-2"
+        await provider.close()
+    
+    async def test_token_exchange_error(self, oauth_server):
+        """Test identity provider errors surface as authentication errors."""
+        provider = OAuthProvider({"providers": {"local": oauth_server.provider_config()}})
+        
+        with pytest.raises(AuthenticationError, match="Invalid authorization code"):
+            await provider.exchange_code_for_token("local", "invalid", "verifier")
+        await provider.close()
+    
+    async def test_startup_tolerates_unreachable_discovery(self):
+        """Test startup succeeds when discovery fails, leaving endpoints unresolved."""
+        provider = OAuthProvider({
+            "providers": {"local": {"client_id": "c", "client_secret": "s", "issuer": "http://127.0.0.1:9"}},
+            "http_client": {"connect_timeout": 0.5}
+        })
+        
+        await provider.start()
+        
+        assert "token_url" not in provider.providers["local"]
+        await provider.close()
+    
+    async def test_extension_opens_and_closes_client(self, oauth_server):
+        """Test the auth extension manages the client across startup and shutdown."""
+        extension = AuthExtension({"providers": {"oauth": {"providers": {"local": oauth_server.provider_config()}}}})
+        provider = extension.providers["oauth"]
+        
+        await extension.get_startup_handler()()
+        client = provider._client
+        assert client is not None and not client.is_closed
+        
+        await extension.get_shutdown_handler()()
+        assert client.is_closed
+    
+    def test_validate_http_client_config(self):
+        """Test invalid client limits and timeouts are reported."""
+        provider = OAuthProvider({
+            "providers": {"google": {"client_id": "id", "client_secret": "secret"}},
+            "state_secret": "test-state-secret",
+            "http_client": {"timeout": 0, "max_connections": -1}
+        })
+        
+        assert len(provider.validate_config()) == 2
+    
+    @pytest.mark.slow
+    async def test_login_latency_benchmark(self):
+        """Benchmark login latency with a pooled client against a client per login."""
+        async with LocalOAuthServer(handshake_seconds=0.01) as server:
+            provider = OAuthProvider({"providers": {"local": server.provider_config()}})
+            await provider.start()
+            logins = 20
+            
+            start_time = time.perf_counter()
+            for _ in range(logins):
+                await _oauth_login(provider)
+            pooled_seconds = (time.perf_counter() - start_time) / logins
+            
+            start_time = time.perf_counter()
+            for _ in range(logins):
+                # Closing drops the pool, so every login opens new connections
+                await provider.close()
+                await _oauth_login(provider)
+            unpooled_seconds = (time.perf_counter() - start_time) / logins
+            await provider.close()
+        
+        assert pooled_seconds < unpooled_seconds / 2
@@ -1,5 +1,7 @@
 """Tests for RBAC (Role-Based Access Control) system."""
 
+import time
+
 import pytest
 
 from beginnings.extensions.auth.rbac import Permission, Role, RBACManager
@@ -325,4 +327,129 @@ class TestRBACManager:
         admin_info = hierarchy["admin"]
         assert "user" in admin_info["inherits"]
         # Admin should have both direct and inherited permissions
-        assert len(admin_info["all_permissions"]) > len(admin_info["direct_permissions"])
\ No newline at end of file
+        assert len(admin_info["all_permissions"]) > len(admin_info["direct_permissions"])
+
+
+def _deep_hierarchy(depth, permissions_per_role=5):
+    """Build a chain of roles, each inheriting from the previous one."""
+    roles = {"level0": {"permissions": [f"perm:0:{index}" for index in range(permissions_per_role)]}}
+    for level in range(1, depth):
+        roles[f"level{level}"] = {
+            "permissions": [f"perm:{level}:{index}" for index in range(permissions_per_role)],
+            "inherits": [f"level{level - 1}"]
+        }
+    return RBACManager({"roles": roles})
+
+
+def _uncompiled_check(manager, user_roles, permission):
+    """Check a permission by walking the hierarchy, as before compilation."""
+    def walk(role_name, seen):
+        role = manager.roles.get(role_name)
+        if role is None or role_name in seen:
+            return set()
+        seen.add(role_name)
+        permissions = set(role.permissions)
+        for parent in role.inherits:
+            permissions |= walk(parent, seen)
+        return permissions
+
+    for role_name in user_roles:
+        permissions = walk(role_name, set())
+        if permission in permissions or "*" in permissions:
+            return True
+    return False
+
+
+class TestCompiledRBAC:
+    """Test the compiled bitset form of the hierarchy."""
+
+    def test_deep_inheritance_flattened(self):
+        """Test permissions from every ancestor are granted."""
+        manager = _deep_hierarchy(50)
+
+        assert manager.check_permission(["level49"], "perm:0:0")
+        assert manager.check_permission(["level10"], "perm:10:4")
+        assert not manager.check_permission(["level10"], "perm:11:0")
+        assert len(manager.get_user_permissions(["level49"])) == 250
+
+    def test_add_role_and_permission_invalidate(self):
+        """Test changes after a check are picked up by the next check."""
+        manager = RBACManager({"roles": {"user": ["read"]}})
+        assert not manager.check_permission(["admin"], "read")
+
+        manager.add_role("admin", permissions=["write"], inherits=["user"])
+        assert manager.check_permission(["admin"], "read")
+
+        manager.get_role("user").add_permission("comment")
+        assert manager.check_permission(["admin"], "comment")
+
+        manager.get_role("user").remove_permission("read")
+        assert not manager.check_permission(["admin"], "read")
+
+        route_config = {"required": True, "permissions": ["publish"]}
+        assert not manager.validate_route_access(["admin"], route_config)[0]
+        manager.add_permission("publish")
+        manager.get_role("admin").add_permission("publish")
+        assert manager.validate_route_access(["admin"], route_config)[0]
+
+    def test_circular_inheritance_terminates(self):
+        """Test cycles compile to the union of the cycle's permissions."""
+        manager = RBACManager({
+            "roles": {
+                "role1": {"permissions": ["a"], "inherits": ["role2"]},
+                "role2": {"permissions": ["b"], "inherits": ["role1"]}
+            }
+        })
+
+        assert manager.check_permission(["role1"], "b")
+        assert manager.check_permission(["role2"], "a")
+
+    def test_unconfigured_roles_match_by_name(self):
+        """Test role requirements match role names the RBAC config does not define."""
+        manager = RBACManager()
+        route_config = {"required": True, "roles": ["editor"], "require_all_roles": ["editor", "staff"]}
+
+        assert not manager.validate_route_access(["editor"], route_config)[0]
+        assert manager.validate_route_access(["staff", "editor"], route_config)[0]
+        assert not manager.validate_route_access(["viewer"], route_config)[0]
+
+    def test_denial_reports_first_missing_permission(self):
+        """Test the reason names the first missing permission in route order."""
+        manager = _deep_hierarchy(3)
+        route_config = {"required": True, "permissions": ["perm:0:0", "perm:5:0", "perm:6:0"]}
+
+        allowed, reason = manager.validate_route_access(["level2"], route_config)
+
+        assert not allowed
+        assert reason == "Missing required permission: perm:5:0"
+
+    def test_matches_uncompiled_checks(self):
+        """Test compiled checks agree with walking the hierarchy."""
+        manager = _deep_hierarchy(12, permissions_per_role=3)
+        manager.add_role("root", permissions=["*"])
+        names = [f"perm:{level}:{index}" for level in range(14) for index in range(3)]
+
+        for user_roles in (["level0"], ["level5"], ["level11"], ["level3", "root"], ["unknown"], []):
+            for name in names:
+                assert manager.check_permission(user_roles, name) == _uncompiled_check(manager, user_roles, name)
+
+    @pytest.mark.slow
+    def test_deep_hierarchy_check_throughput(self):
+        """Benchmark route checks on a deep hierarchy against walking it."""
+        manager = _deep_hierarchy(100)
+        user_roles = ["level99", "level50"]
+        route_config = {"required": True, "permissions": ["perm:0:0", "perm:50:2", "perm:99:4"]}
+        iterations = 2000
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            for permission in route_config["permissions"]:
+                assert _uncompiled_check(manager, user_roles, permission)
+        walk_rate = iterations / (time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            assert manager.validate_route_access(user_roles, route_config)[0]
+        compiled_rate = iterations / (time.perf_counter() - start_time)
+
+        assert compiled_rate > walk_rate * 10
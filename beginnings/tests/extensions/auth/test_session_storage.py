@@ -0,0 +1,183 @@
+"""Tests for session storage backends."""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.auth.providers.base import User
+from beginnings.extensions.auth.providers.session_provider import (
+    MemorySessionStorage,
+    RedisSessionStorage,
+    SessionProvider,
+)
+from beginnings.extensions.rate_limiting.storage import RedisRateLimitStorage
+from beginnings.extensions.redis_connections import register_redis_connection, release_redis_connection
+from beginnings.testing.redis_stand_in import LocalRedisStandIn
+
+REDIS_URL = "redis://stand-in/0"
+
+
+@pytest.fixture
+async def redis():
+    """Register a Redis stand-in as the shared connection."""
+    stand_in = LocalRedisStandIn()
+    register_redis_connection(REDIS_URL, stand_in)
+    yield stand_in
+    await release_redis_connection(REDIS_URL)
+
+
+@pytest.fixture
+def storage(redis):
+    """Create Redis session storage on the stand-in."""
+    return RedisSessionStorage(REDIS_URL)
+
+
+def _session(user_id, **extra):
+    """Create session data for a user."""
+    return {"user_id": user_id, "username": f"user-{user_id}", "roles": ["user"], **extra}
+
+
+def _request(session_id=None):
+    """Create a mock request carrying a session cookie."""
+    request = MagicMock(spec=Request)
+    request.headers = {}
+    request.cookies = {"sessionid": session_id} if session_id else {}
+    return request
+
+
+class TestRedisSessionStorage:
+    """Test Redis session storage against the stand-in."""
+
+    async def test_set_and_get_compact_blob(self, storage, redis):
+        """Test sessions round trip through compact JSON blobs."""
+        await storage.set("abc", _session("1"), 60)
+
+        assert await storage.get("abc") == _session("1")
+        assert redis._data["session:abc"] == json.dumps(_session("1"), separators=(",", ":")).encode()
+        assert await storage.get("missing") is None
+
+    async def test_touch_is_one_round_trip(self, storage, redis):
+        """Test read-and-touch extends the TTL in a single round trip."""
+        with patch("time.time", return_value=1000.0):
+            await storage.set("abc", _session("1"), 60)
+
+        with patch("time.time", return_value=1050.0):
+            round_trips = redis.round_trips
+            data = await storage.touch("abc", 60)
+            assert redis.round_trips == round_trips + 1
+
+        assert data["user_id"] == "1"
+        assert data["last_accessed"] == 1050.0
+        with patch("time.time", return_value=1100.0):
+            assert await storage.get("abc") is not None
+        with patch("time.time", return_value=1111.0):
+            assert await storage.get("abc") is None
+
+    async def test_touch_missing_session(self, storage):
+        """Test touching an unknown session returns None."""
+        assert await storage.touch("missing", 60) is None
+
+    async def test_delete_user_sessions(self, storage, redis):
+        """Test all of one user's sessions are deleted together."""
+        await storage.set("a1", _session("alice"), 60)
+        await storage.set("a2", _session("alice"), 60)
+        await storage.set("b1", _session("bob"), 60)
+
+        round_trips = redis.round_trips
+        assert await storage.delete_user_sessions("alice") == 2
+        assert redis.round_trips == round_trips + 2
+
+        assert await storage.get("a1") is None
+        assert await storage.get("a2") is None
+        assert await storage.get("b1") is not None
+        assert await storage.delete_user_sessions("alice") == 0
+
+    async def test_index_pruned_when_large(self, redis):
+        """Test IDs of expired sessions are pruned from a growing index."""
+        storage = RedisSessionStorage(REDIS_URL, index_prune_size=3)
+
+        with patch("time.time", return_value=1000.0):
+            for index in range(3):
+                await storage.set(f"old{index}", _session("alice"), 10)
+        with patch("time.time", return_value=1015.0):
+            await storage.set("new", _session("alice"), 10)
+            assert await redis.smembers("session:user:alice") == {b"new"}
+
+    async def test_index_expires_with_sessions(self, storage, redis):
+        """Test a user's index expires, and touches keep it alive."""
+        with patch("time.time", return_value=1000.0):
+            await storage.set("a1", _session("alice"), 60)
+            await storage.set("b1", _session("bob"), 60)
+
+        for now in (1050.0, 1100.0):
+            with patch("time.time", return_value=now):
+                assert await storage.touch("a1", 60) is not None
+
+        with patch("time.time", return_value=1150.0):
+            assert await redis.smembers("session:user:alice") == {b"a1"}
+            assert await redis.smembers("session:user:bob") == set()
+            assert await storage.delete_user_sessions("alice") == 1
+
+    async def test_shares_pool_with_rate_limit_storage(self, redis):
+        """Test sessions and rate limiting use one shared connection."""
+        sessions = RedisSessionStorage(REDIS_URL)
+        rate_limits = RedisRateLimitStorage(REDIS_URL)
+
+        assert await sessions._get_redis() is await rate_limits._get_redis() is redis
+
+        await rate_limits.close()
+        await sessions.set("abc", _session("1"), 60)
+        assert await sessions.get("abc") is not None
+        await sessions.close()
+
+
+class TestMemorySessionStorage:
+    """Test memory storage implements the extended interface."""
+
+    async def test_delete_user_sessions(self):
+        """Test memory storage deletes a user's sessions by scanning."""
+        storage = MemorySessionStorage()
+        await storage.set("a1", _session("alice"), 60)
+        await storage.set("b1", _session("bob"), 60)
+
+        assert await storage.delete_user_sessions("alice") == 1
+        assert await storage.get("b1") is not None
+
+    async def test_touch_extends_expiration(self):
+        """Test touch updates last access and expiry."""
+        storage = MemorySessionStorage()
+        with patch("time.time", return_value=1000.0):
+            await storage.set("a1", _session("alice"), 60)
+        with patch("time.time", return_value=1050.0):
+            assert (await storage.touch("a1", 60))["last_accessed"] == 1050.0
+        with patch("time.time", return_value=1100.0):
+            assert await storage.get("a1") is not None
+
+
+class TestSessionProviderRedis:
+    """Test SessionProvider with Redis storage."""
+
+    async def test_authenticate_and_logout_all(self, redis):
+        """Test authentication slides expiry and logout_all ends every session."""
+        provider = SessionProvider({"storage": {"type": "redis", "redis_url": REDIS_URL}})
+        user = User(user_id="alice", username="alice")
+        first = await provider.create_session(user)
+        second = await provider.create_session(user)
+
+        round_trips = redis.round_trips
+        authenticated = await provider.authenticate(_request(first))
+        assert authenticated.user_id == "alice"
+        assert redis.round_trips == round_trips + 1
+
+        result = await provider.logout(_request(first), authenticated, logout_all=True)
+
+        assert result["sessions_deleted"] == 2
+        assert await provider.get_session(second) is None
+        await provider.close()
+
+    def test_unknown_storage_type(self):
+        """Test unsupported storage types are rejected."""
+        with pytest.raises(ValueError, match="Unsupported session storage type"):
+            SessionProvider({"storage": {"type": "carrier_pigeon"}})
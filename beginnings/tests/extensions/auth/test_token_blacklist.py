@@ -0,0 +1,297 @@
+"""Tests for token blacklist storage backends."""
+
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from beginnings.extensions.auth.token_blacklist import (
+    BloomFilter,
+    MemoryTokenBlacklistStorage,
+    RedisTokenBlacklistStorage,
+    SharedMemoryTokenBlacklistStorage,
+    TokenBlacklistManager,
+    token_digest,
+)
+from beginnings.extensions.expiry import ExpiryService
+from beginnings.extensions.redis_connections import register_redis_connection, release_redis_connection
+from beginnings.testing.redis_stand_in import LocalRedisStandIn
+
+REDIS_URL = "redis://blacklist-stand-in/0"
+
+
+@pytest.fixture
+async def redis():
+    """Register a Redis stand-in as the shared connection."""
+    stand_in = LocalRedisStandIn()
+    register_redis_connection(REDIS_URL, stand_in)
+    yield stand_in
+    await release_redis_connection(REDIS_URL)
+
+
+@pytest.fixture
+def shared_path(tmp_path):
+    """Get a backing file path for shared memory storage."""
+    return str(tmp_path / "blacklist")
+
+
+class TestBloomFilter:
+    """Test Bloom filter sizing and membership."""
+
+    def test_no_false_negatives(self):
+        """Test every added digest is reported as present."""
+        bloom = BloomFilter(1000, 0.01)
+        digests = [token_digest(f"jti-{index}") for index in range(1000)]
+        for digest in digests:
+            bloom.add(digest)
+
+        assert all(digest in bloom for digest in digests)
+
+    def test_false_positive_rate_near_target(self):
+        """Test the false positive rate stays close to the configured rate at capacity."""
+        bloom = BloomFilter(5000, 0.01)
+        for index in range(5000):
+            bloom.add(token_digest(f"revoked-{index}"))
+
+        false_positives = sum(token_digest(f"live-{index}") in bloom for index in range(20000))
+
+        assert false_positives / 20000 < 0.02
+
+
+class TestMemoryTokenBlacklistStorage:
+    """Test memory storage cleanup through the expiry service."""
+
+    async def test_cleanup_expires_only_due_tokens(self):
+        """Test cleanup removes expired tokens and keeps live ones."""
+        storage = MemoryTokenBlacklistStorage(ExpiryService())
+        await storage.add_token("old", 1005.0)
+        await storage.add_token("new", 2005.0)
+
+        with patch("time.time", return_value=1500.0):
+            assert await storage.cleanup_expired() == 1
+            assert not await storage.is_blacklisted("old")
+            assert await storage.is_blacklisted("new")
+        assert list(storage._blacklisted_tokens) == ["new"]
+
+    async def test_re_added_token_survives_old_expiry(self):
+        """Test a token re-added with a later expiry is not removed early."""
+        storage = MemoryTokenBlacklistStorage(ExpiryService())
+        await storage.add_token("jti", 1005.0)
+        await storage.add_token("jti", 3005.0)
+
+        with patch("time.time", return_value=1500.0):
+            assert await storage.cleanup_expired() == 0
+            assert await storage.is_blacklisted("jti")
+
+
+class TestRedisTokenBlacklistStorage:
+    """Test Redis storage against the stand-in."""
+
+    async def test_unrevoked_lookup_needs_no_round_trip(self, redis):
+        """Test Bloom filter misses are answered locally."""
+        storage = RedisTokenBlacklistStorage(REDIS_URL, sync_interval=60)
+        await storage.add_token("revoked", time.time() + 60)
+        await storage.sync()
+
+        round_trips = redis.round_trips
+        for index in range(100):
+            assert not await storage.is_blacklisted(f"live-{index}")
+        assert redis.round_trips - round_trips == storage.shared_lookups
+
+        assert await storage.is_blacklisted("revoked")
+        await storage.close()
+
+    async def test_revocation_is_one_round_trip(self, redis):
+        """Test all writes for a revocation are pipelined."""
+        storage = RedisTokenBlacklistStorage(REDIS_URL)
+
+        round_trips = redis.round_trips
+        await storage.add_token("jti", time.time() + 60)
+
+        assert redis.round_trips == round_trips + 1
+        await storage.close()
+
+    async def test_revocation_propagates_between_workers(self, redis):
+        """Test a token revoked by one worker is seen by another after a sync."""
+        first = RedisTokenBlacklistStorage(REDIS_URL, sync_interval=0)
+        second = RedisTokenBlacklistStorage(REDIS_URL, sync_interval=0)
+        assert not await second.is_blacklisted("jti")
+
+        await first.add_token("jti", time.time() + 60)
+
+        assert await second.is_blacklisted("jti")
+        assert not await second.is_blacklisted("other")
+        await first.close()
+        await second.close()
+
+    async def test_new_worker_rebuilds_from_snapshot(self, redis):
+        """Test a worker started later loads live revocations only."""
+        writer = RedisTokenBlacklistStorage(REDIS_URL, bucket_seconds=10)
+        await writer.add_token("live", time.time() + 60)
+        await writer.add_token("expired", time.time() - 30)
+
+        reader = RedisTokenBlacklistStorage(REDIS_URL)
+        assert await reader.is_blacklisted("live")
+        assert token_digest("expired") not in reader._filter
+        await writer.close()
+        await reader.close()
+
+    async def test_token_key_expires_with_token(self, redis):
+        """Test revoked tokens stop being blacklisted once they expire."""
+        storage = RedisTokenBlacklistStorage(REDIS_URL)
+        with patch("time.time", return_value=1000.0):
+            await storage.add_token("jti", 1030.0)
+        with patch("time.time", return_value=1031.0):
+            assert not await storage._contains_shared(token_digest("jti"))
+        await storage.close()
+
+
+class TestSharedMemoryTokenBlacklistStorage:
+    """Test shared memory storage across instances."""
+
+    async def test_revocation_propagates_between_workers(self, shared_path):
+        """Test two instances on one file see each other's revocations."""
+        first = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64, log_capacity=16, sync_interval=0)
+        second = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64, log_capacity=16, sync_interval=0)
+        try:
+            assert not await second.is_blacklisted("jti")
+            await first.add_token("jti", time.time() + 60)
+
+            assert await second.is_blacklisted("jti")
+            assert not await second.is_blacklisted("other")
+        finally:
+            await first.close()
+            await second.close()
+
+    async def test_lagging_worker_rebuilds(self, shared_path):
+        """Test a worker that missed more than the change log rebuilds from the table."""
+        writer = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64, log_capacity=4, sync_interval=0)
+        reader = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64, log_capacity=4, sync_interval=0)
+        try:
+            await reader.sync()
+            for index in range(10):
+                await writer.add_token(f"jti-{index}", time.time() + 60)
+
+            assert all([await reader.is_blacklisted(f"jti-{index}") for index in range(10)])
+        finally:
+            await writer.close()
+            await reader.close()
+
+    async def test_expired_slots_are_reused(self, shared_path):
+        """Test expired entries free their slot for new revocations."""
+        storage = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=1, log_capacity=16)
+        try:
+            with patch("time.time", return_value=1000.0):
+                for index in range(8):
+                    await storage.add_token(f"old-{index}", 1010.0)
+            with patch("time.time", return_value=1020.0):
+                await storage.add_token("new", 1080.0)
+                assert await storage._contains_shared(token_digest("new"))
+        finally:
+            await storage.close()
+
+    async def test_full_bucket_spills_into_next_buckets(self, shared_path):
+        """Test revocations beyond one bucket's slots are all kept."""
+        storage = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=4, log_capacity=64)
+        # Digests with the same leading bytes share a home bucket
+        digests = [bytes(8) + index.to_bytes(8, "little") for index in range(1, 13)]
+        try:
+            for digest in digests:
+                await storage._add_shared(digest, time.time() + 60)
+
+            assert all([await storage._contains_shared(digest) for digest in digests])
+            assert not await storage._contains_shared(bytes(8) + (99).to_bytes(8, "little"))
+        finally:
+            await storage.close()
+
+    async def test_revocation_never_fails_when_buckets_are_full(self, shared_path):
+        """Test a full probe sequence evicts the token expiring soonest."""
+        storage = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=1, log_capacity=16)
+        try:
+            with patch("time.time", return_value=1000.0):
+                for index in range(8):
+                    await storage.add_token(f"jti-{index}", 1100.0 + index)
+                await storage.add_token("one-more", 1200.0)
+
+                assert await storage._contains_shared(token_digest("one-more"))
+                assert not await storage._contains_shared(token_digest("jti-0"))
+                assert all([await storage._contains_shared(token_digest(f"jti-{index}")) for index in range(1, 8)])
+        finally:
+            await storage.close()
+
+    def test_default_path_is_per_app_and_user(self):
+        """Test the default backing file is named after the application and user."""
+        with patch("beginnings.extensions.shared_memory._app_name", "my-app"):
+            storage = SharedMemoryTokenBlacklistStorage()
+
+        assert os.path.basename(storage.path) == f"beginnings_my-app_token_blacklist_{os.getuid()}"
+
+    async def test_unsafe_backing_file_rejected(self, tmp_path, shared_path):
+        """Test symlinked or shared backing files are refused."""
+        target = tmp_path / "elsewhere"
+        target.write_bytes(b"")
+        os.symlink(target, shared_path)
+        storage = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64)
+        with pytest.raises(OSError):
+            await storage.add_token("jti", time.time() + 60)
+        assert target.read_bytes() == b""
+
+        os.chmod(target, 0o644)
+        storage = SharedMemoryTokenBlacklistStorage(path=str(target), buckets=64)
+        with pytest.raises(PermissionError, match="must be 600"):
+            await storage.add_token("jti", time.time() + 60)
+
+    async def test_mismatched_configuration_rejected(self, shared_path):
+        """Test workers must agree on the table layout."""
+        first = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=64)
+        second = SharedMemoryTokenBlacklistStorage(path=shared_path, buckets=128)
+        try:
+            await first.add_token("jti", time.time() + 60)
+            with pytest.raises(ValueError, match="same configuration"):
+                await second.add_token("jti", time.time() + 60)
+        finally:
+            await first.close()
+            await second.close()
+
+
+class TestTokenBlacklistManager:
+    """Test manager storage selection."""
+
+    async def test_shared_memory_storage(self, shared_path):
+        """Test the manager blacklists tokens through shared memory."""
+        manager = TokenBlacklistManager({"storage": {"type": "shared_memory", "path": shared_path, "buckets": 64}})
+        await manager.blacklist_token({"jti": "abc", "exp": time.time() + 60})
+
+        assert await manager.is_token_blacklisted({"jti": "abc"})
+        assert not await manager.is_token_blacklisted({"jti": "def"})
+        await manager.close()
+
+    async def test_revocations_beyond_table_capacity(self, shared_path):
+        """Test revoking more tokens than one bucket holds does not raise."""
+        manager = TokenBlacklistManager({"storage": {"type": "shared_memory", "path": shared_path, "buckets": 1}})
+        for index in range(20):
+            await manager.blacklist_token({"jti": f"jti-{index}", "exp": time.time() + 60 + index})
+
+        assert await manager.is_token_blacklisted({"jti": "jti-19"})
+        await manager.close()
+
+    async def test_redis_storage(self, redis):
+        """Test the manager accepts Redis storage."""
+        manager = TokenBlacklistManager({"storage": {"type": "redis", "redis_url": REDIS_URL}})
+        await manager.blacklist_token({"jti": "abc", "exp": time.time() + 60})
+
+        assert await manager.is_token_blacklisted({"jti": "abc"})
+        await manager.close()
+
+    def test_validate_config(self):
+        """Test invalid shared storage settings are reported."""
+        manager = TokenBlacklistManager({"storage": {"type": "redis", "capacity": 0, "error_rate": 2}})
+
+        assert len(manager.validate_config()) == 2
+        assert TokenBlacklistManager({}).validate_config() == []
+
+    def test_unknown_storage_type(self):
+        """Test unsupported storage types are rejected."""
+        with pytest.raises(ValueError, match="Unsupported blacklist storage type"):
+            TokenBlacklistManager({"storage": {"type": "carrier_pigeon"}})
@@ -0,0 +1,261 @@
+"""Tests for cached, single-flight user resolution."""
+
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.auth.providers.base import AuthenticationError
+from beginnings.extensions.auth.providers.jwt_provider import JWTProvider
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.extensions.auth.user_resolver import UserResolver
+from beginnings.monitoring import get_metrics_collector
+
+SECRET = "test-secret-key-for-jwt-that-is-long-enough-for-security"
+
+
+class CountingLookup:
+    """User lookup that counts calls and can be held open."""
+
+    def __init__(self, users):
+        self.users = users
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self, username=None, user_id=None):
+        self.calls += 1
+        await self.release.wait()
+        for user in self.users:
+            if user["username"] == username or str(user["id"]) == user_id:
+                return dict(user)
+        return None
+
+
+def _request():
+    """Create a mock login request."""
+    request = MagicMock(spec=Request)
+    request.headers = {}
+    request.cookies = {}
+    request.client = MagicMock(host="127.0.0.1")
+    return request
+
+
+@pytest.fixture
+def lookup():
+    """Create a counting lookup with one user."""
+    return CountingLookup([{"id": 1, "username": "alice", "roles": ["user"]}])
+
+
+class TestUserResolver:
+    """Test caching, negative caching and single-flight."""
+
+    async def test_cached_within_ttl(self, lookup):
+        """Test repeated resolutions within the TTL call the lookup once."""
+        resolver = UserResolver({"ttl_seconds": 30})
+
+        for _ in range(5):
+            result = await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+
+        assert result["id"] == 1
+        assert lookup.calls == 1
+
+    async def test_expires_after_ttl(self, lookup):
+        """Test entries are looked up again once the TTL passes."""
+        resolver = UserResolver({"ttl_seconds": 30})
+        with patch("time.monotonic", return_value=1000.0):
+            await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+        with patch("time.monotonic", return_value=1031.0):
+            await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+
+        assert lookup.calls == 2
+
+    async def test_negative_caching(self, lookup):
+        """Test unknown users are cached for the shorter negative TTL."""
+        resolver = UserResolver({"ttl_seconds": 30, "negative_ttl_seconds": 5})
+        with patch("time.monotonic", return_value=1000.0):
+            assert await resolver.resolve("username", "mallory", lambda: lookup(username="mallory")) is None
+            assert await resolver.resolve("username", "mallory", lambda: lookup(username="mallory")) is None
+        assert lookup.calls == 1
+
+        with patch("time.monotonic", return_value=1006.0):
+            await resolver.resolve("username", "mallory", lambda: lookup(username="mallory"))
+        assert lookup.calls == 2
+
+    async def test_concurrent_lookups_share_one_call(self, lookup):
+        """Test concurrent resolutions of the same key are coalesced."""
+        resolver = UserResolver()
+        lookup.release.clear()
+
+        pending = [
+            asyncio.create_task(resolver.resolve("username", "alice", lambda: lookup(username="alice")))
+            for _ in range(20)
+        ]
+        await asyncio.sleep(0)
+        lookup.release.set()
+        results = await asyncio.gather(*pending)
+
+        assert lookup.calls == 1
+        assert all(result["id"] == 1 for result in results)
+
+    async def test_cancelled_caller_does_not_cancel_others(self, lookup):
+        """Test one waiter being cancelled leaves the shared lookup running."""
+        resolver = UserResolver()
+        lookup.release.clear()
+
+        first = asyncio.create_task(resolver.resolve("username", "alice", lambda: lookup(username="alice")))
+        second = asyncio.create_task(resolver.resolve("username", "alice", lambda: lookup(username="alice")))
+        await asyncio.sleep(0)
+        first.cancel()
+        lookup.release.set()
+
+        assert (await second)["id"] == 1
+        assert lookup.calls == 1
+
+    async def test_errors_are_shared_and_not_cached(self):
+        """Test a failing lookup raises for every waiter and is retried next time."""
+        resolver = UserResolver()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise ConnectionError("database down")
+
+        results = await asyncio.gather(
+            resolver.resolve("user_id", "1", failing),
+            resolver.resolve("user_id", "1", failing),
+            return_exceptions=True
+        )
+        with pytest.raises(ConnectionError):
+            await resolver.resolve("user_id", "1", failing)
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+        assert calls == 2
+
+    async def test_invalidate_drops_every_key_of_the_user(self, lookup):
+        """Test invalidating by ID also drops the username entry of that user."""
+        resolver = UserResolver()
+        await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+        await resolver.resolve("user_id", "1", lambda: lookup(user_id="1"))
+
+        assert resolver.invalidate(user_id="1") == 2
+
+        await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+        assert lookup.calls == 3
+
+    async def test_invalidate_during_lookup_is_not_cached(self, lookup):
+        """Test a lookup that straddles an invalidation is not cached."""
+        resolver = UserResolver()
+        lookup.release.clear()
+
+        stale = asyncio.create_task(resolver.resolve("username", "alice", lambda: lookup(username="alice")))
+        await asyncio.sleep(0)
+        resolver.invalidate(username="alice")
+        lookup.release.set()
+        await stale
+
+        await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+        assert lookup.calls == 2
+
+    async def test_credential_bound_entries(self):
+        """Test answers from password-checking lookups only serve the same password."""
+        resolver = UserResolver()
+        calls = []
+
+        async def checking_lookup(password):
+            calls.append(password)
+            return {"id": 1} if password == "right" else None
+
+        assert await resolver.resolve("username", "alice", lambda: checking_lookup("right"), credential="right")
+        assert not await resolver.resolve("username", "alice", lambda: checking_lookup("wrong"), credential="wrong")
+        assert await resolver.resolve("username", "alice", lambda: checking_lookup("right"), credential="right")
+
+        assert calls == ["right", "wrong", "right"]
+        assert all("right" not in repr(entry) for entry in resolver._cache.values())
+
+    async def test_lru_bound(self, lookup):
+        """Test the cache stays within max_size."""
+        resolver = UserResolver({"max_size": 2})
+        for name in ("a", "b", "c"):
+            await resolver.resolve("username", name, lambda name=name: lookup(username=name))
+
+        assert len(resolver._cache) == 2
+        assert ("username", "a") not in resolver._cache
+
+    async def test_db_call_metrics(self, lookup):
+        """Test lookup calls and cache outcomes are exported."""
+        metrics = get_metrics_collector()
+        tags = {"provider": "metrics-test"}
+        resolver = UserResolver(provider="metrics-test")
+
+        for _ in range(4):
+            await resolver.resolve("username", "alice", lambda: lookup(username="alice"))
+
+        assert metrics.get_counter("user_lookup_db_calls_total", tags) == 1
+        assert metrics.get_counter("user_lookup_total", {**tags, "result": "hit"}) == 3
+        assert metrics.get_gauge("user_lookup_db_calls_per_lookup", tags) == 1.0
+
+    def test_validate_config(self):
+        """Test invalid settings are reported."""
+        resolver = UserResolver({"ttl_seconds": -1, "negative_ttl_seconds": -1, "max_size": 0})
+
+        assert len(resolver.validate_config()) == 3
+        assert UserResolver().validate_config() == []
+
+
+class TestProviderUserCache:
+    """Test providers resolve users through the cache."""
+
+    async def test_jwt_refresh_uses_cache_and_invalidation(self, lookup):
+        """Test token refreshes share cached lookups until invalidated."""
+        provider = JWTProvider({"secret_key": SECRET})
+        provider.set_user_lookup_function(lookup)
+        user = MagicMock(user_id="1", username="alice", email=None, roles=["user"], permissions=[])
+        refresh_token = provider.create_refresh_token(user)
+
+        await provider.refresh_token(refresh_token)
+        await provider.refresh_token(refresh_token)
+        assert lookup.calls == 1
+
+        lookup.users[0]["roles"] = ["admin"]
+        assert provider.invalidate_user(user_id="1") == 1
+        access_token, _ = await provider.refresh_token(refresh_token)
+
+        assert lookup.calls == 2
+        assert (await provider._decode_token(access_token))["roles"] == ["admin"]
+        await provider.close()
+
+    async def test_session_login_storm_coalesced(self):
+        """Test concurrent logins for one user make one lookup."""
+        provider = SessionProvider({"password_hashing": {"bcrypt_rounds": 4}})
+        password_hash = provider.hash_password("password123")
+        calls = 0
+
+        async def lookup(username, password=None):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": 1, "username": username, "password_hash": password_hash}
+
+        provider.set_user_lookup_function(lookup)
+        results = await asyncio.gather(*[provider.login(_request(), "alice", "password123") for _ in range(10)])
+
+        assert len(results) == 10
+        assert calls == 1
+        with pytest.raises(AuthenticationError):
+            await provider.login(_request(), "alice", "wrong")
+        await provider.close()
+
+    async def test_cache_can_be_disabled(self, lookup):
+        """Test every resolution calls the lookup when the cache is disabled."""
+        provider = JWTProvider({"secret_key": SECRET, "user_cache": {"enabled": False}})
+        provider.set_user_lookup_function(lookup)
+
+        await provider._lookup_user("alice")
+        await provider._lookup_user("alice")
+
+        assert lookup.calls == 2
+        await provider.close()
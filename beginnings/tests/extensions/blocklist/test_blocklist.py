@@ -0,0 +1,350 @@
+"""
+Tests for the blocklist extension.
+
+This module tests static CIDR blocks, automatic bans promoted from
+rate limit rejections, ban sharing through storage and chain ordering.
+"""
+
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.blocklist import BlocklistExtension
+from beginnings.extensions.rate_limiting import RateLimitExtension
+from beginnings.extensions.rate_limiting.storage import set_extension_storage
+from beginnings.extensions.request_facts import RequestFacts
+from beginnings.extensions.responses import PreparedResponse
+from beginnings.routing.middleware import MiddlewareChainBuilder
+
+
+def _make_request(client: str = "198.51.100.7", path: str = "/api/data", headers: dict | None = None) -> Request:
+    """Build a minimal ASGI request."""
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": (client, 54321),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+def _make_extension(config: dict | None = None) -> BlocklistExtension:
+    """Create extension with a silent logger."""
+    # Don't borrow storage from a RateLimitExtension made by an earlier test
+    set_extension_storage(None)
+    extension = BlocklistExtension(config or {})
+    extension.logger = MagicMock()
+    return extension
+
+
+async def _ok(request: Request) -> JSONResponse:
+    """Downstream handler that always succeeds."""
+    return JSONResponse({"ok": True})
+
+
+async def _too_many(request: Request) -> JSONResponse:
+    """Downstream handler standing in for a rate limit rejection."""
+    RequestFacts.of(request).rate_limited = True
+    return JSONResponse({"error": "Rate limit exceeded"}, status_code=429)
+
+
+async def _handler_429(request: Request) -> JSONResponse:
+    """Downstream handler returning its own 429, as from an upstream service."""
+    return JSONResponse({"error": "Upstream busy"}, status_code=429)
+
+
+class TestStaticBlocks:
+    """Test statically blocked networks."""
+
+    @pytest.mark.asyncio
+    async def test_blocked_network_gets_prepared_403(self):
+        """Test clients in a blocked network get the pre-serialized 403."""
+        extension = _make_extension({"static": ["198.51.100.0/24", "2001:db8::/32"]})
+        middleware = extension.get_middleware_factory()({})
+
+        response = await middleware(_make_request("198.51.100.7"), _ok)
+
+        assert isinstance(response, PreparedResponse)
+        assert response.status_code == 403
+        assert json.loads(response.body) == {"error": "Forbidden"}
+        assert await extension.is_banned("2001:db8::1")
+        assert not await extension.is_banned("203.0.113.1")
+
+    @pytest.mark.asyncio
+    async def test_html_clients_get_html_403(self):
+        """Test non-API requests get the HTML body."""
+        extension = _make_extension({"static": ["198.51.100.0/24"], "error_message": "<nope>"})
+        middleware = extension.get_middleware_factory()({})
+
+        response = await middleware(_make_request(path="/page"), _ok)
+
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert b"&lt;nope&gt;" in response.body
+
+    @pytest.mark.asyncio
+    async def test_unblocked_client_passes_and_shares_ip(self):
+        """Test allowed clients reach the handler with the resolved IP shared."""
+        extension = _make_extension({"static": ["198.51.100.0/24"]})
+        middleware = extension.get_middleware_factory()({})
+        request = _make_request("10.0.0.5", headers={"x-forwarded-for": "203.0.113.9"})
+
+        response = await middleware(request, _ok)
+
+        assert response.status_code == 200
+        assert RequestFacts.of(request).client_ip == "203.0.113.9"
+
+    @pytest.mark.asyncio
+    async def test_forwarded_ip_is_checked(self):
+        """Test blocks apply to the client behind a trusted proxy."""
+        extension = _make_extension({"static": ["203.0.113.0/24"]})
+        middleware = extension.get_middleware_factory()({})
+
+        response = await middleware(_make_request("10.0.0.5", headers={"x-forwarded-for": "203.0.113.9"}), _ok)
+
+        assert response.status_code == 403
+
+    def test_static_file(self, tmp_path):
+        """Test networks are loaded from a file with comments."""
+        blocklist_file = tmp_path / "blocked.txt"
+        blocklist_file.write_text("# scanners\n192.0.2.0/24\n\n2001:db8::/48\n")
+
+        extension = _make_extension({"static_file": str(blocklist_file)})
+
+        assert "192.0.2.10" in extension._static_trie
+        assert "2001:db8::5" in extension._static_trie
+
+    def test_invalid_network_raises(self):
+        """Test invalid static networks are rejected at startup."""
+        with pytest.raises(ValueError, match="Invalid blocked network"):
+            BlocklistExtension({"static": ["300.0.0.0/8"]})
+
+
+class TestAutomaticBans:
+    """Test bans promoted from rate limit rejections."""
+
+    @pytest.mark.asyncio
+    async def test_ban_after_repeated_rejections(self):
+        """Test a client is banned after X rejections and then short-circuited."""
+        extension = _make_extension({"auto_ban": {"violations": 3, "window_seconds": 60, "ban_seconds": 300}})
+        middleware = extension.get_middleware_factory()({})
+        handler = MagicMock(side_effect=_too_many)
+
+        for _ in range(3):
+            response = await middleware(_make_request(), handler)
+            assert response.status_code == 429
+
+        response = await middleware(_make_request(), handler)
+
+        assert response.status_code == 403
+        assert handler.call_count == 3
+        event = extension.logger.log_security_event.call_args.args[0]
+        assert event.event_type == "client_banned"
+        assert event.ip_address == "198.51.100.7"
+
+    @pytest.mark.asyncio
+    async def test_html_rejections_count(self):
+        """Test HTML rate limit rejections raised as HTTPException are counted."""
+        extension = _make_extension({"auto_ban": {"violations": 2}})
+        middleware = extension.get_middleware_factory()({})
+
+        async def raise_429(request):
+            RequestFacts.of(request).rate_limited = True
+            raise HTTPException(status_code=429, detail="slow down")
+
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await middleware(_make_request(path="/page"), raise_429)
+
+        assert await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_other_429_responses_do_not_count(self):
+        """Test 429s that RateLimitExtension did not make are not violations."""
+        extension = _make_extension({"auto_ban": {"violations": 1}})
+        middleware = extension.get_middleware_factory()({})
+
+        async def raise_429(request):
+            raise HTTPException(status_code=429, detail="upstream busy")
+
+        assert (await middleware(_make_request(), _handler_429)).status_code == 429
+        with pytest.raises(HTTPException):
+            await middleware(_make_request(path="/page"), raise_429)
+
+        assert not await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_violations_outside_window_do_not_ban(self):
+        """Test violations spread over more than the window are forgiven."""
+        extension = _make_extension({"auto_ban": {"violations": 2, "window_seconds": 10}})
+        middleware = extension.get_middleware_factory()({})
+
+        with patch("time.time", return_value=1000.0):
+            await middleware(_make_request(), _too_many)
+        with patch("time.time", return_value=1011.0):
+            await middleware(_make_request(), _too_many)
+
+            assert not await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_ban_expires(self):
+        """Test dynamic bans lapse after ban_seconds."""
+        extension = _make_extension({"auto_ban": {"ban_seconds": 60}})
+
+        with patch("time.time", return_value=1000.0):
+            await extension.ban("198.51.100.7")
+            assert await extension.is_banned("198.51.100.7")
+        with patch("time.time", return_value=1061.0):
+            assert not await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_unban(self):
+        """Test bans can be lifted manually."""
+        extension = _make_extension()
+
+        await extension.ban("198.51.100.7")
+        await extension.unban("198.51.100.7")
+
+        assert not await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_disabled_auto_ban_ignores_rejections(self):
+        """Test rejections are not counted when auto-ban is disabled."""
+        extension = _make_extension({"auto_ban": {"enabled": False, "violations": 1}})
+        middleware = extension.get_middleware_factory()({})
+
+        await middleware(_make_request(), _too_many)
+
+        assert not await extension.is_banned("198.51.100.7")
+
+    @pytest.mark.asyncio
+    async def test_bans_from_rate_limit_extension(self):
+        """Test the blocklist bans clients rejected by RateLimitExtension."""
+        extension = _make_extension({"auto_ban": {"violations": 2}})
+        rate_limiter = RateLimitExtension({"global": {"enabled": True, "requests": 1, "window_seconds": 60}})
+        rate_limiter.logger = MagicMock()
+        blocklist_middleware = extension.get_middleware_factory()({})
+        rate_limit_middleware = rate_limiter.get_middleware_factory()({"path": "/api/data"})
+
+        async def chain(request):
+            return await blocklist_middleware(request, lambda r: rate_limit_middleware(r, _ok))
+
+        statuses = [(await chain(_make_request())).status_code for _ in range(4)]
+
+        assert statuses == [200, 429, 429, 403]
+
+
+class TestSharedBans:
+    """Test ban state shared through rate limit storage."""
+
+    @pytest.mark.asyncio
+    async def test_ban_visible_to_other_worker(self, tmp_path):
+        """Test a ban recorded by one instance is enforced by another."""
+        storage_config = {"type": "shared_memory", "path": str(tmp_path / "bans"), "buckets": 64}
+        first = _make_extension({"storage": storage_config, "sync_interval": 0})
+        second = _make_extension({"storage": storage_config, "sync_interval": 0})
+
+        try:
+            assert not await second.is_banned("198.51.100.7")
+            await first.ban("198.51.100.7")
+            assert await second.is_banned("198.51.100.7")
+        finally:
+            await first.get_shutdown_handler()()
+            await second.get_shutdown_handler()()
+
+    @pytest.mark.asyncio
+    async def test_defaults_to_rate_limit_storage(self, tmp_path):
+        """Test bans use the RateLimitExtension's storage when none is configured."""
+        storage_config = {"type": "shared_memory", "path": str(tmp_path / "limits"), "buckets": 64}
+        other_worker = _make_extension({"storage": storage_config, "sync_interval": 0})
+        extension = _make_extension({"sync_interval": 0})
+        rate_limiter = RateLimitExtension({"storage": storage_config})
+
+        try:
+            await extension.ban("198.51.100.7")
+            assert extension._storage is rate_limiter._storage
+            assert await other_worker.is_banned("198.51.100.7")
+
+            # The borrowed storage is left for the rate limiter to close
+            await extension.get_shutdown_handler()()
+            await extension.ban("198.51.100.8")
+            assert await other_worker.is_banned("198.51.100.8")
+        finally:
+            await other_worker.get_shutdown_handler()()
+            await rate_limiter.get_shutdown_handler()()
+
+    @pytest.mark.asyncio
+    async def test_negative_results_cached_for_sync_interval(self, tmp_path):
+        """Test unbanned clients are not rechecked in storage on every request."""
+        extension = _make_extension({
+            "storage": {"type": "shared_memory", "path": str(tmp_path / "bans"), "buckets": 64},
+            "sync_interval": 60
+        })
+
+        try:
+            assert not await extension.is_banned("198.51.100.7")
+            extension._storage.get_counter = MagicMock(side_effect=AssertionError("storage hit"))
+            assert not await extension.is_banned("198.51.100.7")
+        finally:
+            await extension.get_shutdown_handler()()
+
+
+class TestBlocklistConfiguration:
+    """Test route applicability, validation and chain ordering."""
+
+    def test_route_opt_out(self):
+        """Test routes can opt out of the blocklist."""
+        extension = _make_extension()
+
+        assert extension.should_apply_to_route("/", ["GET"], {})
+        assert not extension.should_apply_to_route("/health", ["GET"], {"blocklist": {"enabled": False}})
+        assert not _make_extension({"enabled": False}).should_apply_to_route("/", ["GET"], {})
+
+    def test_validate_config(self):
+        """Test invalid auto-ban settings are reported."""
+        extension = _make_extension({"auto_ban": {"violations": 0, "ban_seconds": -1}})
+
+        errors = extension.validate_config()
+
+        assert "Blocklist auto_ban violations must be positive" in errors
+        assert "Blocklist auto_ban ban_seconds must be positive" in errors
+
+    def test_blocklist_runs_first_in_chain(self):
+        """Test the blocklist is outermost regardless of load order."""
+        execution_log = []
+
+        def make_extension(name):
+            class _Recording(BaseExtension):
+                def get_middleware_factory(self):
+                    def factory(route_config):
+                        def middleware(endpoint):
+                            def wrapped():
+                                execution_log.append(name)
+                                return endpoint()
+                            return wrapped
+                        return middleware
+                    return factory
+
+                def should_apply_to_route(self, path, methods, route_config):
+                    return True
+
+            _Recording.__name__ = name
+            return _Recording({})
+
+        manager = MagicMock()
+        manager.get_loaded_extensions.return_value = [
+            make_extension("AuthExtension"),
+            make_extension("RateLimitExtension"),
+            make_extension("BlocklistExtension"),
+        ]
+
+        chain = MiddlewareChainBuilder(manager).build_middleware_chain("/", ["GET"], {})
+        chain(lambda: None)()
+
+        assert execution_log == ["BlocklistExtension", "RateLimitExtension", "AuthExtension"]
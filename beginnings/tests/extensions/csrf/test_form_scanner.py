@@ -0,0 +1,222 @@
+"""Tests for header-first CSRF validation and the streaming form scanner."""
+
+import time
+import tracemalloc
+import urllib.parse
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.csrf.extension import CSRFExtension
+from beginnings.extensions.csrf.form_scanner import MAX_SCAN_BYTES, FormTokenScanner, scan_form_token
+from beginnings.extensions.csrf.tokens import CSRFTokenError
+
+BOUNDARY = "----beginnings-boundary"
+MULTIPART = f"multipart/form-data; boundary={BOUNDARY}"
+URLENCODED = "application/x-www-form-urlencoded"
+CONFIG = {"secret_key": "test-csrf-secret-key-that-is-long-enough"}
+
+
+def _multipart(*parts):
+    """Encode (name, value, filename) parts as a multipart body."""
+    body = b""
+    for name, value, filename in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+class Receiver:
+    """ASGI receive callable serving a body in chunks and counting reads."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.reads = 0
+
+    async def __call__(self):
+        self.reads += 1
+        if not self.chunks:
+            return {"type": "http.disconnect"}
+        chunk = self.chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(self.chunks)}
+
+
+def _request(receive, content_type, headers=()):
+    """Create a POST request reading its body from receive."""
+    raw_headers = [(b"content-type", content_type.encode())] + [(k.encode(), v.encode()) for k, v in headers]
+    scope = {"type": "http", "method": "POST", "path": "/submit", "query_string": b"", "headers": raw_headers}
+    return Request(scope, receive)
+
+
+def _split(body, size):
+    """Split a body into chunks of a size."""
+    return [body[index:index + size] for index in range(0, len(body), size)] or [b""]
+
+
+class TestFormTokenScanner:
+    """Test incremental field search."""
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 64])
+    def test_urlencoded_across_chunk_boundaries(self, size):
+        """Test the field is found however the body is split."""
+        body = urllib.parse.urlencode({"name": "csrf_token_x", "csrf_token": "a b/c", "other": "1"}).encode()
+        scanner = FormTokenScanner("csrf_token", URLENCODED)
+
+        chunks = _split(body, size)
+        values = [scanner.feed(chunk, final=index == len(chunks) - 1) for index, chunk in enumerate(chunks)]
+
+        assert [value for value in values if value is not None] == ["a b/c"]
+
+    def test_urlencoded_last_field(self):
+        """Test a field at the end of the body is completed by the final chunk."""
+        scanner = FormTokenScanner("csrf_token", URLENCODED)
+
+        assert scanner.feed(b"a=1&csrf_token=tok") is None
+        assert scanner.feed(b"en", final=True) == "token"
+
+    @pytest.mark.parametrize("size", [1, 5, 64, 4096])
+    def test_multipart_skips_file_content(self, size):
+        """Test field-like text inside a file part is not mistaken for the field."""
+        decoy = b'Content-Disposition: form-data; name="csrf_token"\r\n\r\nfake'
+        body = _multipart(("upload", decoy * 10, "a.txt"), ("csrf_token", b"real-token", None))
+        scanner = FormTokenScanner("csrf_token", MULTIPART)
+
+        chunks = _split(body, size)
+        values = [scanner.feed(chunk, final=index == len(chunks) - 1) for index, chunk in enumerate(chunks)]
+
+        assert [value for value in values if value is not None] == ["real-token"]
+
+    def test_multipart_without_field(self):
+        """Test the scanner finishes at the closing delimiter when the field is absent."""
+        scanner = FormTokenScanner("csrf_token", MULTIPART)
+
+        assert scanner.feed(_multipart(("other", b"value", None))) is None
+        assert scanner.finished
+
+    def test_unsupported_content_type(self):
+        """Test JSON bodies are not scanned."""
+        assert not FormTokenScanner("csrf_token", "application/json").supported
+
+
+class TestScanFormToken:
+    """Test streaming reads and replay to the handler."""
+
+    async def test_stops_reading_at_field_and_replays_body(self):
+        """Test only the messages up to the field are read and the handler sees the whole form."""
+        body = _multipart(("csrf_token", b"tok", None), ("upload", b"x" * 100_000, "big.bin"))
+        receive = Receiver(_split(body, 1024))
+        request = _request(receive, MULTIPART)
+
+        assert await scan_form_token(request, "csrf_token") == "tok"
+        assert receive.reads == 1
+
+        form = await request.form()
+        assert form["csrf_token"] == "tok"
+        assert len(await form["upload"].read()) == 100_000
+
+    async def test_body_read_once_when_field_missing(self):
+        """Test a body without the field is still readable by the handler."""
+        body = b"a=1&b=2"
+        receive = Receiver([body])
+        request = _request(receive, URLENCODED)
+
+        assert await scan_form_token(request, "csrf_token") is None
+        assert await request.body() == body
+        assert receive.reads == 1
+
+
+    async def test_gives_up_past_scan_limit(self):
+        """Test a token beyond the scan limit is not found and reading stops there."""
+        body = b"upload=" + b"x" * 10_000 + b"&csrf_token=tok"
+        receive = Receiver(_split(body, 1000))
+        request = _request(receive, URLENCODED)
+
+        assert await scan_form_token(request, "csrf_token", max_bytes=4000) is None
+        assert receive.reads == 5
+        assert await request.body() == body
+
+
+class TestHeaderFirstValidation:
+    """Test the extension checks headers before the body."""
+
+    async def test_header_token_skips_body(self):
+        """Test AJAX requests are validated without reading the body."""
+        extension = CSRFExtension(CONFIG)
+        token = extension.token_manager.generate_token()
+        receive = Receiver([b'{"large": "json"}'])
+        request = _request(receive, "application/json", [("x-csrftoken", token)])
+
+        await extension._validate_csrf_token(request, {})
+
+        assert receive.reads == 0
+
+    async def test_form_token_validated(self):
+        """Test a token in the form body is found and validated."""
+        extension = CSRFExtension(CONFIG)
+        token = extension.token_manager.generate_token()
+        body = urllib.parse.urlencode({"csrf_token": token, "comment": "hi"}).encode()
+        request = _request(Receiver(_split(body, 16)), URLENCODED)
+
+        await extension._validate_csrf_token(request, {})
+
+        assert (await request.form())["comment"] == "hi"
+
+    async def test_missing_token_rejected(self):
+        """Test requests without a token in headers or body are rejected."""
+        extension = CSRFExtension(CONFIG)
+        request = _request(Receiver([b"comment=hi"]), URLENCODED)
+
+        with pytest.raises(CSRFTokenError, match="not found"):
+            await extension._validate_csrf_token(request, {})
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("position", ["first", "last", "missing"])
+@pytest.mark.parametrize("content_type", [MULTIPART, URLENCODED])
+async def test_50mb_upload_benchmark(content_type, position):
+    """Benchmark memory and latency of token lookup in a 50 MB form against full form parsing."""
+    chunk = b"x" * 65536
+    count = 50 * 1024 * 1024 // len(chunk)
+    if content_type == MULTIPART:
+        token_part = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="csrf_token"\r\n\r\ntok\r\n'.encode()
+        upload_head = f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="upload"; filename="big.bin"\r\n\r\n'.encode()
+        closing = f"--{BOUNDARY}--\r\n".encode()
+        if position == "first":
+            head, tail = token_part + upload_head, b"\r\n" + closing
+        elif position == "last":
+            head, tail = upload_head, b"\r\n" + token_part + closing
+        else:
+            head, tail = upload_head, b"\r\n" + closing
+    else:
+        head = b"csrf_token=tok&upload=" if position == "first" else b"upload="
+        tail = b"&csrf_token=tok" if position == "last" else b""
+
+    def upload():
+        return Receiver([head] + [chunk] * count + [tail])
+
+    async def measure(lookup, expected):
+        request = _request(upload(), content_type)
+        tracemalloc.start()
+        start_time = time.perf_counter()
+        token = await lookup(request)
+        elapsed = time.perf_counter() - start_time
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        assert token == expected
+        return elapsed, peak
+
+    async def parse_form(request):
+        form = await request.form(max_part_size=100 * 1024 * 1024)
+        token = form.get("csrf_token")
+        await form.close()
+        return token
+
+    # Past MAX_SCAN_BYTES a late token counts as missing
+    scan_seconds, scan_peak = await measure(
+        lambda request: scan_form_token(request, "csrf_token"), "tok" if position == "first" else None
+    )
+    form_seconds, form_peak = await measure(parse_form, None if position == "missing" else "tok")
+
+    assert scan_peak < MAX_SCAN_BYTES + 1024 * 1024
+    assert scan_peak < form_peak
+    assert scan_seconds < form_seconds / 10
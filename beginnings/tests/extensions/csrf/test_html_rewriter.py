@@ -0,0 +1,205 @@
+"""Tests for the streaming CSRF HTML rewriter."""
+
+import time
+
+import pytest
+from fastapi import Request
+from fastapi.responses import HTMLResponse, StreamingResponse
+
+from beginnings.extensions.csrf.extension import CSRFExtension
+from beginnings.extensions.csrf.html_rewriter import MAX_HELD_FORM_CHARS, CSRFHTMLRewriter, rewrite_html_stream
+
+FIELD = '<input type="hidden" name="csrf_token" value="tok">'
+META = '<meta name="csrf-token" content="tok">'
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Forms <form method="post"></title>
+<!-- <form method="post"> in a comment -->
+<script>if (a < b) { html = '<form method="post">'; }</script>
+</head>
+<body>
+<form method="post" action="/login">a</form>
+<FORM METHOD='POST' data-x="1 > 0">b</FORM>
+<form method=delete>c</form>
+<form method="get" action="/search">d</form>
+<form action="/default-get">e</form>
+<textarea><form method="post"></textarea>
+<p>1 < 2 and <br/> text</p>
+</body></html>
+"""
+
+
+def _stream_rewrite(page, size, **kwargs):
+    """Rewrite a page fed in chunks of a size."""
+    rewriter = CSRFHTMLRewriter(**kwargs)
+    chunks = [page[index:index + size] for index in range(0, len(page), size)]
+    return "".join(rewriter.feed(chunk) for chunk in chunks) + rewriter.close()
+
+
+def _request():
+    """Create a GET request."""
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
+
+
+class TestCSRFHTMLRewriter:
+    """Test form and meta injection."""
+
+    def test_injects_into_protected_forms_only(self):
+        """Test POST-style forms get the field and other markup is untouched."""
+        rewriter = CSRFHTMLRewriter(field_html=FIELD)
+        result = rewriter.rewrite(PAGE)
+
+        assert rewriter.forms_injected == 3
+        assert f'<form method="post" action="/login">{FIELD}a</form>' in result
+        assert f"""<FORM METHOD='POST' data-x="1 > 0">{FIELD}b</FORM>""" in result
+        assert f"<form method=delete>{FIELD}c</form>" in result
+        assert result.replace(FIELD, "") == PAGE
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 5, 8, 13, 64])
+    def test_chunked_output_matches_whole_page(self, size):
+        """Test any chunking produces the same output as rewriting the whole page."""
+        expected = CSRFHTMLRewriter(field_html=FIELD, meta_html=META).rewrite(PAGE)
+
+        assert _stream_rewrite(PAGE, size, field_html=FIELD, meta_html=META) == expected
+
+    def test_meta_before_head_end(self):
+        """Test the meta tag is inserted before the closing head tag."""
+        result = CSRFHTMLRewriter(meta_html=META).rewrite("<html><head><title>t</title></head><body></body></html>")
+
+        assert result == f"<html><head><title>t</title>    {META}\n</head><body></body></html>"
+
+    @pytest.mark.parametrize("size", [1, 4, 7, 100])
+    def test_meta_placeholder_replaced(self, size):
+        """Test the placeholder is replaced, even when split across chunks."""
+        page = "<head><!-- CSRF_META_TAG --><!-- other --></head>"
+
+        result = _stream_rewrite(page, size, meta_html=META)
+
+        assert result == f"<head>{META}<!-- other --></head>"
+
+    def test_unterminated_markup_passes_through(self):
+        """Test truncated pages are flushed unchanged on close."""
+        for page in ['<form method="post', "<!-- open", "<script>x", "a <"]:
+            assert CSRFHTMLRewriter(field_html=FIELD, meta_html=META).rewrite(page) == page
+
+    async def test_stream_handles_split_multibyte_characters(self):
+        """Test byte chunks splitting a UTF-8 character round-trip intact."""
+        page = '<p>héllo ✓</p><form method="post"></form>'.encode()
+
+        async def chunks():
+            for index in range(len(page)):
+                yield page[index:index + 1]
+
+        body = b"".join([chunk async for chunk in rewrite_html_stream(chunks(), CSRFHTMLRewriter(field_html=FIELD))])
+
+        assert body.decode() == f'<p>héllo ✓</p><form method="post">{FIELD}</form>'
+
+    @pytest.mark.parametrize("size", [1, 3, 7, 4096])
+    def test_forms_with_a_field_are_skipped(self, size):
+        """Test forms that already render a CSRF field don't get a second one."""
+        page = (
+            '<form method="post"><input type="hidden" name="csrf_token" value="own"><p>a</p></form>'
+            '<form method="post"><input name="_token" value="own"></form>'
+            '<form method="post"><p>needs one</p></form>'
+        )
+
+        rewriter = CSRFHTMLRewriter(field_html=FIELD, field_name="_token")
+        chunks = [page[index:index + size] for index in range(0, len(page), size)]
+        result = "".join(rewriter.feed(chunk) for chunk in chunks) + rewriter.close()
+
+        assert rewriter.forms_injected == 1
+        assert result == page.replace("<p>needs one", f"{FIELD}<p>needs one")
+
+    def test_unclosed_form_gets_field(self):
+        """Test a form left open at the end of the page still gets the field."""
+        result = CSRFHTMLRewriter(field_html=FIELD).rewrite('<form method="post"><input name="q">')
+
+        assert result == f'<form method="post">{FIELD}<input name="q">'
+
+    def test_large_form_released_at_cap(self):
+        """Test only a bounded amount of a form's content is held back."""
+        rewriter = CSRFHTMLRewriter(field_html=FIELD)
+        output = rewriter.feed('<form method="post">')
+        for _ in range(MAX_HELD_FORM_CHARS // 1000 + 1):
+            output += rewriter.feed("<p>" + "x" * 1000 + "</p>")
+
+        assert output.startswith(f'<form method="post">{FIELD}<p>')
+        assert rewriter.close() == ""
+
+    @pytest.mark.parametrize("page", [
+        "a < b " * 100,
+        "<!-- c -->a < b <" * 100,
+        "x <!- y <!" * 100,
+    ])
+    def test_literal_angle_brackets_pass_through(self, page):
+        """Test pages full of literal "<" and comments are unchanged, in any chunking."""
+        for size in (1, 2, 5, 4096):
+            assert _stream_rewrite(page, size, field_html=FIELD, meta_html=META) == page
+
+
+class TestExtensionInjection:
+    """Test the extension rewrites HTML responses."""
+
+    async def test_streaming_template_response(self):
+        """Test streamed HTML gets form fields and the meta tag without buffering."""
+        extension = CSRFExtension({
+            "secret_key": "test-csrf-secret-key-that-is-long-enough",
+            "template_integration": {"auto_inject_forms": True}
+        })
+
+        async def render():
+            yield "<html><head></head><body>"
+            yield '<form method="po'
+            yield 'st"></form></body></html>'
+
+        response = StreamingResponse(render(), media_type="text/html")
+        response = await extension._add_csrf_headers_to_response(_request(), response, {})
+        body = b"".join([chunk async for chunk in response.body_iterator]).decode()
+
+        assert body.count('name="csrf_token"') == 1
+        assert '<meta name="csrf-token"' in body
+
+    async def test_html_response(self):
+        """Test buffered HTML responses are rewritten and keep a correct length."""
+        extension = CSRFExtension({
+            "secret_key": "test-csrf-secret-key-that-is-long-enough",
+            "template_integration": {"auto_inject_forms": True}
+        })
+        response = HTMLResponse('<html><head></head><body><form method="post"></form></body></html>')
+
+        response = await extension._add_csrf_headers_to_response(_request(), response, {})
+
+        assert b'type="hidden" name="csrf_token"' in response.body
+        assert response.headers["content-length"] == str(len(response.body))
+
+    async def test_auto_inject_forms_off_by_default(self):
+        """Test forms are only injected when enabled, while the meta tag stays."""
+        extension = CSRFExtension({"secret_key": "test-csrf-secret-key-that-is-long-enough"})
+        response = HTMLResponse('<html><head></head><body><form method="post"></form></body></html>')
+
+        response = await extension._add_csrf_headers_to_response(_request(), response, {})
+
+        assert b'name="csrf_token"' not in response.body
+        assert b'<meta name="csrf-token"' in response.body
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("block", [
+    '<div class="row"><p>Item &amp; <a href="/x?a=1&b=2">link</a></p>'
+    '<form method="post" action="/item"><input name="q"></form></div>\n',
+    "a < b <!-- c --> d < e <\n",
+], ids=["tags", "literal_angle_brackets"])
+def test_1mb_page_benchmark(block, record_property):
+    """Benchmark rewriting 1 MB and 4 MB pages in 4 KB chunks, reporting seconds per MB."""
+    def rewrite_seconds(size):
+        page = block * (size // len(block))
+        start_time = time.perf_counter()
+        result = _stream_rewrite(page, 4096, field_html=FIELD)
+        elapsed = time.perf_counter() - start_time
+        assert result.count(FIELD) == page.count("<form")
+        return elapsed
+
+    # Linear rewriting takes the same time per MB at both sizes
+    for megabytes in (1, 4):
+        seconds = min(rewrite_seconds(megabytes * 1024 * 1024) for _ in range(3))
+        record_property(f"seconds_per_mb_at_{megabytes}mb", seconds / megabytes)
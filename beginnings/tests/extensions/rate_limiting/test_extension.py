@@ -0,0 +1,249 @@
+"""
+Tests for the rate limiting extension middleware.
+
+This module tests request rejection, denial aggregation, sampled
+security logging and the pre-serialized under-attack fast path.
+"""
+
+import json
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+
+from beginnings.extensions.rate_limiting.denials import DenialResponses, DenialTracker
+from beginnings.extensions.rate_limiting.extension import RateLimitExtension
+from beginnings.extensions.responses import PreparedResponse
+
+
+def _make_request(path: str = "/api/data", client: str = "198.51.100.7", accept: str = "") -> Request:
+    """Build a minimal ASGI request."""
+    headers = [(b"accept", accept.encode())] if accept else []
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": headers,
+        "client": (client, 54321),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    })
+
+
+async def _call_next(request: Request) -> JSONResponse:
+    """Downstream handler returning a small JSON body."""
+    return JSONResponse({"ok": True})
+
+
+def _make_extension(denials: dict | None = None) -> RateLimitExtension:
+    """Create extension with a tiny limit and a silent logger."""
+    extension = RateLimitExtension({
+        "global": {"enabled": True, "requests": 1, "window_seconds": 60},
+        "denials": denials or {},
+    })
+    extension.logger = MagicMock()
+    return extension
+
+
+class TestDenialTracker:
+    """Test denial aggregation and adaptive log sampling."""
+
+    def test_low_rate_denials_all_logged(self):
+        """Test every denial is logged while under the log budget."""
+        tracker = DenialTracker({"log_budget": 5})
+
+        sample_rates = [tracker.record("ip:1.2.3.4", "/login", "fixed_window") for _ in range(5)]
+
+        assert sample_rates == [1, 1, 1, 1, 1]
+        assert not tracker.under_attack
+
+    def test_flood_logging_capped_and_sampled(self):
+        """Test logging stays within budget and samples once the rate is known."""
+        tracker = DenialTracker({"log_budget": 10, "attack_threshold": 0})
+
+        with patch("time.monotonic", return_value=1000.0):
+            tracker._second_start = 1000.0
+            first_second = [tracker.record("ip:1.2.3.4", "/", "fixed_window") for _ in range(1000)]
+        with patch("time.monotonic", return_value=1001.0):
+            second_second = [tracker.record("ip:1.2.3.4", "/", "fixed_window") for _ in range(1000)]
+
+        assert sum(1 for rate in first_second if rate) == 10
+        logged = [rate for rate in second_second if rate]
+        assert len(logged) == 10
+        assert set(logged) == {100}
+
+    def test_attack_mode_follows_denial_rate(self):
+        """Test under_attack switches on at the threshold and off when it subsides."""
+        tracker = DenialTracker({"attack_threshold": 50})
+
+        with patch("time.monotonic", return_value=1000.0):
+            tracker._second_start = 1000.0
+            for _ in range(49):
+                tracker.record("ip:1.2.3.4", "/", "fixed_window")
+            assert not tracker.under_attack
+            tracker.record("ip:1.2.3.4", "/", "fixed_window")
+            assert tracker.under_attack
+
+        with patch("time.monotonic", return_value=1003.0):
+            tracker.record("ip:1.2.3.4", "/", "fixed_window")
+            assert not tracker.under_attack
+
+    def test_summary_aggregates_and_resets(self):
+        """Test summaries report per key/route counts and then reset."""
+        tracker = DenialTracker({"summary_interval": 10, "summary_top_n": 1})
+
+        for _ in range(3):
+            tracker.record("ip:1.2.3.4", "/login", "fixed_window")
+        tracker.record("ip:5.6.7.8", "/login", "fixed_window")
+
+        assert tracker.collect_summary() is None
+
+        summary = tracker.collect_summary(force=True)
+        assert summary["total_denied"] == 4
+        assert summary["distinct_keys"] == 2
+        assert summary["top_offenders"] == [{"identifier": "ip:1.2.3.4", "path": "/login", "count": 3}]
+        assert tracker.collect_summary(force=True) is None
+
+    def test_tracked_keys_are_bounded(self):
+        """Test keys beyond the limit are folded into one bucket per path."""
+        tracker = DenialTracker({"max_tracked_keys": 2})
+
+        for index in range(5):
+            tracker.record(f"ip:10.0.0.{index}", "/", "fixed_window")
+
+        summary = tracker.collect_summary(force=True)
+        assert summary["distinct_keys"] == 3
+        assert {"identifier": "other", "path": "/", "count": 3} in summary["top_offenders"]
+
+
+class TestDenialResponses:
+    """Test pre-serialized 429 responses."""
+
+    def test_default_json_matches_json_response(self):
+        """Test the spliced JSON body matches what JSONResponse would render."""
+        responses = DenialResponses({}, "Retry-After")
+
+        response = responses.render(is_api_request=True, retry_after=42)
+        expected = JSONResponse({"error": "Rate limit exceeded", "retry_after": 42})
+
+        assert response.status_code == 429
+        assert response.body == expected.body
+        assert response.headers["retry-after"] == "42"
+        assert response.headers["content-type"] == "application/json"
+        assert response.headers["content-length"] == str(len(expected.body))
+
+    def test_custom_error_json(self):
+        """Test a configured error body is serialized once as-is."""
+        responses = DenialResponses({"error_json": {"message": "slow down"}}, "Retry-After")
+
+        response = responses.render(is_api_request=True, retry_after=5)
+
+        assert json.loads(response.body) == {"message": "slow down"}
+
+    def test_html_body_is_escaped(self):
+        """Test HTML responses escape the configured message."""
+        responses = DenialResponses({"error_message": "<b>wait</b>"}, "Retry-After")
+
+        response = responses.render(is_api_request=False, retry_after=5)
+
+        assert b"&lt;b&gt;wait&lt;/b&gt;" in response.body
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+
+    def test_headers_not_shared_between_responses(self):
+        """Test later middleware can modify one response without affecting others."""
+        responses = DenialResponses({}, "Retry-After")
+
+        first = responses.render(is_api_request=True, retry_after=1)
+        first.headers["X-Extra"] = "1"
+        second = responses.render(is_api_request=True, retry_after=1)
+
+        assert "x-extra" not in second.headers
+
+
+class TestRateLimitMiddleware:
+    """Test the rate limiting middleware rejection paths."""
+
+    @pytest.mark.asyncio
+    async def test_api_denial_normal_mode(self):
+        """Test API requests over the limit get a JSON 429 and a logged event."""
+        extension = _make_extension()
+        middleware = extension.get_middleware_factory()({"path": "/api/data"})
+
+        allowed = await middleware(_make_request(), _call_next)
+        denied = await middleware(_make_request(), _call_next)
+
+        assert allowed.status_code == 200
+        assert denied.status_code == 429
+        assert "retry-after" in denied.headers
+        event = extension.logger.log_security_event.call_args.args[0]
+        assert event.event_type == "rate_limited"
+        assert event.details["sample_rate"] == 1
+
+    @pytest.mark.asyncio
+    async def test_html_denial_normal_mode_raises(self):
+        """Test HTML requests over the limit raise a 429 HTTPException."""
+        extension = _make_extension()
+        middleware = extension.get_middleware_factory()({"path": "/page"})
+
+        await middleware(_make_request("/page"), _call_next)
+        with pytest.raises(HTTPException) as exc_info:
+            await middleware(_make_request("/page"), _call_next)
+
+        assert exc_info.value.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_under_attack_uses_prepared_response(self):
+        """Test the fast path returns pre-serialized bytes for HTML and API clients."""
+        extension = _make_extension({"attack_threshold": 1})
+        middleware = extension.get_middleware_factory()({"path": "/page"})
+
+        await middleware(_make_request("/page"), _call_next)
+        html_response = await middleware(_make_request("/page"), _call_next)
+        api_response = await middleware(_make_request("/page", accept="application/json"), _call_next)
+
+        assert isinstance(html_response, PreparedResponse)
+        assert html_response.status_code == 429
+        assert b"Too Many Requests" in html_response.body
+        assert isinstance(api_response, PreparedResponse)
+        assert json.loads(api_response.body)["error"] == "Rate limit exceeded"
+
+    @pytest.mark.asyncio
+    async def test_shutdown_flushes_summary_and_deferred_metrics(self):
+        """Test shutdown emits the pending summary with fast-path metric counts."""
+        extension = _make_extension({"attack_threshold": 1})
+        extension.metrics = MagicMock()
+        middleware = extension.get_middleware_factory()({"path": "/api/data"})
+
+        for _ in range(4):
+            await middleware(_make_request(), _call_next)
+        await extension.get_shutdown_handler()()
+
+        summary_event = extension.logger.log_security_event.call_args.args[0]
+        assert summary_event.event_type == "rate_limit_summary"
+        assert summary_event.details["total_denied"] == 3
+        extension.metrics.increment_counter.assert_any_call(
+            "rate_limit_checks_total", 3, {"algorithm": "fixed_window", "allowed": "False"}
+        )
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_denied_request_throughput(self):
+        """Benchmark denied-request throughput with and without the fast path."""
+        iterations = 2000
+        throughput = {}
+
+        for mode, denials in [("normal", {"attack_threshold": 0}), ("fast_path", {"attack_threshold": 1})]:
+            extension = _make_extension(denials)
+            middleware = extension.get_middleware_factory()({"path": "/api/data"})
+            await middleware(_make_request(), _call_next)
+
+            start_time = time.perf_counter()
+            for _ in range(iterations):
+                response = await middleware(_make_request(), _call_next)
+                assert response.status_code == 429
+            throughput[mode] = iterations / (time.perf_counter() - start_time)
+
+        assert throughput["fast_path"] > throughput["normal"]
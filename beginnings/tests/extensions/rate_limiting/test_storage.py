@@ -5,18 +5,46 @@ This module tests different storage backends including in-memory,
 Redis, and Valkey storage implementations.
 """
 
+import multiprocessing
 import pytest
 import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
+from beginnings.extensions.rate_limiting.algorithms import (
+    FixedWindowAlgorithm,
+    SlidingWindowAlgorithm,
+    TokenBucketAlgorithm
+)
 from beginnings.extensions.rate_limiting.storage import (
     MemoryRateLimitStorage,
     RedisRateLimitStorage,
+    SharedMemoryRateLimitStorage,
     ValKeyRateLimitStorage,
     create_storage
 )
 
 
+def _shared_memory_worker(path: str, algorithm_name: str, attempts: int) -> int:
+    """Hammer one key from a separate process and return allowed count."""
+    algorithm_classes = {
+        "fixed_window": FixedWindowAlgorithm,
+        "sliding_window": SlidingWindowAlgorithm,
+        "token_bucket": TokenBucketAlgorithm,
+    }
+    
+    async def run() -> int:
+        storage = SharedMemoryRateLimitStorage(path, buckets=64)
+        algorithm = algorithm_classes[algorithm_name]({"refill_rate": 0.001}, storage)
+        allowed_count = 0
+        for _ in range(attempts):
+            allowed, _, _ = await algorithm.is_allowed("shared_key", 100, 3600)
+            allowed_count += allowed
+        await storage.close()
+        return allowed_count
+    
+    return asyncio.run(run())
+
+
 class TestMemoryRateLimitStorage:
     """Test in-memory rate limit storage implementation."""
     
@@ -166,6 +194,230 @@ class TestMemoryRateLimitStorage:
         assert retrieved_data is not bucket_data  # Should be a copy
 
 
+class TestSharedMemoryRateLimitStorage:
+    """Test shared-memory rate limit storage implementation."""
+    
+    @pytest.fixture
+    def storage_path(self, tmp_path):
+        """Path for the shared table backing file."""
+        return str(tmp_path / "rate_limit.shm")
+    
+    @pytest.fixture
+    async def storage(self, storage_path):
+        """Create shared memory storage instance for testing."""
+        storage = SharedMemoryRateLimitStorage(storage_path, buckets=64, window_capacity=8)
+        yield storage
+        await storage.close()
+    
+    def test_shared_memory_storage_lazy_initialization(self, storage_path):
+        """Test backing file is not created until first use."""
+        storage = SharedMemoryRateLimitStorage(storage_path)
+        
+        assert storage.path == storage_path
+        assert storage._mmap is None
+        assert not os.path.exists(storage_path)
+    
+    @pytest.mark.asyncio
+    async def test_counter_lifecycle(self, storage):
+        """Test counter increment, read and reset."""
+        count, _ = await storage.get_counter("test_key")
+        assert count == 0
+        
+        count1, window_start1 = await storage.increment_counter("test_key", 60)
+        count2, window_start2 = await storage.increment_counter("test_key", 60)
+        assert (count1, count2) == (1, 2)
+        assert window_start1 == window_start2
+        assert await storage.get_counter("test_key") == (2, window_start1)
+        
+        await storage.reset_counter("test_key")
+        count, _ = await storage.get_counter("test_key")
+        assert count == 0
+    
+    @pytest.mark.asyncio
+    async def test_increment_counter_window_reset(self, storage):
+        """Test counter reset when window expires."""
+        count1, window_start1 = await storage.increment_counter("test_key", 1)
+        
+        with patch('time.time', return_value=window_start1 + 1.5):
+            count2, window_start2 = await storage.increment_counter("test_key", 1)
+        
+        assert (count1, count2) == (1, 1)
+        assert window_start2 > window_start1
+    
+    @pytest.mark.asyncio
+    async def test_token_bucket_round_trip(self, storage):
+        """Test token bucket state is stored separately from counters."""
+        assert await storage.get_token_bucket("test_key") is None
+        
+        bucket_data = {"tokens": 50.5, "last_refill": time.time()}
+        await storage.set_token_bucket("test_key", bucket_data)
+        await storage.increment_counter("test_key", 60)
+        
+        assert await storage.get_token_bucket("test_key") == bucket_data
+    
+    @pytest.mark.asyncio
+    async def test_sliding_window_entries(self, storage):
+        """Test sliding window entries are stored as compact pairs."""
+        current_time = float(int(time.time()))
+        for ts in [current_time - 10, current_time - 2, current_time - 2, current_time]:
+            await storage.add_sliding_window_entry("test_key", ts)
+        
+        entries = await storage.get_sliding_window_entries("test_key")
+        assert entries == [current_time - 10, current_time - 2, current_time - 2, current_time]
+        
+        await storage.cleanup_sliding_window_entries("test_key", current_time - 5)
+        entries = await storage.get_sliding_window_entries("test_key")
+        assert entries == [current_time - 2, current_time - 2, current_time]
+    
+    @pytest.mark.asyncio
+    async def test_sliding_window_overflow_never_undercounts(self, storage):
+        """Test full windows fold old entries forward instead of dropping them."""
+        current_time = float(int(time.time()))
+        for offset in range(12):
+            await storage.add_sliding_window_entry("test_key", current_time - 20 + offset)
+        
+        entries = await storage.get_sliding_window_entries("test_key")
+        assert len(entries) == 12
+        assert len(set(entries)) == storage.window_capacity
+        assert min(entries) >= current_time - 20
+    
+    @pytest.mark.asyncio
+    async def test_full_bucket_evicts_soonest_expiring(self, storage_path):
+        """Test a full bucket reuses the slot closest to expiring."""
+        storage = SharedMemoryRateLimitStorage(storage_path, buckets=1)
+        try:
+            for index in range(storage._SCALAR_SLOTS_PER_BUCKET):
+                await storage.increment_counter(f"key_{index}", 60 + index)
+            
+            await storage.increment_counter("new_key", 600)
+            
+            assert (await storage.get_counter("key_0"))[0] == 0
+            assert (await storage.get_counter("key_1"))[0] == 1
+            assert (await storage.get_counter("new_key"))[0] == 1
+        finally:
+            await storage.close()
+    
+    @pytest.mark.asyncio
+    async def test_state_shared_between_instances(self, storage, storage_path):
+        """Test separate instances on the same file see the same state."""
+        other = SharedMemoryRateLimitStorage(storage_path, buckets=64, window_capacity=8)
+        try:
+            await storage.increment_counter("test_key", 60)
+            await other.increment_counter("test_key", 60)
+            
+            count, _ = await storage.get_counter("test_key")
+            assert count == 2
+        finally:
+            await other.close()
+    
+    @pytest.mark.asyncio
+    async def test_mismatched_configuration_rejected(self, storage, storage_path):
+        """Test workers must agree on the table geometry."""
+        await storage.get_counter("test_key")
+        
+        other = SharedMemoryRateLimitStorage(storage_path, buckets=128)
+        with pytest.raises(ValueError, match="same configuration"):
+            await other.get_counter("test_key")
+    
+    @pytest.mark.asyncio
+    async def test_atomic_is_reentrant(self, storage):
+        """Test storage calls inside atomic() reuse the held bucket lock."""
+        async with storage.atomic("test_key"):
+            async with storage.atomic("test_key"):
+                await storage.increment_counter("test_key", 60)
+        
+        assert storage._lock_depth == {}
+        count, _ = await storage.get_counter("test_key")
+        assert count == 1
+    
+    def test_default_path_is_per_app_and_user(self):
+        """Test the default backing file is named after the application and user."""
+        with patch("beginnings.extensions.shared_memory._app_name", "my app"):
+            storage = SharedMemoryRateLimitStorage()
+        
+        assert os.path.basename(storage.path) == f"beginnings_my_app_rate_limit_{os.getuid()}"
+    
+    @pytest.mark.asyncio
+    async def test_symlinked_backing_file_rejected(self, tmp_path, storage_path):
+        """Test the backing file is not opened through a symlink."""
+        target = tmp_path / "elsewhere"
+        target.write_bytes(b"")
+        os.symlink(target, storage_path)
+        storage = SharedMemoryRateLimitStorage(storage_path, buckets=64)
+        
+        with pytest.raises(OSError):
+            await storage.get_counter("test_key")
+        assert target.read_bytes() == b""
+    
+    @pytest.mark.asyncio
+    async def test_backing_file_accessible_to_others_rejected(self, storage_path):
+        """Test a backing file other users can open is refused."""
+        with open(storage_path, "wb"):
+            pass
+        os.chmod(storage_path, 0o666)
+        storage = SharedMemoryRateLimitStorage(storage_path, buckets=64)
+        
+        with pytest.raises(PermissionError, match="must be 600"):
+            await storage.get_counter("test_key")
+    
+    @pytest.mark.asyncio
+    async def test_contended_lock_yields_to_event_loop(self, storage):
+        """Test waiting for a bucket held by another process lets other tasks run."""
+        ticks = []
+        
+        async def ticker():
+            for _ in range(3):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0)
+        
+        attempts = iter([False, False, False, True])
+        with patch(
+            "beginnings.extensions.rate_limiting.storage.try_lock",
+            side_effect=lambda *args: next(attempts)
+        ):
+            ticking = asyncio.ensure_future(ticker())
+            count, _ = await storage.increment_counter("test_key", 60)
+            await ticking
+        
+        assert count == 1
+        assert len(ticks) == 3
+        assert storage._lock_depth == {}
+    
+    @pytest.mark.slow
+    @pytest.mark.parametrize("algorithm_name", ["fixed_window", "sliding_window", "token_bucket"])
+    def test_global_enforcement_across_processes(self, storage_path, algorithm_name):
+        """Test concurrent worker processes share a single limit."""
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(4) as pool:
+            results = pool.starmap(
+                _shared_memory_worker,
+                [(storage_path, algorithm_name, 60)] * 4
+            )
+        
+        assert sum(results) == 100
+    
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_decision_latency_benchmark(self, storage, record_property):
+        """Benchmark shared memory decisions against in-memory storage.
+
+        Latencies are reported as test properties rather than asserted, as
+        they depend on the machine and its load.
+        """
+        iterations = 5000
+        timings = {}
+        
+        for name, backend in [("memory", MemoryRateLimitStorage()), ("shared_memory", storage)]:
+            algorithm = FixedWindowAlgorithm({}, backend)
+            start_time = time.perf_counter()
+            for index in range(iterations):
+                await algorithm.is_allowed(f"key_{index % 100}", 1_000_000, 3600)
+            timings[name] = (time.perf_counter() - start_time) / iterations
+        
+        for name, seconds in timings.items():
+            record_property(f"{name}_seconds_per_decision", seconds)
+
+
 class TestRedisRateLimitStorage:
     """Test Redis rate limit storage implementation."""
     
@@ -402,6 +654,21 @@ class TestStorageFactory:
         
         assert isinstance(storage, MemoryRateLimitStorage)
     
+    def test_create_shared_memory_storage(self, tmp_path):
+        """Test creating shared memory storage."""
+        config = {
+            "type": "shared_memory",
+            "path": str(tmp_path / "rate_limit.shm"),
+            "buckets": 256,
+            "window_capacity": 32
+        }
+        storage = create_storage(config)
+        
+        assert isinstance(storage, SharedMemoryRateLimitStorage)
+        assert storage.path == str(tmp_path / "rate_limit.shm")
+        assert storage.buckets == 256
+        assert storage.window_capacity == 32
+    
     def test_create_redis_storage(self):
         """Test creating Redis storage."""
         config = {
@@ -455,4 +722,5 @@ class TestStorageFactory:
 
 
 # Integration test imports (needed for async tests)
-import asyncio
\ No newline at end of file
+import asyncio
+import os
\ No newline at end of file
@@ -0,0 +1,212 @@
+"""
+Tests for trusted proxy management.
+
+This module tests the CIDR prefix trie, trusted proxy validation,
+and real client IP extraction.
+"""
+
+import ipaddress
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.extensions.rate_limiting.cidr import CIDRTrie
+from beginnings.extensions.rate_limiting.extension import RateLimitExtension
+from beginnings.extensions.rate_limiting.trusted_proxies import TrustedProxyManager
+from beginnings.extensions.request_facts import RequestFacts
+
+
+def _random_networks(count: int, seed: int = 1234) -> list:
+    """Generate a reproducible mix of IPv4 and IPv6 CDN-style ranges."""
+    rng = random.Random(seed)
+    networks = []
+    for index in range(count):
+        if index % 4 == 3:
+            prefix = rng.choice([32, 36, 40, 48])
+            address = ipaddress.IPv6Address(rng.getrandbits(128))
+            networks.append(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+        else:
+            prefix = rng.choice([12, 16, 18, 20, 22, 24])
+            address = ipaddress.IPv4Address(rng.getrandbits(32))
+            networks.append(ipaddress.ip_network(f"{address}/{prefix}", strict=False))
+    return networks
+
+
+class TestCIDRTrie:
+    """Test CIDR prefix trie matching."""
+
+    def test_ipv4_match(self):
+        """Test IPv4 addresses match their covering network."""
+        trie = CIDRTrie(["10.0.0.0/8", "192.168.1.0/24"])
+
+        assert trie.match("10.1.2.3") == ipaddress.ip_network("10.0.0.0/8")
+        assert "192.168.1.200" in trie
+        assert "192.168.2.1" not in trie
+        assert "11.0.0.1" not in trie
+
+    def test_ipv6_match(self):
+        """Test IPv6 addresses match their covering network."""
+        trie = CIDRTrie(["2001:db8::/32", "::1/128"])
+
+        assert "2001:db8:1::5" in trie
+        assert "::1" in trie
+        assert "2001:db9::1" not in trie
+
+    def test_ipv4_mapped_ipv6_matches_ipv4_network(self):
+        """Test IPv4-mapped IPv6 addresses are matched as IPv4."""
+        trie = CIDRTrie(["203.0.113.0/24"])
+
+        assert "::ffff:203.0.113.9" in trie
+
+    def test_nested_prefix_keeps_shorter_network(self):
+        """Test nested prefixes collapse into the covering network."""
+        trie = CIDRTrie(["10.1.0.0/16"])
+        trie.add("10.0.0.0/8")
+        trie.add("10.1.2.0/24")
+
+        assert trie.match("10.1.2.3") == ipaddress.ip_network("10.0.0.0/8")
+
+    def test_host_and_default_routes(self):
+        """Test /32 host routes and /0 default routes."""
+        trie = CIDRTrie(["198.51.100.7/32"])
+        assert "198.51.100.7" in trie
+        assert "198.51.100.8" not in trie
+
+        trie.add("0.0.0.0/0")
+        assert "8.8.8.8" in trie
+
+    def test_invalid_input(self):
+        """Test invalid addresses never match and invalid networks raise."""
+        trie = CIDRTrie(["10.0.0.0/8"])
+
+        assert "not-an-ip" not in trie
+        with pytest.raises(ValueError):
+            trie.match("not-an-ip")
+        with pytest.raises(ValueError):
+            trie.add("10.0.0.0/33")
+
+    def test_matches_linear_scan(self):
+        """Test trie results agree with a linear scan over 1,000 networks."""
+        networks = _random_networks(1000)
+        trie = CIDRTrie(networks)
+        rng = random.Random(99)
+
+        candidates = [str(network.network_address + 1) for network in networks[:200]]
+        candidates += [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(500)]
+        candidates += [str(ipaddress.IPv6Address(rng.getrandbits(128))) for _ in range(100)]
+
+        for candidate in candidates:
+            address = ipaddress.ip_address(candidate)
+            expected = any(address in network for network in networks)
+            assert (candidate in trie) == expected
+
+    @pytest.mark.slow
+    def test_lookup_benchmark_1000_cidrs(self):
+        """Benchmark trie lookups against a linear scan with 1,000 CIDRs."""
+        networks = _random_networks(1000)
+        trie = CIDRTrie(networks)
+        rng = random.Random(7)
+        addresses = [str(ipaddress.IPv4Address(rng.getrandbits(32))) for _ in range(2000)]
+
+        start_time = time.perf_counter()
+        for address in addresses:
+            ip = ipaddress.ip_address(address)
+            any(ip in network for network in networks)
+        linear_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        for address in addresses:
+            address in trie
+        trie_seconds = time.perf_counter() - start_time
+
+        assert trie_seconds * 10 < linear_seconds
+
+
+class TestTrustedProxyManager:
+    """Test trusted proxy validation and IP extraction."""
+
+    @pytest.fixture
+    def manager(self):
+        """Create proxy manager trusting one CDN range and private networks."""
+        return TrustedProxyManager({
+            "trusted_proxies": ["203.0.113.0/24"],
+            "allow_localhost": True,
+            "allow_private_networks": True
+        })
+
+    def test_is_trusted_proxy(self, manager):
+        """Test configured and default networks are trusted."""
+        assert manager.is_trusted_proxy("203.0.113.10")
+        assert manager.is_trusted_proxy("127.0.0.1")
+        assert manager.is_trusted_proxy("10.2.3.4")
+        assert not manager.is_trusted_proxy("198.51.100.1")
+        assert not manager.is_trusted_proxy("garbage")
+
+    def test_disabled_manager_trusts_nothing(self):
+        """Test disabled manager ignores forwarded headers."""
+        manager = TrustedProxyManager({"enabled": False, "trusted_proxies": ["203.0.113.0/24"]})
+
+        assert not manager.is_trusted_proxy("203.0.113.10")
+        assert manager.extract_real_ip("203.0.113.10", forwarded_for="1.2.3.4") == "203.0.113.10"
+
+    def test_extract_real_ip_from_trusted_proxy(self, manager):
+        """Test forwarded headers are honored only from trusted proxies."""
+        assert manager.extract_real_ip("203.0.113.10", forwarded_for="1.2.3.4, 203.0.113.10") == "1.2.3.4"
+        assert manager.extract_real_ip("203.0.113.10", real_ip="5.6.7.8") == "5.6.7.8"
+        assert manager.extract_real_ip("198.51.100.1", forwarded_for="1.2.3.4") == "198.51.100.1"
+
+    def test_extract_real_ip_invalid_forwarded_ip(self, manager):
+        """Test invalid forwarded IPs fall back to the remote address."""
+        assert manager.extract_real_ip("203.0.113.10", forwarded_for="not-an-ip") == "203.0.113.10"
+
+    def test_resolved_chains_are_cached(self, manager):
+        """Test repeated header chains are served from the LRU cache."""
+        manager.extract_real_ip("203.0.113.10", forwarded_for="1.2.3.4")
+
+        manager._resolve_real_ip = None  # Would fail if called again
+        assert manager.extract_real_ip("203.0.113.10", forwarded_for="1.2.3.4") == "1.2.3.4"
+
+    def test_cache_is_bounded(self):
+        """Test the LRU evicts the least recently used chain."""
+        manager = TrustedProxyManager({"cache_size": 2})
+
+        manager.extract_real_ip("10.0.0.1", forwarded_for="1.1.1.1")
+        manager.extract_real_ip("10.0.0.1", forwarded_for="2.2.2.2")
+        manager.extract_real_ip("10.0.0.1", forwarded_for="1.1.1.1")
+        manager.extract_real_ip("10.0.0.1", forwarded_for="3.3.3.3")
+
+        assert list(manager._resolved_cache) == [
+            ("10.0.0.1", "1.1.1.1", None),
+            ("10.0.0.1", "3.3.3.3", None),
+        ]
+
+
+class TestResolvedClientIPSharing:
+    """Test the resolved client IP is computed once per request."""
+
+    def _make_request(self):
+        """Create a minimal request behind a trusted proxy."""
+        return SimpleNamespace(
+            client=SimpleNamespace(host="10.0.0.5"),
+            headers={"x-forwarded-for": "1.2.3.4"},
+            scope={"path": "/"}
+        )
+
+    def test_rate_limiter_stores_client_ip(self):
+        """Test the rate limiter records the resolved IP in the request facts."""
+        extension = RateLimitExtension({})
+        request = self._make_request()
+
+        assert extension._get_client_ip(request) == "ip:1.2.3.4"
+        assert RequestFacts.of(request).client_ip == "1.2.3.4"
+
+    def test_session_provider_reuses_client_ip(self):
+        """Test the session provider reuses the proxy-validated IP."""
+        provider = SessionProvider({})
+        request = self._make_request()
+        RequestFacts.of(request).client_ip = "9.9.9.9"
+
+        assert provider._get_client_ip(request) == "9.9.9.9"
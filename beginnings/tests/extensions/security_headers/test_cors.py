@@ -364,4 +364,87 @@ class TestCORSIntegration:
         result = await middleware(request, call_next)
         
         # CORS headers should not be present
-        assert "Access-Control-Allow-Origin" not in result.headers
\ No newline at end of file
+        assert "Access-Control-Allow-Origin" not in result.headers
+
+class TestCompiledCORS:
+    """Test compiled origin matching and cached preflight responses."""
+    
+    def test_origin_patterns_compiled(self):
+        """Test exact origins and all wildcard patterns are matched like fnmatch."""
+        cors_manager = CORSManager({
+            "enabled": True,
+            "allow_origins": ["https://app.example.com", "https://*.example.org", "http://localhost:300?"]
+        })
+        
+        assert cors_manager.is_origin_allowed("https://app.example.com")
+        assert cors_manager.is_origin_allowed("https://a.b.example.org")
+        assert cors_manager.is_origin_allowed("http://localhost:3001")
+        assert not cors_manager.is_origin_allowed("https://app.example.com.evil.com")
+        assert not cors_manager.is_origin_allowed("https://example.org")
+        assert not cors_manager.is_origin_allowed("http://localhost:30011")
+    
+    def test_preflight_served_from_cache(self):
+        """Test identical preflights reuse serialized headers in fresh responses."""
+        cors_manager = CORSManager({"enabled": True, "allow_origins": ["https://app.example.com"]})
+        
+        first = cors_manager.get_preflight_response("https://app.example.com", "POST", "Content-Type, Accept")
+        second = cors_manager.get_preflight_response("https://app.example.com", "POST", "Content-Type, Accept")
+        second.headers["X-Extra"] = "1"
+        
+        assert first is not second
+        assert "x-extra" not in first.headers
+        assert first.headers["Access-Control-Allow-Headers"] == "Content-Type, Authorization, X-Requested-With, Accept"
+        assert len(cors_manager._preflight_cache) == 1
+        assert first.headers.raw == cors_manager.create_preflight_response(
+            "https://app.example.com", "POST", ["Content-Type", "Accept"]
+        ).headers.raw
+    
+    def test_preflight_cache_bounded(self):
+        """Test the least recently used preflight is evicted at capacity."""
+        cors_manager = CORSManager({"enabled": True, "allow_origins": ["*"], "preflight_cache_size": 2})
+        
+        cors_manager.get_preflight_response("https://a.example.com", "GET")
+        cors_manager.get_preflight_response("https://b.example.com", "GET")
+        cors_manager.get_preflight_response("https://a.example.com", "GET")
+        cors_manager.get_preflight_response("https://c.example.com", "GET")
+        
+        assert [key[0] for key in cors_manager._preflight_cache] == ["https://a.example.com", "https://c.example.com"]
+
+
+@pytest.mark.slow
+def test_preflight_benchmark(record_property):
+    """Benchmark cached preflights against per-request origin scans and header building.
+
+    Timings are reported as test properties rather than asserted, as
+    they depend on the machine and its load.
+    """
+    import fnmatch
+    import time
+    
+    allow_origins = ["https://*.example.com", "https://*.cdn.example.org"] + [
+        f"https://site{index}.example.net" for index in range(50)
+    ]
+    cors_manager = CORSManager({"enabled": True, "allow_origins": allow_origins})
+    origin = "https://x.cdn.example.org"
+    requested_headers = "content-type, x-requested-with, accept"
+    iterations = 20000
+    
+    def uncached():
+        assert any(fnmatch.fnmatch(origin, allowed) or origin == allowed for allowed in allow_origins)
+        cors_manager.create_preflight_response(origin, "POST", [h.strip() for h in requested_headers.split(",")])
+    
+    def cached():
+        assert cors_manager.is_origin_allowed(origin)
+        cors_manager.get_preflight_response(origin, "POST", requested_headers)
+    
+    def measure(preflight):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            preflight()
+        return time.perf_counter() - start_time
+    
+    rounds = [(measure(uncached), measure(cached)) for _ in range(3)]
+    uncached_seconds, cached_seconds = (min(times) for times in zip(*rounds))
+    
+    record_property("uncached_seconds_per_preflight", uncached_seconds / iterations)
+    record_property("cached_seconds_per_preflight", cached_seconds / iterations)
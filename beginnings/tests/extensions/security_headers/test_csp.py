@@ -9,6 +9,7 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock
 
 from fastapi import Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from beginnings.extensions.security_headers.extension import SecurityHeadersExtension
 from beginnings.extensions.security_headers.csp import CSPManager
@@ -262,24 +263,80 @@ class TestCSPIntegration:
         factory = extension.get_middleware_factory()
         middleware = factory({})
         
-        request = MagicMock(spec=Request)
-        request.state = MagicMock()
+        request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
         response = Response(content="test", status_code=200)
-        call_next = AsyncMock(return_value=response)
+        csp_nonce = extension.get_template_functions()["csp_nonce"]
         
-        result = await middleware(request, call_next)
+        async def render_template(request):
+            # Template asks for both nonces while rendering
+            csp_nonce(request)
+            csp_nonce(request, "style")
+            return response
+        
+        result = await middleware(request, render_template)
         
         assert "Content-Security-Policy" in result.headers
         csp_header = result.headers["Content-Security-Policy"]
         
-        # Should include nonces
-        assert "'nonce-" in csp_header
-        assert "script-src 'self' 'nonce-" in csp_header
-        assert "style-src 'self' 'nonce-" in csp_header
+        # Should include the nonces the template used
+        assert f"script-src 'self' 'nonce-{request.state.csp_script_nonce}'" in csp_header
+        assert f"style-src 'self' 'nonce-{request.state.csp_style_nonce}'" in csp_header
+    
+    @pytest.mark.asyncio
+    async def test_middleware_omits_unused_nonces(self):
+        """Test nonces are neither generated nor sent when no template uses them."""
+        config = {
+            "csp": {
+                "enabled": True,
+                "directives": {
+                    "script_src": ["'self'"],
+                    "style_src": ["'self'"]
+                },
+                "nonce": {"enabled": True}
+            }
+        }
+        extension = SecurityHeadersExtension(config)
+        middleware = extension.get_middleware_factory()({})
+        csp_nonce = extension.get_template_functions()["csp_nonce"]
+        
+        request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
+        
+        async def render_template(request):
+            csp_nonce(request, "style")
+            return JSONResponse({"ok": True})
+        
+        result = await middleware(request, render_template)
+        
+        assert result.headers["Content-Security-Policy"] == (
+            f"script-src 'self'; style-src 'self' 'nonce-{request.state.csp_style_nonce}'"
+        )
+        assert not hasattr(request.state, "csp_script_nonce")
+    
+    @pytest.mark.asyncio
+    async def test_middleware_streamed_html_gets_nonces_up_front(self):
+        """Test streamed pages get nonces before headers are sent."""
+        config = {
+            "csp": {
+                "enabled": True,
+                "directives": {"script_src": ["'self'"], "style_src": ["'self'"]},
+                "nonce": {"enabled": True, "style_nonce": False}
+            }
+        }
+        extension = SecurityHeadersExtension(config)
+        middleware = extension.get_middleware_factory()({})
+        csp_nonce = extension.get_template_functions()["csp_nonce"]
+        
+        request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
         
-        # Nonces should be available in request state
-        assert hasattr(request.state, "csp_script_nonce")
-        assert hasattr(request.state, "csp_style_nonce")
+        async def render():
+            yield f'<script nonce="{csp_nonce(request)}"></script>'
+        
+        result = await middleware(request, AsyncMock(return_value=StreamingResponse(render(), media_type="text/html")))
+        body = "".join([chunk async for chunk in result.body_iterator])
+        
+        nonce = request.state.csp_script_nonce
+        assert result.headers["Content-Security-Policy"] == f"script-src 'self' 'nonce-{nonce}'; style-src 'self'"
+        assert f'nonce="{nonce}"' in body
     
     @pytest.mark.asyncio
     async def test_middleware_csp_route_override(self):
@@ -351,4 +408,47 @@ class TestCSPIntegration:
         result = await middleware(request, call_next)
         
         # CSP header should not be present
-        assert "Content-Security-Policy" not in result.headers
\ No newline at end of file
+        assert "Content-Security-Policy" not in result.headers
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_lazy_nonce_json_route_benchmark(record_property):
+    """Benchmark nonce overhead on JSON routes that never render a nonce.
+
+    Timings are reported as test properties rather than asserted, as
+    they depend on the machine and its load.
+    """
+    import time
+    
+    directives = {"default_src": ["'self'"], "script_src": ["'self'"], "style_src": ["'self'"]}
+    with_nonces = SecurityHeadersExtension({"csp": {"enabled": True, "directives": directives, "nonce": {"enabled": True}}})
+    without_nonces = SecurityHeadersExtension({"csp": {"enabled": True, "directives": directives}})
+    csp_nonce = with_nonces.get_template_functions()["csp_nonce"]
+    scope = {"type": "http", "method": "GET", "path": "/api", "query_string": b"", "headers": []}
+    iterations = 20000
+    
+    async def json_route(request):
+        return JSONResponse({"ok": True})
+    
+    async def template_route(request):
+        csp_nonce(request)
+        csp_nonce(request, "style")
+        return JSONResponse({"ok": True})
+    
+    async def measure(extension, endpoint):
+        middleware = extension.get_middleware_factory()({})
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            await middleware(Request(dict(scope)), endpoint)
+        return time.perf_counter() - start_time
+    
+    # Interleaved rounds so load changes affect all three alike
+    rounds = [
+        (await measure(without_nonces, json_route), await measure(with_nonces, json_route), await measure(with_nonces, template_route))
+        for _ in range(5)
+    ]
+    baseline_seconds, lazy_seconds, used_seconds = (min(times) for times in zip(*rounds))
+    
+    record_property("seconds_per_request_without_nonces", baseline_seconds / iterations)
+    record_property("seconds_per_request_unused_nonces", lazy_seconds / iterations)
+    record_property("seconds_per_request_rendered_nonces", used_seconds / iterations)
@@ -277,4 +277,102 @@ class TestSecurityHeadersBasic:
         
         errors = extension.validate_config()
         assert len(errors) > 0
-        assert any("max_age" in error for error in errors)
\ No newline at end of file
+        assert any("max_age" in error for error in errors)
+
+class TestCompiledHeaders:
+    """Test route header blocks compiled at registration."""
+    
+    @pytest.mark.asyncio
+    async def test_handler_header_replaced_not_duplicated(self):
+        """Test configured headers replace headers the handler already set."""
+        extension = SecurityHeadersExtension({"headers": {"x_frame_options": "DENY"}})
+        middleware = extension.get_middleware_factory()({})
+        
+        response = Response(content="test", headers={"X-Frame-Options": "SAMEORIGIN", "X-Custom": "1"})
+        result = await middleware(MagicMock(spec=Request), AsyncMock(return_value=response))
+        
+        assert result.headers.getlist("X-Frame-Options") == ["DENY"]
+        assert result.headers["X-Custom"] == "1"
+    
+    @pytest.mark.asyncio
+    async def test_csp_nonce_template_rendered_per_response(self):
+        """Test each response gets fresh nonces in the precompiled CSP."""
+        config = {
+            "csp": {
+                "enabled": True,
+                "directives": {
+                    "script_src": ["'self'", "https://cdn.example.com/a%20b.js"],
+                    "style_src": ["'self'"]
+                },
+                "nonce": {"enabled": True}
+            }
+        }
+        extension = SecurityHeadersExtension(config)
+        middleware = extension.get_middleware_factory()({})
+        
+        csp_nonce = extension.get_template_functions()["csp_nonce"]
+        
+        async def render_template(request):
+            csp_nonce(request)
+            csp_nonce(request, "style")
+            return Response(content="test")
+        
+        values = []
+        for _ in range(2):
+            request = Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []})
+            result = await middleware(request, render_template)
+            values.append(result.headers["Content-Security-Policy"])
+            
+            script_nonce = request.state.csp_script_nonce
+            style_nonce = request.state.csp_style_nonce
+            assert values[-1] == (
+                f"script-src 'self' https://cdn.example.com/a%20b.js 'nonce-{script_nonce}'; "
+                f"style-src 'self' 'nonce-{style_nonce}'"
+            )
+        
+        assert values[0] != values[1]
+    
+    def test_static_csp_compiled_into_block(self):
+        """Test a CSP without nonces is part of the static header block."""
+        extension = SecurityHeadersExtension({"csp": {"enabled": True, "directives": {"default_src": ["'self'"]}}})
+        
+        compiled = extension._compile_headers({})
+        
+        assert compiled.csp is None
+        assert (b"content-security-policy", b"default-src 'self'") in compiled.static
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_compiled_headers_benchmark(record_property):
+    """Benchmark precompiled header blocks against rebuilding headers per response.
+
+    Timings are reported as test properties rather than asserted, as
+    they depend on the machine and its load.
+    """
+    import time
+    
+    config = {
+        "headers": {"permissions_policy": {"camera": ["self"], "geolocation": []}},
+        "csp": {
+            "enabled": True,
+            "directives": {"default_src": ["'self'"], "script_src": ["'self'"], "img_src": ["'self'", "data:"]}
+        }
+    }
+    extension = SecurityHeadersExtension(config)
+    security_config = {"headers": {"x_frame_options": "SAMEORIGIN"}}
+    compiled = extension._compile_headers(security_config)
+    request = MagicMock(spec=Request)
+    iterations = 20000
+    
+    async def measure(block):
+        start_time = time.perf_counter()
+        for _ in range(iterations):
+            await extension._add_security_headers(request, Response(), security_config, block)
+        return time.perf_counter() - start_time
+    
+    rebuild_seconds = min([await measure(None) for _ in range(3)])
+    compiled_seconds = min([await measure(compiled) for _ in range(3)])
+    
+    record_property("rebuild_seconds_per_response", rebuild_seconds / iterations)
+    record_property("compiled_seconds_per_response", compiled_seconds / iterations)
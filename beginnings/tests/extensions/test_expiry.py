@@ -0,0 +1,223 @@
+"""Tests for the shared timing-wheel expiry service."""
+
+import asyncio
+import random
+import statistics
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from beginnings.extensions.auth.extension import AuthExtension
+from beginnings.extensions.auth.providers.oauth_provider import OAuthProvider
+from beginnings.extensions.auth.providers.session_provider import MemorySessionStorage
+from beginnings.extensions.expiry import ExpiryService, TimerWheel, get_expiry_service
+
+BASE = 1_000_000.0
+
+
+class Store:
+    """Minimal expiring store registered with a service."""
+
+    def __init__(self, service):
+        self.items = {}
+        self.tracker = service.tracker(self.items.get, self.items.pop)
+
+    def set(self, key, expires_at):
+        self.items[key] = expires_at
+        self.tracker.schedule(key, expires_at)
+
+
+class TestTimerWheel:
+    """Test scheduling and advancing."""
+
+    def test_fires_at_due_tick(self):
+        """Test entries fire at their due tick, not before."""
+        wheel = TimerWheel(tick_seconds=1.0)
+        wheel.advance(BASE)
+        offsets = [1, 7, 8, 9, 31, 100, 500]
+        for offset in offsets:
+            wheel.add(BASE + offset - 0.5, "owner", offset)
+
+        fired_at = {}
+        for second in range(1, 600):
+            for key in wheel.advance(BASE + second).get("owner", []):
+                fired_at[key] = second
+
+        assert fired_at == {offset: offset for offset in offsets}
+        assert wheel.size == 0
+
+    def test_randomized_against_due_times(self):
+        """Test random schedules fire exactly when due."""
+        wheel = TimerWheel(tick_seconds=1.0)
+        rng = random.Random(7)
+        wheel.advance(BASE)
+        due = {}
+        fired = {}
+
+        for second in range(1, 3000):
+            for _ in range(rng.randint(0, 3)):
+                key = len(due)
+                due[key] = second + rng.randint(0, 1500)
+                wheel.add(BASE + due[key], None, key)
+            for key in wheel.advance(BASE + second).get(None, []):
+                fired[key] = second
+
+        assert all(fired[key] == max(tick, 1) for key, tick in due.items() if tick < 3000)
+
+    def test_long_gaps_and_clock_jumps(self):
+        """Test a long gap fires everything due and a backwards jump fires nothing."""
+        wheel = TimerWheel(tick_seconds=1.0)
+        wheel.advance(BASE)
+        wheel.add(BASE + 10, None, "soon")
+        wheel.add(BASE + 10_000, None, "later")
+
+        assert wheel.advance(BASE + 5_000) == {None: ["soon"]}
+        assert wheel.advance(BASE - 100) == {}
+        assert wheel.advance(BASE + 10_000) == {None: ["later"]}
+
+    def test_past_entries_due_on_next_advance(self):
+        """Test entries already due fire on the next advance."""
+        wheel = TimerWheel(tick_seconds=1.0)
+        wheel.advance(BASE)
+        wheel.add(BASE - 30, None, "late")
+
+        assert wheel.advance(BASE) == {None: ["late"]}
+
+
+class TestExpiryTracker:
+    """Test per-store tracking on the shared wheel."""
+
+    def test_sliding_expiry_keeps_one_entry(self):
+        """Test extending a key's expiry does not add wheel entries."""
+        service = ExpiryService()
+        service.advance(BASE)
+        store = Store(service)
+        for second in range(100):
+            store.set("session", BASE + second + 60)
+
+        assert service.wheel.size == 1
+        assert service.advance(BASE + 61) == 0
+        assert service.advance(BASE + 160) == 1
+        assert store.items == {}
+
+    def test_deleted_keys_skipped(self):
+        """Test keys removed by the store are not expired again."""
+        service = ExpiryService()
+        service.advance(BASE)
+        store = Store(service)
+        store.set("a", BASE + 5)
+        del store.items["a"]
+
+        assert service.advance(BASE + 10) == 0
+        assert store.tracker._scheduled == {}
+
+    def test_earlier_expiry_rescheduled(self):
+        """Test shortening a key's expiry expires it at the earlier time."""
+        service = ExpiryService()
+        service.advance(BASE)
+        store = Store(service)
+        store.set("a", BASE + 100)
+        store.set("a", BASE + 5)
+
+        assert service.advance(BASE + 6) == 1
+        assert service.advance(BASE + 101) == 0
+
+    async def test_background_task(self):
+        """Test the started service expires keys without explicit cleanup."""
+        service = ExpiryService(tick_seconds=0.01)
+        store = Store(service)
+        store.set("a", time.time() + 0.02)
+
+        await service.start()
+        await service.start()
+        await asyncio.sleep(0.1)
+        await service.stop()
+        assert service.running
+
+        await service.stop()
+        assert not service.running
+        assert store.items == {}
+
+    async def test_callback_errors_do_not_stop_expiry(self):
+        """Test one failing store does not block others."""
+        service = ExpiryService()
+        service.advance(BASE)
+        broken = service.tracker(lambda key: BASE, MagicMock(side_effect=RuntimeError("boom")))
+        broken.schedule("x", BASE + 1)
+        store = Store(service)
+        store.set("a", BASE + 1)
+
+        service.advance(BASE + 2)
+
+        assert store.items == {}
+
+
+class TestStoresUseExpiryService:
+    """Test stores expire entries through the service."""
+
+    async def test_memory_sessions(self):
+        """Test expired sessions are removed on cleanup."""
+        storage = MemorySessionStorage(ExpiryService())
+        with patch("time.time", return_value=BASE):
+            await storage.set("old", {"user_id": "1"}, 10)
+            await storage.set("new", {"user_id": "2"}, 100)
+        with patch("time.time", return_value=BASE + 50):
+            assert await storage.cleanup_expired() == 1
+
+        assert list(storage._sessions) == ["new"]
+
+    def test_oauth_state_single_use(self):
+        """Test a state is accepted once and forgotten after it expires."""
+        provider = OAuthProvider({"state_secret": "secret"})
+        state = provider.generate_state(expire_minutes=1)
+
+        assert provider.consume_state(state)
+        assert not provider.consume_state(state)
+        assert provider.validate_state(state)
+
+        with patch("time.time", return_value=time.time() + 120):
+            get_expiry_service().advance()
+        assert state not in provider._used_states
+
+    async def test_auth_extension_starts_and_stops_service(self):
+        """Test the auth extension runs the shared service between startup and shutdown."""
+        extension = AuthExtension({"providers": {}})
+
+        await extension.get_startup_handler()()
+        assert get_expiry_service().running
+        await extension.get_shutdown_handler()()
+        assert not get_expiry_service().running
+
+
+@pytest.mark.slow
+def test_million_entry_expiry_benchmark(record_property):
+    """Benchmark 1M entries: per-tick expiry work against a full scan.
+
+    Timings are reported as test properties rather than asserted, as
+    they depend on the machine and its load.
+    """
+    service = ExpiryService()
+    service.advance(BASE)
+    store = Store(service)
+    entries = 1_000_000
+    horizon = 600
+    for index in range(entries):
+        store.set(index, BASE + 1 + index % horizon)
+
+    start_time = time.perf_counter()
+    [key for key, expires_at in store.items.items() if expires_at <= BASE + 1]
+    scan_seconds = time.perf_counter() - start_time
+
+    tick_seconds = []
+    expired = 0
+    for second in range(1, horizon + 1):
+        start_time = time.perf_counter()
+        expired += service.advance(BASE + second)
+        tick_seconds.append(time.perf_counter() - start_time)
+
+    assert expired == entries
+    assert store.items == {}
+    record_property("full_scan_seconds", scan_seconds)
+    record_property("median_tick_seconds", statistics.median(tick_seconds))
+    record_property("max_tick_seconds", max(tick_seconds))
@@ -0,0 +1,179 @@
+"""Tests for request facts shared between extensions."""
+
+import re
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import Request
+
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.extensions.blocklist import BlocklistExtension
+from beginnings.extensions.rate_limiting import RateLimitExtension
+from beginnings.extensions.rate_limiting.trusted_proxies import TrustedProxyManager
+from beginnings.extensions.request_facts import RequestFacts
+
+
+def _scope(path="/api/data", headers=None, client="10.0.0.5"):
+    """Build a minimal ASGI scope."""
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(name.encode(), value.encode()) for name, value in (headers or {}).items()],
+        "client": (client, 54321),
+        "server": ("testserver", 80),
+        "scheme": "http",
+    }
+
+
+async def _ok(request):
+    """Downstream handler."""
+    return MagicMock(status_code=200, headers={})
+
+
+class TestRequestFacts:
+    """Test parsing and sharing of request facts."""
+
+    def test_shared_by_requests_on_same_scope(self):
+        """Test every Request built for a scope reads the same facts."""
+        scope = _scope()
+
+        assert RequestFacts.of(Request(scope)) is RequestFacts.of(Request(scope))
+
+    def test_path_collapses_repeated_slashes(self):
+        """Test //api///data and /api/data are the same path."""
+        assert RequestFacts.of(Request(_scope("//api///data"))).path == "/api/data"
+
+    @pytest.mark.parametrize("path, headers, expected", [
+        ("/page", {"accept": "application/json"}, True),
+        ("/api/items", {}, True),
+        ("/page", {"content-type": "application/json"}, True),
+        ("/page", {"accept": "text/html"}, False),
+    ])
+    def test_is_api(self, path, headers, expected):
+        """Test JSON clients are recognized by Accept, path or Content-Type."""
+        assert RequestFacts.of(Request(_scope(path, headers))).is_api is expected
+
+    def test_bearer_token_and_cookies(self):
+        """Test the bearer token and cookies are parsed from headers."""
+        headers = {"authorization": "Bearer abc.def", "cookie": "session_id=s1; csrf=c1"}
+        facts = RequestFacts.of(Request(_scope(headers=headers)))
+
+        assert facts.bearer_token == "abc.def"
+        assert facts.cookies == {"session_id": "s1", "csrf": "c1"}
+        assert RequestFacts.of(Request(_scope(headers={"authorization": "Basic x"}))).bearer_token is None
+
+    def test_test_doubles_get_unshared_facts(self):
+        """Test requests without a dict scope still get working facts."""
+        request = MagicMock(scope=None, url=MagicMock(path="/x//y"), headers={})
+
+        assert RequestFacts.of(request) is not RequestFacts.of(request)
+        assert RequestFacts.of(request).path == "/x/y"
+
+
+class TestSharedClientIP:
+    """Test the client IP is resolved once per request."""
+
+    @pytest.mark.asyncio
+    async def test_resolved_once_across_extensions(self):
+        """Test blocklist, rate limiting and sessions with matching proxy configs share one resolution."""
+        blocklist = BlocklistExtension({})
+        blocklist.logger = MagicMock()
+        rate_limiter = RateLimitExtension({"global": {"enabled": True, "requests": 10, "window_seconds": 60}})
+        rate_limiter.logger = MagicMock()
+        blocklist_middleware = blocklist.get_middleware_factory()({})
+        rate_limit_middleware = rate_limiter.get_middleware_factory()({"path": "/api/data"})
+        request = Request(_scope(headers={"x-forwarded-for": "203.0.113.9"}))
+
+        with patch.object(TrustedProxyManager, "extract_real_ip", autospec=True, return_value="203.0.113.9") as resolve:
+            response = await blocklist_middleware(request, lambda r: rate_limit_middleware(r, _ok))
+            session_ip = SessionProvider({})._get_client_ip(Request(request.scope))
+
+        assert response.status_code == 200
+        assert session_ip == "203.0.113.9"
+        assert resolve.call_count == 1
+
+    def test_each_proxy_config_resolves_separately(self):
+        """Test a looser blocklist proxy config does not decide rate limit keys."""
+        blocklist = BlocklistExtension({"trusted_proxies": {"trusted_proxies": ["198.51.100.0/24"]}})
+        rate_limiter = RateLimitExtension({})
+        request = Request(_scope(headers={"x-forwarded-for": "203.0.113.9"}, client="198.51.100.7"))
+
+        assert blocklist._get_client_ip(request) == "203.0.113.9"
+        assert rate_limiter._get_client_ip(request) == "ip:198.51.100.7"
+        assert RateLimitExtension({})._get_client_ip(request) == "ip:198.51.100.7"
+
+    @pytest.mark.asyncio
+    async def test_repeated_slashes_share_rate_limit(self):
+        """Test extra slashes do not give a client a fresh rate limit bucket."""
+        rate_limiter = RateLimitExtension({"global": {"enabled": True, "requests": 1, "window_seconds": 60}})
+        rate_limiter.logger = MagicMock()
+        middleware = rate_limiter.get_middleware_factory()({"path": "/api/data"})
+
+        statuses = [
+            (await middleware(Request(_scope(path)), _ok)).status_code
+            for path in ["/api/data", "//api/data", "/api//data"]
+        ]
+
+        assert statuses == [200, 429, 429]
+
+
+@pytest.mark.slow
+def test_shared_facts_benchmark(record_property):
+    """Benchmark four extensions reading shared facts against each reparsing the request.
+
+    Both cases share one ``Request`` across the layers, as real middleware
+    does. Timings are reported as test properties rather than asserted, as
+    they depend on the machine and its load.
+    """
+    proxy_manager = TrustedProxyManager({"enabled": True})
+    headers = {
+        "accept": "text/html,application/xhtml+xml",
+        "authorization": "Bearer " + "t" * 200,
+        "cookie": "; ".join(f"c{index}=v{index}" for index in range(10)),
+        "x-forwarded-for": "203.0.113.9",
+    }
+    scope = _scope("/account//settings", headers)
+
+    def reparse():
+        # What each layer did before facts were shared
+        request = Request(dict(scope))
+        for _ in range(4):
+            path = request.url.path
+            if "//" in path:
+                path = re.sub(r"/{2,}", "/", path)
+            "application/json" in request.headers.get("accept", "").lower()
+            request.headers.get("content-type", "")
+            request.headers.get("authorization")
+            request.cookies.get("c5")
+            proxy_manager.extract_real_ip(
+                request.client.host,
+                request.headers.get("x-forwarded-for"),
+                request.headers.get("x-real-ip")
+            )
+
+    def shared():
+        request = Request(dict(scope))
+        for _ in range(4):
+            facts = RequestFacts.of(request)
+            facts.path
+            facts.is_api
+            facts.bearer_token
+            facts.cookies.get("c5")
+            facts.resolve_client_ip(proxy_manager)
+
+    def seconds(func):
+        start_time = time.perf_counter()
+        for _ in range(2000):
+            func()
+        return time.perf_counter() - start_time
+
+    reparse_times, shared_times = [], []
+    for _ in range(5):
+        reparse_times.append(seconds(reparse))
+        shared_times.append(seconds(shared))
+
+    record_property("reparse_seconds_per_request", min(reparse_times) / 2000)
+    record_property("shared_seconds_per_request", min(shared_times) / 2000)
@@ -0,0 +1,296 @@
+"""Tests for single-flight coalescing of identical GET requests."""
+
+from __future__ import annotations
+
+import asyncio
+import secrets
+import tempfile
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+import yaml
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import HTMLResponse, StreamingResponse
+
+from beginnings.config.enhanced_loader import ConfigLoader
+from beginnings.extensions.loader import ExtensionManager
+from beginnings.routing.api import APIRouter
+from beginnings.routing.coalescing import RequestCoalescer, coalesce_endpoint
+
+ROUTES = {
+    "/page": {"coalesce": True},
+    "/items/*": {"coalesce": True, "coalesce_vary": ["accept-language"]},
+    "/fail": {"coalesce": True},
+    "/html": {"coalesce": True},
+    "/sync": {"coalesce": True},
+    "/nonce": {"coalesce": True},
+    "/login": {"coalesce": True},
+    "/account": {"coalesce": True},
+}
+
+
+def _make_router(routes: dict[str, Any] = ROUTES) -> APIRouter:
+    """Create an API router whose configuration has the given routes."""
+    temp_dir = tempfile.mkdtemp()
+    with open(Path(temp_dir) / "app.yaml", "w") as f:
+        yaml.safe_dump({"app": {"name": "test-app"}, "routes": routes}, f)
+
+    config_loader = ConfigLoader(temp_dir)
+    extension_manager = ExtensionManager(FastAPI(), config_loader.load_config())
+    return APIRouter(config_loader=config_loader, extension_manager=extension_manager)
+
+
+class Handlers:
+    """Route handlers that count their invocations."""
+
+    def __init__(self) -> None:
+        self.calls: dict[str, int] = {}
+        self.router = _make_router()
+        router = self.router
+
+        @router.get("/page")
+        async def page(q: str = "") -> dict[str, Any]:
+            return await self._handle("page", {"q": q})
+
+        @router.get("/items/{item_id}")
+        async def item(item_id: int) -> dict[str, Any]:
+            return await self._handle(f"item:{item_id}", {"id": item_id})
+
+        @router.get("/fail")
+        async def fail() -> None:
+            await self._handle("fail", None)
+            raise HTTPException(status_code=503, detail="backend down")
+
+        @router.get("/html")
+        async def html() -> HTMLResponse:
+            await self._handle("html", None)
+            return HTMLResponse("<p>hello</p>", headers={"x-rendered": "once"})
+
+        @router.get("/sync")
+        def sync() -> dict[str, str]:
+            self.calls["sync"] = self.calls.get("sync", 0) + 1
+            return {"ok": "yes"}
+
+        @router.get("/nonce")
+        async def nonce(request: Request) -> HTMLResponse:
+            await self._handle("nonce", None)
+            request.state.csp_script_nonce = secrets.token_urlsafe(16)
+            return HTMLResponse(f'<script nonce="{request.state.csp_script_nonce}"></script>')
+
+        @router.get("/login")
+        async def login() -> HTMLResponse:
+            await self._handle("login", None)
+            response = HTMLResponse("<p>welcome</p>")
+            response.set_cookie("session", secrets.token_hex(16))
+            return response
+
+        @router.get("/account")
+        async def account() -> HTMLResponse:
+            await self._handle("account", None)
+            return HTMLResponse("<p>account</p>", headers={"cache-control": "no-cache, Private"})
+
+        @router.post("/page")
+        async def post_page() -> dict[str, Any]:
+            return await self._handle("post", {})
+
+        @router.get("/plain")
+        async def plain() -> dict[str, Any]:
+            return await self._handle("plain", {})
+
+        self.app = FastAPI()
+        self.app.include_router(router)
+
+    async def _handle(self, name: str, result: Any) -> Any:
+        """Count a call and simulate slow rendering."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        await asyncio.sleep(0.05)
+        return result
+
+    async def burst(self, requests: list[tuple[str, str, dict[str, str]]]) -> list[httpx.Response]:
+        """Send requests concurrently."""
+        transport = httpx.ASGITransport(app=self.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            return await asyncio.gather(*[
+                client.request(method, url, headers=headers) for method, url, headers in requests
+            ])
+
+
+class TestCoalescedRoutes:
+    """Test coalescing through the router."""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("burst_size", [1, 10, 100])
+    async def test_one_handler_call_per_burst(self, burst_size):
+        """Test a burst of identical GETs runs the handler once and every client gets the response."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/page?q=x", {})] * burst_size)
+
+        assert handlers.calls == {"page": 1}
+        assert [response.json() for response in responses] == [{"q": "x"}] * burst_size
+
+    @pytest.mark.asyncio
+    async def test_key_includes_query_and_vary_headers(self):
+        """Test different queries and vary header values are not coalesced together."""
+        handlers = Handlers()
+
+        await handlers.burst(
+            [("GET", "/page?q=a", {})] * 5
+            + [("GET", "/page?q=b", {})] * 5
+            + [("GET", "/page?q=a", {"accept": "text/plain"})] * 5
+            + [("GET", "/items/1", {"accept-language": "en"})] * 5
+            + [("GET", "/items/1", {"accept-language": "fr"})] * 5
+        )
+
+        assert handlers.calls == {"page": 3, "item:1": 2}
+
+    @pytest.mark.asyncio
+    async def test_sequential_requests_each_run(self):
+        """Test only concurrent requests share a handler call."""
+        handlers = Handlers()
+
+        for _ in range(3):
+            await handlers.burst([("GET", "/page", {})])
+
+        assert handlers.calls == {"page": 3}
+
+    @pytest.mark.asyncio
+    async def test_errors_propagate_to_every_waiter(self):
+        """Test an exception from the shared call reaches every request."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/fail", {})] * 20)
+
+        assert handlers.calls == {"fail": 1}
+        assert {response.status_code for response in responses} == {503}
+        assert {response.json()["detail"] for response in responses} == {"backend down"}
+
+    @pytest.mark.asyncio
+    async def test_response_bytes_fanned_out(self):
+        """Test waiters receive the leader's response body and headers."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/html", {})] * 10)
+
+        assert handlers.calls == {"html": 1}
+        assert {response.text for response in responses} == {"<p>hello</p>"}
+        assert {response.headers["x-rendered"] for response in responses} == {"once"}
+        assert {response.headers["content-length"] for response in responses} == {"12"}
+
+    @pytest.mark.asyncio
+    async def test_per_request_secrets_not_shared(self):
+        """Test responses that used a CSP nonce are rendered for each request."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/nonce", {})] * 5)
+
+        assert handlers.calls == {"nonce": 5}
+        assert len({response.text for response in responses}) == 5
+
+    @pytest.mark.asyncio
+    async def test_cookie_responses_not_shared(self):
+        """Test a response setting a cookie is never replayed to other clients."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/login", {})] * 4)
+
+        assert handlers.calls == {"login": 4}
+        assert len({response.cookies["session"] for response in responses}) == 4
+
+    @pytest.mark.asyncio
+    async def test_private_responses_not_shared(self):
+        """Test Cache-Control private responses are rendered for each request."""
+        handlers = Handlers()
+
+        await handlers.burst([("GET", "/account", {})] * 4)
+
+        assert handlers.calls == {"account": 4}
+
+    def test_response_parameter_rejected(self):
+        """Test handlers setting headers on an injected Response cannot be coalesced."""
+        async def handler(response: Response) -> dict[str, str]:
+            response.set_cookie("seen", "1")
+            return {}
+
+        with pytest.raises(ValueError, match="Response parameter"):
+            coalesce_endpoint(handler, RequestCoalescer())
+
+    @pytest.mark.asyncio
+    async def test_sync_endpoint(self):
+        """Test synchronous endpoints still run in the threadpool."""
+        handlers = Handlers()
+
+        responses = await handlers.burst([("GET", "/sync", {})] * 3)
+
+        assert {response.status_code for response in responses} == {200}
+        assert 1 <= handlers.calls["sync"] <= 3
+
+    @pytest.mark.asyncio
+    async def test_only_configured_get_routes(self):
+        """Test POSTs and routes without ``coalesce`` run once per request."""
+        handlers = Handlers()
+
+        await handlers.burst([("POST", "/page", {})] * 5 + [("GET", "/plain", {})] * 5)
+
+        assert handlers.calls == {"post": 5, "plain": 5}
+
+
+class TestRequestCoalescer:
+    """Test follower fallbacks."""
+
+    @pytest.mark.asyncio
+    async def test_followers_run_handler_when_leader_cancelled(self):
+        """Test a cancelled leader doesn't fail the requests waiting on it."""
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        leader = asyncio.ensure_future(coalescer.run(("GET", "/"), call))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(coalescer.run(("GET", "/"), call))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        assert await follower == "result"
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_followers_stop_waiting_at_timeout(self):
+        """Test followers of a hung leader run the handler themselves."""
+        coalescer = RequestCoalescer(timeout=0.05)
+        hang = asyncio.Event()
+
+        async def hung():
+            await hang.wait()
+
+        async def quick():
+            return "own result"
+
+        leader = asyncio.ensure_future(coalescer.run(("GET", "/"), hung))
+        await asyncio.sleep(0)
+
+        assert await coalescer.run(("GET", "/"), quick) == "own result"
+        hang.set()
+        await leader
+
+    @pytest.mark.asyncio
+    async def test_streaming_responses_not_shared(self):
+        """Test followers of a streaming response run the handler themselves."""
+        coalescer = RequestCoalescer()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return StreamingResponse(iter([b"chunk"]))
+
+        results = await asyncio.gather(*[coalescer.run(("GET", "/"), call) for _ in range(3)])
+
+        assert len(calls) == 3
+        assert len({id(result) for result in results}) == 3
@@ -0,0 +1,323 @@
+"""Tests for per-extension latency instrumentation of middleware chains."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import gc
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import httpx
+import pytest
+import yaml
+from fastapi import FastAPI, HTTPException
+
+from beginnings.cli.debug.bottleneck_detector import BottleneckDetector
+from beginnings.config.enhanced_loader import ConfigLoader
+from beginnings.core.app import App
+from beginnings.extensions.base import BaseExtension
+from beginnings.monitoring.metrics import MetricsCollector
+from beginnings.routing import timing
+from beginnings.routing.api import APIRouter
+from beginnings.routing.middleware import MiddlewareChainBuilder
+from beginnings.routing.timing import MiddlewareTimer, ServerTimingMiddleware
+
+
+def make_extension(name: str, delay: float = 0.0, status_code: int | None = None) -> BaseExtension:
+    """Create an extension whose middleware sleeps, then calls the endpoint or raises."""
+    class _Sleeping(BaseExtension):
+        def get_middleware_factory(self):
+            def factory(route_config):
+                def middleware(endpoint):
+                    @functools.wraps(endpoint)
+                    async def wrapped(*args, **kwargs):
+                        await asyncio.sleep(delay)
+                        if status_code is not None:
+                            raise HTTPException(status_code=status_code)
+                        return await endpoint(*args, **kwargs)
+                    return wrapped
+                return middleware
+            return factory
+
+        def should_apply_to_route(self, path, methods, route_config):
+            return True
+
+    _Sleeping.__name__ = name
+    return _Sleeping({})
+
+
+def make_builder(extensions: list[BaseExtension], metrics: MetricsCollector) -> MiddlewareChainBuilder:
+    """Create a chain builder timing the given extensions."""
+    manager = MagicMock()
+    manager.get_loaded_extensions.return_value = extensions
+    return MiddlewareChainBuilder(manager, MiddlewareTimer(metrics))
+
+
+def durations(metrics: MetricsCollector, name: str) -> dict[str, float]:
+    """Get the histogram statistics of an extension's layer."""
+    return metrics.get_histogram_stats(timing.HISTOGRAM_NAME, {"extension": name})
+
+
+@pytest.fixture
+def detector():
+    """Feed timed requests to a fresh bottleneck detector."""
+    detector = BottleneckDetector()
+    timing.set_bottleneck_detector(detector)
+    yield detector
+    timing.set_bottleneck_detector(None)
+
+
+class TestMiddlewareTimer:
+    """Test timed middleware chains."""
+
+    @pytest.mark.asyncio
+    async def test_records_self_time_per_extension(self):
+        """Test each layer's histogram excludes the time of the layers it calls."""
+        # Sleeps advance a fake clock, so the recorded times are exact
+        now_ns = 0
+
+        async def sleep(delay):
+            nonlocal now_ns
+            now_ns += int(delay * 1_000_000_000)
+
+        metrics = MetricsCollector()
+        builder = make_builder([
+            make_extension("AuthExtension", delay=0.03),
+            make_extension("BlocklistExtension"),
+            make_extension("CSRFExtension", delay=0.01),
+        ], metrics)
+
+        async def endpoint():
+            await asyncio.sleep(0.02)
+            return "ok"
+
+        chain = builder.build_middleware_chain("/", ["GET"], {})
+        with patch.object(timing, "perf_counter_ns", lambda: now_ns), patch("asyncio.sleep", sleep):
+            assert await chain(endpoint)() == "ok"
+
+        blocklist, auth, csrf = (
+            durations(metrics, name) for name in ("BlocklistExtension", "AuthExtension", "CSRFExtension")
+        )
+        assert {stats["count"] for stats in (blocklist, auth, csrf)} == {1}
+        assert blocklist["max"] == 0
+        assert auth["max"] == 30
+        assert csrf["max"] == 10
+
+    @pytest.mark.asyncio
+    async def test_short_circuited_layers_not_recorded(self, detector):
+        """Test layers a request never reached record nothing."""
+        metrics = MetricsCollector()
+        builder = make_builder([
+            make_extension("BlocklistExtension", status_code=403),
+            make_extension("CSRFExtension"),
+        ], metrics)
+        endpoint = MagicMock()
+
+        chain = builder.build_middleware_chain("/", ["GET"], {})
+        with pytest.raises(HTTPException):
+            await chain(endpoint)()
+
+        endpoint.assert_not_called()
+        assert durations(metrics, "BlocklistExtension")["count"] == 1
+        assert durations(metrics, "CSRFExtension")["count"] == 0
+        [request] = detector.analyzer._request_data
+        assert request["status_code"] == 403
+        assert list(request["middleware_timings"]) == ["BlocklistExtension"]
+
+    @pytest.mark.asyncio
+    async def test_feeds_bottleneck_detector(self, detector):
+        """Test every timed request is recorded with its middleware timings."""
+        builder = make_builder([
+            make_extension("RateLimitExtension", delay=0.01),
+            make_extension("AuthExtension"),
+        ], MetricsCollector())
+
+        async def list_items():
+            return "ok"
+
+        chain = builder.build_middleware_chain("/items", ["GET"], {})
+        await chain(list_items)()
+
+        [request] = detector.analyzer._request_data
+        assert request["path"] == "/items"
+        assert request["method"] == "GET"
+        assert request["status_code"] == 200
+        assert request["route_handler"] == "list_items"
+        assert set(request["middleware_timings"]) == {"RateLimitExtension", "AuthExtension"}
+        assert request["middleware_timings"]["RateLimitExtension"] >= 10
+        assert request["duration_ms"] >= sum(request["middleware_timings"].values())
+
+    def test_sync_chains(self):
+        """Test synchronous middleware and endpoints are timed without changing results."""
+        metrics = MetricsCollector()
+
+        class _Sync(BaseExtension):
+            def get_middleware_factory(self):
+                return lambda route_config: lambda endpoint: (lambda: endpoint() + 1)
+
+            def should_apply_to_route(self, path, methods, route_config):
+                return True
+
+        chain = make_builder([_Sync({}), _Sync({})], metrics).build_middleware_chain("/", ["GET"], {})
+
+        assert chain(lambda: 1)() == 3
+        assert durations(metrics, "_Sync")["count"] == 2
+
+    def test_reset_keeps_held_windows(self):
+        """Test reset empties histograms, hides them from reports and keeps held windows recording."""
+        metrics = MetricsCollector()
+        window = metrics.histogram_window(timing.HISTOGRAM_NAME, {"extension": "AuthExtension"})
+        window.extend([1.0, 2.0, 3.0])
+
+        assert metrics.get_all_metrics()["histograms"] == {
+            "middleware_duration_ms[extension=AuthExtension]": durations(metrics, "AuthExtension")
+        }
+        assert durations(metrics, "AuthExtension")["max"] == 3.0
+
+        metrics.reset_metrics()
+        assert metrics.get_all_metrics()["histograms"] == {}
+
+        window.append(4.0)
+        assert durations(metrics, "AuthExtension")["count"] == 1
+
+    def test_disabled_without_timer(self):
+        """Test chains are composed untimed unless a timer is configured."""
+        manager = MagicMock()
+        manager.get_loaded_extensions.return_value = [make_extension("AuthExtension")]
+        endpoint = MagicMock(__name__="endpoint")
+
+        chain = MiddlewareChainBuilder(manager).build_middleware_chain("/", ["GET"], {})
+
+        assert chain(endpoint).__wrapped__ is endpoint
+
+
+def _make_router(config: dict[str, Any], extensions: list[BaseExtension]) -> APIRouter:
+    """Create an API router with the given configuration and extensions."""
+    temp_dir = tempfile.mkdtemp()
+    with open(Path(temp_dir) / "app.yaml", "w") as f:
+        yaml.safe_dump({"app": {"name": "test-app"}, **config}, f)
+
+    manager = MagicMock()
+    manager.get_loaded_extensions.return_value = extensions
+    return APIRouter(config_loader=ConfigLoader(temp_dir), extension_manager=manager)
+
+
+class TestServerTiming:
+    """Test the Server-Timing header."""
+
+    @pytest.mark.asyncio
+    async def test_header_lists_each_layer_and_handler(self):
+        """Test responses carry a Server-Timing entry per extension and the handler."""
+        router = _make_router({"middleware_timing": {"enabled": True}}, [
+            make_extension("AuthExtension", delay=0.01),
+            make_extension("RateLimitExtension"),
+        ])
+
+        @router.get("/items")
+        async def items() -> dict[str, str]:
+            return {"ok": "yes"}
+
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(ServerTimingMiddleware)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/items")
+
+        assert response.json() == {"ok": "yes"}
+        entries = [entry.split(";dur=") for entry in response.headers["server-timing"].split(", ")]
+        assert [name for name, _ in entries] == ["RateLimitExtension", "AuthExtension", "handler"]
+        assert float(entries[1][1]) >= 10
+
+    @pytest.mark.asyncio
+    async def test_untimed_routes_have_no_header(self):
+        """Test routers without ``middleware_timing`` leave responses untouched."""
+        router = _make_router({}, [make_extension("AuthExtension")])
+
+        @router.get("/items")
+        async def items() -> dict[str, str]:
+            return {"ok": "yes"}
+
+        app = FastAPI()
+        app.include_router(router)
+        app.add_middleware(ServerTimingMiddleware)
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            response = await client.get("/items")
+
+        assert "server-timing" not in response.headers
+
+    @pytest.mark.parametrize("environment,installed", [("development", True), ("production", False)])
+    def test_app_installs_header_outside_production(self, environment, installed):
+        """Test the App only sends Server-Timing outside production."""
+        temp_dir = tempfile.mkdtemp()
+        with open(Path(temp_dir) / "app.yaml", "w") as f:
+            yaml.safe_dump({"app": {"name": "test-app"}, "middleware_timing": {"enabled": True}}, f)
+
+        app = App(config_dir=temp_dir, environment=environment)
+
+        assert any(middleware.cls is ServerTimingMiddleware for middleware in app.user_middleware) == installed
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_timing_overhead_per_layer():
+    """Benchmark the cost each timed layer adds over an untimed one."""
+    def middleware(endpoint):
+        async def wrapped():
+            return await endpoint()
+        return wrapped
+
+    class _PassThrough(BaseExtension):
+        def get_middleware_factory(self):
+            return lambda route_config: middleware
+
+        def should_apply_to_route(self, path, methods, route_config):
+            return True
+
+    async def endpoint():
+        return None
+
+    def chains(layer_count):
+        manager = MagicMock()
+        manager.get_loaded_extensions.return_value = [_PassThrough({}) for _ in range(layer_count)]
+        untimed = MiddlewareChainBuilder(manager).build_middleware_chain("/", ["GET"], {})
+        timed = make_builder(manager.get_loaded_extensions(), MetricsCollector()).build_middleware_chain(
+            "/", ["GET"], {}
+        )
+        return untimed(endpoint), timed(endpoint)
+
+    async def seconds(chain):
+        # Collections are paused, as timeit does, so the size of the test
+        # session's heap doesn't count against the layers
+        gc.disable()
+        try:
+            start_time = time.perf_counter()
+            for _ in range(5000):
+                await chain()
+            return time.perf_counter() - start_time
+        finally:
+            gc.enable()
+
+    # The per-request cost is the same for short and long chains, so the
+    # difference between them leaves what each extra layer costs
+    short_untimed, short_timed = chains(2)
+    long_untimed, long_timed = chains(18)
+    times: dict[Any, list[float]] = {chain: [] for chain in (short_untimed, short_timed, long_untimed, long_timed)}
+    for _ in range(9):
+        for chain, chain_times in times.items():
+            chain_times.append(await seconds(chain))
+
+    untimed_per_layer = (min(times[long_untimed]) - min(times[short_untimed])) / 5000 / 16
+    timed_per_layer = (min(times[long_timed]) - min(times[short_timed])) / 5000 / 16
+    overhead = timed_per_layer - untimed_per_layer
+    # The budget is 1µs per layer; machines too slow to run an untimed
+    # pass-through layer in an eighth of that get a proportionally larger one
+    budget = max(1e-6, 8 * untimed_per_layer)
+    assert overhead < budget, f"{overhead * 1e9:.0f}ns per layer, {untimed_per_layer * 1e9:.0f}ns untimed"
@@ -172,6 +172,32 @@ class TestCORSManager:
         assert effective_config.allow_credentials is True
         assert effective_config.max_age == 600
 
+    def test_cors_manager_merged_config_cached(self) -> None:
+        """Test merged route configs are reused until either config changes."""
+        manager = CORSManager(CORSConfig(allow_origins=["https://example.com"]))
+        manager.set_route_cors("/api/users", {"max_age": 60})
+        
+        first = manager.get_cors_config_for_route("/api/users")
+        assert manager.get_cors_config_for_route("/api/users") is first
+        
+        manager.set_global_cors({"allow_origins": ["https://other.example.com"]})
+        updated = manager.get_cors_config_for_route("/api/users")
+        assert updated is not first
+        assert updated.allow_origins == ["https://other.example.com"]
+        assert updated.max_age == 60
+
+    def test_cors_config_origin_matching(self) -> None:
+        """Test compiled origin matching of listed origins and the origin regex."""
+        config = CORSConfig(
+            allow_origins=["https://example.com"],
+            allow_origin_regex=r"https://[a-z]+\.example\.org"
+        )
+        
+        assert config.is_origin_allowed("https://example.com")
+        assert config.is_origin_allowed("https://app.example.org")
+        assert not config.is_origin_allowed("https://evil.com")
+        assert CORSConfig().is_origin_allowed("https://anything.example")
+
     def test_cors_manager_from_config(self) -> None:
         """Test creating CORS manager from configuration."""
         config = {
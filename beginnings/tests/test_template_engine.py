@@ -6,6 +6,7 @@ Tests template rendering, configuration, and integration with the HTMLRouter.
 
 from __future__ import annotations
 
+import re
 import tempfile
 from pathlib import Path
 from typing import Any
@@ -106,6 +107,21 @@ class TestTemplateEngine:
             assert "<h1>Welcome</h1>" in result
             assert "Welcome Alice!" in result
 
+    def test_request_functions(self) -> None:
+        """Test request-first template functions receive the request being rendered."""
+        with tempfile.TemporaryDirectory() as temp_dir:
+            templates_dir = Path(temp_dir) / "templates"
+            templates_dir.mkdir()
+            (templates_dir / "path.html").write_text("{{ show_path() }} {{ show_path(request, '!') }}")
+            engine = TemplateEngine(template_directory=str(templates_dir))
+            engine.register_request_functions({
+                "show_path": lambda request, suffix="": request.url.path + suffix
+            })
+            request = Request({"type": "http", "method": "GET", "path": "/a", "query_string": b"", "headers": []})
+            
+            assert engine.render_template("path.html", request=request) == "/a /a!"
+            assert engine.render_template("path.html") == " "
+
     def test_render_template_with_inheritance(self) -> None:
         """Test template rendering with template inheritance."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -348,6 +364,51 @@ class TestHTMLRouterTemplateIntegration:
             import shutil
             shutil.rmtree(temp_dir, ignore_errors=True)
 
+    def test_extension_template_functions(self) -> None:
+        """Test templates call extension functions like csp_nonce() without passing the request."""
+        temp_dir = tempfile.mkdtemp()
+        
+        try:
+            templates_dir = Path(temp_dir) / "templates"
+            templates_dir.mkdir()
+            (templates_dir / "page.html").write_text(
+                '<script nonce="{{ csp_nonce() }}"></script><style nonce="{{ csp_nonce("style") }}"></style>'
+            )
+            config = {
+                "app": {"name": "nonce_test_app"},
+                "templates": {"directory": str(templates_dir)},
+                "extensions": {
+                    "beginnings.extensions.security_headers.extension:SecurityHeadersExtension": {
+                        "csp": {
+                            "enabled": True,
+                            "directives": {"script_src": ["'self'"], "style_src": ["'self'"]},
+                            "nonce": {"enabled": True}
+                        }
+                    }
+                }
+            }
+            with open(Path(temp_dir) / "app.yaml", "w") as f:
+                yaml.safe_dump(config, f)
+            
+            app = App(config_dir=temp_dir, environment="development")
+            html_router = app.create_html_router()
+            request = Request({"type": "http", "method": "GET", "path": "/page", "query_string": b"", "headers": []})
+            
+            rendered = html_router.render_template("page.html", request=request)
+            
+            # The nonces rendered are the ones the CSP middleware adds to the header
+            assert re.findall(r'nonce="([^"]+)"', rendered) == [
+                request.state.csp_script_nonce,
+                request.state.csp_style_nonce
+            ]
+            
+            # Rendering without a request leaves the nonce empty
+            assert html_router.render_template("page.html") == '<script nonce=""></script><style nonce=""></style>'
+            
+        finally:
+            import shutil
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
     def test_template_engine_security(self) -> None:
         """Test template engine security features."""
         with tempfile.TemporaryDirectory() as temp_dir:
@@ -0,0 +1,200 @@
+"""Tests for the rate limiting benchmark matrix and Redis stand-in."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from beginnings.extensions.rate_limiting.storage import RedisRateLimitStorage
+from beginnings.testing.benchmarks import (
+    RateLimitBenchmark,
+    RateLimitBenchmarkConfiguration,
+    RateLimitBenchmarkResult,
+    run_rate_limit_benchmarks
+)
+from beginnings.testing.redis_stand_in import LocalRedisStandIn
+
+
+def _small_config(**overrides):
+    """Create a matrix small enough for the regular test run."""
+    config = {
+        "algorithms": ["fixed_window"],
+        "storages": ["memory"],
+        "concurrency_levels": [4],
+        "key_cardinalities": [5],
+        "requests_per_key": 8,
+        "limit": 3,
+    }
+    config.update(overrides)
+    return RateLimitBenchmarkConfiguration(**config)
+
+
+class TestLocalRedisStandIn:
+    """Test Redis semantics of the stand-in."""
+
+    @pytest.mark.asyncio
+    async def test_hash_commands_return_bytes(self):
+        """Test hash replies are bytes like redis-py without decoding."""
+        redis = LocalRedisStandIn()
+
+        await redis.hset("bucket", mapping={"tokens": "4.5", "last_refill": 10})
+
+        assert await redis.hgetall("bucket") == {b"tokens": b"4.5", b"last_refill": b"10"}
+        assert await redis.hget("bucket", "tokens") == b"4.5"
+
+    @pytest.mark.asyncio
+    async def test_sorted_set_members_are_unique(self):
+        """Test adding an existing member updates it instead of duplicating."""
+        redis = LocalRedisStandIn()
+
+        await redis.zadd("window", {"100.0": 100.0})
+        await redis.zadd("window", {"100.0": 100.0})
+        await redis.zadd("window", {"50.0": 50.0})
+
+        assert await redis.zrange("window", 0, -1) == [b"50.0", b"100.0"]
+        assert await redis.zremrangebyscore("window", 0, 60) == 1
+
+    @pytest.mark.asyncio
+    async def test_keys_expire(self):
+        """Test expired keys disappear."""
+        redis = LocalRedisStandIn()
+
+        with patch("time.time", return_value=1000.0):
+            await redis.set("key", "value", ex=10)
+        with patch("time.time", return_value=1011.0):
+            assert await redis.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_pipeline_is_one_round_trip(self):
+        """Test pipelined commands share a single round trip."""
+        redis = LocalRedisStandIn()
+        await redis.hset("counter", mapping={"count": 3})
+        round_trips = redis.round_trips
+
+        pipeline = redis.pipeline()
+        pipeline.hget("counter", "count")
+        pipeline.hget("counter", "missing")
+        results = await pipeline.execute()
+
+        assert results == [b"3", None]
+        assert redis.round_trips == round_trips + 1
+
+    @pytest.mark.asyncio
+    async def test_unknown_script_raises(self):
+        """Test scripts without a registered handler are rejected."""
+        redis = LocalRedisStandIn()
+
+        with pytest.raises(NotImplementedError):
+            await redis.eval("return 1", 0)
+
+    @pytest.mark.asyncio
+    async def test_drives_redis_storage(self):
+        """Test RedisRateLimitStorage runs unchanged against the stand-in."""
+        storage = RedisRateLimitStorage("redis://stand-in")
+        storage._redis = LocalRedisStandIn()
+
+        assert (await storage.increment_counter("key", 60))[0] == 1
+        assert (await storage.increment_counter("key", 60))[0] == 2
+        assert (await storage.get_counter("key"))[0] == 2
+
+        await storage.set_token_bucket("bucket", {"tokens": 2.5, "last_refill": 100.0})
+        assert await storage.get_token_bucket("bucket") == {"tokens": 2.5, "last_refill": 100.0}
+
+
+class TestRateLimitBenchmark:
+    """Test the rate limiting benchmark matrix."""
+
+    @pytest.mark.asyncio
+    async def test_memory_case_matches_oracle(self):
+        """Test an exact in-process limiter admits exactly the oracle count."""
+        benchmark = RateLimitBenchmark(_small_config())
+
+        result = await benchmark.run_case("fixed_window", "memory", 4, 5)
+
+        assert isinstance(result, RateLimitBenchmarkResult)
+        assert result.decisions == 40
+        assert result.admitted == result.oracle_admitted == 15
+        assert result.over_admission_rate == 0.0
+        assert result.decisions_per_second > 0
+        assert result.p99_latency_ms >= result.p50_latency_ms
+        assert result.bytes_per_key > 0
+
+    @pytest.mark.asyncio
+    async def test_shared_memory_reports_slot_size(self):
+        """Test shared memory footprint is the fixed slot size."""
+        benchmark = RateLimitBenchmark(_small_config(shared_memory_buckets=64))
+
+        result = await benchmark.run_case("token_bucket", "shared_memory", 4, 5)
+
+        assert result.over_admission_rate == 0.0
+        assert result.bytes_per_key == 48
+
+    @pytest.mark.asyncio
+    async def test_shared_memory_processes_match_oracle(self):
+        """Test worker processes sharing one table never over-admit."""
+        benchmark = RateLimitBenchmark(_small_config(shared_memory_buckets=64))
+
+        result = await benchmark.run_process_case("sliding_window", 2, 5)
+
+        assert (result.processes, result.concurrency) == (2, 1)
+        assert result.decisions == 40
+        assert result.admitted == result.oracle_admitted == 15
+        assert result.over_admitted == 0
+
+    @pytest.mark.asyncio
+    async def test_oracle_detects_racy_storage(self):
+        """Test non-atomic read-modify-write over the Redis stand-in is caught."""
+        benchmark = RateLimitBenchmark(_small_config(requests_per_key=20))
+
+        serial = await benchmark.run_case("token_bucket", "redis", 1, 1)
+        concurrent = await benchmark.run_case("token_bucket", "redis", 16, 1)
+
+        assert serial.over_admitted == 0
+        assert concurrent.over_admitted > 0
+        assert concurrent.metadata["round_trips_per_decision"] >= 1
+
+    @pytest.mark.asyncio
+    async def test_custom_algorithm_registration(self):
+        """Test new algorithms can join the matrix with their own oracle."""
+        class AdmitAll:
+            def __init__(self, config, storage):
+                self.storage = storage
+
+            async def is_allowed(self, key, limit, window_seconds):
+                return True, limit, 0.0
+
+        benchmark = RateLimitBenchmark(_small_config(algorithms=["admit_all"]))
+        benchmark.register_algorithm("admit_all", AdmitAll, lambda *args: 2)
+
+        results = await benchmark.run_matrix()
+
+        assert results[0].over_admitted == 5 * (8 - 2)
+
+    def test_report_and_export(self, tmp_path):
+        """Test report summaries, table output and JSON export."""
+        benchmark = run_rate_limit_benchmarks(_small_config(storages=["memory", "redis"], concurrency_levels=[1]))
+
+        report = benchmark.generate_report()
+        assert {result["storage"] for result in report["results"]} == {"memory", "redis"}
+        assert set(report["summary"]) == {"memory", "redis"}
+        assert "asyncio tasks in one process" in report["concurrency_model"]
+        assert "over-admit" in benchmark.format_table()
+        assert report["concurrency_model"] in benchmark.format_table()
+
+        export_path = tmp_path / "rate_limit.json"
+        benchmark.export_results(export_path)
+        assert len(json.loads(export_path.read_text())["results"]) == 2
+
+    def test_unknown_storage(self):
+        """Test unknown storage types are rejected."""
+        with pytest.raises(ValueError, match="Unknown benchmark storage type"):
+            RateLimitBenchmark().create_storage("carrier_pigeon", "/tmp")
+
+    @pytest.mark.slow
+    def test_full_matrix(self):
+        """Run the default matrix; exact backends must never over-admit."""
+        benchmark = run_rate_limit_benchmarks()
+
+        for result in benchmark.results:
+            if result.storage in ("memory", "shared_memory"):
+                assert result.over_admitted == 0, result
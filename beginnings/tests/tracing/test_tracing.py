@@ -0,0 +1,493 @@
+"""Tests for request tracing."""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import gc
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+import yaml
+from fastapi import FastAPI, HTTPException
+
+from beginnings.core.app import App
+from beginnings.extensions.auth.providers.session_provider import SessionProvider
+from beginnings.extensions.base import BaseExtension
+from beginnings.extensions.rate_limiting.extension import RateLimitExtension
+from beginnings.logging import LogConfig, LogFormat, LogLevel, LogManager
+from beginnings.routing.middleware import MiddlewareChainBuilder
+from beginnings.routing.templates import TemplateEngine
+from beginnings.tracing import (
+    BatchSpanProcessor,
+    HeadSampler,
+    InMemoryExporter,
+    OTLPJsonFileExporter,
+    SpanContext,
+    SpanExporter,
+    StatusCode,
+    TailSampler,
+    Tracer,
+    TracingMiddleware,
+    current_trace_ids,
+    format_traceparent,
+    parse_traceparent,
+    set_tracer,
+    start_span,
+)
+
+TRACEPARENT = "00-4bf92f3577b34da6a3ce929d0e0e4736-00f067aa0ba902b7-01"
+
+
+def make_tracer(exporter: SpanExporter, head_rate: float = 1.0, **tracer_options: Any) -> Tracer:
+    """Create a tracer exporting to the given exporter."""
+    return Tracer(BatchSpanProcessor(exporter), head_sampler=HeadSampler(head_rate), **tracer_options)
+
+
+@pytest.fixture
+def tracer():
+    """Trace every request into an in-memory exporter."""
+    tracer = make_tracer(InMemoryExporter())
+    set_tracer(tracer)
+    yield tracer
+    set_tracer(None)
+    tracer.shutdown()
+
+
+def finished_spans(tracer: Tracer) -> dict[str, Any]:
+    """Export the spans of finished traces and get them by name."""
+    tracer.force_flush()
+    return {span.name: span for span in tracer.processor.exporter.get_finished_spans()}
+
+
+def make_extension(name: str, status_code: int | None = None) -> BaseExtension:
+    """Create an extension whose middleware calls the endpoint or raises."""
+    class _PassThrough(BaseExtension):
+        def get_middleware_factory(self):
+            def factory(route_config):
+                def middleware(endpoint):
+                    @functools.wraps(endpoint)
+                    async def wrapped(*args, **kwargs):
+                        if status_code is not None:
+                            raise HTTPException(status_code=status_code)
+                        return await endpoint(*args, **kwargs)
+                    return wrapped
+                return middleware
+            return factory
+
+        def should_apply_to_route(self, path, methods, route_config):
+            return True
+
+    _PassThrough.__name__ = name
+    return _PassThrough({})
+
+
+def build_chain(extensions: list[BaseExtension]) -> Any:
+    """Build the middleware chain of a route with the given extensions."""
+    manager = MagicMock()
+    manager.get_loaded_extensions.return_value = extensions
+    return MiddlewareChainBuilder(manager).build_middleware_chain("/", ["GET"], {})
+
+
+class TestTraceparent:
+    """Test W3C traceparent propagation."""
+
+    def test_parse(self):
+        """Test a valid header is parsed into the caller's span context."""
+        context = parse_traceparent(TRACEPARENT)
+
+        assert context.trace_id_hex == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert context.span_id_hex == "00f067aa0ba902b7"
+        assert context.sampled is True
+
+    def test_format_round_trip(self):
+        """Test formatting a context gives back the header it was parsed from."""
+        assert format_traceparent(parse_traceparent(TRACEPARENT)) == TRACEPARENT
+        assert format_traceparent(SpanContext(1, 2, False)) == f"00-{1:032x}-{2:016x}-00"
+
+    def test_future_versions(self):
+        """Test headers of future versions are read by their version 00 fields."""
+        context = parse_traceparent("01" + TRACEPARENT[2:] + "-extra")
+
+        assert context.trace_id_hex == "4bf92f3577b34da6a3ce929d0e0e4736"
+
+    @pytest.mark.parametrize("header", [
+        "",
+        "ff" + TRACEPARENT[2:],
+        TRACEPARENT + "-extra",
+        TRACEPARENT.upper(),
+        TRACEPARENT.replace("-", "_"),
+        "00-00000000000000000000000000000000-00f067aa0ba902b7-01",
+        "00-4bf92f3577b34da6a3ce929d0e0e4736-0000000000000000-01",
+        "00-4bf92f3577b34da6a3ce929d0e0e473-00f067aa0ba902b7-01",
+    ])
+    def test_invalid_headers(self, header):
+        """Test invalid headers are ignored."""
+        assert parse_traceparent(header) is None
+
+
+class TestSampling:
+    """Test head and tail sampling."""
+
+    def test_head_sampling_ratio(self):
+        """Test the head sampler records its rate of random trace IDs."""
+        sampler = HeadSampler(0.1)
+        tracer = make_tracer(InMemoryExporter(), head_rate=0.1)
+
+        sampled = sum(tracer.start_request("GET").recording for _ in range(20000))
+
+        assert sampler.rate == 0.1
+        assert 1600 <= sampled <= 2400
+
+    def test_head_sampling_follows_parent(self):
+        """Test requests carrying a traceparent follow the caller's decision."""
+        tracer = make_tracer(InMemoryExporter(), head_rate=0.0)
+
+        span = tracer.start_request("GET", TRACEPARENT)
+        unsampled = tracer.start_request("GET", TRACEPARENT[:-2] + "00")
+
+        assert span.recording is True
+        assert span.context.trace_id_hex == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert span.parent_span_id == 0x00f067aa0ba902b7
+        assert unsampled.recording is False
+
+    def test_invalid_rate(self):
+        """Test rates outside 0.0 to 1.0 are rejected."""
+        with pytest.raises(ValueError):
+            HeadSampler(1.5)
+
+    def test_tail_sampling_keeps_errors_and_slow_traces(self):
+        """Test the tail sampler keeps only error and slow traces at rate 0."""
+        exporter = InMemoryExporter()
+        tracer = make_tracer(exporter, tail_sampler=TailSampler(latency_threshold_ms=20, rate=0.0))
+
+        with tracer.start_request("fast"):
+            pass
+        with pytest.raises(RuntimeError):
+            with tracer.start_request("failed"):
+                with start_span("query"):
+                    raise RuntimeError("connection reset")
+        with tracer.start_request("slow"):
+            time.sleep(0.03)
+        tracer.force_flush()
+
+        assert [span.name for span in exporter.get_finished_spans()] == ["query", "failed", "slow"]
+
+
+class TestSpans:
+    """Test span recording."""
+
+    @pytest.mark.asyncio
+    async def test_extension_layers_nest(self, tracer):
+        """Test each extension layer is a span nested in the one calling it."""
+        chain = build_chain([make_extension("CSRFExtension"), make_extension("AuthExtension")])
+
+        async def endpoint():
+            with start_span("handler"):
+                return "ok"
+
+        with tracer.start_request("GET /") as root:
+            assert await chain(endpoint)() == "ok"
+
+        spans = finished_spans(tracer)
+        assert spans["AuthExtension"].parent_span_id == root.context.span_id
+        assert spans["CSRFExtension"].parent_span_id == spans["AuthExtension"].context.span_id
+        assert spans["handler"].parent_span_id == spans["CSRFExtension"].context.span_id
+        assert spans["AuthExtension"].attributes == {"beginnings.extension": "AuthExtension"}
+        assert {span.context.trace_id for span in spans.values()} == {root.context.trace_id}
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_span_errors(self, tracer):
+        """Test HTTP exceptions below 500 record their status without an error."""
+        chain = build_chain([make_extension("AuthExtension", status_code=401)])
+
+        with pytest.raises(HTTPException):
+            with tracer.start_request("GET /"):
+                await chain(MagicMock())()
+
+        auth = finished_spans(tracer)["AuthExtension"]
+        assert auth.status is StatusCode.UNSET
+        assert auth.attributes["http.response.status_code"] == 401
+
+    @pytest.mark.asyncio
+    async def test_template_and_storage_spans(self, tracer):
+        """Test template renders and rate limit and session storage calls are spans."""
+        temp_dir = tempfile.mkdtemp()
+        (Path(temp_dir) / "page.html").write_text("<p>{{ name }}</p>")
+        engine = TemplateEngine(temp_dir)
+        rate_limiter = RateLimitExtension({})
+        sessions = SessionProvider({"secret_key": "x" * 32})
+
+        with tracer.start_request("GET /"):
+            await rate_limiter._storage.increment_counter("client", 60)
+            await sessions._storage.save("session", {"user_id": "1"}, 60)
+            assert await engine.render_template_async("page.html", {"name": "a"}) == "<p>a</p>"
+
+        spans = finished_spans(tracer)
+        assert spans["template.render"].attributes == {"template.name": "page.html"}
+        assert spans["rate_limit.storage.increment_counter"].attributes == {"storage.backend": "MemoryRateLimitStorage"}
+        assert spans["session.storage.save"].attributes == {"storage.backend": "MemorySessionStorage"}
+
+    def test_untraced_without_tracer(self):
+        """Test storage is left untouched unless tracing is enabled."""
+        rate_limiter = RateLimitExtension({})
+
+        assert not hasattr(rate_limiter._storage.increment_counter, "__wrapped__")
+
+    def test_unsampled_requests_record_nothing(self):
+        """Test unsampled requests have IDs but start no-op spans."""
+        exporter = InMemoryExporter()
+        tracer = make_tracer(exporter, head_rate=0.0)
+
+        with tracer.start_request("GET /") as root:
+            child = start_span("query")
+            ids = current_trace_ids()
+
+        tracer.force_flush()
+        assert root.recording is False
+        assert child.recording is False
+        assert ids == (root.context.trace_id_hex, root.context.span_id_hex)
+        assert current_trace_ids() is None
+        assert exporter.get_finished_spans() == []
+
+    def test_spans_per_trace_capped(self):
+        """Test spans beyond the cap and spans ending after the root are dropped."""
+        exporter = InMemoryExporter()
+        tracer = make_tracer(exporter, max_spans_per_trace=3)
+
+        with tracer.start_request("GET /"):
+            for index in range(5):
+                with start_span(f"query {index}"):
+                    pass
+            late = start_span("late")
+        late.end()
+        tracer.force_flush()
+
+        assert [span.name for span in exporter.get_finished_spans()] == ["query 0", "query 1", "query 2"]
+
+
+class TestExport:
+    """Test span export."""
+
+    def test_otlp_json_file(self):
+        """Test batches are appended to the file as OTLP/JSON export requests."""
+        path = Path(tempfile.mkdtemp()) / "traces" / "spans.jsonl"
+        tracer = make_tracer(OTLPJsonFileExporter(path, "shop"))
+
+        with tracer.start_request("GET /items", TRACEPARENT, {"http.request.method": "GET"}) as root:
+            root.set_attribute("http.response.status_code", 500)
+            root.set_attribute("cache.hit", False)
+            root.set_status(StatusCode.ERROR, "backend down")
+        tracer.shutdown()
+
+        [line] = path.read_text().splitlines()
+        [resource_spans] = json.loads(line)["resourceSpans"]
+        assert resource_spans["resource"]["attributes"] == [{"key": "service.name", "value": {"stringValue": "shop"}}]
+        [scope_spans] = resource_spans["scopeSpans"]
+        assert scope_spans["scope"] == {"name": "beginnings"}
+        [span] = scope_spans["spans"]
+        assert span["traceId"] == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert span["parentSpanId"] == "00f067aa0ba902b7"
+        assert span["spanId"] == root.context.span_id_hex
+        assert span["kind"] == 2
+        assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+        assert span["attributes"] == [
+            {"key": "http.request.method", "value": {"stringValue": "GET"}},
+            {"key": "http.response.status_code", "value": {"intValue": "500"}},
+            {"key": "cache.hit", "value": {"boolValue": False}},
+        ]
+        assert span["status"] == {"code": 2, "message": "backend down"}
+
+    def test_full_queue_drops_spans(self):
+        """Test spans beyond the queue size are dropped rather than blocking requests."""
+        exporter = InMemoryExporter()
+        processor = BatchSpanProcessor(exporter, max_queue_size=2, schedule_delay_ms=60000)
+        tracer = Tracer(processor)
+
+        for _ in range(3):
+            with tracer.start_request("GET /"):
+                pass
+        tracer.force_flush()
+
+        assert len(exporter.get_finished_spans()) == 2
+        tracer.shutdown()
+
+    def test_export_errors_are_contained(self):
+        """Test a failing exporter doesn't raise into request handling."""
+        exporter = MagicMock(spec=SpanExporter)
+        exporter.export.side_effect = OSError("disk full")
+        tracer = Tracer(BatchSpanProcessor(exporter))
+
+        with tracer.start_request("GET /"):
+            pass
+        tracer.force_flush()
+
+        exporter.export.assert_called_once()
+        tracer.shutdown()
+
+
+def _make_app(config: dict[str, Any]) -> App:
+    """Create an App with the given configuration."""
+    temp_dir = tempfile.mkdtemp()
+    with open(Path(temp_dir) / "app.yaml", "w") as f:
+        yaml.safe_dump({"app": {"name": "test-app"}, **config}, f)
+    return App(config_dir=temp_dir)
+
+
+class TestTracingMiddleware:
+    """Test request traces."""
+
+    @pytest.mark.asyncio
+    async def test_request_is_root_span(self):
+        """Test requests continue the caller's trace and are named after their route."""
+        app = _make_app({"tracing": {"enabled": True, "export": {"type": "memory"}}})
+        exporter = app._tracer.processor.exporter
+        router = app.create_api_router()
+        seen_ids = []
+
+        @router.get("/items/{item_id}")
+        async def item(item_id: int) -> dict[str, int]:
+            seen_ids.append(current_trace_ids())
+            return {"id": item_id}
+
+        app.include_router(router)
+        try:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+                response = await client.get("/items/1", headers={"traceparent": TRACEPARENT})
+            app._tracer.force_flush()
+        finally:
+            set_tracer(None)
+
+        assert response.json() == {"id": 1}
+        [root] = exporter.get_finished_spans()
+        assert root.name == "GET /items/{item_id}"
+        assert root.context.trace_id_hex == "4bf92f3577b34da6a3ce929d0e0e4736"
+        assert root.attributes["http.response.status_code"] == 200
+        assert root.attributes["url.path"] == "/items/1"
+        assert seen_ids == [(root.context.trace_id_hex, root.context.span_id_hex)]
+
+    @pytest.mark.asyncio
+    async def test_server_errors_are_span_errors(self):
+        """Test 5xx responses set the root span's status to ERROR."""
+        exporter = InMemoryExporter()
+        tracer = make_tracer(exporter)
+        app = FastAPI()
+
+        @app.get("/fail")
+        async def fail() -> None:
+            raise HTTPException(status_code=503)
+
+        app.add_middleware(TracingMiddleware, tracer=tracer)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            await client.get("/fail")
+        tracer.force_flush()
+
+        [root] = exporter.get_finished_spans()
+        assert root.status is StatusCode.ERROR
+        assert root.attributes["http.response.status_code"] == 503
+
+    def test_disabled_by_default(self):
+        """Test the App installs no tracing unless configured."""
+        app = _make_app({})
+
+        assert app._tracer is None
+        assert not any(middleware.cls is TracingMiddleware for middleware in app.user_middleware)
+
+
+class TestLogStamping:
+    """Test trace IDs in log entries."""
+
+    @pytest.mark.asyncio
+    async def test_log_entries_carry_current_span_ids(self):
+        """Test log entries get the IDs of the current span unless given."""
+        manager = LogManager()
+        config = LogConfig(
+            name="app",
+            level=LogLevel.INFO,
+            format=LogFormat.JSON,
+            output_file=str(Path(tempfile.mkdtemp()) / "app.log"),
+            structured_logging=True
+        )
+        await manager.initialize_logging(config)
+        tracer = make_tracer(InMemoryExporter(), head_rate=0.0)
+
+        with tracer.start_request("GET /") as root:
+            stamped = await manager.log(LogLevel.INFO, "in request", logger_name="app")
+            explicit = await manager.log(LogLevel.INFO, "explicit", logger_name="app", trace_id="abc")
+        outside = await manager.log(LogLevel.INFO, "outside", logger_name="app")
+
+        assert stamped.log_entry.trace_id == root.context.trace_id_hex
+        assert stamped.log_entry.span_id == root.context.span_id_hex
+        assert (explicit.log_entry.trace_id, explicit.log_entry.span_id) == ("abc", None)
+        assert (outside.log_entry.trace_id, outside.log_entry.span_id) == (None, None)
+
+
+class _DiscardingExporter(SpanExporter):
+    """Exporter that encodes spans, then discards them."""
+
+    def export(self, spans):
+        from beginnings.tracing.exporters import encode_spans
+        encode_spans(spans, "benchmark")
+
+
+@pytest.mark.slow
+@pytest.mark.asyncio
+async def test_tracing_overhead():
+    """Benchmark the per-request cost of tracing at 1% and 100% sampling."""
+    extensions = [make_extension(f"Extension{index}") for index in range(5)]
+
+    async def endpoint():
+        return None
+
+    def asgi_app(chain):
+        async def app(scope, receive, send):
+            await chain()
+        return app
+
+    untraced = asgi_app(build_chain(extensions)(endpoint))
+    tracers = {rate: make_tracer(_DiscardingExporter(), head_rate=rate) for rate in (0.01, 1.0)}
+    set_tracer(tracers[1.0])
+    try:
+        traced_chain = build_chain(extensions)(endpoint)
+    finally:
+        set_tracer(None)
+    apps = {
+        None: untraced,
+        0.01: TracingMiddleware(asgi_app(traced_chain), tracers[0.01]),
+        1.0: TracingMiddleware(asgi_app(traced_chain), tracers[1.0]),
+    }
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"host", b"testserver")]}
+
+    async def seconds(app):
+        # Collections are paused, as timeit does
+        gc.disable()
+        try:
+            start_time = time.perf_counter()
+            for _ in range(2000):
+                await app(scope, None, None)
+            return time.perf_counter() - start_time
+        finally:
+            gc.enable()
+
+    times: dict[Any, list[float]] = {rate: [] for rate in apps}
+    for _ in range(7):
+        for rate, app in apps.items():
+            times[rate].append(await seconds(app))
+            await asyncio.sleep(0)
+    for tracer in tracers.values():
+        tracer.shutdown()
+
+    baseline = min(times[None]) / 2000
+    overhead = {rate: min(times[rate]) / 2000 - baseline for rate in (0.01, 1.0)}
+    report = ", ".join(f"{rate:.0%}: {seconds * 1e6:.1f}µs" for rate, seconds in overhead.items())
+    # Unsampled requests skip span creation, so 1% sampling costs a small
+    # fraction of recording every request
+    assert overhead[0.01] < overhead[1.0] / 4, f"{report} over {baseline * 1e6:.1f}µs untraced"